@@ -3,7 +3,7 @@
 #
 #  The FIVE config maps that drive every faucet: UTXO
 #  networks, EVM networks, SVM networks, MOVE networks and
-#  ERC-20 tokens.
+#  ERC-20 tokens — plus the optional per-route rate limits.
 #  This file is MOUNTED into the backend container
 #  (./_CONFIG:/config) and loaded by main.py at startup —
 #  editing it needs a backend restart (docker restart
@@ -43,7 +43,9 @@
 #   (top level)  — identity: id (picker order), names
 #   'faucet'     — the OPERATOR's choices: which coin, which
 #                  network flavour, the payout size and the
-#                  ElectrumX endpoint (host:port, SSL)
+#                  ElectrumX endpoint (host:port, SSL) —
+#                  optionally with 'electrum_fallbacks', more
+#                  endpoints for the same chain to fail over to
 #   'explorer'   — where the UI links a transaction / address
 #
 # 'coin' names an entry of the backend's coin registry
@@ -453,3 +455,41 @@ MOVE_NETWORK_CONFIGS = {
         },
     },
 }
+
+
+
+
+
+
+
+
+
+############################################################
+# RATE_LIMIT_CONFIGS
+############################################################
+#
+# Per-client-IP request budgets, one token bucket per route:
+#
+#   key          — the Flask route rule exactly as declared
+#                  in the blueprint ('/api/evm/<network>/request'
+#                  — the placeholder, not a network name), so
+#                  one budget covers every network of a route
+#   'burst'      — requests a client may fire back to back
+#   'per_minute' — the steady rate once the burst is spent
+#
+# Routes not listed are never limited; delete the whole map
+# to switch the limiter off. A shed request gets a 429 with
+# Retry-After before it reaches any faucet, RPC or Etherscan.
+# The budget is per IP: a classroom behind one NAT shares
+# it, so size it for the whole room, not one student. A key
+# naming no real route fails the boot.
+############################################################
+
+RATE_LIMIT_CONFIGS = {
+    '/api/evm/<network>/request':                 {'burst': 20, 'per_minute': 60},
+    '/api/erc20/<network>/<token>/request':       {'burst': 20, 'per_minute': 60},
+    '/api/utxo/<network>/request-btc':            {'burst': 20, 'per_minute': 60},
+    '/api/svm/<network>/request':                 {'burst': 20, 'per_minute': 60},
+    '/api/move/<network>/request':                {'burst': 20, 'per_minute': 60},
+    '/api/evm/<network>/get-stored-transactions': {'burst': 30, 'per_minute': 120},
+}
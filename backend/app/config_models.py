@@ -15,9 +15,13 @@
 #  comes back out is normalized plain dicts again, so every
 #  consumer keeps its ordinary dict access.
 #
+#  validate_rate_limits() does the same for the optional
+#  RATE_LIMIT_CONFIGS map — per-route budgets, not a faucet
+#  family, so it stays out of validate_configs()' signature.
+#
 #  Used by:
-#    - main.py — validate_configs() right after the config
-#      definitions
+#    - main.py — validate_configs() / validate_rate_limits()
+#      right after the config definitions
 #    - tests/test_config_models.py — the negative cases
 ############################################################
 
@@ -27,6 +31,7 @@ from app.erc_faucet.config_schema import Erc20TokenConfig
 from app.utxo_faucet.config_schema import UtxoNetworkConfig
 from app.svm_faucet.config_schema import SvmNetworkConfig
 from app.move_faucet.config_schema import MoveNetworkConfig
+from app.rate_limit.config_schema import RateLimitRule
 
 
 
@@ -111,3 +116,35 @@ def validate_configs(evm_configs, erc20_configs, utxo_configs, svm_configs, move
         {key: model.model_dump(exclude_none=True) for key, model in svm.items()},
         {key: model.model_dump(exclude_none=True) for key, model in move.items()},
     )
+
+
+
+
+
+
+
+
+############################################################
+# validate_rate_limits
+############################################################
+#
+# Validates RATE_LIMIT_CONFIGS (route rule -> budget) through
+# RateLimitRule and returns normalized plain dicts, with the
+# same loud ValueError contract as validate_configs. Whether
+# each rule names a real route is only known once the
+# blueprints are registered — rate_limit_hook.py checks that.
+#
+# Used by:
+#   - main.py — right after validate_configs()
+############################################################
+
+def validate_rate_limits(rate_limit_configs):
+    rules = {}
+    for rule, config in (rate_limit_configs or {}).items():
+        if not isinstance(rule, str) or not rule.startswith('/'):
+            raise ValueError(f"Rate limit key {rule!r} must be a route rule like '/api/evm/<network>/request'")
+        try:
+            rules[rule] = RateLimitRule.model_validate(config).model_dump()
+        except ValueError as e:
+            raise ValueError(f"Rate limit for '{rule}' is misconfigured:\n{e}") from None
+    return rules
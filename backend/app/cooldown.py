@@ -11,22 +11,46 @@
 #  the claim expires — a failed payout releases the slot so a
 #  student is never locked out by an error.
 #
-#  Deliberately in-memory: the table resets on restart and a
-#  freshly generated wallet walks around it — both accepted
-#  for a lab faucet paying out testnet coins. (This also makes
-#  the whole backend single-process by design: run gunicorn
-#  with one worker.)
+#  Two interchangeable backends with the same claim/release
+#  contract, picked by cooldown_table():
+#
+#    CooldownTable        — in-memory and lock-striped, the
+#                           default. Resets on restart; one
+#                           gunicorn worker only.
+#    SqliteCooldownTable  — one row per claimed key in
+#                           SHARED_STATE_DIR/cooldowns.db, so
+#                           N workers on one host share the
+#                           slots (see app/shared_state.py).
+#
+#  A freshly generated wallet walks around either — accepted
+#  for a lab faucet paying out testnet coins.
 #
 #  Used by:
 #    - evm_faucet/evm_faucet.py — per (network, address)
 #    - erc_faucet/erc20_faucet.py — per (network, token, address)
 #    - utxo_faucet/utxo_faucet.py — per (network, address)
 #    - svm_faucet/svm_faucet.py — per (network, address)
+#    - move_faucet/move_faucet.py — per (network, address)
 ############################################################
 
 
+import json
 import time
+import sqlite3
 import threading
+import collections
+
+from . import shared_state
+
+
+# Hard cap on live slots per in-memory table. Far above any
+# class — (network, address) pairs for 200 students on every
+# chain are a few thousand — so it only ever bites a scripted
+# client minting fresh addresses.
+COOLDOWN_MAX_ENTRIES = 100_000
+
+# Independent locks per in-memory table — see CooldownTable
+COOLDOWN_STRIPES = 16
 
 
 
@@ -36,17 +60,27 @@ import threading
 
 
 ############################################################
-# CooldownTable
+# _CooldownStripe
 ############################################################
 #
-# One instance per faucet, each with its own window length and
-# key shape — the keys are opaque tuples to this class.
+# One lock's worth of CooldownTable: the claim map for the
+# keys that hash to it, behind its own lock.
+#
+# Memory stays flat for the life of the process: every claim
+# is also filed in a per-second bucket, and because the window
+# is the same for every key, the oldest bucket is always the
+# next to expire. Each claim sweeps the expired buckets off
+# the front (amortized O(1) — a key is filed once and swept
+# once), a release unfiles its key at once, and max_entries
+# is a hard cap on top: when a stripe is full the oldest
+# buckets are evicted early, the slots closest to expiring
+# anyway.
 #
 # Used by:
-#   - the four faucet __init__s — one instance each
+#   - CooldownTable (below) — one per stripe
 ############################################################
 
-class CooldownTable:
+class _CooldownStripe:
 
 
 
@@ -58,17 +92,93 @@ class CooldownTable:
     ############################################################
     #
     # seconds is the cooldown window; the lock guards the
-    # claim map so check-and-claim stays one atomic step.
+    # claim map and its buckets, so check-and-claim stays one
+    # atomic step.
     #
     # Used by:
-    #   - the four faucet __init__s
+    #   - CooldownTable.__init__ (below)
     ############################################################
 
-    def __init__(self, seconds):
+    def __init__(self, seconds, max_entries):
         self.seconds = int(seconds)
+        self.max_entries = int(max_entries)
         self._lock = threading.Lock()
+
+        # key -> the unix second it was claimed in
         self._last_claim = {}
 
+        # claim second -> the set of keys claimed in it, oldest
+        # second first. Exactly the keys of _last_claim are
+        # filed — release and a re-claim unfile the old entry
+        # (see _unfile), so claim/release churn cannot grow it.
+        self._buckets = collections.OrderedDict()
+
+        # Lifetime counters for stats(): keys swept after their
+        # window, and keys evicted early by the max_entries cap
+        self.expired = 0
+        self.evicted = 0
+
+
+
+
+
+
+    ############################################################
+    # _sweep
+    ############################################################
+    #
+    # Drops buckets off the front while they are expired — or
+    # while the table has fewer than `room` free slots under
+    # max_entries (claim makes room for one; live_count none).
+    # Every filed key is live in exactly that bucket. The
+    # caller holds self._lock.
+    #
+    # Used by:
+    #   - claim / live_count (below)
+    ############################################################
+
+    def _sweep(self, now, room=0):
+        while self._buckets:
+            second, keys = next(iter(self._buckets.items()))
+            expired = now - second >= self.seconds
+            if not expired and len(self._last_claim) + room <= self.max_entries:
+                return
+
+            self._buckets.popitem(last=False)
+            for key in keys:
+                del self._last_claim[key]
+            if expired:
+                self.expired += len(keys)
+            else:
+                self.evicted += len(keys)
+
+
+
+
+
+
+    ############################################################
+    # _unfile
+    ############################################################
+    #
+    # Forgets one key's claim: out of the claim map and out of
+    # its second's bucket, dropping the bucket once it is
+    # empty. The caller holds self._lock.
+    #
+    # Used by:
+    #   - claim / release (below)
+    ############################################################
+
+    def _unfile(self, key):
+        second = self._last_claim.pop(key, None)
+        if second is None:
+            return
+
+        keys = self._buckets[second]
+        keys.discard(key)
+        if not keys:
+            del self._buckets[second]
+
 
 
 
@@ -84,16 +194,23 @@ class CooldownTable:
     # down. No RPC or I/O ever happens under the lock.
     #
     # Used by:
-    #   - the faucets' payout paths, right before the slow work
+    #   - CooldownTable.claim (below)
     ############################################################
 
     def claim(self, key):
         now = int(time.time())
         with self._lock:
+            self._sweep(now)
+
             last = self._last_claim.get(key)
             if last is not None and now - last < self.seconds:
                 return self.seconds - (now - last)
+
+            # Only a successful claim makes room under the cap
+            self._unfile(key)
+            self._sweep(now, room=1)
             self._last_claim[key] = now
+            self._buckets.setdefault(now, set()).add(key)
             return 0
 
 
@@ -111,9 +228,405 @@ class CooldownTable:
     # is harmless.
     #
     # Used by:
-    #   - the faucets' payout failure paths
+    #   - CooldownTable.release (below)
     ############################################################
 
     def release(self, key):
         with self._lock:
-            self._last_claim.pop(key, None)
+            self._unfile(key)
+
+
+
+
+
+
+    ############################################################
+    # peek / live_count
+    ############################################################
+    #
+    # Read-only views for CooldownTable: the seconds the key
+    # still has to wait (0 = free right now), and how many keys
+    # are cooling down — neither ever counts an expired slot.
+    #
+    # Used by:
+    #   - CooldownTable.peek / __contains__ / stats (below)
+    ############################################################
+
+    def peek(self, key):
+        now = int(time.time())
+        with self._lock:
+            last = self._last_claim.get(key)
+        if last is not None and now - last < self.seconds:
+            return self.seconds - (now - last)
+        return 0
+
+    def live_count(self):
+        with self._lock:
+            self._sweep(int(time.time()))
+            return len(self._last_claim)
+
+
+
+
+
+
+
+
+############################################################
+# CooldownTable
+############################################################
+#
+# One instance per faucet, each with its own window length and
+# key shape — the keys are opaque tuples to this class.
+#
+# Striped: hash(key) picks one of `stripes` independent
+# _CooldownStripes, each with its own lock, so a whole class
+# pressing "request" at once spreads over 16 locks instead of
+# queueing on one. A key only ever lives in its own stripe,
+# which keeps check-and-claim atomic per key exactly as
+# before. max_entries is split evenly across the stripes, so
+# the cap — and its oldest-first eviction — is per stripe.
+# tools/bench_cooldown.py measures claim throughput by thread
+# count.
+#
+# Used by:
+#   - cooldown_table (below) — the single-process backend
+############################################################
+
+class CooldownTable:
+
+    def __init__(self, seconds, max_entries=COOLDOWN_MAX_ENTRIES, stripes=COOLDOWN_STRIPES):
+        self.seconds = int(seconds)
+        self.max_entries = int(max_entries)
+        per_stripe = -(-self.max_entries // stripes)
+        self._stripes = [_CooldownStripe(self.seconds, per_stripe) for _ in range(stripes)]
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+
+
+
+
+
+    ############################################################
+    # claim / release
+    ############################################################
+    #
+    # Atomically claim the key's slot: returns 0 when the claim
+    # succeeded (the caller may proceed with the payout) or the
+    # seconds still remaining when the key is cooling down.
+    # release gives a claimed slot back — called on every
+    # failure path after a successful claim, so a failed payout
+    # never counts as the student's claim; releasing an
+    # unclaimed key is harmless. No RPC or I/O ever happens
+    # under a stripe lock.
+    #
+    # Used by:
+    #   - the faucets' payout paths (claim right before the slow
+    #     work, release on every failure path)
+    ############################################################
+
+    def claim(self, key):
+        return self._stripe(key).claim(key)
+
+    def release(self, key):
+        self._stripe(key).release(key)
+
+
+
+
+
+
+    ############################################################
+    # peek
+    ############################################################
+    #
+    # The read-only half of claim: the seconds still remaining
+    # for the key, 0 when it is free — without claiming. The
+    # faucets call it first thing, so a student spamming the
+    # button is refused before any signature recovery or RPC.
+    # It decides nothing: a 0 here can still lose the later
+    # claim() to a parallel request, which stays the one atomic
+    # check.
+    #
+    # Used by:
+    #   - the faucets' request_* — the fast-path 429
+    ############################################################
+
+    def peek(self, key):
+        return self._stripe(key).peek(key)
+
+    def __contains__(self, key):
+        return self.peek(key) > 0
+
+
+
+
+
+
+    ############################################################
+    # stats
+    ############################################################
+    #
+    # The table's counters, summed over the stripes.
+    #
+    # Used by:
+    #   - tests/test_cooldown.py — the bounded-memory checks
+    ############################################################
+
+    def stats(self):
+        return {
+            'live': sum(stripe.live_count() for stripe in self._stripes),
+            'expired': sum(stripe.expired for stripe in self._stripes),
+            'evicted': sum(stripe.evicted for stripe in self._stripes),
+            'max_entries': self.max_entries,
+        }
+
+
+
+
+
+
+
+
+############################################################
+# SqliteCooldownTable
+############################################################
+#
+# The multi-worker backend: the same contract as
+# CooldownTable, one row per claimed key in a SQLite file
+# every worker opens. namespace keeps the faucets' tables
+# apart inside the one file; keys are stored as their JSON
+# text, so any tuple of strings round-trips.
+#
+# Used by:
+#   - cooldown_table (below) — when SHARED_STATE_DIR is set
+############################################################
+
+class SqliteCooldownTable:
+
+
+
+
+
+
+    ############################################################
+    # __init__
+    ############################################################
+    #
+    # Creates the table on first use (every worker races to —
+    # IF NOT EXISTS makes that harmless) and switches the file
+    # to WAL, so readers never wait on a writer.
+    #
+    # Used by:
+    #   - cooldown_table (below)
+    ############################################################
+
+    def __init__(self, seconds, namespace, path):
+        self.seconds = int(seconds)
+        self.namespace = namespace
+        self.path = path
+
+        # Rows THIS worker swept after their window — see stats()
+        self.expired = 0
+
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS Cooldown_Claims (
+                    namespace   TEXT NOT NULL,
+                    key         TEXT NOT NULL,
+                    claimed_at  INTEGER NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            ''')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS Cooldown_Claims_Expiry ON Cooldown_Claims (namespace, claimed_at)')
+        finally:
+            conn.close()
+
+
+
+
+
+
+    ############################################################
+    # _connect
+    ############################################################
+    #
+    # One short-lived connection per call, in autocommit mode
+    # so claim() controls its own transaction. The 10 s busy
+    # timeout covers another worker holding the write lock —
+    # it only ever does so for one SELECT and one UPSERT.
+    #
+    # Used by:
+    #   - every method below
+    ############################################################
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+
+
+
+
+
+    ############################################################
+    # claim
+    ############################################################
+    #
+    # The same contract as CooldownTable.claim. BEGIN
+    # IMMEDIATE takes the database write lock BEFORE the read,
+    # so check-and-claim stays one atomic step across every
+    # worker, not just every thread. The namespace's expired
+    # rows are swept in the same transaction — an indexed range
+    # delete — so the file stays as flat as the in-memory table.
+    #
+    # Used by:
+    #   - the faucets' payout paths, right before the slow work
+    ############################################################
+
+    def claim(self, key):
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            swept = conn.execute(
+                'DELETE FROM Cooldown_Claims WHERE namespace = ? AND claimed_at <= ?',
+                (self.namespace, now - self.seconds),
+            )
+            self.expired += max(swept.rowcount, 0)
+
+            row = conn.execute(
+                'SELECT claimed_at FROM Cooldown_Claims WHERE namespace = ? AND key = ?',
+                (self.namespace, json.dumps(key)),
+            ).fetchone()
+            if row is not None and now - row[0] < self.seconds:
+                conn.execute('ROLLBACK')
+                return self.seconds - (now - row[0])
+
+            conn.execute(
+                'INSERT OR REPLACE INTO Cooldown_Claims (namespace, key, claimed_at) VALUES (?, ?, ?)',
+                (self.namespace, json.dumps(key), now),
+            )
+            conn.execute('COMMIT')
+            return 0
+        finally:
+            conn.close()
+
+
+
+
+
+
+    ############################################################
+    # release
+    ############################################################
+    #
+    # The same contract as CooldownTable.release — a single
+    # DELETE is atomic on its own.
+    #
+    # Used by:
+    #   - the faucets' payout failure paths
+    ############################################################
+
+    def release(self, key):
+        conn = self._connect()
+        try:
+            conn.execute(
+                'DELETE FROM Cooldown_Claims WHERE namespace = ? AND key = ?',
+                (self.namespace, json.dumps(key)),
+            )
+        finally:
+            conn.close()
+
+
+
+
+
+
+    ############################################################
+    # peek
+    ############################################################
+    #
+    # The same contract as CooldownTable.peek — one indexed
+    # SELECT, no write lock taken.
+    #
+    # Used by:
+    #   - the faucets' request_* — the fast-path 429
+    ############################################################
+
+    def peek(self, key):
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT claimed_at FROM Cooldown_Claims WHERE namespace = ? AND key = ?',
+                (self.namespace, json.dumps(key)),
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is not None and now - row[0] < self.seconds:
+            return self.seconds - (now - row[0])
+        return 0
+
+    def __contains__(self, key):
+        return self.peek(key) > 0
+
+
+
+
+
+
+    ############################################################
+    # stats
+    ############################################################
+    #
+    # The same shape as CooldownTable.stats: 'live' is the
+    # namespace's unexpired rows across ALL workers, 'expired'
+    # counts this worker's sweeps. Nothing is evicted early —
+    # the file has no memory cap to enforce.
+    #
+    # Used by:
+    #   - tests/test_cooldown.py
+    ############################################################
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            live = conn.execute(
+                'SELECT COUNT(*) FROM Cooldown_Claims WHERE namespace = ? AND claimed_at > ?',
+                (self.namespace, int(time.time()) - self.seconds),
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+        return {'live': live, 'expired': self.expired, 'evicted': 0, 'max_entries': None}
+
+
+
+
+
+
+
+
+############################################################
+# cooldown_table
+############################################################
+#
+# The one place a faucet gets its table from: in-memory by
+# default, the shared SQLite file when SHARED_STATE_DIR is
+# set. namespace names the faucet ('evm', 'erc20', ...) and
+# only matters to the shared backend.
+#
+# Used by:
+#   - the five faucet __init__s — one table each
+############################################################
+
+def cooldown_table(seconds, namespace):
+    if shared_state.SHARED_STATE_DIR:
+        return SqliteCooldownTable(seconds, namespace, shared_state.shared_path('cooldowns.db'))
+    return CooldownTable(seconds)
@@ -10,12 +10,12 @@
 #
 #  This class deliberately owns NO wallet plumbing: it is
 #  composed WITH the EVMFaucet instance and borrows its Web3
-#  connections (which carry the sign-and-send middleware —
-#  signing happens there, this class never touches the key),
-#  its signature verification and — critically — its
-#  per-network send locks. Native ETH payouts and token
+#  connections, its payout signing (send_with_nonce signs
+#  with the faucet key — this class never touches it), its
+#  signature verification and — critically — its
+#  per-network nonce counter. Native ETH payouts and token
 #  payouts spend from the same wallet, so on any one chain
-#  they must share one nonce discipline or they'd race each
+#  they must share one nonce sequence or they'd race each
 #  other onto the same nonce.
 #
 #  A payout mirrors the native flow: the student signs the
@@ -25,9 +25,10 @@
 #  be unusable; the frontend shows the same rule with a link
 #  to the native faucet), that it doesn't already hold a full
 #  chunk, the per-(network, token, address) cooldown, and its
-#  own token balance, then broadcasts a transfer() under the
-#  shared lock. Note the wallet's CURRENT chain is irrelevant
-#  — the faucet sends on whichever chain the request names.
+#  own token balance, then broadcasts a transfer() on the
+#  next shared nonce. Note the wallet's CURRENT chain is
+#  irrelevant — the faucet sends on whichever chain the
+#  request names.
 #
 #  Used by:
 #    - erc20_routes.py — the Flask endpoints under /api/erc20/*
@@ -39,7 +40,7 @@ import logging
 import threading
 
 from .token_contracts import get_erc20_contract
-from ..cooldown import CooldownTable
+from ..cooldown import cooldown_table
 from ..icons import icon_url
 
 
@@ -73,11 +74,11 @@ class ERC20Faucet:
     ############################################################
     #
     # Composition, not duplication: evm_faucet is the shared
-    # EVMFaucet instance whose Web3 connections (with the
-    # signing middleware), signature check and per-network
-    # send locks this class borrows. token_configs is main.py's
-    # ERC20_TOKEN_CONFIGS (token-first, with a deployments map
-    # per token). Ends with a warmup that pre-fetches every
+    # EVMFaucet instance whose Web3 connections, payout
+    # signing, signature check, nonce counter, gas
+    # oracle and payout queue this class borrows. token_configs
+    # is main.py's ERC20_TOKEN_CONFIGS (token-first, with a
+    # deployments map per token). Ends with a warmup that pre-fetches every
     # deployment's balance — a wrong contract address is
     # visible in the console at startup.
     #
@@ -91,9 +92,9 @@ class ERC20Faucet:
 
         # Per-(network, token, address) cooldown between payouts —
         # the slot is claimed atomically before the slow RPC work and
-        # released on failure (see app/cooldown.py for the in-memory
-        # trade-offs).
-        self.cooldowns = CooldownTable(seconds=60)
+        # released on failure (see app/cooldown.py for the backends
+        # and their trade-offs).
+        self.cooldowns = cooldown_table(60, 'erc20')
 
         # (token, network) -> (unix time, balance). One token page
         # asks for the faucet's balance on EVERY chain the token
@@ -388,19 +389,21 @@ class ERC20Faucet:
     ############################################################
     #
     # The actual payout: validate everything, then broadcast
-    # one chunk-sized transfer() under the send lock shared
-    # with the native EVM faucet (same wallet, same nonce
-    # sequence). The student's wallet does NOT have to be on
+    # one chunk-sized transfer() on a nonce from the counter
+    # shared with the native EVM faucet (same wallet, same
+    # nonce sequence). The student's wallet does NOT have to be on
     # the target chain — the signature only proves address
     # ownership. Returns a (payload, http_status) tuple;
-    # user-facing errors are Lithuanian.
+    # user-facing errors are Lithuanian. The broadcast runs on
+    # the EVM faucet's payout queue for the network; wait=False
+    # answers 202 with its ticket instead.
     #
     # Used by:
     #   - erc20_routes.py —
     #     GET /api/erc20/<network>/<token>/request
     ############################################################
 
-    def request_tokens(self, network, token_symbol, to_address, signature, nonce):
+    def request_tokens(self, network, token_symbol, to_address, signature, nonce, wait=True):
         token_symbol = (token_symbol or '').upper()
 
         if not self.is_supported(network, token_symbol):
@@ -435,6 +438,16 @@ class ERC20Faucet:
             return {"error": "Neteisingas adresas"}, 400
 
 
+        # Fast path: a wallet still cooling down is refused right
+        # here, before the signature recovery and balance RPCs
+        # below. peek() only reads — STEP 3's claim() stays the one
+        # atomic check.
+        cooldown_key = (network, token_symbol, to_address.lower())
+        remaining = self.cooldowns.peek(cooldown_key)
+        if remaining:
+            return {"error": f"Žetonai jums jau išsiųsti. Daugiau galėsite pasiimti už {remaining} sek."}, 429
+
+
         # STEP 2: signature check — the exact message the frontend
         # asks MetaMask to sign, identical to the native ETH flow.
         # ========================================================
@@ -474,63 +487,73 @@ class ERC20Faucet:
         # same address would otherwise both pass a bare check and
         # get paid twice. Every failure path below releases the
         # slot, so a failed attempt never locks the student out.
-        cooldown_key = (network, token_symbol, to_address.lower())
         remaining = self.cooldowns.claim(cooldown_key)
         if remaining:
             return {"error": f"Žetonai jums jau išsiųsti. Daugiau galėsite pasiimti už {remaining} sek."}, 429
 
-        try:
-            faucet_token_balance = contract.functions.balanceOf(self.evm_faucet.FAUCET_ADDRESS).call()
-        except Exception:
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Nepavyko gauti čiaupo balanso"}, 500
-
-        if faucet_token_balance < amount_to_send:
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Čiaupas nebeturi žetonų. Praneškite dėstytojui."}, 503
-
-
-        # STEP 4: broadcast — under the network's send lock, SHARED
-        # with the native faucet, so token and native payouts from
-        # the same wallet never collide on a nonce. The sign-and-send
-        # middleware on the borrowed Web3 instance fills the pending
-        # nonce and chain id, signs and broadcasts. Gas is estimated
-        # per chain (zkSync-style chains want very different numbers
-        # than the classic 100k) with a safe fallback; gasPrice is
-        # explicit to force a LEGACY transaction — several testnets
-        # have spotty EIP-1559 support.
-        # ===========================================================
-        transfer_fn = contract.functions.transfer(to_address, amount_to_send)
-
-        try:
-            gas_limit = int(transfer_fn.estimate_gas({'from': self.evm_faucet.FAUCET_ADDRESS}) * 1.5)
-        except Exception:
-            gas_limit = 100000
-
-        try:
-            with self.evm_faucet.send_lock_for(network):
-                tx_hash = transfer_fn.transact({
+        # From here on the work runs on the network's payout worker
+        # (app/payout_queue/) as one job: the faucet balance check
+        # and the broadcast. With wait (the method's default; the
+        # route passes it only for ?wait=1) the HTTP thread waits
+        # for the job's answer; without — the route's default —
+        # it answers 202 with the ticket straight away.
+        def send():
+            try:
+                faucet_token_balance = contract.functions.balanceOf(self.evm_faucet.FAUCET_ADDRESS).call()
+            except Exception:
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Nepavyko gauti čiaupo balanso"}, 500
+
+            if faucet_token_balance < amount_to_send:
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Čiaupas nebeturi žetonų. Praneškite dėstytojui."}, 503
+
+
+            # STEP 4: broadcast on the next nonce from the counter SHARED
+            # with the native faucet (EVMFaucet.send_with_nonce), so token
+            # and native payouts from the same wallet never collide on a
+            # nonce; the transfer is built here, signed and broadcast
+            # there. Gas is estimated per chain (zkSync-style chains want
+            # very different numbers than the classic 100k) with a safe
+            # fallback; the fee fields come from the EVM faucet's gas
+            # oracle cache — a LEGACY gasPrice unless the network is
+            # configured for EIP-1559.
+            # ===========================================================
+            transfer_fn = contract.functions.transfer(to_address, amount_to_send)
+
+            try:
+                gas_limit = int(transfer_fn.estimate_gas({'from': self.evm_faucet.FAUCET_ADDRESS}) * 1.5)
+            except Exception:
+                gas_limit = 100000
+
+            try:
+                fees = self.evm_faucet.gas_oracle.fees(network)
+                tx_hash = self.evm_faucet.send_with_nonce(network, lambda tx_nonce: transfer_fn.build_transaction({
                     'from': self.evm_faucet.FAUCET_ADDRESS,
                     'gas': gas_limit,
-                    'gasPrice': w3.eth.gas_price,
-                })
-        except Exception:
-            logging.exception(f"Failed to broadcast {token_symbol} payout on {network}")
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500
-
-        # Success — the cooldown slot claimed in STEP 3 stays, and
-        # the cached balance is dropped so the page shows the new
-        # number on its next poll.
-        self._balance_cache.pop((token_symbol, network), None)
-
-        return {
-            "message": f"{token_symbol} sent successfully",
-            "transaction_hash": tx_hash.hex(),
-            "amount": float(config['chunk_size']),
-            "token": token_symbol,
-            "network": network,
-        }, 200
+                    'nonce': tx_nonce,
+                    'chainId': self.evm_faucet.NETWORK_CONFIGS[network]['chain_id'],
+                    **fees,
+                }))
+            except Exception:
+                logging.exception(f"Failed to broadcast {token_symbol} payout on {network}")
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500
+
+            # Success — the cooldown slot claimed in STEP 3 stays, and
+            # the cached balance is dropped so the page shows the new
+            # number on its next poll.
+            self._balance_cache.pop((token_symbol, network), None)
+
+            return {
+                "message": f"{token_symbol} sent successfully",
+                "transaction_hash": tx_hash.hex(),
+                "amount": float(config['chunk_size']),
+                "token": token_symbol,
+                "network": network,
+            }, 200
+
+        return self.evm_faucet.payouts.submit(network, send, wait=wait)
 
 
 
@@ -11,12 +11,13 @@
 #                                               every chain it
 #                                               lives on
 #    GET /api/erc20/<network>/<token>/request — send one chunk
-#                                               (?address, ?signature, ?nonce)
+#                                               (?address, ?signature, ?nonce,
+#                                                ?wait=1 → 200, not 202 + ticket)
 #
 #  A deliberately thin layer: every handler just forwards to
 #  the shared ERC20Faucet instance, which is composed WITH the
 #  native EVM faucet — same wallet, same Web3 connections,
-#  same send lock.
+#  same nonce counter.
 #
 #  Used by:
 #    - main.py — blueprint registration
@@ -122,5 +123,5 @@ def request_tokens(network, token):
     to_address = request.args.get('address')
     signature = request.args.get('signature')
     nonce = request.args.get('nonce')
-    data, status = erc20_faucet.request_tokens(network, token, to_address, signature, nonce)
+    data, status = erc20_faucet.request_tokens(network, token, to_address, signature, nonce, wait=request.args.get('wait') == '1')
     return jsonify(data), status
@@ -14,7 +14,7 @@
 ############################################################
 
 
-from typing import Optional
+from typing import Optional, Literal
 
 from pydantic import Field
 
@@ -57,7 +57,10 @@ class EvmNativeCurrency(StrictModel):
 #
 # What the backend itself uses: display names, its own RPC
 # (may carry <ENV_NAME> placeholders, resolved at startup by
-# EVMFaucet) and the payout size.
+# EVMFaucet), the payout size and, optionally, how payouts
+# price their gas — 'legacy' gasPrice (the default; several
+# testnets have spotty EIP-1559 support) or 'eip1559' fee
+# fields from eth_feeHistory (see gas_oracle.py).
 #
 # Used by:
 #   - EvmNetworkConfig (below)
@@ -68,6 +71,7 @@ class EvmFaucetSection(StrictModel):
     full_name: str = Field(min_length=1)
     rpc_url: str = Field(pattern=r'^https?://')
     chunk_size: float = Field(gt=0)
+    fee_mode: Optional[Literal['legacy', 'eip1559']] = None
 
 
 
@@ -13,18 +13,20 @@
 #    2. The faucet checks the address doesn't already hold a
 #       full chunk, that the cooldown has passed, and that the
 #       faucet wallet itself still has coins.
-#    3. A plain value transfer is handed to web3's sign-and-
-#       send middleware, which fills the pending nonce and
-#       chain id, signs with the faucet key (shared with the
-#       UTXO faucet) and broadcasts.
+#    3. A plain value transfer gets the next nonce from the
+#       faucet's LOCAL per-network counter (nonce_manager.py),
+#       is signed locally with the faucet key (shared with the
+#       UTXO faucet) and broadcast raw.
 #
 #  Built for classroom load: the polled faucet balance is
-#  cached for a few seconds, payouts are serialized per
-#  network (nonces are per chain — different chains never
-#  contend), and every chain is warmed up at startup with a
-#  console report — including a chain-id check that catches a
-#  wrong RPC URL before the frontend and the faucet drift
-#  onto different chains (rerun before the first payout if
+#  cached for a few seconds, and so are the fees (gas_oracle.py,
+#  refreshed in the background); nonces are allocated
+#  locally, so several payouts per network broadcast at once
+#  (nonces are per chain — different chains never contend);
+#  and every chain is warmed up at startup with a console
+#  report — including a chain-id check that catches a wrong
+#  RPC URL before the frontend and the faucet drift onto
+#  different chains (rerun before the first payout if
 #  the RPC was unreachable at startup — see _verify_chain_id).
 #
 #  The transaction-graph scraper that used to live here is
@@ -34,7 +36,7 @@
 #  Used by:
 #    - evm_routes.py — the Flask endpoints under /api/evm/*
 #    - erc20_faucet.py — borrows the connections, signature
-#      check and per-network send locks
+#      check, nonces and payout queue
 ############################################################
 
 
@@ -48,17 +50,13 @@ from web3 import Web3
 from eth_account import Account
 from eth_account.messages import encode_defunct
 
-from ..cooldown import CooldownTable
+from .nonce_manager import nonce_manager, is_nonce_conflict, is_already_known
+from .gas_oracle import GasOracle
+from ..cooldown import cooldown_table
+from ..keepalive import keepalive_scheduler
+from ..payout_queue.payout_queue import PayoutQueue
 from ..icons import icon_url
 
-# web3 v7 renamed this middleware — accept either name so an
-# image upgrade doesn't break payouts
-try:
-    from web3.middleware import construct_sign_and_send_raw_middleware
-except ImportError:
-    from web3.middleware import SignAndSendRawMiddlewareBuilder
-    construct_sign_and_send_raw_middleware = SignAndSendRawMiddlewareBuilder.build
-
 
 # How long a polled faucet balance is served from cache. The page
 # polls every few seconds per open browser tab; payouts drop the
@@ -73,6 +71,11 @@ COOLDOWN_SECONDS = 60
 # falls back to the lowest picker id instead.
 DEFAULT_NETWORK = 'sepolia'
 
+# Payout worker threads per network. With local nonces the
+# broadcasts no longer take turns, so a few run side by side;
+# more would only queue on the RPC provider's rate limit.
+PAYOUT_WORKERS = 4
+
 
 
 
@@ -88,10 +91,11 @@ DEFAULT_NETWORK = 'sepolia'
 # groups:
 #
 #   setup   — __init__, _warm_up_networks, _verify_chain_id
-#   locks   — send_lock_for
+#   nonces  — send_with_nonce
 #   queries — _faucet_balance
 #   faucet  — is_supported_network, verify_signature,
 #             request_eth, get_faucet_balance, get_networks
+#   debug   — get_gas_oracle
 #
 # The transaction-graph scraper that used to live here is
 # explorer.py's EtherscanExplorer now.
@@ -114,10 +118,8 @@ class EVMFaucet:
     ############################################################
     #
     # Wires one faucet for every configured network: a Web3
-    # instance per network from the config's faucet.rpc_url —
-    # each carrying the sign-and-send middleware, so a payout
-    # is one w3.eth.send_transaction call — the shared faucet
-    # key normalized to 0x + 64 hex characters, and the
+    # instance per network from the config's faucet.rpc_url,
+    # the shared faucet key normalized to 0x + 64 hex characters, and the
     # in-memory cooldown table. network_configs is main.py's
     # EVM_NETWORK_CONFIGS — sectioned into top-level identity
     # plus 'faucet', 'metamask' and 'explorer' parts.
@@ -156,10 +158,10 @@ class EVMFaucet:
         # config's faucet.rpc_url. <NAME> placeholders in the URL are
         # environment variable references, resolved here and only
         # here — the config file itself never holds the Infura key.
-        # The sign-and-send middleware turns every
-        # eth_sendTransaction from the faucet address into: fill the
-        # PENDING nonce and chain id, sign locally, broadcast raw —
-        # no payout path builds or signs transactions by hand.
+        # Payouts never go through eth_sendTransaction: the payout
+        # paths build the complete transaction (nonce, chain id and
+        # fees included) and send_with_nonce signs it locally and
+        # broadcasts it raw.
         self.w3_instances = {}
         for network in self.NETWORK_CONFIGS:
             rpc_url_template = self.NETWORK_CONFIGS[network]['faucet']['rpc_url']
@@ -170,22 +172,34 @@ class EVMFaucet:
             request_kwargs = {
                 'timeout': 10
             }
-            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs=request_kwargs))
-            if self.FAUCET_ACCOUNT:
-                w3.middleware_onion.add(construct_sign_and_send_raw_middleware(self.FAUCET_ACCOUNT))
-            self.w3_instances[network] = w3
+            self.w3_instances[network] = Web3(Web3.HTTPProvider(rpc_url, request_kwargs=request_kwargs))
 
         # Per-(network, address) cooldown between payouts — the slot
         # is claimed atomically before the payout work and released
-        # on failure (see app/cooldown.py for the in-memory
+        # on failure (see app/cooldown.py for the backends and their
         # trade-offs).
-        self.cooldowns = CooldownTable(COOLDOWN_SECONDS)
-
-        # network -> the lock serializing that chain's payouts, native
-        # AND ERC-20 (same wallet, same per-chain nonce sequence — see
-        # send_lock_for). Per network on purpose: a Sepolia payout has
-        # no business blocking a Hoodi one.
-        self._send_locks = {}
+        self.cooldowns = cooldown_table(COOLDOWN_SECONDS, 'evm')
+
+        # network -> the faucet wallet's next nonce there, native AND
+        # ERC-20 (same wallet, same per-chain nonce sequence — see
+        # send_with_nonce). Cross-process when SHARED_STATE_DIR is set
+        # (see nonce_manager.py).
+        self.nonces = nonce_manager()
+
+        # network -> the queue + PAYOUT_WORKERS worker threads that
+        # run its payouts, native AND ERC-20 (the ERC-20 faucet
+        # borrows this one just like the nonces) — see
+        # app/payout_queue/
+        self.payouts = PayoutQueue('evm', workers=PAYOUT_WORKERS)
+
+        # network -> the current fee fields for a payout, refreshed
+        # in the background once the warmup has run — legacy gasPrice
+        # unless the network's config asks for fee_mode 'eip1559'
+        # (see gas_oracle.py)
+        self.gas_oracle = GasOracle(self.w3_instances, {
+            network: config['faucet'].get('fee_mode', 'legacy')
+            for network, config in self.NETWORK_CONFIGS.items()
+        })
 
         # network -> (unix time, balance in whole ETH) for the polled
         # faucet balance — see _faucet_balance. Pre-filled by the
@@ -213,11 +227,16 @@ class EVMFaucet:
     # slowest RPC bounds the wall time: run the chain-id check
     # (see _verify_chain_id — a mismatch screams instead of
     # counting as ready), then pre-fetch the faucet balance
-    # into the cache, so the first page load answers instantly.
+    # into the cache, so the first page load answers instantly,
+    # and the fees into the gas oracle, whose background
+    # refreshers start once every network has been tried.
     # Success and failure both go to the console; a failed
     # network does NOT kill the app — the other networks and
     # faucets keep serving, and a network that was unreachable
     # here gets its chain-id check on its first payout instead.
+    # Every network's HTTPProvider session is then handed to
+    # the keep-alive scheduler (eth_blockNumber), so an idle
+    # one never goes cold.
     #
     # Used by:
     #   - __init__ (above)
@@ -234,7 +253,8 @@ class EVMFaucet:
                 if self.FAUCET_ADDRESS:
                     balance_eth = float(w3.from_wei(w3.eth.get_balance(self.FAUCET_ADDRESS), 'ether'))
                     self._balance_cache[network] = (int(time.time()), balance_eth)
-                    print(f"[EVM] {network} ready — chain id {chain_id}, faucet balance {balance_eth:.4f}")
+                    fees = self.gas_oracle.refresh(network)
+                    print(f"[EVM] {network} ready — chain id {chain_id}, faucet balance {balance_eth:.4f}, fees {fees}")
                 else:
                     print(f"[EVM] {network} connected (chain id {chain_id}) — but NO FAUCET KEY is configured, payouts will fail")
             except Exception:
@@ -249,6 +269,10 @@ class EVMFaucet:
         for thread in threads:
             thread.join()
 
+        self.gas_oracle.start()
+        for network, w3 in self.w3_instances.items():
+            keepalive_scheduler.register(f'evm/{network}', lambda w3=w3: w3.eth.block_number)
+
 
 
 
@@ -342,22 +366,53 @@ class EVMFaucet:
 
 
     ############################################################
-    # send_lock_for
+    # send_with_nonce
     ############################################################
     #
-    # The lock serializing one network's payouts. Shared BY
-    # DESIGN with the ERC-20 faucet: native and token payouts
-    # spend from the same wallet, so on any one chain they
-    # must take turns reading the pending nonce. setdefault is
-    # atomic under the GIL, so no extra locking here.
+    # Broadcasts one payout from the faucet wallet on a locally
+    # allocated nonce: build(nonce) returns the complete
+    # transaction dict, which is signed with the faucet key and
+    # broadcast raw; returns its hash. Shared BY DESIGN with
+    # the ERC-20 faucet: native and token payouts spend from
+    # the same wallet, so on any one chain they draw from one
+    # nonce sequence. A node that already holds the signed
+    # transaction (a retried or duplicated broadcast) means it
+    # went out — its hash is the answer. A nonce conflict —
+    # the counter was behind the chain — resyncs the network's
+    # counter and is retried once on the re-read number. Any
+    # other failure (a timeout, a signing error, an RPC 5xx)
+    # only releases its nonce for the next payout — a resync
+    # there would hand out again the numbers other payouts
+    # hold but have not broadcast yet — and propagates.
     #
     # Used by:
     #   - request_eth (below)
     #   - erc20_faucet.py — request_tokens
     ############################################################
 
-    def send_lock_for(self, network):
-        return self._send_locks.setdefault(network, threading.Lock())
+    def send_with_nonce(self, network, build):
+        w3 = self.w3_instances[network]
+
+        def fetch_pending():
+            return w3.eth.get_transaction_count(self.FAUCET_ADDRESS, 'pending')
+
+        for attempt in range(2):
+            nonce = self.nonces.allocate(network, fetch_pending)
+            signed = None
+            try:
+                signed = self.FAUCET_ACCOUNT.sign_transaction(build(nonce))
+                # eth-account 0.13 renamed rawTransaction
+                raw = getattr(signed, 'raw_transaction', None) or signed.rawTransaction
+                return w3.eth.send_raw_transaction(raw)
+            except Exception as e:
+                if signed is not None and is_already_known(e):
+                    return signed.hash
+                if not is_nonce_conflict(e):
+                    self.nonces.release(network, nonce)
+                    raise
+                self.nonces.resync(network)
+                if attempt:
+                    raise
 
 
 
@@ -400,17 +455,18 @@ class EVMFaucet:
     ############################################################
     #
     # The actual payout: validate everything, then broadcast
-    # one chunk-sized value transfer. Sends are serialized and
-    # the nonce counts pending transactions, so a whole class
-    # claiming at once can't collide on the same nonce. Returns
+    # one chunk-sized value transfer. Every send takes its own
+    # nonce from the local counter, so a whole class claiming
+    # at once can't collide on the same nonce. Returns
     # a (payload, http_status) tuple; user-facing errors are
-    # Lithuanian.
+    # Lithuanian. The broadcast runs on the network's payout
+    # queue; wait=False answers 202 with its ticket instead.
     #
     # Used by:
     #   - evm_routes.py — GET /api/evm/<network>/request
     ############################################################
 
-    def request_eth(self, network, to_address, signature, nonce):
+    def request_eth(self, network, to_address, signature, nonce, wait=True):
         if not self.is_supported_network(network):
             return {"error": f"Nepalaikomas tinklas: {network}"}, 400
 
@@ -447,6 +503,16 @@ class EVMFaucet:
             return {"error": "Neteisingas adresas"}, 400
 
 
+        # Fast path: a wallet still cooling down is refused right
+        # here, before the signature recovery and balance RPCs
+        # below. peek() only reads — STEP 3's claim() stays the one
+        # atomic check.
+        cooldown_key = (network, to_address.lower())
+        remaining = self.cooldowns.peek(cooldown_key)
+        if remaining:
+            return {"error": f"Kriptovaliuta jums jau išsiųsta. Daugiau galėsite pasiimti už {remaining} sek."}, 429
+
+
         # STEP 2: signature check. This is the exact message the
         # frontend asks MetaMask to sign — any mismatch (different
         # nonce, different wording) fails recovery.
@@ -473,55 +539,66 @@ class EVMFaucet:
         # same wallet out of the others, and two parallel requests
         # from the same address can't both pass the check and get
         # paid twice. Every failure path below releases the slot.
-        cooldown_key = (network, to_address.lower())
         remaining = self.cooldowns.claim(cooldown_key)
         if remaining:
             return {"error": f"Kriptovaliuta jums jau išsiųsta. Daugiau galėsite pasiimti už {remaining} sek."}, 429
 
-        try:
-            faucet_balance = w3.eth.get_balance(self.FAUCET_ADDRESS)
-        except Exception:
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Nepavyko gauti čiaupo balanso"}, 500
-
-        if faucet_balance < amount_to_send_wei:
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Čiaupas nebeturi kriptovaliutos. Praneškite dėstytojui."}, 503
-
-
-        # STEP 4: broadcast — under the network's send lock, so two
-        # concurrent claims can't get filled with the same pending
-        # nonce. The sign-and-send middleware (attached in __init__)
-        # fills the nonce and chain id, signs and broadcasts.
-        # gasPrice is passed explicitly to force a LEGACY transaction
-        # — several of the configured testnets have spotty EIP-1559
-        # support. The generous gas limit costs nothing, unused gas
-        # is refunded.
-        # ===========================================================
-        try:
-            with self.send_lock_for(network):
-                tx_hash = w3.eth.send_transaction({
+        # From here on the work runs on the network's payout worker
+        # (app/payout_queue/) as one job: the faucet balance check
+        # and the broadcast. With wait (the method's default; the
+        # route passes it only for ?wait=1) the HTTP thread waits
+        # for the job's answer; without — the route's default —
+        # it answers 202 with the ticket straight away.
+        def send():
+            try:
+                faucet_balance = w3.eth.get_balance(self.FAUCET_ADDRESS)
+            except Exception:
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Nepavyko gauti čiaupo balanso"}, 500
+
+            if faucet_balance < amount_to_send_wei:
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Čiaupas nebeturi kriptovaliutos. Praneškite dėstytojui."}, 503
+
+
+            # STEP 4: broadcast on the next local nonce (send_with_nonce
+            # — no lock held across the round trips, concurrent claims
+            # each get their own number), signed locally and sent raw;
+            # the chain id is the config's, already checked against the
+            # RPC above.
+            # The fee fields come from the gas oracle's cache — a
+            # LEGACY gasPrice unless the network is configured for
+            # EIP-1559. The generous gas limit costs nothing, unused
+            # gas is refunded.
+            # ===========================================================
+            try:
+                fees = self.gas_oracle.fees(network)
+                tx_hash = self.send_with_nonce(network, lambda tx_nonce: {
                     'from': self.FAUCET_ADDRESS,
                     'to': to_address,
                     'value': int(amount_to_send_wei),
                     'gas': 210000,
-                    'gasPrice': w3.eth.gas_price,
+                    'nonce': tx_nonce,
+                    'chainId': self.NETWORK_CONFIGS[network]['chain_id'],
+                    **fees,
                 })
-        except Exception:
-            logging.exception(f"Failed to broadcast {network} payout")
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500
+            except Exception:
+                logging.exception(f"Failed to broadcast {network} payout")
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500
 
-        # Success — the cooldown slot claimed above stays, and the
-        # cached balance is dropped so the page shows the payout on
-        # its next poll.
-        self._balance_cache.pop(network, None)
+            # Success — the cooldown slot claimed above stays, and the
+            # cached balance is dropped so the page shows the payout on
+            # its next poll.
+            self._balance_cache.pop(network, None)
 
-        return {
-            "message": "ETH sent successfully",
-            "transaction_hash": tx_hash.hex(),
-            "amount": float(w3.from_wei(amount_to_send_wei, 'ether'))
-        }, 200
+            return {
+                "message": "ETH sent successfully",
+                "transaction_hash": tx_hash.hex(),
+                "amount": float(w3.from_wei(amount_to_send_wei, 'ether'))
+            }, 200
+
+        return self.payouts.submit(network, send, wait=wait)
 
 
 
@@ -614,3 +691,24 @@ class EVMFaucet:
             "networks": networks,
             "default_network": default_key
         }
+
+
+
+
+
+
+    ############################################################
+    # get_gas_oracle
+    ############################################################
+    #
+    # The gas oracle's cache for every network: mode, fee
+    # fields, their age and whether they are past the
+    # staleness bound — what an operator checks when payouts
+    # linger in the mempool.
+    #
+    # Used by:
+    #   - evm_routes.py — GET /api/evm/gas-oracle
+    ############################################################
+
+    def get_gas_oracle(self):
+        return {"networks": self.gas_oracle.snapshot()}, 200
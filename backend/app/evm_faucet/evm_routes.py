@@ -7,13 +7,16 @@
 #    GET /api/evm/networks                          — available networks
 #    GET /api/evm/<network>/faucet-balance          — faucet address + balance
 #    GET /api/evm/<network>/request                 — send one chunk
-#                                                     (?address, ?signature, ?nonce)
+#                                                     (?address, ?signature, ?nonce,
+#                                                      ?wait=1 → 200, not 202 + ticket)
 #    GET /api/evm/<network>/get-stored-transactions — flows for the tx graph
 #                                                     (?address, ?from, ?to)
 #    GET /api/evm/<network>/transaction-days        — days the root address
 #                                                     transacted (?address, ?tz_offset)
 #    GET /api/evm/set-address-name                  — label an address
 #                                                     (?address, ?name)
+#    GET /api/evm/gas-oracle                        — cached fees + their age
+#                                                     (debug)
 #
 #  A deliberately thin layer: every handler just forwards to
 #  the shared EVMFaucet instance, which already returns
@@ -72,7 +75,7 @@ def request_eth(network):
     to_address = request.args.get('address')
     signature = request.args.get('signature')
     nonce = request.args.get('nonce')
-    data, status = evm_faucet.request_eth(network, to_address, signature, nonce)
+    data, status = evm_faucet.request_eth(network, to_address, signature, nonce, wait=request.args.get('wait') == '1')
     return jsonify(data), status
 
 
@@ -225,3 +228,24 @@ def set_address_name():
 
 
 
+
+
+
+############################################################
+# get_gas_oracle
+############################################################
+#
+# GET /api/evm/gas-oracle
+#
+# Debug view of the gas oracle: per network, the fee mode,
+# the cached fee fields payouts use, their age in seconds
+# and whether they are past the staleness bound.
+#
+# Used by:
+#   - the operator, by hand — no page calls it
+############################################################
+
+@bp_evm_faucet.route('/api/evm/gas-oracle', methods=['GET'])
+def get_gas_oracle():
+    data, status = evm_faucet.get_gas_oracle()
+    return jsonify(data), status
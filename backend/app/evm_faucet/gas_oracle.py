@@ -0,0 +1,250 @@
+############################################################
+#  [*] Gas oracle — cached EVM fees, refreshed in the background
+#
+#  A payout used to ask the RPC for w3.eth.gas_price on the
+#  spot, which cost one blocking round trip per payout. The
+#  oracle keeps the current fee fields per network instead.
+#  One daemon thread per network refreshes them every
+#  GAS_REFRESH_SECONDS, and the payouts read the cache.
+#
+#  Two modes, per network (the config's faucet.fee_mode):
+#
+#    legacy   — {'gasPrice'}: eth_gasPrice. The default:
+#               several of the configured testnets have
+#               spotty EIP-1559 support.
+#    eip1559  — {'maxFeePerGas', 'maxPriorityFeePerGas'}:
+#               derived from eth_feeHistory — the median tip
+#               of the last GAS_FEE_HISTORY_BLOCKS blocks, on
+#               top of twice the next block's base fee.
+#
+#  The cache is bounded by GAS_MAX_AGE_SECONDS: when the
+#  refresher has fallen behind (a dead RPC, or a process
+#  whose warmup never ran), a payout fetches fresh values
+#  itself rather than pay with stale fees.
+#
+#  Web3-free on purpose (it only calls w3.eth.*), so the
+#  tests drive it with a fake.
+#
+#  Used by:
+#    - evm_faucet.py — EVMFaucet (payout fees, warmup, the
+#      /api/evm/gas-oracle debug payload), shared with the
+#      ERC-20 faucet
+#    - tests/test_gas_oracle.py
+############################################################
+
+
+import time
+import logging
+import threading
+
+
+# How often the background threads refresh each network
+GAS_REFRESH_SECONDS = 5
+
+# Cached fees older than this are never paid with — the payout
+# fetches its own
+GAS_MAX_AGE_SECONDS = 30
+
+# eip1559 mode: how many recent blocks' tips the median is
+# taken over, and at which percentile of each block
+GAS_FEE_HISTORY_BLOCKS = 5
+GAS_PRIORITY_PERCENTILE = 50
+
+# eip1559 mode: the least tip ever offered — an idle testnet
+# reports zero tips, and a zero-tip transaction can sit in the
+# pool indefinitely (1 gwei)
+GAS_MIN_PRIORITY_WEI = 1_000_000_000
+
+
+
+
+
+
+
+
+############################################################
+# GasOracle
+############################################################
+#
+# w3_instances is EVMFaucet's network -> Web3 map; modes maps
+# a network to 'legacy' or 'eip1559' (absent = legacy).
+#
+# Used by:
+#   - evm_faucet.py — one instance, EVMFaucet.gas_oracle
+############################################################
+
+class GasOracle:
+
+
+
+
+
+
+    ############################################################
+    # __init__
+    ############################################################
+    #
+    # The cache: network -> (time.monotonic() of the fetch,
+    # fee fields). Replaced whole on every refresh, so readers
+    # need no lock.
+    #
+    # Used by:
+    #   - EVMFaucet.__init__
+    ############################################################
+
+    def __init__(self, w3_instances, modes=None):
+        self.w3_instances = w3_instances
+        self.modes = dict(modes or {})
+        self._cache = {}
+        self._failing = set()
+        self._threads = []
+
+
+
+
+
+
+    ############################################################
+    # fees
+    ############################################################
+    #
+    # The fee fields a payout spreads into its transaction —
+    # from the cache while it is younger than
+    # GAS_MAX_AGE_SECONDS, otherwise fetched (and cached) right
+    # here. A failed fetch raises: the payout fails like any
+    # other RPC failure.
+    #
+    # Used by:
+    #   - EVMFaucet.request_eth
+    #   - erc20_faucet.py — request_tokens
+    ############################################################
+
+    def fees(self, network):
+        cached = self._cache.get(network)
+        if cached and time.monotonic() - cached[0] <= GAS_MAX_AGE_SECONDS:
+            return dict(cached[1])
+        return dict(self.refresh(network))
+
+
+
+
+
+
+    ############################################################
+    # refresh
+    ############################################################
+    #
+    # Fetch one network's fee fields in its mode and cache
+    # them.
+    #
+    # Used by:
+    #   - fees (above) — the stale fallback
+    #   - _run (below) — the background refresh
+    #   - EVMFaucet._warm_up_networks — primes the cache
+    ############################################################
+
+    def refresh(self, network):
+        eth = self.w3_instances[network].eth
+
+        if self.modes.get(network) == 'eip1559':
+            history = eth.fee_history(GAS_FEE_HISTORY_BLOCKS, 'latest', [GAS_PRIORITY_PERCENTILE])
+            base_fee = int(history['baseFeePerGas'][-1])   # the NEXT block's base fee
+            tips = sorted(int(reward[0]) for reward in (history.get('reward') or []) if reward)
+            priority = max(tips[len(tips) // 2] if tips else 0, GAS_MIN_PRIORITY_WEI)
+
+            # Twice the base fee rides out six full blocks of the
+            # base fee's 12.5% growth; only what is used is charged
+            fees = {'maxFeePerGas': 2 * base_fee + priority, 'maxPriorityFeePerGas': priority}
+        else:
+            fees = {'gasPrice': int(eth.gas_price)}
+
+        self._cache[network] = (time.monotonic(), fees)
+        return fees
+
+
+
+
+
+
+    ############################################################
+    # start
+    ############################################################
+    #
+    # Starts one daemon refresher per network (once) — one
+    # slow RPC never delays the other chains' refreshes.
+    #
+    # Used by:
+    #   - EVMFaucet._warm_up_networks — after the warmup
+    ############################################################
+
+    def start(self):
+        if self._threads:
+            return
+
+        for network in self.w3_instances:
+            thread = threading.Thread(target=self._run, args=(network,), name=f'evm-gas-{network}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # The refresher loop. A failing RPC is logged once when it
+    # starts failing and once when it recovers, not every
+    # GAS_REFRESH_SECONDS.
+    #
+    # Used by:
+    #   - start (above) — one thread per network
+    ############################################################
+
+    def _run(self, network):
+        while True:
+            time.sleep(GAS_REFRESH_SECONDS)
+            try:
+                self.refresh(network)
+            except Exception as e:
+                if network not in self._failing:
+                    self._failing.add(network)
+                    logging.warning(f"[EVM] {network} gas price refresh failing: {e}")
+                continue
+
+            if network in self._failing:
+                self._failing.discard(network)
+                logging.warning(f"[EVM] {network} gas price refresh recovered")
+
+
+
+
+
+
+    ############################################################
+    # snapshot
+    ############################################################
+    #
+    # Every network's mode, cached fee fields and their age in
+    # seconds (None before the first fetch), plus whether the
+    # entry is past GAS_MAX_AGE_SECONDS — the debug payload.
+    #
+    # Used by:
+    #   - EVMFaucet.get_gas_oracle
+    ############################################################
+
+    def snapshot(self):
+        now = time.monotonic()
+        networks = {}
+        for network in self.w3_instances:
+            cached = self._cache.get(network)
+            age = round(now - cached[0], 1) if cached else None
+            networks[network] = {
+                'mode': self.modes.get(network, 'legacy'),
+                'fees': dict(cached[1]) if cached else None,
+                'age_seconds': age,
+                'stale': age is None or age > GAS_MAX_AGE_SECONDS,
+            }
+        return networks
@@ -0,0 +1,292 @@
+############################################################
+#  [*] Nonce manager — the faucet wallet's EVM nonces, local
+#
+#  A payout used to let web3's sign-and-send middleware read
+#  the PENDING nonce over RPC — under the network's send
+#  lock, so two payouts could not read the same number. Each
+#  payout held that lock across the nonce, gas price and
+#  broadcast round trips.
+#
+#  Now the faucet keeps the next nonce per network itself:
+#  seeded ONCE from eth_getTransactionCount(address,
+#  'pending'), then every payout takes the next integer. That
+#  increment is the whole critical section; signing and the
+#  broadcast run concurrently.
+#
+#  A broadcast can fail after its nonce was taken, while
+#  other payouts hold the numbers after it, allocated but not
+#  yet broadcast. release() hands the failed number back: the
+#  next allocation takes it first, so the gap fills and the
+#  counter never moves backward past the payouts in flight.
+#
+#  The counter itself can drift too: another tool spends from
+#  the same wallet, a node drops a transaction. Only a
+#  broadcast the node refuses FOR ITS NONCE
+#  (is_nonce_conflict) says so — resync() then forgets the
+#  counter, the next allocation re-reads the pending count
+#  from the chain, and the payout is retried once on the
+#  fresh number. One the node refuses because it already
+#  holds that very transaction (is_already_known) went out —
+#  see EVMFaucet.send_with_nonce.
+#
+#  The counter lives in memory by default, or in
+#  SHARED_STATE_DIR/nonces.db when several gunicorn workers
+#  pay from the same wallet — the same switch as
+#  app/cooldown.py.
+#
+#  Used by:
+#    - evm_faucet.py — EVMFaucet.send_with_nonce (shared
+#      with the ERC-20 faucet: same wallet, same nonces)
+#    - tests/test_nonce_manager.py
+############################################################
+
+
+import sqlite3
+import threading
+
+from .. import shared_state
+
+
+# What the common clients (geth, erigon, nethermind, besu,
+# anvil) answer when a transaction's nonce is already taken —
+# lowercase substrings of the JSON-RPC error message
+NONCE_CONFLICT_MARKERS = (
+    'nonce too low',
+    'replacement transaction underpriced',
+    'nonce has already been used',
+)
+
+# What they answer when the transaction itself — same bytes,
+# same hash — is already in their pool: a re-broadcast of a
+# payout that went out, NOT a conflict
+ALREADY_KNOWN_MARKERS = (
+    'already known',
+    'known transaction',
+    'alreadyknown',
+)
+
+
+
+
+
+
+
+
+############################################################
+# is_nonce_conflict
+############################################################
+#
+# Did the node refuse a broadcast because its nonce is used
+# (or in flight) already? Then the local counter is behind
+# the chain — resync and retry — rather than the payout
+# being bad.
+#
+# Used by:
+#   - evm_faucet.py — EVMFaucet.send_with_nonce
+############################################################
+
+def is_nonce_conflict(error):
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_CONFLICT_MARKERS)
+
+
+
+
+
+
+
+
+############################################################
+# is_already_known
+############################################################
+#
+# Did the node refuse a broadcast because it holds the same
+# transaction already? Then the payout is in flight on its
+# nonce — a success, answered with the signed hash.
+#
+# Used by:
+#   - evm_faucet.py — EVMFaucet.send_with_nonce
+############################################################
+
+def is_already_known(error):
+    message = str(error).lower()
+    return any(marker in message for marker in ALREADY_KNOWN_MARKERS)
+
+
+
+
+
+
+
+
+############################################################
+# NonceManager
+############################################################
+#
+# The in-memory backend: network -> next nonce, plus the
+# numbers released by failed broadcasts (handed out again
+# lowest first), one small lock per network (different
+# chains never contend). The seeding RPC call runs under the
+# network's lock — it must, or two first payouts would both
+# seed the same number — but only once per process and after
+# a resync.
+#
+# Used by:
+#   - nonce_manager (below) — the single-process backend
+############################################################
+
+class NonceManager:
+
+    def __init__(self):
+        self._next = {}
+        self._released = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, network):
+        lock = self._locks.get(network)
+        if lock is not None:
+            return lock
+
+        with self._guard:
+            return self._locks.setdefault(network, threading.Lock())
+
+    def allocate(self, network, fetch_pending):
+        with self._lock_for(network):
+            released = self._released.get(network)
+            if released:
+                nonce = min(released)
+                released.discard(nonce)
+                return nonce
+
+            nonce = self._next.get(network)
+            if nonce is None:
+                nonce = int(fetch_pending())
+            self._next[network] = nonce + 1
+            return nonce
+
+    def release(self, network, nonce):
+        with self._lock_for(network):
+            if network in self._next and nonce < self._next[network]:
+                self._released.setdefault(network, set()).add(nonce)
+
+    def resync(self, network):
+        with self._lock_for(network):
+            self._next.pop(network, None)
+            self._released.pop(network, None)
+
+
+
+
+
+
+
+
+############################################################
+# SqliteNonceManager
+############################################################
+#
+# The multi-worker backend: the same contract, one row per
+# network in a SQLite file every worker opens (and one per
+# released number). BEGIN
+# IMMEDIATE takes the write lock before the read, so the
+# read-and-increment is atomic across workers; a seed's RPC
+# round trip happens inside that transaction for the same
+# reason the in-memory backend seeds under its lock.
+#
+# Used by:
+#   - nonce_manager (below) — when SHARED_STATE_DIR is set
+############################################################
+
+class SqliteNonceManager:
+
+    def __init__(self, path):
+        self.path = path
+
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS Evm_Nonces (
+                    network     TEXT PRIMARY KEY,
+                    next_nonce  INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS Evm_Released_Nonces (
+                    network  TEXT NOT NULL,
+                    nonce    INTEGER NOT NULL,
+                    PRIMARY KEY (network, nonce)
+                )
+            ''')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def allocate(self, network, fetch_pending):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            released = conn.execute(
+                'SELECT MIN(nonce) FROM Evm_Released_Nonces WHERE network = ?', (network,)).fetchone()[0]
+            if released is not None:
+                conn.execute('DELETE FROM Evm_Released_Nonces WHERE network = ? AND nonce = ?', (network, released))
+                conn.execute('COMMIT')
+                return released
+
+            row = conn.execute('SELECT next_nonce FROM Evm_Nonces WHERE network = ?', (network,)).fetchone()
+            nonce = row[0] if row is not None else int(fetch_pending())
+            conn.execute(
+                'INSERT OR REPLACE INTO Evm_Nonces (network, next_nonce) VALUES (?, ?)',
+                (network, nonce + 1),
+            )
+            conn.execute('COMMIT')
+            return nonce
+        finally:
+            conn.close()
+
+    def release(self, network, nonce):
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT OR IGNORE INTO Evm_Released_Nonces (network, nonce) '
+                'SELECT network, ? FROM Evm_Nonces WHERE network = ? AND next_nonce > ?',
+                (nonce, network, nonce),
+            )
+        finally:
+            conn.close()
+
+    def resync(self, network):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM Evm_Nonces WHERE network = ?', (network,))
+            conn.execute('DELETE FROM Evm_Released_Nonces WHERE network = ?', (network,))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+
+
+
+
+
+
+
+############################################################
+# nonce_manager
+############################################################
+#
+# In-memory by default, the shared SQLite file when
+# SHARED_STATE_DIR is set.
+#
+# Used by:
+#   - evm_faucet.py — EVMFaucet.__init__
+############################################################
+
+def nonce_manager():
+    if shared_state.SHARED_STATE_DIR:
+        return SqliteNonceManager(shared_state.shared_path('nonces.db'))
+    return NonceManager()
@@ -0,0 +1,238 @@
+############################################################
+#  [*] Keep-alive scheduler — warm RPC connections between
+#      classes
+#
+#  Every faucet keeps long-lived connections to its nodes:
+#  Electrum sockets, the pooled HTTPS sessions of the Solana
+#  and Sui clients, web3's HTTPProvider sessions. Left idle
+#  over lunch, the server drops them, and the first student
+#  after the break pays a full TCP + TLS handshake (plus
+#  Electrum's server.version) before the faucet can even
+#  fetch a balance.
+#
+#  One scheduler per process keeps them warm instead: every
+#  faucet registers a cheap call per connection — Electrum's
+#  server.ping, Solana's getHealth, Sui's chainIdentifier,
+#  EVM's eth_blockNumber — and the scheduler thread runs
+#  each every KEEPALIVE_SECONDS. Each ping runs on its own
+#  short-lived thread, so a hung node never delays the
+#  others, and a job is never run twice at once: the next
+#  run is scheduled when the last one finishes.
+#
+#  A failed ping is retried after KEEPALIVE_RETRY_SECONDS,
+#  not a full interval: the failure already dropped the dead
+#  connection (the clients close a broken socket or let the
+#  HTTP pool dial fresh), so the retry reconnects in the
+#  background — a student's request never pays the cold
+#  handshake. A failing job is logged once when it starts
+#  failing and once when it recovers.
+#
+#  Per process on purpose: every gunicorn worker owns its own
+#  connections (see gunicorn.conf.py's preload_app).
+#
+#  Used by:
+#    - utxo_faucet/electrum_pool.py — every endpoint's health
+#      check
+#    - evm_faucet/evm_faucet.py, svm_faucet/svm_faucet.py,
+#      move_faucet/move_faucet.py — registered at the end of
+#      their warmups
+#    - tests/test_keepalive.py
+############################################################
+
+
+import time
+import heapq
+import logging
+import itertools
+import threading
+
+
+# How often each registered connection is pinged — well under
+# the idle timeouts of ElectrumX (600 s) and of the usual
+# HTTP keep-alive (60-75 s)
+KEEPALIVE_SECONDS = 30
+
+# How soon a failed ping is retried — the reconnect
+KEEPALIVE_RETRY_SECONDS = 5
+
+
+
+
+
+
+
+
+############################################################
+# _Job
+############################################################
+#
+# One registered connection: its name (for the log), the
+# ping callable and its interval.
+#
+# Used by:
+#   - KeepAliveScheduler (below)
+############################################################
+
+class _Job:
+
+    def __init__(self, name, ping, interval):
+        self.name = name
+        self.ping = ping
+        self.interval = interval
+        self.failing = False
+
+
+
+
+
+
+
+
+############################################################
+# KeepAliveScheduler
+############################################################
+#
+# The scheduler; see the file header. register() is the
+# whole public surface — the thread starts with the first
+# registration.
+#
+# Used by:
+#   - keepalive_scheduler (below) — the process's one
+#     instance
+############################################################
+
+class KeepAliveScheduler:
+
+    def __init__(self):
+        self._jobs = {}
+        self._due = []     # heap of (time.monotonic() due, seq, name)
+        self._seq = itertools.count()
+        self._wakeup = threading.Condition()
+        self._thread = None
+
+
+
+
+
+
+    ############################################################
+    # register
+    ############################################################
+    #
+    # Pings `ping()` every `interval` seconds from now on; the
+    # first run is one interval away (the warmup has just
+    # used the connection). A name already registered is left
+    # as it is.
+    #
+    # Used by:
+    #   - the faucets' warmups — see the file header
+    ############################################################
+
+    def register(self, name, ping, interval=KEEPALIVE_SECONDS):
+        with self._wakeup:
+            if name in self._jobs:
+                return
+            self._jobs[name] = _Job(name, ping, interval)
+            self._schedule(name, interval)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='keepalive', daemon=True)
+                self._thread.start()
+
+
+
+
+
+
+    ############################################################
+    # _schedule
+    ############################################################
+    #
+    # Puts a job back on the heap `delay` seconds from now and
+    # wakes the scheduler thread; the caller holds _wakeup.
+    #
+    # Used by:
+    #   - register (above) / _ping (below)
+    ############################################################
+
+    def _schedule(self, name, delay):
+        heapq.heappush(self._due, (time.monotonic() + delay, next(self._seq), name))
+        self._wakeup.notify()
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # The scheduler thread: sleeps until the earliest job is
+    # due, then hands it to a thread of its own.
+    #
+    # Used by:
+    #   - register (above) — started once
+    ############################################################
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._due or self._due[0][0] > time.monotonic():
+                    self._wakeup.wait(self._due[0][0] - time.monotonic() if self._due else None)
+                _, _, name = heapq.heappop(self._due)
+                job = self._jobs[name]
+
+            threading.Thread(target=self._ping, args=(job,), name=f'keepalive-{name}', daemon=True).start()
+
+
+
+
+
+
+    ############################################################
+    # _ping
+    ############################################################
+    #
+    # One run of one job, then its next one: a full interval
+    # after a success, KEEPALIVE_RETRY_SECONDS after a
+    # failure. Returns whether the ping answered.
+    #
+    # Used by:
+    #   - _run (above) — on a thread per run
+    #   - tests/test_keepalive.py
+    ############################################################
+
+    def _ping(self, job):
+        try:
+            job.ping()
+        except Exception as e:
+            if not job.failing:
+                job.failing = True
+                logging.warning(f"[KEEPALIVE] {job.name} failing, reconnecting: {e}")
+            ok = False
+        else:
+            if job.failing:
+                job.failing = False
+                logging.warning(f"[KEEPALIVE] {job.name} recovered")
+            ok = True
+
+        with self._wakeup:
+            self._schedule(job.name, job.interval if ok else min(job.interval, KEEPALIVE_RETRY_SECONDS))
+        return ok
+
+
+
+
+
+
+
+
+############################################################
+# keepalive_scheduler
+############################################################
+#
+# The process's one scheduler — every faucet registers here.
+############################################################
+
+keepalive_scheduler = KeepAliveScheduler()
@@ -4,10 +4,10 @@
 #  The reference Move chain. Balances are counted in MIST
 #  (1 SUI = 1e9). There is no rent-exempt minimum — Sui's
 #  storage model refunds rebates instead — so any positive
-#  payout is spendable. Gas for a payout is chosen by the
-#  node itself during transaction resolution; FEE_MIST is
-#  only the safety margin the faucet must hold ON TOP of the
-#  chunk before it commits to a payout.
+#  payout is spendable. FEE_MIST is the safety margin the
+#  faucet must hold ON TOP of the chunk before it commits to
+#  a payout, and the gas budget of a locally built one — only
+#  the gas actually used is charged.
 #
 #  Used by:
 #    - chains/__init__.py — the registry
@@ -24,9 +24,9 @@ DECIMALS = 9
 # The full SUI coin type tag, as GraphQL wants it spelled
 COIN_TYPE = '0x2::sui::SUI'
 
-# Safety margin over the chunk for gas — a simple transfer
-# costs well under 0.005 SUI at the reference gas price; the
-# margin is deliberately generous
+# Safety margin over the chunk for gas, and the gas budget —
+# a simple transfer costs well under 0.005 SUI at the
+# reference gas price; the margin is deliberately generous
 FEE_MIST = 10_000_000
 
 NETWORKS = ('mainnet', 'testnet', 'devnet')
@@ -6,18 +6,22 @@
 #  removed in 2026). Knows NOTHING about faucets or configs —
 #  it gets an endpoint URL and talks protocol.
 #
-#  The payout trick that keeps this dependency-free: the node
-#  itself BUILDS the transaction. simulateTransaction accepts
-#  a JSON transaction with doGasSelection enabled, resolves
-#  gas coins, price and budget, and answers with the fully
-#  built TransactionData BCS — the caller only signs those
-#  bytes and hands them to executeTransaction. No client-side
-#  BCS serialization anywhere.
+#  A payout is normally serialized by the faucet itself
+#  (transaction_bcs.py) from the gas coin ref the previous
+#  execution's effects returned and the reference gas price,
+#  so it costs ONE executeTransaction. The node can still
+#  BUILD it: simulateTransaction accepts a JSON transaction
+#  with doGasSelection enabled, resolves gas coins, price and
+#  budget, and answers with the fully built TransactionData
+#  BCS — the fallback when no gas coin ref is cached yet or
+#  the cached one went stale.
 #
 #  GraphQL is stateless HTTP: every call is an independent
-#  request, one instance per network, a timeout so a hung
-#  endpoint can't wedge a Flask worker, and GraphQL-level
-#  errors raised as RuntimeError.
+#  request over one pooled session, kept warm between classes
+#  by the keep-alive scheduler's chainIdentifier query
+#  (app/keepalive.py). One instance per network, a timeout so
+#  a hung endpoint can't wedge a Flask worker, and GraphQL-
+#  level errors raised as RuntimeError.
 #
 #  Used by:
 #    - move_faucet.py — one long-lived instance per network,
@@ -51,7 +55,8 @@ SUI_USER_AGENT = 'knf-faucet'
 #
 # The client itself; see the file header for the full story.
 # Public surface: request(), get_chain_identifier(),
-# get_balance(), build_transfer(), execute().
+# get_balance(), get_reference_gas_price(),
+# build_transfer(), execute().
 #
 # Used by:
 #   - move_faucet.py — MoveFaucet keeps one per network
@@ -157,10 +162,12 @@ class SuiGraphqlClient:
     #
     # The chain's genesis-derived identifier — used as the
     # startup health probe, so a dead endpoint screams in the
-    # console before the first student arrives.
+    # console before the first student arrives, and as the
+    # keep-alive ping after it.
     #
     # Used by:
-    #   - move_faucet.py — _warm_up_networks
+    #   - move_faucet.py — _warm_up_networks and the
+    #     keep-alive job
     ############################################################
 
     def get_chain_identifier(self) -> str:
@@ -199,6 +206,27 @@ class SuiGraphqlClient:
 
 
 
+    ############################################################
+    # get_reference_gas_price
+    ############################################################
+    #
+    # The current epoch's reference gas price in MIST per gas
+    # unit — what a locally built payout bids. It only changes
+    # at epoch boundaries (~24 h), so the caller caches it.
+    #
+    # Used by:
+    #   - move_faucet.py — MoveFaucet._gas_price
+    ############################################################
+
+    def get_reference_gas_price(self) -> int:
+        data = self.request('{ epoch { referenceGasPrice } }')
+        return int(data['epoch']['referenceGasPrice'])
+
+
+
+
+
+
     ############################################################
     # build_transfer
     ############################################################
@@ -208,12 +236,12 @@ class SuiGraphqlClient:
     # TransferObjects to the recipient — the same shape Sui's
     # own faucet uses) goes into simulateTransaction with
     # doGasSelection, and the resolved, ready-to-sign
-    # TransactionData BCS comes back base64-encoded. A payout
-    # is therefore always built fresh at claim time, against
-    # the gas coins the node picked that second.
+    # TransactionData BCS comes back base64-encoded, built
+    # against the gas coins the node picked that second.
     #
     # Used by:
-    #   - move_faucet.py — request_move, inside the send lock
+    #   - move_faucet.py — MoveFaucet._execute_transfer, the
+    #     fallback when no cached gas coin ref is usable
     ############################################################
 
     def build_transfer(self, sender: str, recipient_bytes_b64: str, amount_b64: str) -> str:
@@ -256,18 +284,21 @@ class SuiGraphqlClient:
     ############################################################
     #
     # Broadcasts the signed transaction and returns its digest
-    # (which IS the transaction id on Sui). A non-SUCCESS
+    # (which IS the transaction id on Sui) with the gas coin's
+    # object ref after it — (0x id, version, base58 digest),
+    # the gas coin the next payout pays with. A non-SUCCESS
     # execution raises with the chain's own error message.
     #
     # Used by:
-    #   - move_faucet.py — the payout broadcast
+    #   - move_faucet.py — MoveFaucet._execute_transfer
     ############################################################
 
-    def execute(self, tx_bcs_b64: str, signature_b64: str) -> str:
+    def execute(self, tx_bcs_b64: str, signature_b64: str) -> tuple:
         data = self.request(
             'mutation($bcs: Base64!, $sigs: [Base64!]!) {'
             '  executeTransaction(transactionDataBcs: $bcs, signatures: $sigs) {'
-            '    effects { status executionError { message } digest } } }',
+            '    effects { status executionError { message } digest'
+            '      gasEffects { gasObject { address version digest } } } } }',
             {'bcs': tx_bcs_b64, 'sigs': [signature_b64]},
         )
         effects = data['executeTransaction']['effects']
@@ -275,4 +306,6 @@ class SuiGraphqlClient:
             error = (effects.get('executionError') or {}).get('message', 'unknown')
             raise RuntimeError(f"Sui transaction failed: {error}")
 
-        return effects['digest']
+        gas = (effects.get('gasEffects') or {}).get('gasObject')
+        gas_ref = (gas['address'], int(gas['version']), gas['digest']) if gas else None
+        return effects['digest'], gas_ref
@@ -12,10 +12,10 @@
 #               each Move chain separately
 #    address    0x + 64 hex characters (32 bytes)
 #    units      MIST, 1e9 to the coin
-#    tx model   no nonce and no blockhash: every payout is
-#               BUILT BY THE NODE at claim time
-#               (simulateTransaction resolves the gas coins),
-#               then signed here and executed
+#    tx model   no nonce and no blockhash, but every payout
+#               names its gas coin by object ref (id,
+#               version, digest), and the version moves with
+#               every transaction that coin pays for
 #
 #  How a payout works, end to end:
 #
@@ -26,11 +26,16 @@
 #    2. The faucet checks the wallet doesn't already hold a
 #       chunk, the per-(network, address) cooldown, and its
 #       own balance (chunk + gas margin).
-#    3. The node builds the transfer (SplitCoins from gas +
-#       TransferObjects), the faucet signs the returned BCS
-#       and executes — under a per-network send lock, because
-#       two payouts resolved against the same gas coins would
-#       race.
+#    3. The faucet serializes the transfer itself
+#       (SplitCoins from gas + TransferObjects, see
+#       transaction_bcs.py) against the gas coin ref the
+#       previous payout's effects returned and the cached
+#       reference gas price, signs it and executes — ONE
+#       GraphQL round trip. With no usable ref (the first
+#       payout, a version conflict) the node builds it
+#       instead (simulateTransaction). All under a
+#       per-network send lock, because two payouts spending
+#       the same gas coin version would race.
 #
 #  Everything is prepared eagerly at startup — clients built,
 #  chains probed, balances pre-fetched — so a dead endpoint
@@ -56,7 +61,11 @@ from solders.signature import Signature
 
 from .chains import chain_params
 from .graphql_client import SuiGraphqlClient
-from ..cooldown import CooldownTable
+from .transaction_bcs import transfer_transaction, uleb128
+from ..cooldown import cooldown_table
+from ..keepalive import keepalive_scheduler
+from ..shared_state import SendLocks
+from ..payout_queue.payout_queue import PayoutQueue
 from ..icons import icon_url
 
 
@@ -76,33 +85,35 @@ DEFAULT_NETWORK = 'suiTestnet'
 # A Move address: 0x plus exactly 32 bytes of hex
 ADDRESS_PATTERN = re.compile(r'^0x[0-9a-fA-F]{64}$')
 
+# How long the reference gas price is reused before it is
+# read again — it only changes at epoch boundaries (~24 h),
+# and a payout refused over a stale one reads it afresh
+GAS_PRICE_TTL_SECONDS = 600
 
+# What the node answers when it REJECTS a locally built
+# payout before executing it — the gas coin's version moved
+# or is locked by another transaction, the bid is under the
+# reference gas price. Nothing landed, nothing was paid
+LOCAL_BUILD_REJECTIONS = (
+    'not available for consumption',
+    'objectversionunavailableforconsumption',
+    'locked by a different transaction',
+    'objectlockconflict',
+    'under reference gas price',
+    'gaspriceunderrgp',
+)
 
-
-
-
-
-
-############################################################
-# _uleb128
-############################################################
-#
-# BCS length prefix for the personal-message payload — the
-# wallet signs blake2b over intent + BCS(vector<u8> message),
-# and vector lengths are ULEB128-encoded.
-#
-# Used by:
-#   - MoveFaucet.verify_signature (below)
-############################################################
-
-def _uleb128(value: int) -> bytes:
-    out = bytearray()
-    while True:
-        byte = value & 0x7f
-        value >>= 7
-        out.append(byte | (0x80 if value else 0))
-        if not value:
-            return bytes(out)
+# A payout short of gas — the budget or the gas coin cannot
+# cover it. This can come back as a non-SUCCESS execution
+# status: the transaction LANDED and was charged gas, but
+# its transfer was rolled back, so the chunk was not paid
+# and the gas coin's version moved
+LOCAL_BUILD_GAS_FAILURES = (
+    'insufficientgas',
+    'insufficient gas',
+    'gasbalancetoolow',
+    'lower than the needed amount',
+)
 
 
 
@@ -122,12 +133,14 @@ def _uleb128(value: int) -> bytes:
 #   helpers  — is_supported_network, _chunk_mist,
 #              _faucet_balance
 #   crypto   — verify_signature, _sign_transaction
+#   payouts  — _gas_price, _execute_transfer
 #   public   — get_networks, get_faucet_balance, request_move
 #
 # All GraphQL work lives in graphql_client.py: one stateless
 # client per network. Payouts are serialized per network by
-# _send_locks and the polled faucet balance is cached for a
-# few seconds.
+# _send_locks, each network's gas coin ref and reference gas
+# price are cached for the next payout, and the polled
+# faucet balance is cached for a few seconds.
 #
 # Used by:
 #   - move_routes.py — one shared instance for all handlers
@@ -161,8 +174,8 @@ class MoveFaucet:
 
         # Per-(network, address) cooldown between payouts, keyed the
         # same way as the other faucets (see app/cooldown.py for the
-        # in-memory trade-offs).
-        self.cooldowns = CooldownTable(COOLDOWN_SECONDS)
+        # backends and their trade-offs).
+        self.cooldowns = cooldown_table(COOLDOWN_SECONDS, 'move')
 
         # Same FAUCET_PRIVATE_KEY as every other family, used as an
         # Ed25519 seed like SVM — but hashed into a Sui address, so
@@ -197,11 +210,25 @@ class MoveFaucet:
                 rpc_url, debug=self.APP_DEBUG, label=network_key)
 
         # network_key -> the lock serializing that chain's payouts:
-        # two concurrent claims would otherwise be resolved by the
-        # node against the same gas coins and race. Per network on
-        # purpose — one chain's payout has no business blocking
-        # another's.
-        self._send_locks = {}
+        # two concurrent claims would otherwise spend the same gas
+        # coin version and race. Per network on purpose — one
+        # chain's payout has no business blocking another's;
+        # cross-process when SHARED_STATE_DIR is set.
+        self._send_locks = SendLocks('move')
+
+        # network_key -> the faucet's gas coin ref (0x id, version,
+        # base58 digest) as the last payout's effects left it —
+        # what the next payout pays gas with. Read and written
+        # under the send lock; empty until a payout has run.
+        self._gas_coins = {}
+
+        # network_key -> (unix time, reference gas price in MIST)
+        # — see _gas_price. Pre-filled by the warmup below.
+        self._gas_prices = {}
+
+        # network_key -> the queue + worker thread that runs its
+        # payouts — see app/payout_queue/
+        self.payouts = PayoutQueue('move')
 
         # network_key -> (unix time, balance in coins) for the
         # polled faucet balance. Pre-filled by the warmup below.
@@ -254,9 +281,12 @@ class MoveFaucet:
     #
     # The startup warmup, one thread per network so the
     # slowest endpoint bounds the wall time: probe the chain's
-    # identifier and fetch the faucet balance (which also
-    # primes the balance cache). A failed network deliberately
-    # does NOT raise — the rest of the backend keeps serving.
+    # identifier, fetch the faucet balance (which also primes
+    # the balance cache) and the reference gas price. A failed
+    # network deliberately does NOT raise — the rest of the
+    # backend keeps serving. Then every network's session is
+    # handed to the keep-alive scheduler (chainIdentifier), so
+    # an idle one never goes cold.
     #
     # Used by:
     #   - __init__ (above)
@@ -273,6 +303,7 @@ class MoveFaucet:
                     balance = client.get_balance(
                         self.FAUCET_ADDRESS, params['coin_type']) / (10 ** params['decimals'])
                     self._balance_cache[network_key] = (int(time.time()), balance)
+                    self._gas_price(network_key)
                     print(f"[MOVE] {network_key} ready — chain {chain_id}, faucet balance {balance:.4f}")
                 else:
                     print(f"[MOVE] {network_key} connected (chain {chain_id}) — but NO FAUCET KEY is configured, payouts will fail")
@@ -288,6 +319,9 @@ class MoveFaucet:
         for thread in threads:
             thread.join()
 
+        for key, client in self._clients.items():
+            keepalive_scheduler.register(f'move/{key}', client.get_chain_identifier)
+
 
 
 
@@ -392,7 +426,7 @@ class MoveFaucet:
                 return False
 
             encoded = message.encode('utf-8')
-            payload = bytes([3, 0, 0]) + _uleb128(len(encoded)) + encoded
+            payload = bytes([3, 0, 0]) + uleb128(len(encoded)) + encoded
             digest = hashlib.blake2b(payload, digest_size=32).digest()
             return Signature.from_bytes(sig).verify(Pubkey.from_bytes(pubkey), digest)
         except Exception:
@@ -407,14 +441,14 @@ class MoveFaucet:
     # _sign_transaction
     ############################################################
     #
-    # The faucet's own signature over the node-built payout:
-    # blake2b-256 over intent (0,0,0) + the TransactionData
-    # BCS, signed Ed25519, serialized as base64 of
-    # flag || sig64 || pubkey32 — the format executeTransaction
-    # expects.
+    # The faucet's own signature over a payout's
+    # TransactionData BCS: blake2b-256 over intent (0,0,0) +
+    # the TransactionData BCS, signed Ed25519, serialized as
+    # base64 of flag || sig64 || pubkey32 — the format
+    # executeTransaction expects.
     #
     # Used by:
-    #   - request_move (below)
+    #   - _execute_transfer (below)
     ############################################################
 
     def _sign_transaction(self, tx_bcs_b64: str) -> str:
@@ -429,6 +463,99 @@ class MoveFaucet:
 
 
 
+    ############################################################
+    # _gas_price
+    ############################################################
+    #
+    # The reference gas price a locally built payout bids,
+    # read once per GAS_PRICE_TTL_SECONDS per network.
+    #
+    # Used by:
+    #   - _warm_up_networks (above) — pre-fills it
+    #   - _execute_transfer (below)
+    ############################################################
+
+    def _gas_price(self, network: str) -> int:
+        cached = self._gas_prices.get(network)
+        if cached and int(time.time()) - cached[0] < GAS_PRICE_TTL_SECONDS:
+            return cached[1]
+
+        price = self._clients[network].get_reference_gas_price()
+        self._gas_prices[network] = (int(time.time()), price)
+        return price
+
+
+
+
+
+
+    ############################################################
+    # _execute_transfer
+    ############################################################
+    #
+    # One payout on the wire; returns its digest. The caller
+    # holds the network's send lock.
+    #
+    # With a cached gas coin ref the transfer is serialized
+    # locally (transaction_bcs.py) at the cached reference gas
+    # price, with fee_mist as its gas budget, and executed —
+    # the one round trip. Two failures have not paid the
+    # chunk, so the payout falls back to the node-built
+    # transaction (simulateTransaction) and the cached price is
+    # dropped: a node that REJECTS it before execution
+    # (LOCAL_BUILD_REJECTIONS — the coin moved under another
+    # process or a wallet, or is locked; a price below a new
+    # epoch's reference), and a payout short of gas
+    # (LOCAL_BUILD_GAS_FAILURES) — which may have landed and
+    # been charged gas, but with its transfer rolled back.
+    # Every other failure — a transport error, an execution or
+    # finality timeout — is NOT retried that way: the first
+    # transaction may have landed, and a second build would
+    # pay twice. It fails the payout.
+    #
+    # Either way the gas coin ref from the execution's effects
+    # is cached for the next payout; one that failed keeps
+    # none, so the next payout has the node build again.
+    #
+    # Used by:
+    #   - request_move (below)
+    ############################################################
+
+    def _execute_transfer(self, network: str, to_address: str, amount_mist: int) -> str:
+        client = self._clients[network]
+        gas_ref = self._gas_coins.pop(network, None)
+
+        if gas_ref:
+            try:
+                tx_bcs = base64.b64encode(transfer_transaction(
+                    self.FAUCET_ADDRESS, to_address, amount_mist, gas_ref,
+                    self._gas_price(network), self._chain_params[network]['fee_mist'],
+                )).decode()
+                digest, self._gas_coins[network] = client.execute(tx_bcs, self._sign_transaction(tx_bcs))
+                return digest
+            except RuntimeError as e:
+                message = str(e).lower()
+                if any(marker in message for marker in LOCAL_BUILD_REJECTIONS):
+                    logging.warning(f"[MOVE] {network} locally built payout refused, letting the node build it: {e}")
+                elif any(marker in message for marker in LOCAL_BUILD_GAS_FAILURES):
+                    logging.warning(f"[MOVE] {network} locally built payout short of gas, letting the node build it: {e}")
+                else:
+                    raise
+                self._gas_prices.pop(network, None)
+
+        tx_bcs = client.build_transfer(
+            self.FAUCET_ADDRESS,
+            base64.b64encode(bytes.fromhex(to_address[2:])).decode(),
+            base64.b64encode(amount_mist.to_bytes(8, 'little')).decode(),
+        )
+        digest, self._gas_coins[network] = client.execute(tx_bcs, self._sign_transaction(tx_bcs))
+        return digest
+
+
+
+
+
+
     ############################################################
     # get_networks
     ############################################################
@@ -522,17 +649,19 @@ class MoveFaucet:
     # request_move
     ############################################################
     #
-    # The actual payout: validate everything, then have the
-    # node build one chunk-sized transfer, sign it and execute
-    # — under the network's send lock. Returns a
+    # The actual payout: validate everything, then build one
+    # chunk-sized transfer, sign it and execute — under the
+    # network's send lock. Returns a
     # (payload, http_status) tuple; user-facing errors are
-    # Lithuanian.
+    # Lithuanian. The build and execute run on the network's
+    # payout queue; wait=False answers 202 with its ticket
+    # instead.
     #
     # Used by:
     #   - move_routes.py — GET /api/move/<network>/request
     ############################################################
 
-    def request_move(self, network: str, to_address: str, signature: str, nonce: str) -> tuple:
+    def request_move(self, network: str, to_address: str, signature: str, nonce: str, wait: bool = True) -> tuple:
         if not self.is_supported_network(network):
             return {"error": f"Nepalaikomas tinklas: {network}"}, 400
 
@@ -559,6 +688,16 @@ class MoveFaucet:
             return {"error": "Negalima siųsti į čiaupo adresą"}, 400
 
 
+        # Fast path: a wallet still cooling down is refused right
+        # here, before the signature recovery and balance RPCs
+        # below. peek() only reads — STEP 3's claim() stays the one
+        # atomic check.
+        cooldown_key = (network, to_address)
+        remaining = self.cooldowns.peek(cooldown_key)
+        if remaining:
+            return {"error": f"Kriptovaliuta jums jau išsiųsta. Daugiau galėsite pasiimti už {remaining} sek."}, 429
+
+
         # STEP 2: signature check. This is the exact message the
         # frontend asks the wallet to sign — any mismatch (different
         # nonce, different wording) fails verification.
@@ -585,52 +724,52 @@ class MoveFaucet:
         # The cooldown slot is check-and-CLAIMED atomically, per
         # (network, address), so two parallel requests from the same
         # address can't both pass the check and get paid twice.
-        cooldown_key = (network, to_address)
         remaining = self.cooldowns.claim(cooldown_key)
         if remaining:
             return {"error": f"Kriptovaliuta jums jau išsiųsta. Daugiau galėsite pasiimti už {remaining} sek."}, 429
 
-        try:
-            faucet_mist = client.get_balance(self.FAUCET_ADDRESS, params['coin_type'])
-        except Exception:
-            self.cooldowns.release(cooldown_key)
-            logging.exception(f"Failed to read the faucet balance on {network}")
-            return {"error": "Nepavyko gauti čiaupo balanso"}, 500
+        # From here on the work runs on the network's payout worker
+        # (app/payout_queue/) as one job: the faucet balance check
+        # and the broadcast. With wait (the method's default; the
+        # route passes it only for ?wait=1) the HTTP thread waits
+        # for the job's answer; without — the route's default —
+        # it answers 202 with the ticket straight away.
+        def send():
+            try:
+                faucet_mist = client.get_balance(self.FAUCET_ADDRESS, params['coin_type'])
+            except Exception:
+                self.cooldowns.release(cooldown_key)
+                logging.exception(f"Failed to read the faucet balance on {network}")
+                return {"error": "Nepavyko gauti čiaupo balanso"}, 500
 
-        if faucet_mist < amount_mist + params['fee_mist']:
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Čiaupas nebeturi kriptovaliutos. Praneškite dėstytojui."}, 503
+            if faucet_mist < amount_mist + params['fee_mist']:
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Čiaupas nebeturi kriptovaliutos. Praneškite dėstytojui."}, 503
 
 
-        # STEP 4: build, sign and execute — under the network's
-        # send lock. The transaction is built by the NODE inside
-        # the lock (simulateTransaction resolves the gas coins that
-        # very second), so a payout can never be prepared in
-        # advance. setdefault is atomic under the GIL, so the lock
-        # map needs no lock of its own.
-        # =======================================================
-        try:
-            with self._send_locks.setdefault(network, threading.Lock()):
-                tx_bcs = client.build_transfer(
-                    self.FAUCET_ADDRESS,
-                    base64.b64encode(bytes.fromhex(to_address[2:])).decode(),
-                    base64.b64encode(amount_mist.to_bytes(8, 'little')).decode(),
-                )
-                digest = client.execute(tx_bcs, self._sign_transaction(tx_bcs))
-        except Exception:
-            logging.exception(f"Failed to broadcast {network} payout")
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500
+            # STEP 4: build, sign and execute — under the network's
+            # send lock, which also guards the cached gas coin ref
+            # the transaction spends (see _execute_transfer).
+            # =======================================================
+            try:
+                with self._send_locks.for_network(network):
+                    digest = self._execute_transfer(network, to_address, amount_mist)
+            except Exception:
+                logging.exception(f"Failed to broadcast {network} payout")
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500
 
-        # Success — the cooldown slot claimed above stays, and the
-        # cached balance is dropped so the page shows the payout on
-        # its next poll.
-        self._balance_cache.pop(network, None)
+            # Success — the cooldown slot claimed above stays, and the
+            # cached balance is dropped so the page shows the payout on
+            # its next poll.
+            self._balance_cache.pop(network, None)
 
-        return {
-            "message": f"{params['symbol']} sent successfully",
-            "transaction_id": digest,
-            "amount": amount_mist / (10 ** params['decimals']),
-            "from_address": self.FAUCET_ADDRESS,
-            "network": network,
-        }, 200
+            return {
+                "message": f"{params['symbol']} sent successfully",
+                "transaction_id": digest,
+                "amount": amount_mist / (10 ** params['decimals']),
+                "from_address": self.FAUCET_ADDRESS,
+                "network": network,
+            }, 200
+
+        return self.payouts.submit(network, send, wait=wait)
@@ -7,7 +7,8 @@
 #    GET /api/move/networks                  — available networks
 #    GET /api/move/<network>/faucet-balance  — faucet address + balance
 #    GET /api/move/<network>/request         — send one chunk
-#                                              (?address, ?signature, ?nonce)
+#                                              (?address, ?signature, ?nonce,
+#                                               ?wait=1 → 200, not 202 + ticket)
 #
 #  Shaped like the other family surfaces so the frontend can
 #  treat them all alike. A deliberately thin layer: every
@@ -116,5 +117,5 @@ def request_move(network):
     to_address = request.args.get('address')
     signature = request.args.get('signature')
     nonce = request.args.get('nonce')
-    data, status = move_faucet.request_move(network, to_address, signature, nonce)
+    data, status = move_faucet.request_move(network, to_address, signature, nonce, wait=request.args.get('wait') == '1')
     return jsonify(data), status
@@ -0,0 +1,165 @@
+############################################################
+#  [*] Sui transaction BCS — a payout serialized locally
+#
+#  A payout used to be BUILT BY THE NODE: simulateTransaction
+#  with doGasSelection answered with the TransactionData BCS,
+#  and executeTransaction then sent it back — two GraphQL
+#  round trips per payout, the first one only to learn bytes
+#  the faucet can write itself. This module writes them.
+#
+#  The transaction is always the same shape (Sui's own
+#  faucet's): SplitCoins the chunk off the gas coin, then
+#  TransferObjects the new coin to the recipient. What the
+#  node used to resolve, the caller supplies: the gas coin's
+#  object ref (id, version, digest — cached by MoveFaucet
+#  from the previous payout's effects) and the reference gas
+#  price (cached per epoch).
+#
+#  BCS, the parts used here (sui-types, TransactionData::V1):
+#
+#    integers     little-endian, fixed width
+#    enum tag     ULEB128 variant index
+#    vector       ULEB128 length, then the items
+#    address      32 raw bytes
+#    digest       a vector<u8> — ULEB128 32, then 32 bytes
+#
+#  Used by:
+#    - move_faucet.py — MoveFaucet._execute_transfer, and
+#      uleb128 for the personal-message payload
+#    - tests/test_move_faucet.py
+############################################################
+
+
+import struct
+
+from solders.hash import Hash
+
+
+# Enum variant indices, as declared in sui-types
+TRANSACTION_DATA_V1 = 0
+PROGRAMMABLE_TRANSACTION = 0
+CALL_ARG_PURE = 0
+COMMAND_TRANSFER_OBJECTS = 1
+COMMAND_SPLIT_COINS = 2
+ARGUMENT_GAS_COIN = 0
+ARGUMENT_INPUT = 1
+ARGUMENT_NESTED_RESULT = 3
+EXPIRATION_NONE = 0
+
+
+
+
+
+
+
+
+############################################################
+# uleb128
+############################################################
+#
+# BCS length prefixes and enum tags are ULEB128-encoded.
+#
+# Used by:
+#   - the encoders below
+#   - move_faucet.py — MoveFaucet.verify_signature
+############################################################
+
+def uleb128(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        out.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+
+
+
+
+
+
+
+############################################################
+# _address / _vector / _object_ref
+############################################################
+#
+# The composite encodings: a 0x-hex address as its 32 raw
+# bytes, a vector as its length and already-encoded items,
+# and an object ref (0x-hex id, version, base58 digest) as
+# the (ObjectID, SequenceNumber, ObjectDigest) tuple. A Sui
+# digest is base58 over 32 bytes — the same encoding as a
+# Solana hash, so solders parses it.
+#
+# Used by:
+#   - transfer_transaction (below)
+############################################################
+
+def _address(address: str) -> bytes:
+    raw = bytes.fromhex(address[2:] if address.startswith('0x') else address)
+    if len(raw) != 32:
+        raise ValueError(f'Not a 32-byte Sui address: {address}')
+    return raw
+
+
+def _vector(items) -> bytes:
+    items = list(items)
+    return uleb128(len(items)) + b''.join(items)
+
+
+def _object_ref(object_ref) -> bytes:
+    object_id, version, digest = object_ref
+    return _address(object_id) + struct.pack('<Q', int(version)) + uleb128(32) + bytes(Hash.from_string(digest))
+
+
+
+
+
+
+
+
+############################################################
+# transfer_transaction
+############################################################
+#
+# The TransactionData BCS of one payout: `amount` MIST split
+# off the gas coin `gas_ref` and transferred to `recipient`,
+# paid by `sender` at `price` MIST per gas unit with at most
+# `budget` MIST of gas, no expiration. Returns the raw bytes
+# — the caller signs them under the transaction intent and
+# base64-encodes them for executeTransaction.
+#
+# Used by:
+#   - move_faucet.py — MoveFaucet._execute_transfer
+############################################################
+
+def transfer_transaction(sender: str, recipient: str, amount: int, gas_ref, price: int, budget: int) -> bytes:
+    # Pure inputs are vector<u8>s holding the value's own BCS
+    inputs = _vector([
+        uleb128(CALL_ARG_PURE) + uleb128(8) + struct.pack('<Q', amount),
+        uleb128(CALL_ARG_PURE) + uleb128(32) + _address(recipient),
+    ])
+
+    commands = _vector([
+        # SplitCoins(GasCoin, [Input(0)])
+        uleb128(COMMAND_SPLIT_COINS) + uleb128(ARGUMENT_GAS_COIN)
+        + _vector([uleb128(ARGUMENT_INPUT) + struct.pack('<H', 0)]),
+        # TransferObjects([NestedResult(0, 0)], Input(1))
+        uleb128(COMMAND_TRANSFER_OBJECTS)
+        + _vector([uleb128(ARGUMENT_NESTED_RESULT) + struct.pack('<HH', 0, 0)])
+        + uleb128(ARGUMENT_INPUT) + struct.pack('<H', 1),
+    ])
+
+    gas_data = (
+        _vector([_object_ref(gas_ref)])
+        + _address(sender)
+        + struct.pack('<QQ', int(price), int(budget))
+    )
+
+    return (
+        uleb128(TRANSACTION_DATA_V1)
+        + uleb128(PROGRAMMABLE_TRANSACTION) + inputs + commands
+        + _address(sender)
+        + gas_data
+        + uleb128(EXPIRATION_NONE)
+    )
@@ -0,0 +1,539 @@
+############################################################
+#  [*] Payout queue — one worker per network, a ticket per payout
+#
+#  The request handlers validate, check the signature and
+#  CLAIM the cooldown on the HTTP thread, then hand the slow
+#  part — the faucet balance check, the send lock, signing
+#  and the broadcast round trips — to the network's payout
+#  worker as a job. Every job gets a ticket:
+#
+#    queued  → sending → sent    (http_status 200)
+#                      → failed  (the job's error status)
+#
+#  By default the handler answers 202 with the ticket at
+#  once and the client polls GET /api/payout/<ticket>
+#  (payout_routes.py; the frontend's requestPayout.js); with
+#  ?wait=1 it WAITS for its ticket and answers with the
+#  payout's own payload. Either way, HTTP threads no longer
+#  pile up behind a send lock: the network's worker drains
+#  its queue in order.
+#
+#  A faucet may also hand the queue a BATCH handler (the
+#  UTXO faucet does): its worker then keeps collecting jobs
+#  for the network's batch window after the first one, and
+#  pays everything collected with one handler call — one
+#  transaction with many outputs — while every ticket still
+#  gets its own answer.
+#
+#  A faucet whose payouts need no ordering (the EVM faucets,
+#  with their local nonces; the SVM faucet, with no nonce at
+#  all) may run a small pool of workers per network instead
+#  of one.
+#
+#  Tickets live in-memory by default, or in
+#  SHARED_STATE_DIR/payouts.db when several gunicorn workers
+#  serve the API (the poll may land on another worker) —
+#  the same switch as app/cooldown.py. Either store keeps a
+#  ticket for TICKET_TTL_SECONDS, and the in-memory one at
+#  most TICKET_MAX_ENTRIES of them.
+#
+#  Used by:
+#    - evm_faucet.py / utxo_faucet.py / svm_faucet.py /
+#      move_faucet.py — one PayoutQueue each (ERC-20 borrows
+#      the EVM faucet's, same wallet, same nonces)
+#    - payout_routes.py — ticket lookups
+############################################################
+
+
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import secrets
+import threading
+import collections
+
+from .. import shared_state
+
+
+# How long a finished ticket stays answerable, and the cap
+# on tickets the in-memory store holds at once
+TICKET_TTL_SECONDS = 3600
+TICKET_MAX_ENTRIES = 10_000
+
+# How long a waiting request blocks on its ticket before it
+# answers 202 with the ticket instead — a payout stuck behind
+# a dead RPC must not hold the HTTP thread past gunicorn's
+# timeout
+WAIT_TIMEOUT_SECONDS = 90
+
+# How long an exiting process lets the workers finish the
+# jobs already queued, counted from the SIGTERM (see
+# PayoutQueue._drain) — gunicorn's graceful_timeout less a
+# margin, so the drain ends before the master's SIGKILL
+DRAIN_MARGIN_SECONDS = 5
+DRAIN_TIMEOUT_SECONDS = max(0, int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '60')) - DRAIN_MARGIN_SECONDS)
+
+# Most jobs one batch handler call is given — bounds the
+# transaction a batch builds, whatever the queue holds
+BATCH_MAX_JOBS = 100
+
+# The generic answer when a job dies with an exception it
+# did not handle itself
+_CRASHED = ({"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500)
+
+
+
+
+
+
+
+
+############################################################
+# TicketStore
+############################################################
+#
+# The in-memory backend: ticket -> record dict, insertion
+# ordered, so the oldest tickets are swept off the front
+# once they outlive the TTL or the store outgrows its cap.
+#
+# Used by:
+#   - ticket_store (below) — the single-process backend
+############################################################
+
+class TicketStore:
+
+    def __init__(self, ttl=TICKET_TTL_SECONDS, max_entries=TICKET_MAX_ENTRIES):
+        self.ttl = int(ttl)
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self._tickets = collections.OrderedDict()
+
+    def create(self, network):
+        ticket = secrets.token_urlsafe(16)
+        now = int(time.time())
+        with self._lock:
+            while self._tickets:
+                oldest = next(iter(self._tickets.values()))
+                if now - oldest['created_at'] < self.ttl and len(self._tickets) < self.max_entries:
+                    break
+                self._tickets.popitem(last=False)
+            self._tickets[ticket] = {
+                'ticket': ticket, 'network': network, 'status': 'queued',
+                'http_status': None, 'result': None, 'created_at': now,
+            }
+        return ticket
+
+    def update(self, ticket, status, result=None, http_status=None):
+        with self._lock:
+            record = self._tickets.get(ticket)
+            if record is not None:
+                record.update(status=status, result=result, http_status=http_status)
+
+    def get(self, ticket):
+        with self._lock:
+            record = self._tickets.get(ticket)
+            return dict(record) if record is not None else None
+
+
+
+
+
+
+
+
+############################################################
+# SqliteTicketStore
+############################################################
+#
+# The multi-worker backend: the same contract, one row per
+# ticket in a SQLite file every worker opens. Expired rows
+# are pruned on every create — an indexed range delete.
+#
+# Used by:
+#   - ticket_store (below) — when SHARED_STATE_DIR is set
+############################################################
+
+class SqliteTicketStore:
+
+    def __init__(self, path, ttl=TICKET_TTL_SECONDS):
+        self.path = path
+        self.ttl = int(ttl)
+
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS Payout_Tickets (
+                    ticket       TEXT PRIMARY KEY,
+                    network      TEXT NOT NULL,
+                    status       TEXT NOT NULL,
+                    http_status  INTEGER,
+                    result       TEXT,
+                    created_at   INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS Payout_Tickets_Age ON Payout_Tickets (created_at)')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def create(self, network):
+        ticket = secrets.token_urlsafe(16)
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM Payout_Tickets WHERE created_at <= ?', (now - self.ttl,))
+            conn.execute(
+                "INSERT INTO Payout_Tickets (ticket, network, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (ticket, network, now),
+            )
+        finally:
+            conn.close()
+        return ticket
+
+    def update(self, ticket, status, result=None, http_status=None):
+        conn = self._connect()
+        try:
+            conn.execute(
+                'UPDATE Payout_Tickets SET status = ?, result = ?, http_status = ? WHERE ticket = ?',
+                (status, json.dumps(result) if result is not None else None, http_status, ticket),
+            )
+        finally:
+            conn.close()
+
+    def get(self, ticket):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT network, status, http_status, result, created_at FROM Payout_Tickets WHERE ticket = ?',
+                (ticket,),
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        network, status, http_status, result, created_at = row
+        return {
+            'ticket': ticket, 'network': network, 'status': status, 'http_status': http_status,
+            'result': json.loads(result) if result is not None else None, 'created_at': created_at,
+        }
+
+
+
+
+
+
+
+
+############################################################
+# ticket_store / tickets
+############################################################
+#
+# The process-wide store every PayoutQueue writes to and the
+# status route reads from — in-memory by default, the shared
+# SQLite file when SHARED_STATE_DIR is set.
+#
+# Used by:
+#   - PayoutQueue (below)
+#   - payout_routes.py — GET /api/payout/<ticket>
+############################################################
+
+def ticket_store():
+    if shared_state.SHARED_STATE_DIR:
+        return SqliteTicketStore(shared_state.shared_path('payouts.db'))
+    return TicketStore()
+
+
+tickets = ticket_store()
+
+
+
+
+
+
+
+
+############################################################
+# shutdown_started
+############################################################
+#
+# Stamps when this process was asked to stop, so the exit
+# drain counts its budget from the SIGTERM rather than from
+# whenever atexit finally runs. Only the first call counts;
+# a process never stamped (the dev server) drains from its
+# exit.
+#
+# Used by:
+#   - gunicorn.conf.py — post_worker_init's SIGTERM wrapper
+#   - PayoutQueue._drain (below)
+############################################################
+
+_shutdown_started = None
+
+
+def shutdown_started():
+    global _shutdown_started
+    if _shutdown_started is None:
+        _shutdown_started = time.monotonic()
+
+
+
+
+
+
+
+
+############################################################
+# PayoutQueue
+############################################################
+#
+# One faucet's per-network payout queues. A network's queue
+# and its daemon worker threads (`workers` of them, one by
+# default) are created on the first job, so a network nobody
+# claims on costs nothing. scope only names the threads.
+#
+# A job is a zero-argument callable returning the usual
+# (payload, http_status) tuple. It owns its error handling —
+# releasing the cooldown slot on failure included; a job that
+# raises anyway is logged and answered with a generic 500.
+#
+# With a batch_handler, a job is instead whatever the faucet
+# submits (plain data) and the handler pays a whole batch:
+# batch_handler(network, jobs) returns one (payload,
+# http_status) per job, in order. batch_windows maps a
+# network to the seconds its worker keeps collecting after
+# the first job; a network not in it only batches what is
+# already queued.
+#
+# Used by:
+#   - the faucets — one instance each, see the file header
+############################################################
+
+class PayoutQueue:
+
+
+
+
+
+
+    ############################################################
+    # __init__
+    ############################################################
+    #
+    # The worker registry plus the in-process waiters: ticket ->
+    # [Event, result] for handlers blocking on their ticket, so
+    # a waiting request never polls the store.
+    #
+    # Used by:
+    #   - the faucets' __init__
+    ############################################################
+
+    def __init__(self, scope, batch_handler=None, batch_windows=None, workers=1):
+        self.scope = scope
+        self.workers = int(workers)
+        self.batch_handler = batch_handler
+        self.batch_windows = batch_windows or {}
+        self._queues = {}
+        self._workers = []
+        self._guard = threading.Lock()
+        self._waiters = {}
+
+
+
+
+
+
+    ############################################################
+    # submit
+    ############################################################
+    #
+    # Queue one payout job and answer for it: with wait the
+    # job's own (payload, http_status) once it ran; without
+    # (what the request routes ask for unless ?wait=1), 202
+    # and the ticket right away. A waited job that outlasts
+    # WAIT_TIMEOUT_SECONDS is answered like an async one — it
+    # is still queued and will still pay.
+    #
+    # Used by:
+    #   - the faucets' request_* — right after the cooldown claim
+    ############################################################
+
+    def submit(self, network, job, wait=True):
+        ticket = tickets.create(network)
+        waiter = None
+        if wait:
+            waiter = [threading.Event(), None]
+            self._waiters[ticket] = waiter
+
+        self._queue_for(network).put((ticket, job))
+
+        if wait and waiter[0].wait(WAIT_TIMEOUT_SECONDS):
+            self._waiters.pop(ticket, None)
+            return waiter[1]
+
+        self._waiters.pop(ticket, None)
+        return {"ticket": ticket, "status": "queued", "status_url": f"/api/payout/{ticket}"}, 202
+
+
+
+
+
+
+    ############################################################
+    # _queue_for
+    ############################################################
+    #
+    # The network's queue, starting its worker threads on first
+    # use. The first worker also registers the exit drain.
+    #
+    # Used by:
+    #   - submit (above)
+    ############################################################
+
+    def _queue_for(self, network):
+        jobs = self._queues.get(network)
+        if jobs is not None:
+            return jobs
+
+        with self._guard:
+            if network not in self._queues:
+                if not self._workers:
+                    atexit.register(self._drain)
+                jobs = queue.Queue()
+                self._queues[network] = jobs
+                for index in range(self.workers):
+                    name = f'payout-{self.scope}-{network}' + (f'-{index}' if self.workers > 1 else '')
+                    worker = threading.Thread(target=self._work, args=(network, jobs), name=name, daemon=True)
+                    self._workers.append(worker)
+                    worker.start()
+            return self._queues[network]
+
+
+
+
+
+
+    ############################################################
+    # _work
+    ############################################################
+    #
+    # The worker loop: one job at a time, in arrival order (a
+    # pool takes them in arrival order but runs them side by
+    # side) — or, with a batch handler, one batch at a time:
+    # the first job opens the network's window, and everything
+    # arriving before it closes (up to BATCH_MAX_JOBS) rides
+    # along. None is the drain's stop marker; a batch still in
+    # hand when it arrives is paid first.
+    #
+    # Used by:
+    #   - _queue_for (above) — `workers` threads per network
+    ############################################################
+
+    def _work(self, network, jobs):
+        while True:
+            item = jobs.get()
+            if item is None:
+                return
+
+            if self.batch_handler is None:
+                self._run(network, [item])
+                continue
+
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.batch_windows.get(network, 0)
+            while len(batch) < BATCH_MAX_JOBS:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = jobs.get(timeout=remaining) if remaining > 0 else jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._run(network, batch)
+            if stopping:
+                return
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # Pays one batch (a single job without a batch handler).
+    # Every ticket walks queued → sending → sent/failed and a
+    # waiting handler is woken with its own result; a crash
+    # fails the whole batch with the generic 500.
+    #
+    # Used by:
+    #   - _work (above)
+    ############################################################
+
+    def _run(self, network, batch):
+        for ticket, _ in batch:
+            tickets.update(ticket, 'sending')
+
+        try:
+            if self.batch_handler is None:
+                results = [batch[0][1]()]
+            else:
+                results = self.batch_handler(network, [job for _, job in batch])
+        except Exception:
+            logging.exception(f"Payout job crashed on {network}")
+            results = [_CRASHED] * len(batch)
+
+        for (ticket, _), result in zip(batch, results):
+            payload, http_status = result
+            tickets.update(ticket, 'sent' if http_status == 200 else 'failed', payload, http_status)
+
+            waiter = self._waiters.get(ticket)
+            if waiter is not None:
+                waiter[1] = result
+                waiter[0].set()
+
+
+
+
+
+
+    ############################################################
+    # _drain
+    ############################################################
+    #
+    # On process exit (atexit — a gunicorn worker leaving after
+    # SIGTERM, or the dev server stopping): queue a stop marker
+    # per worker behind every job already accepted and give the
+    # workers until DRAIN_TIMEOUT_SECONDS past the shutdown
+    # stamp (shutdown_started, below — the SIGTERM itself under
+    # gunicorn, else the exit) to pay them out, so a 202
+    # already handed to a student is honoured. The in-flight
+    # requests gunicorn finished first spend the same budget:
+    # the whole shutdown stays inside graceful_timeout.
+    #
+    # Used by:
+    #   - atexit — registered by _queue_for (above)
+    ############################################################
+
+    def _drain(self):
+        with self._guard:
+            for jobs in self._queues.values():
+                for _ in range(self.workers):
+                    jobs.put(None)
+            workers = list(self._workers)
+
+        deadline = (_shutdown_started or time.monotonic()) + DRAIN_TIMEOUT_SECONDS
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
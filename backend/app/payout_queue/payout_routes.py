@@ -0,0 +1,52 @@
+############################################################
+#  [*] Payout ticket HTTP API
+#
+#    GET /api/payout/<ticket>  — status of one queued payout
+#
+#  The poll target of every claim (the request routes
+#  answer 202 with a ticket unless asked ?wait=1): the
+#  ticket's status — queued, sending, sent or failed — and,
+#  once finished, the exact payload and HTTP status a
+#  waiting request would have answered with (transaction
+#  hash included). Tickets are unguessable random tokens, so
+#  knowing one is the only access check.
+#
+#  Used by:
+#    - main.py — blueprint registration
+############################################################
+
+
+from flask import Blueprint, jsonify
+
+from .payout_queue import tickets
+
+
+bp_payout_queue = Blueprint('payout_queue', __name__)
+
+
+
+
+
+
+
+
+############################################################
+# get_payout
+############################################################
+#
+# GET /api/payout/<ticket>
+#
+# 200 with the ticket record while it exists, 404 once it
+# expired (or never existed). The record's own http_status
+# tells a sent payout from a failed one.
+#
+# Used by:
+#   - vite/app/src/requestPayout.js — every faucet page's claim
+############################################################
+
+@bp_payout_queue.route('/api/payout/<ticket>', methods=['GET'])
+def get_payout(ticket):
+    record = tickets.get(ticket)
+    if record is None:
+        return jsonify({"error": "Nežinomas arba pasibaigęs išmokos bilietas"}), 404
+    return jsonify(record), 200
@@ -0,0 +1,42 @@
+############################################################
+#  [*] Rate limit config schema
+#
+#  The ENFORCED shape of one RATE_LIMIT_CONFIGS entry — the
+#  token-bucket budget of one route: how many requests a
+#  client may fire back to back (burst) and how fast the
+#  allowance comes back (per_minute). Built on the strict
+#  base, so a misspelled key fails the boot with a precise
+#  error.
+#
+#  Used by:
+#    - app/config_models.py — validate_rate_limits()
+############################################################
+
+
+from pydantic import Field
+
+from ..config_base import StrictModel
+
+
+
+
+
+
+
+
+############################################################
+# RateLimitRule
+############################################################
+#
+# One route's budget, per client IP. burst is the bucket
+# size — a student's honest double-click must fit in it;
+# per_minute the steady rate a client is held to once the
+# burst is spent.
+#
+# Used by:
+#   - app/config_models.py — validate_rate_limits()
+############################################################
+
+class RateLimitRule(StrictModel):
+    burst: int = Field(ge=1)
+    per_minute: float = Field(gt=0)
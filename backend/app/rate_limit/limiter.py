@@ -0,0 +1,145 @@
+############################################################
+#  [*] Rate limiter — per-client-IP token buckets
+#
+#  The bucket table behind the before_request hook
+#  (rate_limit_hook.py). One bucket per (route rule, client
+#  IP): it holds up to `burst` tokens, refills at
+#  `per_minute` tokens a minute, and every request spends
+#  one. An empty bucket answers "retry in N seconds" — the
+#  request is shed before it ever reaches a faucet object, so
+#  a scripted client can no longer burn the RPC and Etherscan
+#  quotas.
+#
+#  Memory is bounded: the table is an LRU of at most
+#  max_clients buckets, so a flood of spoofed or rotating IPs
+#  evicts the longest-idle buckets instead of growing the
+#  process. An evicted client simply starts again with a full
+#  bucket — the same as a client idle long enough to refill.
+#
+#  Flask-free on purpose, so the tests exercise it directly.
+#
+#  Used by:
+#    - app/rate_limit/rate_limit_hook.py — one instance per app
+#    - tests/test_rate_limit.py
+############################################################
+
+
+import math
+import time
+import threading
+import collections
+
+
+# Hard cap on buckets held at once. One bucket is a few
+# hundred bytes; a class of 200 students across every limited
+# route stays far below it.
+RATE_LIMIT_MAX_CLIENTS = 50_000
+
+
+
+
+
+
+
+
+############################################################
+# TokenBucketLimiter
+############################################################
+#
+# rules maps a route rule string ('/api/evm/<network>/request')
+# to its budget — {'burst': int, 'per_minute': float}, the
+# shape app/rate_limit/config_schema.py validates. Rules not
+# in the map are never limited.
+#
+# Used by:
+#   - app/rate_limit/rate_limit_hook.py
+############################################################
+
+class TokenBucketLimiter:
+
+    def __init__(self, rules, max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.rules = dict(rules or {})
+        self.max_clients = int(max_clients)
+        self._lock = threading.Lock()
+
+        # (rule, client ip) -> [tokens, last refill time],
+        # least recently used first
+        self._buckets = collections.OrderedDict()
+
+        # Lifetime counters: requests shed, buckets evicted
+        self.rejected = 0
+        self.evicted = 0
+
+
+
+
+
+
+    ############################################################
+    # allow
+    ############################################################
+    #
+    # Spend one token from the client's bucket for this rule.
+    # Returns 0 when the request may proceed, otherwise the
+    # whole seconds until the next token — the Retry-After
+    # value. Refill is computed lazily from the elapsed time,
+    # so there is no background thread; the lock covers only
+    # a few float operations.
+    #
+    # Used by:
+    #   - rate_limit_hook.py — every request to a limited route
+    ############################################################
+
+    def allow(self, rule, client):
+        budget = self.rules.get(rule)
+        if budget is None:
+            return 0
+
+        burst = budget['burst']
+        per_second = budget['per_minute'] / 60.0
+        key = (rule, client)
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(burst), now]
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * per_second)
+                bucket[1] = now
+
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return 0
+
+            self.rejected += 1
+            return max(1, math.ceil((1.0 - bucket[0]) / per_second))
+
+
+
+
+
+
+    ############################################################
+    # stats
+    ############################################################
+    #
+    # The table's counters.
+    #
+    # Used by:
+    #   - tests/test_rate_limit.py
+    ############################################################
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': len(self._buckets),
+                'rejected': self.rejected,
+                'evicted': self.evicted,
+                'max_clients': self.max_clients,
+            }
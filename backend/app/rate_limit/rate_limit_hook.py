@@ -0,0 +1,66 @@
+############################################################
+#  [*] Rate limit hook — sheds abusive traffic per client IP
+#
+#  Wires limiter.py's token buckets into the Flask app as a
+#  before_request hook: a request to a limited route from a
+#  client whose bucket is empty is answered 429 (with a
+#  Retry-After header) right there — no faucet object, RPC
+#  or Etherscan call is ever reached.
+#
+#  The client is request.remote_addr, which is the REAL
+#  client IP only because main.py installs ProxyFix (the
+#  backend always sits behind the Caddy endpoint).
+#
+#  Used by:
+#    - main.py — install_rate_limiter() after the blueprints
+############################################################
+
+
+from flask import request, jsonify
+
+from .limiter import TokenBucketLimiter
+
+
+
+
+
+
+
+
+############################################################
+# install_rate_limiter
+############################################################
+#
+# Registers the hook on `app` and returns the limiter. Must
+# run AFTER the blueprints are registered: every configured
+# rule is checked against the app's url_map, so a typo in
+# RATE_LIMIT_CONFIGS fails the boot instead of silently
+# limiting nothing.
+#
+# Used by:
+#   - main.py — the entrypoint's blueprint step
+############################################################
+
+def install_rate_limiter(app, rules):
+    known_rules = {rule.rule for rule in app.url_map.iter_rules()}
+    unknown = sorted(set(rules) - known_rules)
+    if unknown:
+        raise ValueError(f"RATE_LIMIT_CONFIGS names unknown routes {unknown} — known routes: {sorted(known_rules)}")
+
+    limiter = TokenBucketLimiter(rules)
+
+    @app.before_request
+    def _rate_limit():
+        if request.url_rule is None:
+            return None
+
+        retry_after = limiter.allow(request.url_rule.rule, request.remote_addr)
+        if not retry_after:
+            return None
+
+        response = jsonify({"error": f"Per daug užklausų. Bandykite dar kartą už {retry_after} sek."})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    return limiter
@@ -0,0 +1,193 @@
+############################################################
+#  [*] Shared state — what several gunicorn workers agree on
+#
+#  By default every piece of faucet state is process-local:
+#  cooldowns live in a dict, payouts serialize on a
+#  threading.Lock. That is exactly right for ONE worker and
+#  silently wrong for several — each worker would hand out
+#  its own cooldown slots, send locks and EVM nonces, so two
+#  workers could pay the same student twice or fill the same
+#  EVM nonce.
+#
+#  SHARED_STATE_DIR switches the backend into multi-worker
+#  mode. It names a directory every worker of the SAME host
+#  can write (the /tmp tmpfs in docker-compose is enough):
+#
+#    cooldowns.db      — app/cooldown.py's SqliteCooldownTable
+#    payouts.db        — the payout queue's SqliteTicketStore
+#    nonces.db         — the EVM faucet's SqliteNonceManager
+#    locks/<name>.lock — one flock file per send lock (below)
+#
+#  Unset (the default) keeps the in-memory behaviour: run
+#  gunicorn with one worker. The cross-process pieces only
+#  coordinate workers on one machine — flock and SQLite
+#  locking do not span hosts.
+#
+#  Used by:
+#    - app/cooldown.py — cooldown_table() picks its backend
+#    - app/payout_queue/ and app/evm_faucet/nonce_manager.py
+#      — the same switch for tickets and nonces
+#    - the UTXO and MOVE faucets — SendLocks, one registry
+#      per faucet
+############################################################
+
+
+import os
+import fcntl
+import threading
+
+
+# The multi-worker switch — see the file header. None = one
+# process, everything in memory.
+SHARED_STATE_DIR = os.getenv('SHARED_STATE_DIR') or None
+
+
+
+
+
+
+
+
+############################################################
+# shared_path
+############################################################
+#
+# An absolute path inside SHARED_STATE_DIR, creating the
+# parent directory on first use (every worker races to do
+# it — exist_ok makes the race harmless).
+#
+# Used by:
+#   - app/cooldown.py — the cooldown database
+#   - ProcessLock (below) — the lock files
+############################################################
+
+def shared_path(*parts):
+    path = os.path.join(SHARED_STATE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+
+
+
+
+
+
+############################################################
+# ProcessLock
+############################################################
+#
+# A lock that holds across threads AND processes: a
+# threading.Lock first (flock belongs to the open file, so
+# two threads of one worker sharing the descriptor would
+# both "hold" it), then an exclusive flock on the lock file.
+# Used exactly like a threading.Lock — `with lock:`.
+#
+# Used by:
+#   - SendLocks (below) — in multi-worker mode
+############################################################
+
+class ProcessLock:
+
+
+
+
+
+
+    ############################################################
+    # __init__
+    ############################################################
+    #
+    # name becomes the lock file's name; the file is opened
+    # once and kept open for the life of the process.
+    #
+    # Used by:
+    #   - SendLocks.for_network (below)
+    ############################################################
+
+    def __init__(self, name):
+        self.name = name
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(shared_path('locks', f'{name}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+
+
+
+
+
+
+    ############################################################
+    # acquire / release
+    ############################################################
+    #
+    # Thread lock first, file lock second; released in the
+    # reverse order. A failed flock gives the thread lock
+    # back, so an error never wedges the other threads.
+    #
+    # Used by:
+    #   - __enter__ / __exit__ (below)
+    ############################################################
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return True
+
+    def release(self):
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+
+
+
+
+
+
+############################################################
+# SendLocks
+############################################################
+#
+# One faucet's per-network payout locks. for_network always
+# returns the SAME lock object for the same network — a
+# threading.Lock in single-process mode, a ProcessLock named
+# '<scope>-<network>' when SHARED_STATE_DIR is set, so every
+# worker serializes on the same file. scope keeps families
+# apart (an SVM chain and a UTXO chain may share a key).
+# The EVM faucets need none: their nonces are allocated
+# locally (app/evm_faucet/nonce_manager.py). Neither does
+# the SVM faucet: Solana has no account nonce at all.
+#
+# Used by:
+#   - utxo_faucet.py / move_faucet.py — the payout paths
+############################################################
+
+class SendLocks:
+
+    def __init__(self, scope):
+        self.scope = scope
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def for_network(self, network):
+        lock = self._locks.get(network)
+        if lock is not None:
+            return lock
+
+        with self._guard:
+            if network not in self._locks:
+                self._locks[network] = (
+                    ProcessLock(f'{self.scope}-{network}') if SHARED_STATE_DIR else threading.Lock()
+                )
+            return self._locks[network]
@@ -0,0 +1,248 @@
+############################################################
+#  [*] Blockhash cache — recent Solana blockhashes, refreshed
+#      in the background
+#
+#  Every Solana transaction carries a recent blockhash, and a
+#  payout used to fetch one on the spot — a blocking round
+#  trip on every payout, although a blockhash stays
+#  valid for ~150 blocks (about a minute). The cache keeps
+#  one per network instead. One daemon thread per network
+#  refreshes it every BLOCKHASH_REFRESH_SECONDS, and the
+#  payouts sign with the cached hash.
+#
+#  A refresh is ONE batch round trip — getLatestBlockhash
+#  (the hash and its lastValidBlockHeight) and getBlockHeight
+#  — so the cache knows how many blocks the hash has left. A
+#  payout only takes a hash that, at BLOCK_SECONDS per block
+#  since the fetch, is still BLOCKHASH_SAFETY_BLOCKS short
+#  of its last valid height; otherwise (the refresher has
+#  fallen behind, a dead RPC) the payout fetches one itself.
+#
+#  A send that fails with "blockhash not found" means the
+#  node has already forgotten the hash (a lagging or
+#  switched RPC): invalidate() drops it, so the retry and
+#  every later payout get a fresh one.
+#
+#  RPC-client-only on purpose (it only calls batch()), so
+#  the tests drive it with a fake.
+#
+#  Used by:
+#    - svm_faucet.py — SVMFaucet (payout blockhash, warmup)
+#    - tests/test_svm_faucet.py
+############################################################
+
+
+import time
+import logging
+import threading
+
+from .rpc_client import SOLANA_COMMITMENT
+
+
+# How often the background threads refresh each network
+BLOCKHASH_REFRESH_SECONDS = 5
+
+# Blocks a cached hash must have left before its last valid
+# height for a payout to sign with it — covers the send, its
+# preflight and a slow leader (~20 s)
+BLOCKHASH_SAFETY_BLOCKS = 50
+
+# Seconds per block used to age a cached hash — Solana's slot
+# time
+BLOCK_SECONDS = 0.4
+
+
+
+
+
+
+
+
+############################################################
+# is_blockhash_not_found
+############################################################
+#
+# Did a send fail because the node no longer knows the
+# transaction's blockhash? That is the preflight's
+# "Blockhash not found" simulation error.
+#
+# Used by:
+#   - svm_faucet.py — SVMFaucet.request_sol's broadcast
+############################################################
+
+def is_blockhash_not_found(error) -> bool:
+    return 'blockhash not found' in str(error).lower()
+
+
+
+
+
+
+
+
+############################################################
+# BlockhashCache
+############################################################
+#
+# clients is SVMFaucet's network -> SolanaRpcClient map.
+#
+# Used by:
+#   - svm_faucet.py — one instance, SVMFaucet.blockhashes
+############################################################
+
+class BlockhashCache:
+
+
+
+
+
+
+    ############################################################
+    # __init__
+    ############################################################
+    #
+    # The cache: network -> (time.monotonic() of the fetch,
+    # entry dict). Replaced whole on every refresh, so readers
+    # need no lock.
+    #
+    # Used by:
+    #   - SVMFaucet.__init__
+    ############################################################
+
+    def __init__(self, clients):
+        self.clients = clients
+        self._cache = {}
+        self._failing = set()
+        self._threads = []
+
+
+
+
+
+
+    ############################################################
+    # blockhash / entry
+    ############################################################
+    #
+    # The blockhash a payout signs with — from the cache while
+    # it has BLOCKHASH_SAFETY_BLOCKS to spare, otherwise
+    # fetched (and cached) right here. A failed fetch raises:
+    # the payout fails like any other RPC failure. entry()
+    # returns the whole cache entry — the hash with its
+    # last_valid_block_height, which the signature tracker
+    # needs to tell a dropped payout from a slow one.
+    #
+    # Used by:
+    #   - SVMFaucet.request_sol — entry()
+    #   - tests/test_svm_faucet.py
+    ############################################################
+
+    def blockhash(self, network) -> str:
+        return self.entry(network)['blockhash']
+
+    def entry(self, network) -> dict:
+        cached = self._cache.get(network)
+        if cached and self._blocks_left(cached) > BLOCKHASH_SAFETY_BLOCKS:
+            return cached[1]
+        return self.refresh(network)
+
+    def _blocks_left(self, cached):
+        fetched_at, entry = cached
+        aged = (time.monotonic() - fetched_at) / BLOCK_SECONDS
+        return entry['last_valid_block_height'] - entry['block_height'] - aged
+
+
+
+
+
+
+    ############################################################
+    # refresh / invalidate
+    ############################################################
+    #
+    # refresh() fetches one network's latest blockhash and the
+    # current block height in one batch and caches them;
+    # invalidate() drops the entry, so the next payout
+    # fetches its own.
+    #
+    # Used by:
+    #   - entry (above) — the stale fallback
+    #   - _run (below) — the background refresh
+    #   - SVMFaucet._warm_up_networks — primes the cache
+    #   - SVMFaucet.request_sol — invalidate() after
+    #     "blockhash not found"
+    ############################################################
+
+    def refresh(self, network):
+        latest, block_height = self.clients[network].batch([
+            ('getLatestBlockhash', [{'commitment': SOLANA_COMMITMENT}]),
+            ('getBlockHeight', [{'commitment': SOLANA_COMMITMENT}]),
+        ])
+        entry = {
+            'blockhash': latest['value']['blockhash'],
+            'last_valid_block_height': int(latest['value']['lastValidBlockHeight']),
+            'block_height': int(block_height),
+        }
+
+        self._cache[network] = (time.monotonic(), entry)
+        return entry
+
+    def invalidate(self, network):
+        self._cache.pop(network, None)
+
+
+
+
+
+
+    ############################################################
+    # start
+    ############################################################
+    #
+    # Starts one daemon refresher per network (once) — one
+    # slow RPC never delays the other chains' refreshes.
+    #
+    # Used by:
+    #   - SVMFaucet._warm_up_networks — after the warmup
+    ############################################################
+
+    def start(self):
+        if self._threads:
+            return
+
+        for network in self.clients:
+            thread = threading.Thread(target=self._run, args=(network,), name=f'svm-blockhash-{network}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # The refresher loop. A failing RPC is logged once when it
+    # starts failing and once when it recovers, not every
+    # BLOCKHASH_REFRESH_SECONDS.
+    #
+    # Used by:
+    #   - start (above) — one thread per network
+    ############################################################
+
+    def _run(self, network):
+        while True:
+            time.sleep(BLOCKHASH_REFRESH_SECONDS)
+            try:
+                self.refresh(network)
+            except Exception as e:
+                if network not in self._failing:
+                    self._failing.add(network)
+                    logging.warning(f"[SVM] {network} blockhash refresh failing: {e}")
+                continue
+
+            if network in self._failing:
+                self._failing.discard(network)
+                logging.warning(f"[SVM] {network} blockhash refresh recovered")
@@ -7,10 +7,13 @@
 #  talks protocol.
 #
 #  Solana RPC is stateless HTTP: every call is an independent
-#  request, there is no connection to keep alive and a dropped
-#  one costs nothing but a retry by the caller. One instance
+#  request over one pooled session, kept warm between classes
+#  by the keep-alive scheduler's getHealth (app/keepalive.py);
+#  a dropped connection costs nothing but a retry. One instance
 #  per network, a timeout so a hung endpoint can't wedge a
 #  Flask worker, and RPC-level errors raised as RuntimeError.
+#  batch() sends several calls as one JSON-RPC batch array —
+#  one POST, one round trip.
 #
 #  Some providers (and the Cloudflare instances in front of
 #  them) reject the bare python-requests user agent, so one is
@@ -53,8 +56,9 @@ SOLANA_COMMITMENT = 'confirmed'
 ############################################################
 #
 # The client itself; see the file header for the full story.
-# Public surface: request(), get_balance(), get_latest_
-# blockhash(), send_transaction(), get_version().
+# Public surface: request(), batch(), get_balance(),
+# get_balances(), send_transaction(), get_version(),
+# get_health().
 #
 # Used by:
 #   - svm_faucet.py — SVMFaucet keeps one per network
@@ -99,32 +103,27 @@ class SolanaRpcClient:
 
 
     ############################################################
-    # request
+    # _post
     ############################################################
     #
-    # One JSON-RPC call. The node ANSWERING with an error is a
-    # RuntimeError (a retry would only ask the same question
-    # again). A CONNECTION failure retries once — a pooled
-    # keep-alive the server dropped while idle fails exactly
-    # one send, and the pool dials fresh for the retry; safe
-    # even for a broadcast, because re-sending the same signed
-    # transaction is idempotent (same signature). Every other
-    # transport failure propagates as the requests exception
-    # it already is, so the caller can decide. The timing
-    # print only fires with APP_DEBUG on.
+    # One HTTP POST of a JSON-RPC payload, parsed. A CONNECTION
+    # failure retries once — a pooled keep-alive the server
+    # dropped while idle fails exactly one send, and the pool
+    # dials fresh for the retry; safe even for a broadcast,
+    # because re-sending the same signed transaction is
+    # idempotent (same signature). Every other transport
+    # failure propagates as the requests exception it already
+    # is, so the caller can decide. The timing print only
+    # fires with APP_DEBUG on.
     #
     # Used by:
-    #   - every query method below
+    #   - request / batch (below)
     ############################################################
 
-    def request(self, method: str, params: list = None):
+    def _post(self, payload, what: str):
         if not self.endpoint:
             raise ValueError('Solana RPC endpoint not configured')
 
-        payload = {'jsonrpc': '2.0', 'id': 1, 'method': method}
-        if params is not None:
-            payload['params'] = params
-
         start_time = time.time()
         try:
             response = self.session.post(self.endpoint, json=payload, timeout=SOLANA_TIMEOUT_S)
@@ -135,8 +134,28 @@ class SolanaRpcClient:
 
         elapsed_time = time.time() - start_time
         if self.debug:
-            print(f"[DEBUG] Solana request '{method}' took {elapsed_time:.3f}s (network: {self.label})")
+            print(f"[DEBUG] Solana {what} took {elapsed_time:.3f}s (network: {self.label})")
+
+        return answer
 
+
+
+
+
+
+    ############################################################
+    # _result
+    ############################################################
+    #
+    # One reply's result. The node ANSWERING with an error is a
+    # RuntimeError (a retry would only ask the same question
+    # again); a reply with neither is a ValueError.
+    #
+    # Used by:
+    #   - request / batch (below)
+    ############################################################
+
+    def _result(self, answer):
         if 'error' in answer and answer['error']:
             raise RuntimeError(f"Solana RPC error: {answer['error']}")
 
@@ -150,6 +169,70 @@ class SolanaRpcClient:
 
 
 
+    ############################################################
+    # request
+    ############################################################
+    #
+    # One JSON-RPC call — see _post for the retry rule and
+    # _result for the error rule.
+    #
+    # Used by:
+    #   - every query method below
+    ############################################################
+
+    def request(self, method: str, params: list = None):
+        payload = {'jsonrpc': '2.0', 'id': 1, 'method': method}
+        if params is not None:
+            payload['params'] = params
+
+        return self._result(self._post(payload, f"request '{method}'"))
+
+
+
+
+
+
+    ############################################################
+    # batch
+    ############################################################
+    #
+    # Several calls in ONE JSON-RPC batch array — one POST,
+    # one round trip. Takes (method, params) pairs and returns
+    # their results in the same order (the node may answer the
+    # array in any order; ids sort it out). Same retry and
+    # error rules as request(); any item's error raises.
+    #
+    # Used by:
+    #   - blockhash_cache.py — BlockhashCache.refresh
+    ############################################################
+
+    def batch(self, requests: list) -> list:
+        payload = []
+        for request_id, (method, params) in enumerate(requests, start=1):
+            item = {'jsonrpc': '2.0', 'id': request_id, 'method': method}
+            if params is not None:
+                item['params'] = params
+            payload.append(item)
+        if not payload:
+            return []
+
+        methods = ', '.join(item['method'] for item in payload)
+        answer = self._post(payload, f"batch '{methods}'")
+        if not isinstance(answer, list):
+            # A node that refuses batches answers one error object
+            self._result(answer)
+            raise ValueError('Unexpected Solana RPC batch response')
+
+        by_id = {item.get('id'): item for item in answer if isinstance(item, dict)}
+        if len(by_id) != len(payload) or set(by_id) != {item['id'] for item in payload}:
+            raise ValueError('Unexpected Solana RPC batch response')
+        return [self._result(by_id[item['id']]) for item in payload]
+
+
+
+
+
+
     ############################################################
     # get_balance
     ############################################################
@@ -172,21 +255,27 @@ class SolanaRpcClient:
 
 
     ############################################################
-    # get_latest_blockhash
+    # get_balances
     ############################################################
     #
-    # The recent blockhash every transaction must carry —
-    # Solana's replay protection, and the reason a payout can
-    # never be built ahead of time: it expires after ~150
-    # slots (about a minute).
+    # Several addresses' balances in LAMPORTS, in the order
+    # given, in ONE round trip: getMultipleAccounts with an
+    # empty data slice (only the lamports are wanted — no
+    # account data crosses the wire). An account the chain has
+    # never seen answers null, which reads as 0 — like
+    # getBalance.
     #
     # Used by:
-    #   - svm_faucet.py — building a payout
+    #   - svm_faucet.py — the claim path's eligibility reads
     ############################################################
 
-    def get_latest_blockhash(self) -> str:
-        result = self.request('getLatestBlockhash', [{'commitment': SOLANA_COMMITMENT}])
-        return result['value']['blockhash']
+    def get_balances(self, addresses: list) -> list:
+        result = self.request('getMultipleAccounts', [list(addresses), {
+            'commitment': SOLANA_COMMITMENT,
+            'encoding': 'base64',
+            'dataSlice': {'offset': 0, 'length': 0},
+        }])
+        return [int((account or {}).get('lamports', 0)) for account in result['value']]
 
 
 
@@ -232,3 +321,23 @@ class SolanaRpcClient:
 
     def get_version(self) -> str:
         return self.request('getVersion').get('solana-core', 'unknown')
+
+
+
+
+
+
+    ############################################################
+    # get_health
+    ############################################################
+    #
+    # The node's own health verdict — 'ok', or an RPC error
+    # when it has fallen behind the cluster. The cheapest
+    # call there is, which makes it the keep-alive ping.
+    #
+    # Used by:
+    #   - svm_faucet.py — the keep-alive job
+    ############################################################
+
+    def get_health(self) -> str:
+        return self.request('getHealth')
@@ -0,0 +1,331 @@
+############################################################
+#  [*] Signature tracker — did a Solana payout actually land?
+#
+#  sendTransaction answers with a signature as soon as the
+#  node ACCEPTS the transaction — not when it lands. A
+#  transaction dropped by the leader (congestion, a fork)
+#  simply never appears, and the student was left holding a
+#  spent cooldown slot for nothing.
+#
+#  Every broadcast payout is handed to the tracker with the
+#  lastValidBlockHeight of the blockhash it was signed with.
+#  One daemon thread polls every pending signature every
+#  SIGNATURE_POLL_SECONDS: per network ONE batch round trip
+#  — getSignatureStatuses in chunks of at most
+#  SIGNATURE_STATUS_CHUNK (the RPC's own limit) plus
+#  getBlockHeight — and settles each payout:
+#
+#    pending  → confirmed  (landed, confirmed commitment)
+#             → failed     (landed, but the transfer erred)
+#             → expired    (never seen, and the block height
+#                           passed its lastValidBlockHeight —
+#                           it can never land now)
+#
+#  The regular poll only asks the node's recent status cache,
+#  which forgets a transaction after a few minutes — after an
+#  RPC outage a payout that DID land would read as never
+#  seen. So a payout is only marked expired once a second
+#  query with searchTransactionHistory finds nothing either;
+#  a failed history lookup leaves it pending.
+#
+#  Every settled payout calls back into the faucet once,
+#  with its record: the faucet gives back the payout's
+#  lamport reservation, drops its cached balance for a
+#  payout that landed (confirmed or failed — the fee moved
+#  the balance either way) and releases the cooldown of one
+#  that never reached the student (failed or expired).
+#
+#  The status map is per process and keeps a settled payout
+#  for SIGNATURE_TTL_SECONDS, at most SIGNATURE_MAX_ENTRIES
+#  of them — the same shape as the payout queue's in-memory
+#  ticket store.
+#
+#  Used by:
+#    - svm_faucet.py — one instance, SVMFaucet.signatures,
+#      plus the GET /api/svm/<network>/payout/<signature>
+#      payload
+#    - tests/test_svm_faucet.py
+############################################################
+
+
+import time
+import logging
+import threading
+import collections
+
+from .rpc_client import SOLANA_COMMITMENT
+
+
+# How often the pending signatures are polled
+SIGNATURE_POLL_SECONDS = 2
+
+# Signatures per getSignatureStatuses call — the RPC's limit
+SIGNATURE_STATUS_CHUNK = 256
+
+# How long a settled payout stays answerable, and the cap on
+# payouts the map holds at once
+SIGNATURE_TTL_SECONDS = 3600
+SIGNATURE_MAX_ENTRIES = 10_000
+
+# The commitment levels that count as landed
+LANDED_COMMITMENTS = ('confirmed', 'finalized')
+
+
+
+
+
+
+
+
+############################################################
+# SignatureTracker
+############################################################
+#
+# clients is SVMFaucet's network -> SolanaRpcClient map;
+# on_settled(record) is the faucet's callback — see the
+# file header. A record is a dict:
+# signature, network, status, last_valid_block_height,
+# created_at, settled_at, error, and the payout's opaque
+# `context` (the faucet's cooldown key and reservation).
+#
+# Used by:
+#   - svm_faucet.py — SVMFaucet.__init__
+############################################################
+
+class SignatureTracker:
+
+    def __init__(self, clients, on_settled):
+        self.clients = clients
+        self.on_settled = on_settled
+
+        # signature -> record, insertion ordered so the oldest
+        # are swept off the front
+        self._records = collections.OrderedDict()
+        self._failing = set()
+        self._wakeup = threading.Condition()
+        self._thread = None
+
+
+
+
+
+
+    ############################################################
+    # track
+    ############################################################
+    #
+    # Starts tracking one broadcast payout; the poller thread
+    # starts with the first one.
+    #
+    # Used by:
+    #   - SVMFaucet.request_sol — after a successful broadcast
+    ############################################################
+
+    def track(self, network, signature, last_valid_block_height, context=None):
+        now = time.time()
+        with self._wakeup:
+            while self._records:
+                oldest = next(iter(self._records.values()))
+                expired = oldest['settled_at'] is not None and now - oldest['settled_at'] >= SIGNATURE_TTL_SECONDS
+                if not expired and len(self._records) < SIGNATURE_MAX_ENTRIES:
+                    break
+                self._records.popitem(last=False)
+
+            self._records[signature] = {
+                'signature': signature, 'network': network, 'status': 'pending',
+                'last_valid_block_height': last_valid_block_height,
+                'created_at': now, 'settled_at': None, 'error': None, 'context': context,
+            }
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='svm-signatures', daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+
+
+
+
+
+
+    ############################################################
+    # status
+    ############################################################
+    #
+    # One payout's public record (no context), or None for a
+    # signature this process never tracked (or has swept).
+    #
+    # Used by:
+    #   - SVMFaucet.get_payout_status
+    ############################################################
+
+    def status(self, network, signature):
+        with self._wakeup:
+            record = self._records.get(signature)
+            if record is None or record['network'] != network:
+                return None
+            return {key: value for key, value in record.items() if key != 'context'}
+
+
+
+
+
+
+    ############################################################
+    # poll
+    ############################################################
+    #
+    # One round over every pending payout, network by
+    # network. A network whose RPC fails keeps its payouts
+    # pending for the next round; the failure is logged once
+    # when it starts and once when it recovers. A payout the
+    # recent cache no longer knows, past its last valid
+    # height, is looked up in the transaction history before
+    # it may expire.
+    #
+    # Used by:
+    #   - _run (below)
+    #   - tests/test_svm_faucet.py
+    ############################################################
+
+    def poll(self):
+        with self._wakeup:
+            pending = collections.defaultdict(list)
+            for record in self._records.values():
+                if record['status'] == 'pending':
+                    pending[record['network']].append(record['signature'])
+
+        for network, signatures in pending.items():
+            try:
+                statuses, block_height = self._fetch(network, signatures)
+            except Exception as e:
+                if network not in self._failing:
+                    self._failing.add(network)
+                    logging.warning(f"[SVM] {network} signature status poll failing: {e}")
+                continue
+
+            if network in self._failing:
+                self._failing.discard(network)
+                logging.warning(f"[SVM] {network} signature status poll recovered")
+
+            statuses = dict(zip(signatures, statuses))
+            expiring = [signature for signature in signatures
+                        if statuses[signature] is None and self._past_valid(signature, block_height)]
+            if expiring:
+                try:
+                    statuses.update(zip(expiring, self._fetch_history(network, expiring)))
+                except Exception as e:
+                    logging.warning(f"[SVM] {network} signature history lookup failed, "
+                                    f"keeping {len(expiring)} payout(s) pending: {e}")
+                    for signature in expiring:
+                        del statuses[signature]
+
+            for signature, status in statuses.items():
+                self._settle(signature, status, block_height)
+
+    def _past_valid(self, signature, block_height):
+        with self._wakeup:
+            record = self._records.get(signature)
+            return record is not None and block_height > record['last_valid_block_height']
+
+
+
+
+
+
+    ############################################################
+    # _fetch / _fetch_history
+    ############################################################
+    #
+    # _fetch: one network's statuses from the node's recent
+    # status cache, in the order given, and its current block
+    # height — in ONE batch round trip. _fetch_history: the
+    # statuses of signatures about to expire, searched in the
+    # node's full transaction history.
+    #
+    # Used by:
+    #   - poll (above)
+    ############################################################
+
+    def _fetch(self, network, signatures):
+        results = self.clients[network].batch(
+            self._status_requests(signatures, {})
+            + [('getBlockHeight', [{'commitment': SOLANA_COMMITMENT}])]
+        )
+
+        statuses = [status for result in results[:-1] for status in result['value']]
+        return statuses, int(results[-1])
+
+    def _fetch_history(self, network, signatures):
+        results = self.clients[network].batch(
+            self._status_requests(signatures, {'searchTransactionHistory': True}))
+        return [status for result in results for status in result['value']]
+
+    def _status_requests(self, signatures, options):
+        return [('getSignatureStatuses', [signatures[i:i + SIGNATURE_STATUS_CHUNK], options])
+                for i in range(0, len(signatures), SIGNATURE_STATUS_CHUNK)]
+
+
+
+
+
+
+    ############################################################
+    # _settle
+    ############################################################
+    #
+    # Moves one payout on from pending — or leaves it there —
+    # then runs the faucet's callback outside the lock.
+    #
+    # Used by:
+    #   - poll (above)
+    ############################################################
+
+    def _settle(self, signature, status, block_height):
+        with self._wakeup:
+            record = self._records.get(signature)
+            if record is None or record['status'] != 'pending':
+                return
+
+            if status is None:
+                if block_height <= record['last_valid_block_height']:
+                    return
+                record['status'] = 'expired'
+            elif status.get('confirmationStatus') not in LANDED_COMMITMENTS:
+                return
+            elif status.get('err') is not None:
+                record['status'] = 'failed'
+                record['error'] = str(status['err'])
+            else:
+                record['status'] = 'confirmed'
+            record['settled_at'] = time.time()
+
+        if record['status'] != 'confirmed':
+            logging.warning(f"[SVM] {record['network']} payout {signature} {record['status']}")
+        try:
+            self.on_settled(record)
+        except Exception:
+            logging.exception(f"[SVM] {record['network']} payout {signature} callback failed")
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # The poller thread: a round every SIGNATURE_POLL_SECONDS
+    # while anything is pending, asleep otherwise.
+    #
+    # Used by:
+    #   - track (above) — started once
+    ############################################################
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not any(record['status'] == 'pending' for record in self._records.values()):
+                    self._wakeup.wait()
+            time.sleep(SIGNATURE_POLL_SECONDS)
+            self.poll()
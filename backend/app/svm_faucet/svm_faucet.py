@@ -22,11 +22,20 @@
 #       against the address they are claiming to.
 #    2. The faucet checks the wallet doesn't already hold a
 #       chunk, the per-(network, address) cooldown, and its
-#       own balance.
-#    3. A System Program transfer is built against a freshly
-#       fetched blockhash, signed with the faucet keypair and
-#       broadcast — under a per-network send lock, because two
-#       payouts sharing a blockhash and signer would race.
+#       own balance — both balances in one getMultipleAccounts
+#       round trip.
+#    3. A System Program transfer is built against the
+#       network's cached recent blockhash (blockhash_cache.py,
+#       refreshed in the background), signed with the faucet
+#       keypair and broadcast — with no lock: Solana has no
+#       account nonce, so payouts to different recipients
+#       sign and send in parallel, and an in-flight lamport
+#       reservation keeps the balance check honest.
+#    4. The signature is tracked until it lands
+#       (signature_tracker.py), which gives its reservation
+#       back: a confirmed payout drops the cached faucet
+#       balance, a failed or expired one releases the
+#       student's cooldown.
 #
 #  Everything is prepared eagerly at startup — clients built,
 #  versions probed, balances pre-fetched — so a dead endpoint
@@ -55,7 +64,11 @@ from solders.system_program import transfer, TransferParams
 
 from .chains import chain_params
 from .rpc_client import SolanaRpcClient
-from ..cooldown import CooldownTable
+from .blockhash_cache import BlockhashCache, is_blockhash_not_found
+from .signature_tracker import SignatureTracker
+from ..cooldown import cooldown_table
+from ..keepalive import keepalive_scheduler
+from ..payout_queue.payout_queue import PayoutQueue
 from ..icons import icon_url
 
 
@@ -72,6 +85,12 @@ COOLDOWN_SECONDS = 60
 # falls back to the lowest picker id instead.
 DEFAULT_NETWORK = 'solanaDevnet'
 
+# Payout worker threads per network. Without an account nonce
+# the broadcasts never take turns, so several run side by side;
+# more would only queue on the RPC provider's rate limit.
+# tools/bench_svm_payouts.py measures the payouts/s they buy.
+PAYOUT_WORKERS = 8
+
 
 
 
@@ -90,11 +109,15 @@ DEFAULT_NETWORK = 'solanaDevnet'
 #   helpers  — is_supported_network, _chunk_lamports,
 #              _faucet_balance
 #   auth     — verify_signature
-#   public   — get_networks, get_faucet_balance, request_sol
+#   payouts  — _reserve, _on_payout_settled
+#   public   — get_networks, get_faucet_balance, request_sol,
+#              get_payout_status
 #
 # All RPC work lives in rpc_client.py: one stateless client
-# per network. Payouts are serialized per network by
-# _send_locks and the polled faucet balance is cached for a
+# per network. Payout blockhashes come from blockhashes (a
+# BlockhashCache), payouts run PAYOUT_WORKERS at a time per
+# network with their lamports reserved in _reserved until
+# they settle, and the polled faucet balance is cached for a
 # few seconds.
 #
 # Used by:
@@ -129,8 +152,8 @@ class SVMFaucet:
 
         # Per-(network, address) cooldown between payouts, keyed the
         # same way as the other faucets (see app/cooldown.py for the
-        # in-memory trade-offs).
-        self.cooldowns = CooldownTable(COOLDOWN_SECONDS)
+        # backends and their trade-offs).
+        self.cooldowns = cooldown_table(COOLDOWN_SECONDS, 'svm')
 
         # Same FAUCET_PRIVATE_KEY as EVM and UTXO, reinterpreted as
         # an Ed25519 seed. A missing or broken key leaves this None
@@ -159,17 +182,32 @@ class SVMFaucet:
             self._clients[network_key] = SolanaRpcClient(
                 rpc_url, debug=self.APP_DEBUG, label=network_key)
 
-        # network_key -> the lock serializing that chain's payouts:
-        # two concurrent claims would otherwise build transactions
-        # against the same blockhash with the same signer and race.
-        # Per network on purpose — one chain's payout has no
-        # business blocking another's.
-        self._send_locks = {}
+        # network_key -> the recent blockhash payouts sign with,
+        # refreshed in the background — see blockhash_cache.py.
+        # Primed by the warmup below.
+        self.blockhashes = BlockhashCache(self._clients)
+
+        # network_key -> lamports (chunk + fee) of the payouts
+        # broadcast but not yet settled. The claim path's balance
+        # read cannot see them yet, so the balance check subtracts
+        # them — see _reserve. Per process: across gunicorn workers
+        # an overdraw is still refused by the node's preflight.
+        self._reserved = {}
+        self._reserved_lock = threading.Lock()
+
+        # network_key -> the queue + PAYOUT_WORKERS worker threads
+        # that run its payouts in parallel — see app/payout_queue/
+        self.payouts = PayoutQueue('svm', workers=PAYOUT_WORKERS)
 
         # network_key -> (unix time, balance in coins) for the
         # polled faucet balance. Pre-filled by the warmup below.
         self._balance_cache = {}
 
+        # signature -> status of every broadcast payout, polled in
+        # the background until it lands or expires — see
+        # signature_tracker.py
+        self.signatures = SignatureTracker(self._clients, self._on_payout_settled)
+
         self._warm_up_networks()
 
 
@@ -220,9 +258,13 @@ class SVMFaucet:
     #
     # The startup warmup, one thread per network so the
     # slowest endpoint bounds the wall time: probe the node's
-    # version and fetch the faucet balance (which also primes
-    # the balance cache). A failed network deliberately does
-    # NOT raise — the rest of the backend keeps serving.
+    # version, fetch the faucet balance (which also primes
+    # the balance cache) and prime the blockhash cache. A
+    # failed network deliberately does NOT raise — the rest of
+    # the backend keeps serving. Then the blockhash refreshers
+    # start, and every network's session is handed to the
+    # keep-alive scheduler (getHealth), so an idle one never
+    # goes cold.
     #
     # Used by:
     #   - __init__ (above)
@@ -243,6 +285,12 @@ class SVMFaucet:
                     print(f"[SVM] {network_key} connected (solana-core {version}) — but NO FAUCET KEY is configured, payouts will fail")
             except Exception:
                 logging.exception(f"[SVM] {network_key} FAILED to warm up")
+                return
+
+            try:
+                self.blockhashes.refresh(network_key)
+            except Exception as e:
+                logging.warning(f"[SVM] {network_key} blockhash not cached yet: {e}")
 
         threads = [
             threading.Thread(target=warm, args=(key, client), name=f'svm-warmup-{key}')
@@ -253,6 +301,10 @@ class SVMFaucet:
         for thread in threads:
             thread.join()
 
+        self.blockhashes.start()
+        for key, client in self._clients.items():
+            keepalive_scheduler.register(f'svm/{key}', client.get_health)
+
 
 
 
@@ -354,6 +406,69 @@ class SVMFaucet:
 
 
 
+    ############################################################
+    # _reserve / _unreserve
+    ############################################################
+    #
+    # The in-flight lamport counter. _reserve takes `lamports`
+    # for one payout if the balance read at claim time, less
+    # everything already reserved, still covers them — and
+    # answers whether it did. _unreserve gives them back once
+    # the payout failed to broadcast or settled.
+    #
+    # Used by:
+    #   - request_sol (below) — the payout job
+    #   - _on_payout_settled (below)
+    ############################################################
+
+    def _reserve(self, network: str, balance_lamports: int, lamports: int) -> bool:
+        with self._reserved_lock:
+            reserved = self._reserved.get(network, 0)
+            if balance_lamports - reserved < lamports:
+                return False
+            self._reserved[network] = reserved + lamports
+            return True
+
+    def _unreserve(self, network: str, lamports: int):
+        with self._reserved_lock:
+            self._reserved[network] = max(0, self._reserved.get(network, 0) - lamports)
+
+
+
+
+
+
+    ############################################################
+    # _on_payout_settled
+    ############################################################
+    #
+    # The signature tracker's callback, once per payout. Its
+    # reservation is given back either way. A payout that
+    # landed (confirmed, or failed on chain — the fee was
+    # still taken) drops the cached faucet balance, so the
+    # page shows the new number on its next poll. One that
+    # failed or expired never reached the student, so their
+    # cooldown slot is released and they may claim again at
+    # once.
+    #
+    # Used by:
+    #   - signature_tracker.py — SignatureTracker._settle
+    ############################################################
+
+    def _on_payout_settled(self, record):
+        cooldown_key, lamports = record['context']
+        self._unreserve(record['network'], lamports)
+
+        if record['status'] != 'expired':
+            self._balance_cache.pop(record['network'], None)
+        if record['status'] != 'confirmed':
+            self.cooldowns.release(cooldown_key)
+
+
+
+
+
+
     ############################################################
     # get_networks
     ############################################################
@@ -447,15 +562,17 @@ class SVMFaucet:
     ############################################################
     #
     # The actual payout: validate everything, then broadcast
-    # one chunk-sized System Program transfer under the
-    # network's send lock. Returns a (payload, http_status)
-    # tuple; user-facing errors are Lithuanian.
+    # one chunk-sized System Program transfer, in parallel
+    # with the network's other payouts. Returns a (payload,
+    # http_status) tuple; user-facing errors are Lithuanian.
+    # The broadcast runs on the network's payout queue;
+    # wait=False answers 202 with its ticket instead.
     #
     # Used by:
     #   - svm_routes.py — GET /api/svm/<network>/request
     ############################################################
 
-    def request_sol(self, network: str, to_address: str, signature: str, nonce: str) -> tuple:
+    def request_sol(self, network: str, to_address: str, signature: str, nonce: str, wait: bool = True) -> tuple:
         if not self.is_supported_network(network):
             return {"error": f"Nepalaikomas tinklas: {network}"}, 400
 
@@ -483,6 +600,16 @@ class SVMFaucet:
             return {"error": "Negalima siųsti į čiaupo adresą"}, 400
 
 
+        # Fast path: a wallet still cooling down is refused right
+        # here, before the signature recovery and balance RPCs
+        # below. peek() only reads — STEP 3's claim() stays the one
+        # atomic check.
+        cooldown_key = (network, to_address)
+        remaining = self.cooldowns.peek(cooldown_key)
+        if remaining:
+            return {"error": f"Kriptovaliuta jums jau išsiųsta. Daugiau galėsite pasiimti už {remaining} sek."}, 429
+
+
         # STEP 2: signature check. This is the exact message the
         # frontend asks Phantom to sign — any mismatch (different
         # nonce, different wording) fails verification.
@@ -495,10 +622,12 @@ class SVMFaucet:
         # STEP 3: eligibility — no top-up if the wallet already
         # holds a chunk, the cooldown slot must be free, and the
         # faucet must still have the chunk plus the signature fee.
-        # Every failure path after the claim releases the slot.
+        # Both balances arrive in ONE getMultipleAccounts round
+        # trip. Every failure path after the claim releases the
+        # slot.
         # =======================================================
         try:
-            user_lamports = client.get_balance(to_address)
+            user_lamports, faucet_lamports = client.get_balances([to_address, self.FAUCET_ADDRESS])
         except Exception:
             logging.exception(f"Failed to read {to_address} balance on {network}")
             return {"error": "Nepavyko gauti naudotojo balanso"}, 500
@@ -509,59 +638,108 @@ class SVMFaucet:
         # The cooldown slot is check-and-CLAIMED atomically, per
         # (network, address), so two parallel requests from the same
         # address can't both pass the check and get paid twice.
-        cooldown_key = (network, to_address)
         remaining = self.cooldowns.claim(cooldown_key)
         if remaining:
             return {"error": f"Kriptovaliuta jums jau išsiųsta. Daugiau galėsite pasiimti už {remaining} sek."}, 429
 
-        try:
-            faucet_lamports = client.get_balance(self.FAUCET_ADDRESS)
-        except Exception:
-            self.cooldowns.release(cooldown_key)
-            logging.exception(f"Failed to read the faucet balance on {network}")
-            return {"error": "Nepavyko gauti čiaupo balanso"}, 500
-
-        if faucet_lamports < amount_lamports + params['fee_lamports']:
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Čiaupas nebeturi kriptovaliutos. Praneškite dėstytojui."}, 503
-
-
-        # STEP 4: build, sign and broadcast — under the network's
-        # send lock. The blockhash is fetched INSIDE the lock and
-        # used immediately: it expires in ~150 slots, so a payout
-        # can never be prepared in advance the way an EVM nonce
-        # can. setdefault is atomic under the GIL, so the lock map
-        # needs no lock of its own.
-        # =======================================================
-        try:
-            with self._send_locks.setdefault(network, threading.Lock()):
-                blockhash = Hash.from_string(client.get_latest_blockhash())
-
+        # From here on the work runs on one of the network's payout
+        # workers (app/payout_queue/) as one job: the faucet balance
+        # check (on the balance read above, less the lamports of
+        # payouts still in flight) and the broadcast. With wait
+        # (the method's default; the route passes it only for
+        # ?wait=1) the HTTP thread waits for the job's answer;
+        # without — the route's default — it answers 202 with
+        # the ticket straight away.
+        def send():
+            cost = amount_lamports + params['fee_lamports']
+            if not self._reserve(network, faucet_lamports, cost):
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Čiaupas nebeturi kriptovaliutos. Praneškite dėstytojui."}, 503
+
+
+            # STEP 4: build and sign against the cached blockhash —
+            # no RPC — then broadcast. No lock: with no account nonce
+            # two payouts from the faucet keypair never conflict, and
+            # the reservation above already holds their lamports. A
+            # node that no longer knows the hash (a lagging RPC, a
+            # stale cache) rejects the send in preflight, so nothing
+            # landed: the cache is dropped and the payout is signed
+            # again with a fresh hash, once.
+            # =======================================================
+            def sign(blockhash):
+                recent = Hash.from_string(blockhash)
                 instruction = transfer(TransferParams(
                     from_pubkey=self.faucet_keypair.pubkey(),
                     to_pubkey=recipient,
                     lamports=amount_lamports,
                 ))
                 message_obj = Message.new_with_blockhash(
-                    [instruction], self.faucet_keypair.pubkey(), blockhash)
-                transaction = Transaction([self.faucet_keypair], message_obj, blockhash)
+                    [instruction], self.faucet_keypair.pubkey(), recent)
+                transaction = Transaction([self.faucet_keypair], message_obj, recent)
+                return base64.b64encode(bytes(transaction)).decode('utf-8')
 
-                tx_signature = client.send_transaction(
-                    base64.b64encode(bytes(transaction)).decode('utf-8'))
-        except Exception:
-            logging.exception(f"Failed to broadcast {network} payout")
-            self.cooldowns.release(cooldown_key)
-            return {"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500
+            def broadcast():
+                entry = self.blockhashes.entry(network)
+                encoded = sign(entry['blockhash'])
+                return str(client.send_transaction(encoded)), entry
 
-        # Success — the cooldown slot claimed above stays, and the
-        # cached balance is dropped so the page shows the payout on
-        # its next poll.
-        self._balance_cache.pop(network, None)
+            try:
+                try:
+                    tx_signature, entry = broadcast()
+                except Exception as e:
+                    if not is_blockhash_not_found(e):
+                        raise
+                    logging.warning(f"[SVM] {network} blockhash expired on the node, retrying with a fresh one")
+                    self.blockhashes.invalidate(network)
+                    tx_signature, entry = broadcast()
+            except Exception:
+                logging.exception(f"Failed to broadcast {network} payout")
+                self._unreserve(network, cost)
+                self.cooldowns.release(cooldown_key)
+                return {"error": "Nepavyko išsiųsti transakcijos. Bandykite dar kartą."}, 500
+
+            # Accepted — the cooldown slot and the reservation stay
+            # while the tracker waits for the payout to land. Only
+            # then is the cached balance dropped; a dropped payout
+            # gives the slot back instead.
+            self.signatures.track(network, tx_signature, entry['last_valid_block_height'],
+                                  context=(cooldown_key, cost))
 
-        return {
-            "message": f"{params['symbol']} sent successfully",
-            "transaction_id": str(tx_signature),
-            "amount": amount_lamports / (10 ** params['decimals']),
-            "from_address": self.FAUCET_ADDRESS,
-            "network": network,
-        }, 200
+            return {
+                "message": f"{params['symbol']} sent successfully",
+                "transaction_id": tx_signature,
+                "status": "pending",
+                "amount": amount_lamports / (10 ** params['decimals']),
+                "from_address": self.FAUCET_ADDRESS,
+                "network": network,
+            }, 200
+
+        return self.payouts.submit(network, send, wait=wait)
+
+
+
+
+
+
+    ############################################################
+    # get_payout_status
+    ############################################################
+    #
+    # Where one broadcast payout stands: pending, confirmed,
+    # failed or expired (see signature_tracker.py), with its
+    # lastValidBlockHeight and timestamps. 404 for a signature
+    # this worker never sent or has already swept — the map
+    # is per process.
+    #
+    # Used by:
+    #   - svm_routes.py — GET /api/svm/<network>/payout/<signature>
+    ############################################################
+
+    def get_payout_status(self, network: str, signature: str) -> tuple:
+        if not self.is_supported_network(network):
+            return {"error": f"Nepalaikomas tinklas: {network}"}, 400
+
+        record = self.signatures.status(network, signature)
+        if record is None:
+            return {"error": "Nežinoma išmoka"}, 404
+        return record, 200
@@ -7,7 +7,9 @@
 #    GET /api/svm/networks                  — available networks
 #    GET /api/svm/<network>/faucet-balance  — faucet address + balance
 #    GET /api/svm/<network>/request         — send one chunk
-#                                             (?address, ?signature, ?nonce)
+#                                             (?address, ?signature, ?nonce,
+#                                              ?wait=1 → 200, not 202 + ticket)
+#    GET /api/svm/<network>/payout/<sig>    — did a payout land?
 #
 #  Shaped like the EVM and UTXO surfaces so the frontend can
 #  treat all three alike. A deliberately thin layer: every
@@ -30,7 +32,7 @@ bp_svm_faucet = Blueprint('svm_faucet', __name__)
 
 
 # The single faucet instance, shared by every request handler
-# below. Its per-network state (RPC clients, send locks, the
+# below. Its per-network state (RPC clients, reservations, the
 # balance cache) is built once and guarded, so sharing it
 # across threads is safe.
 svm_faucet = SVMFaucet(SVM_NETWORK_CONFIGS)
@@ -116,5 +118,29 @@ def request_sol(network):
     to_address = request.args.get('address')
     signature = request.args.get('signature')
     nonce = request.args.get('nonce')
-    data, status = svm_faucet.request_sol(network, to_address, signature, nonce)
+    data, status = svm_faucet.request_sol(network, to_address, signature, nonce, wait=request.args.get('wait') == '1')
+    return jsonify(data), status
+
+
+
+
+
+############################################################
+# get_payout_status
+############################################################
+#
+# GET /api/svm/<network>/payout/<signature>
+#
+# Where one broadcast payout stands — pending until the
+# background tracker sees it confirmed, failed or expired.
+# A dropped payout has already given the student's cooldown
+# back.
+#
+# Used by:
+#   - clients following a payout after the request answered
+############################################################
+
+@bp_svm_faucet.route('/api/svm/<network>/payout/<signature>', methods=['GET'])
+def get_payout_status(network, signature):
+    data, status = svm_faucet.get_payout_status(network, signature)
     return jsonify(data), status
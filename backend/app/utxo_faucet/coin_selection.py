@@ -0,0 +1,340 @@
+############################################################
+#  [*] Coin selection — which UTXOs pay a payout
+#
+#  The payout path used to take UTXOs in whatever order
+#  Electrum listed them until the value covered amount plus
+#  fee: often more inputs than needed, a dust-sized change
+#  output, and a wallet that fragments a little more with
+#  every claim. CoinSelector picks the inputs instead, in
+#  this order:
+#
+#    branch and bound — a depth-first search for inputs that
+#                       pay the target with NO change output:
+#                       the excess may be at most what the
+#                       change output would have cost plus a
+#                       dust-sized remainder (which the payout
+#                       then leaves to the miners). Bounded by
+#                       BNB_MAX_TRIES, so 10k+ UTXO sets stay
+#                       fast — an unfinished search just falls
+#                       through
+#    smallest first   — only on a fragmented wallet (more than
+#                       SMALLEST_FIRST_ABOVE_UTXOS usable
+#                       coins): sweeps up to SWEEP_MAX_INPUTS
+#                       of the smallest coins that can still
+#                       pay, so payouts shrink the set. The fee
+#                       rate moves with the mempool (the fee
+#                       oracle), so this pays today's rate for
+#                       inputs a cheaper block might have taken
+#                       — hence the small cap; the bulk of the
+#                       sweep is consolidation.py's, which
+#                       waits for cheap fees
+#    largest first    — the fewest inputs, the lowest fee; the
+#                       last resort, it fails only when the
+#                       funds (within the cap) really are short
+#
+#  Every strategy counts in EFFECTIVE values — a coin's value
+#  minus the fee of spending it (the dialect's INPUT_SIZE at
+#  the fee rate) — so a coin worth less than its own input
+#  fee is never spent, and no strategy takes more than
+#  max_inputs coins.
+#
+#  Electrum-free on purpose (UTXOs are listunspent-shaped
+#  dicts, the dialect only lends its two size constants), so
+#  tests and tools/bench_coin_selection.py drive it with plain
+#  lists.
+#
+#  Used by:
+#    - utxo_faucet.py — UTXOFaucet._create_and_broadcast_batch,
+#      UTXOFaucet._estimate_fee
+#    - tools/bench_coin_selection.py
+############################################################
+
+
+from operator import itemgetter
+
+
+# The most inputs one payout may spend — keeps a legacy
+# transaction (148 bytes per input) far below the 100 kB
+# standardness limit and the signing time bounded
+COIN_SELECTION_MAX_INPUTS = 100
+
+# Search steps branch and bound may take before giving up on a
+# changeless match (Bitcoin Core uses the same bound)
+BNB_MAX_TRIES = 100_000
+
+# Usable coins above which the wallet counts as fragmented and
+# payouts try smallest first before largest first — at most
+# SWEEP_MAX_INPUTS of them per payout, so a claim's signing
+# time and fee stay modest. Deliberately below
+# consolidation.py's CONSOLIDATE_THRESHOLD_UTXOS: payouts
+# start nibbling at a fragmented wallet before the
+# background sweep is due
+SMALLEST_FIRST_ABOVE_UTXOS = 50
+SWEEP_MAX_INPUTS = 20
+
+# Fixed transaction overhead (version, counts, locktime) in bytes
+TX_OVERHEAD_SIZE = 10
+
+
+
+
+
+
+
+
+############################################################
+# estimate_fee
+############################################################
+#
+# Conservative size estimate times the sat/vB rate. The
+# per-input/per-output sizes are the dialect's constants
+# (SegWit ~91/31 vbytes, legacy ~148/34 bytes).
+#
+# Used by:
+#   - CoinSelector (below)
+#   - utxo_faucet.py — UTXOFaucet._estimate_fee
+############################################################
+
+def estimate_fee(dialect, fee_rate: int, num_inputs: int, num_outputs: int) -> int:
+    estimated_size = (num_inputs * dialect.INPUT_SIZE) + (num_outputs * dialect.OUTPUT_SIZE) + TX_OVERHEAD_SIZE
+    return estimated_size * fee_rate
+
+
+
+
+
+
+
+
+############################################################
+# CoinSelector
+############################################################
+#
+# One payout's selection problem: the dialect (sizes), the
+# fee rate, the dust limit and the input cap. select() runs
+# the strategies above; each strategy can also be called on
+# its own (the benchmark compares them) and returns the
+# chosen UTXOs or None. settle() turns a choice into its
+# (fee, change).
+#
+# Used by:
+#   - utxo_faucet.py — UTXOFaucet._create_and_broadcast_batch
+#   - tools/bench_coin_selection.py
+############################################################
+
+class CoinSelector:
+
+    def __init__(self, dialect, fee_rate: int, dust_limit: int, max_inputs: int = COIN_SELECTION_MAX_INPUTS):
+        self.dialect = dialect
+        self.fee_rate = fee_rate
+        self.dust_limit = dust_limit
+        self.max_inputs = max_inputs
+        self.input_fee = dialect.INPUT_SIZE * fee_rate
+
+
+
+
+
+
+    ############################################################
+    # select
+    ############################################################
+    #
+    # The inputs for paying amount (summed over num_payouts
+    # recipient outputs). Raises ValueError when nothing can
+    # pay it — the same errors the faucet always raised.
+    #
+    # Used by:
+    #   - UTXOFaucet._create_and_broadcast_batch — as the
+    #     UTXO set's choose()
+    ############################################################
+
+    def select(self, utxos: list, amount: int, num_payouts: int) -> list:
+        if not utxos:
+            raise ValueError("No UTXOs available")
+
+        coins = self._by_value(utxos)
+        selected = self._branch_and_bound(coins, amount, num_payouts)
+        if selected is None and len(coins) > SMALLEST_FIRST_ABOVE_UTXOS:
+            selected = self._smallest_first(coins, amount, num_payouts, min(self.max_inputs, SWEEP_MAX_INPUTS))
+        if selected is None:
+            selected = self._largest_first(coins, amount, num_payouts)
+
+        if selected is None:
+            raise ValueError("Insufficient funds")
+        return selected
+
+
+
+
+
+
+    ############################################################
+    # settle
+    ############################################################
+    #
+    # (fee, change) of spending selected: change is whatever is
+    # left after the fee WITH a change output; when that is
+    # dust (or less) there is no change output and the rest is
+    # fee.
+    #
+    # Used by:
+    #   - UTXOFaucet._create_and_broadcast_batch
+    #   - tools/bench_coin_selection.py
+    ############################################################
+
+    def settle(self, selected: list, amount: int, num_payouts: int) -> tuple:
+        total_input = sum(utxo['value'] for utxo in selected)
+        fee = estimate_fee(self.dialect, self.fee_rate, len(selected), num_payouts + 1)
+        change = total_input - amount - fee
+        if change > self.dust_limit:
+            return fee, change
+        return total_input - amount, 0
+
+
+
+
+
+
+    ############################################################
+    # branch_and_bound
+    ############################################################
+    #
+    # Depth-first over the usable coins, largest effective
+    # value first: each step either includes the next coin or
+    # skips it. A branch is cut once it overshoots the window
+    # [target, target + tolerance], can no longer reach the
+    # target with everything left (suffix sums), or is at the
+    # input cap. Skipping a coin also skips the equal-valued
+    # coins right after it — those branches were just tried.
+    # Keeps the smallest excess found; an exact match ends the
+    # search.
+    #
+    # Used by:
+    #   - select (above)
+    ############################################################
+
+    def branch_and_bound(self, utxos: list, amount: int, num_payouts: int):
+        return self._branch_and_bound(self._by_value(utxos), amount, num_payouts)
+
+    def _branch_and_bound(self, coins: list, amount: int, num_payouts: int):
+        values = [value for value, _ in coins]
+        target = self._target(amount, num_payouts)
+        tolerance = self.dialect.OUTPUT_SIZE * self.fee_rate + self.dust_limit
+
+        remaining = [0] * (len(values) + 1)
+        for i in range(len(values) - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + values[i]
+        if remaining[0] < target:
+            return None
+
+        best, best_excess = None, None
+        picked, value, i = [], 0, 0
+        for _ in range(BNB_MAX_TRIES):
+            if value >= target:
+                excess = value - target
+                if excess <= tolerance and (best_excess is None or excess < best_excess):
+                    best, best_excess = list(picked), excess
+                    if excess == 0:
+                        break
+                backtrack = True
+            else:
+                backtrack = (i == len(values) or value + remaining[i] < target
+                             or len(picked) == self.max_inputs)
+
+            if not backtrack:
+                picked.append(i)
+                value += values[i]
+                i += 1
+                continue
+
+            if not picked:
+                break
+            skipped = picked.pop()
+            value -= values[skipped]
+            i = skipped + 1
+            while i < len(values) and values[i] == values[skipped]:
+                i += 1
+
+        if best is None:
+            return None
+        return [coins[index][1] for index in best]
+
+
+
+
+
+
+    ############################################################
+    # largest_first / smallest_first
+    ############################################################
+    #
+    # largest_first takes coins from the largest effective value
+    # down until they pay the target (ties keep listunspent's
+    # order). smallest_first takes the SMALLEST coins that can
+    # still pay it within limit inputs (default: the input cap):
+    # the lowest window of limit coins (ascending) that reaches
+    # the target, from its bottom up. None when the cap is in
+    # the way.
+    #
+    # Used by:
+    #   - select (above)
+    ############################################################
+
+    def largest_first(self, utxos: list, amount: int, num_payouts: int):
+        return self._largest_first(self._by_value(utxos), amount, num_payouts)
+
+    def smallest_first(self, utxos: list, amount: int, num_payouts: int):
+        return self._smallest_first(self._by_value(utxos), amount, num_payouts)
+
+    def _largest_first(self, coins: list, amount: int, num_payouts: int):
+        return self._accumulate(coins[:self.max_inputs], self._target(amount, num_payouts))
+
+    def _smallest_first(self, coins: list, amount: int, num_payouts: int, limit=None):
+        limit = limit or self.max_inputs
+        target = self._target(amount, num_payouts)
+        ascending = coins[::-1]
+        window = sum(value for value, _ in ascending[:limit])
+        start = 0
+        while window < target and start + limit < len(ascending):
+            window += ascending[start + limit][0] - ascending[start][0]
+            start += 1
+        return self._accumulate(ascending[start:start + limit], target)
+
+    def _accumulate(self, coins: list, target: int):
+        selected, value = [], 0
+        for effective, utxo in coins:
+            selected.append(utxo)
+            value += effective
+            if value >= target:
+                return selected
+        return None
+
+
+
+
+
+
+    ############################################################
+    # _by_value / _target
+    ############################################################
+    #
+    # _by_value pairs every coin worth more than its own input
+    # fee with its effective value, largest first — sorted ONCE
+    # per select(), every strategy reads the same list. _target
+    # is what those effective values must add up to: the amount
+    # plus the fee of everything but the inputs, with no change
+    # output.
+    #
+    # Used by:
+    #   - the strategies (above)
+    ############################################################
+
+    def _by_value(self, utxos: list) -> list:
+        input_fee = self.input_fee
+        usable = [(utxo['value'] - input_fee, utxo) for utxo in utxos if utxo['value'] > input_fee]
+        usable.sort(key=itemgetter(0), reverse=True)
+        return usable
+
+    def _target(self, amount: int, num_payouts: int) -> int:
+        return amount + estimate_fee(self.dialect, self.fee_rate, 0, num_payouts)
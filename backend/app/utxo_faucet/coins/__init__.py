@@ -4,7 +4,8 @@
 #  Every UTXO coin's PROTOCOL CONSTANTS live here, one module
 #  per coin: address parameters per network flavour (bech32
 #  HRP on SegWit coins, base58 version bytes on legacy ones)
-#  and the coin's relay economics (fee rate, dust limit).
+#  and the coin's relay economics (fallback fee rate and its
+#  clamps, dust limit).
 #
 #  These are facts about the coin — a Dogecoin testnet
 #  address starts with 'n' whether the operator likes it or
@@ -14,7 +15,8 @@
 #  here at startup.
 #
 #  Adding a coin = one small module with NAME, NETWORKS,
-#  FEE_RATE, DUST_LIMIT — and a line in COINS below.
+#  FEE_RATE, MIN_FEE_RATE, MAX_FEE_RATE, DUST_LIMIT — and a
+#  line in COINS below.
 #
 #  Used by:
 #    - app/config_models.py — boot validation of coin+network
@@ -42,9 +44,10 @@ COINS = {
 #
 # The resolved parameter dict for one coin on one network
 # flavour: the address params ('hrp', or 'p2pkh_prefix' +
-# 'p2sh_prefix') merged with the coin's fee_rate and
-# dust_limit. Raises ValueError naming the known options —
-# the boot validation surfaces that message verbatim.
+# 'p2sh_prefix') merged with the coin's fee_rate, its
+# min/max_fee_rate clamps and dust_limit. Raises ValueError
+# naming the known options — the boot validation surfaces
+# that message verbatim.
 #
 # Used by:
 #   - app/config_models.py — UtxoFaucetSection validator
@@ -65,5 +68,7 @@ def coin_params(coin: str, network: str) -> dict:
     return {
         **address_params,
         'fee_rate': module.FEE_RATE,
+        'min_fee_rate': module.MIN_FEE_RATE,
+        'max_fee_rate': module.MAX_FEE_RATE,
         'dust_limit': module.DUST_LIMIT,
     }
@@ -22,6 +22,11 @@ NETWORKS = {
 }
 
 # Conservative classroom defaults: 10 sat/vB clears any
-# testnet mempool, 546 sat is the standard dust threshold
+# testnet mempool, 546 sat is the standard dust threshold.
+# FEE_RATE is only paid when the Electrum server has no fee
+# estimate; a live estimate is clamped into MIN..MAX (the
+# ceiling keeps a testnet fee storm from draining the faucet)
 FEE_RATE = 10
+MIN_FEE_RATE = 1
+MAX_FEE_RATE = 200
 DUST_LIMIT = 546
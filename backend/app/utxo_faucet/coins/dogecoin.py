@@ -19,6 +19,10 @@ NETWORKS = {
 
 # Dogecoin relay minimums are ~100x Bitcoin's (0.001 DOGE/kB
 # min fee, 0.01 DOGE dust) — 1000 koinu/B keeps payouts
-# comfortably standard
+# comfortably standard, and stays the floor under a live
+# estimate too: older Dogecoin nodes still refuse to relay
+# below the recommended 0.01 DOGE/kB
 FEE_RATE = 1000
+MIN_FEE_RATE = 1000
+MAX_FEE_RATE = 10000
 DUST_LIMIT = 1000000
@@ -20,4 +20,6 @@ NETWORKS = {
 
 # Litecoin-style relay rules
 FEE_RATE = 10
+MIN_FEE_RATE = 1
+MAX_FEE_RATE = 100
 DUST_LIMIT = 546
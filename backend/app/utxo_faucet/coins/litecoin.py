@@ -23,4 +23,6 @@ NETWORKS = {
 # Same conservative defaults as Bitcoin — Litecoin's relay
 # minimums are lower, so these are comfortably standard
 FEE_RATE = 10
+MIN_FEE_RATE = 1
+MAX_FEE_RATE = 100
 DUST_LIMIT = 546
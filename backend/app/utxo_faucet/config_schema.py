@@ -14,7 +14,7 @@
 ############################################################
 
 
-from typing import Optional, Literal
+from typing import Annotated, Optional, Literal
 
 from pydantic import Field, model_validator
 
@@ -34,7 +34,20 @@ from ..config_base import StrictModel
 # The OPERATOR's choices for one UTXO network — and nothing
 # more: which coin ('bitcoin', 'litecoin', 'knfcoin',
 # 'dogecoin'), which network flavour, the payout size and the
-# ElectrumX endpoint (host:port, SSL).
+# ElectrumX endpoint (host:port, SSL) — plus, optionally,
+# fallback endpoints for the same chain (electrum_pool.py
+# health-checks them all and fails over), how many
+# milliseconds the payout worker collects claims into one
+# batch transaction (utxo_faucet.py's BATCH_WINDOW_MS when
+# unset; 0 batches only what is already queued), and when the
+# background consolidation job sweeps the wallet: above how
+# many UTXOs (0 turns it off) and at most at which sat/vB rate
+# (consolidation.py's defaults when unset), and how many
+# pre-split coins a fan-out pool keeps for parallel payouts
+# (fanout.py; unset or 0 — batched payouts only). The pool is
+# capped at 24: every pool coin is an output of one split
+# transaction, and Bitcoin Core's default mempool limit is 25
+# transactions per chain of unconfirmed descendants.
 #
 # Everything protocol-precise — address version bytes, bech32
 # HRPs, fee rates, dust limits — is a fact about the coin,
@@ -52,6 +65,11 @@ class UtxoFaucetSection(StrictModel):
     chunk_size: float = Field(gt=0)
     network: Literal['mainnet', 'testnet', 'regtest']
     electrum_server: str = Field(pattern=r'^[\w.\-]+:\d+$')
+    electrum_fallbacks: list[Annotated[str, Field(pattern=r'^[\w.\-]+:\d+$')]] = []
+    batch_window_ms: Optional[int] = Field(default=None, ge=0, le=5000)
+    consolidate_above_utxos: Optional[int] = Field(default=None, ge=0)
+    consolidate_max_fee_rate: Optional[int] = Field(default=None, gt=0)
+    fanout_pool_size: Optional[int] = Field(default=None, ge=0, le=24)
 
 
 
@@ -0,0 +1,237 @@
+############################################################
+#  [*] Consolidation — sweeping a fragmented faucet wallet
+#
+#  Every payout leaves a change output, and top-ups arrive
+#  as many small outputs: over a semester the faucet address
+#  collects hundreds of UTXOs. listunspent grows with them,
+#  and so do a payout's input count, signing time and fee.
+#
+#  The consolidation job sweeps them back together, one
+#  background thread per network, every
+#  CONSOLIDATE_CHECK_SECONDS. A sweep only runs when all of
+#  these hold:
+#
+#    the wallet is fragmented — more UTXOs than the network's
+#        threshold (config: consolidate_above_utxos, default
+#        CONSOLIDATE_THRESHOLD_UTXOS; 0 turns the job off)
+#    fees are cheap — the fee oracle's rate is at most
+#        consolidate_max_fee_rate (default: CONSOLIDATE_FEE_FACTOR
+#        x the coin registry's MIN_FEE_RATE). A swept input
+#        costs its fee whenever it is spent; spending it now,
+#        at the floor, beats spending it in a busy mempool
+#    the network is idle — no payout for
+#        CONSOLIDATE_IDLE_SECONDS, so students never queue
+#        behind a sweep
+#
+#  A sweep spends the smallest usable coins (at most
+#  COIN_SELECTION_MAX_INPUTS) into CONSOLIDATE_INTO_OUTPUTS
+#  equal outputs back to the faucet. It holds the network's
+#  payout lock and reserves its inputs in the UTXO set like a
+#  payout does — see UTXOFaucet._consolidate.
+#
+#  The planning helpers are Electrum-free on purpose (UTXOs
+#  are listunspent-shaped dicts, the dialect only lends its
+#  size constants), so tests drive them with plain lists.
+#
+#  Used by:
+#    - utxo_faucet.py — UTXOFaucet.consolidator,
+#      UTXOFaucet._consolidate
+#    - tests/test_consolidation.py
+############################################################
+
+
+import time
+import logging
+import threading
+from operator import itemgetter
+
+from .coin_selection import COIN_SELECTION_MAX_INPUTS
+
+
+# How often each network's thread checks whether a sweep is due
+CONSOLIDATE_CHECK_SECONDS = 300
+
+# UTXOs above which a wallet is swept, unless the network's
+# config sets its own consolidate_above_utxos
+CONSOLIDATE_THRESHOLD_UTXOS = 100
+
+# The most a sweep pays per vbyte, as a multiple of the coin's
+# MIN_FEE_RATE, unless the config sets consolidate_max_fee_rate
+CONSOLIDATE_FEE_FACTOR = 2
+
+# How long a network must have gone without a payout first
+CONSOLIDATE_IDLE_SECONDS = 120
+
+# How many outputs a sweep leaves — a few, not one, so payouts
+# have more than one coin to pick from while the sweep confirms
+CONSOLIDATE_INTO_OUTPUTS = 3
+
+
+
+
+
+
+
+
+############################################################
+# sweep_inputs
+############################################################
+#
+# The coins a sweep spends: the smallest ones worth more
+# than their own input fee, at most max_inputs of them —
+# or none, when there are too few to shrink the set (a
+# sweep of into coins into into outputs gains nothing).
+#
+# Used by:
+#   - utxo_faucet.py — UTXOFaucet._consolidate, as the UTXO
+#     set's choose()
+############################################################
+
+def sweep_inputs(utxos: list, dialect, fee_rate: int, into: int = CONSOLIDATE_INTO_OUTPUTS,
+                 max_inputs: int = COIN_SELECTION_MAX_INPUTS) -> list:
+    input_fee = dialect.INPUT_SIZE * fee_rate
+    usable = sorted((utxo for utxo in utxos if utxo['value'] > input_fee), key=itemgetter('value'))
+    selected = usable[:max_inputs]
+    return selected if len(selected) > into else []
+
+
+
+
+
+
+
+
+############################################################
+# split_outputs
+############################################################
+#
+# amount (the swept total minus the fee) as up to into
+# equal output values, the remainder on the last — fewer
+# outputs when equal parts would be dust, none when even
+# one would.
+#
+# Used by:
+#   - utxo_faucet.py — UTXOFaucet._consolidate
+############################################################
+
+def split_outputs(amount: int, into: int, dust_limit: int) -> list:
+    into = min(into, amount // (dust_limit + 1))
+    if into <= 0:
+        return []
+
+    values = [amount // into] * into
+    values[-1] += amount % into
+    return values
+
+
+
+
+
+
+
+
+############################################################
+# Consolidator
+############################################################
+#
+# The scheduler: sweep(network) does the work (and decides
+# whether it is due), returning a report dict — before and
+# after UTXO counts, inputs, outputs, fee, transaction_id —
+# or None when it skipped. The last report per network is
+# kept for GET /api/utxo/consolidation.
+#
+# Used by:
+#   - utxo_faucet.py — one instance, UTXOFaucet.consolidator
+############################################################
+
+class Consolidator:
+
+    def __init__(self, sweep, networks):
+        self.sweep = sweep
+        self.networks = list(networks)
+        self.reports = {}
+        self._failing = set()
+        self._threads = []
+
+
+
+
+
+
+    ############################################################
+    # start
+    ############################################################
+    #
+    # Starts one daemon thread per network (once).
+    #
+    # Used by:
+    #   - UTXOFaucet._warm_up_networks — after the warmup
+    ############################################################
+
+    def start(self):
+        if self._threads:
+            return
+
+        for network in self.networks:
+            thread = threading.Thread(target=self._run, args=(network,), name=f'utxo-consolidate-{network}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+
+
+
+
+
+    ############################################################
+    # run_once
+    ############################################################
+    #
+    # One check on one network: the sweep's report (also kept
+    # in reports and printed with its before/after counts),
+    # or None.
+    #
+    # Used by:
+    #   - _run (below)
+    #   - tests/test_consolidation.py
+    ############################################################
+
+    def run_once(self, network):
+        report = self.sweep(network)
+        if report:
+            report['at'] = time.time()
+            self.reports[network] = report
+            print(f"[UTXO] {network} consolidated {report['before']} → {report['after']} UTXOs "
+                  f"({report['inputs']} in, {report['outputs']} out, fee {report['fee']}): "
+                  f"{report['transaction_id']}")
+        return report
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # The scheduler loop. A failing sweep is logged once when
+    # it starts failing and once when it recovers.
+    #
+    # Used by:
+    #   - start (above) — one thread per network
+    ############################################################
+
+    def _run(self, network):
+        while True:
+            time.sleep(CONSOLIDATE_CHECK_SECONDS)
+            try:
+                self.run_once(network)
+            except Exception as e:
+                if network not in self._failing:
+                    self._failing.add(network)
+                    logging.warning(f"[UTXO] {network} consolidation failing: {e}")
+                continue
+
+            if network in self._failing:
+                self._failing.discard(network)
+                logging.warning(f"[UTXO] {network} consolidation recovered")
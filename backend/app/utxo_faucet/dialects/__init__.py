@@ -14,12 +14,13 @@
 #                base58 addresses, p2pkh spending,
 #                pre-BIP-143 scriptSig signing (doge3)
 #
-#  Every dialect answers the same five questions: the
+#  Every dialect answers the same six questions: the
 #  faucet's own script, its address, whether a recipient
-#  address is valid, that address as a scriptPubKey, and how
-#  to sign one input — plus TX_VERSION and the INPUT_SIZE /
-#  OUTPUT_SIZE fee-estimate constants. The engine holds ONE
-#  code path and asks the dialect at each of those points.
+#  address is valid, that address as a scriptPubKey, how to
+#  sign one input, and the signed transaction's vsize — plus
+#  TX_VERSION and the INPUT_SIZE / OUTPUT_SIZE fee-estimate
+#  constants. The engine holds ONE code path and asks the
+#  dialect at each of those points.
 #
 #  Used by:
 #    - utxo_faucet.py — dialect_for() per configured network
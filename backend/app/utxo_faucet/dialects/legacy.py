@@ -43,6 +43,10 @@ class LegacyDialect:
     INPUT_SIZE = 148
     OUTPUT_SIZE = 34
 
+    # The longest DER signature plus its SIGHASH byte — what
+    # signed_vsize counts every signature as
+    MAX_SIGNATURE_SIZE = 73
+
 
 
 
@@ -201,3 +205,25 @@ class LegacyDialect:
         tx.vin[index].script_sig = embit_script.Script(
             bytes([len(der_sig)]) + der_sig + bytes([len(pub_bytes)]) + pub_bytes
         )
+
+
+
+
+    ############################################################
+    # signed_vsize
+    ############################################################
+    #
+    # The signed transaction's size in bytes — no witness, so
+    # vsize is plain size. Every signature is counted at
+    # MAX_SIGNATURE_SIZE (its push byte in the scriptSig says
+    # how long it came out): RFC-6979 signatures vary by a byte
+    # or two with the message, so a fee priced on this stays
+    # sufficient when the transaction is re-signed with a
+    # different change value.
+    #
+    # Used by:
+    #   - utxo_faucet.py — the payout's exact fee
+    ############################################################
+
+    def signed_vsize(self, tx) -> int:
+        return len(tx.serialize()) + sum(self.MAX_SIGNATURE_SIZE - inp.script_sig.data[0] for inp in tx.vin)
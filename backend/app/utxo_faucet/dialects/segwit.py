@@ -47,6 +47,10 @@ class SegwitDialect:
     INPUT_SIZE = 91
     OUTPUT_SIZE = 31
 
+    # The longest DER signature plus its SIGHASH byte — what
+    # signed_vsize counts every signature as
+    MAX_SIGNATURE_SIZE = 73
+
 
 
 
@@ -186,3 +190,30 @@ class SegwitDialect:
         sighash = tx.sighash_segwit(index, script_code, amount_sat)
         der_sig = key.sign(sighash).serialize() + bytes([SIGHASH.ALL])
         tx.vin[index].witness = Witness([der_sig, key.get_public_key().serialize()])
+
+
+
+
+    ############################################################
+    # signed_vsize
+    ############################################################
+    #
+    # The signed transaction's virtual size (BIP-141 weight / 4,
+    # rounded up) — witness bytes count a quarter. Every
+    # signature is counted at MAX_SIGNATURE_SIZE: RFC-6979
+    # signatures come out a byte shorter or longer with the
+    # message, so a fee priced on this stays sufficient when
+    # the transaction is re-signed with a different change
+    # value.
+    #
+    # Used by:
+    #   - utxo_faucet.py — the payout's exact fee
+    ############################################################
+
+    def signed_vsize(self, tx) -> int:
+        witness_size = 2 + sum(
+            len(inp.witness.serialize()) + self.MAX_SIGNATURE_SIZE - len(inp.witness.items[0])
+            for inp in tx.vin
+        )
+        base_size = len(tx.serialize()) - (2 + sum(len(inp.witness.serialize()) for inp in tx.vin))
+        return (base_size * 4 + witness_size + 3) // 4
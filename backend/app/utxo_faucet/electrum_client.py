@@ -8,25 +8,61 @@
 #  The servers run self-signed certificates, so certificate
 #  verification is off.
 #
+#  PIPELINED: every request gets its own JSON-RPC id, many
+#  requests are in flight on the one socket at once, and a
+#  reader thread hands each reply to the caller waiting for
+#  that id. A student's balance poll no longer queues behind
+#  a payout's listunspent and broadcast — throughput on one
+#  connection grows with concurrency instead of being one
+#  request per round trip. batch() sends several calls as
+#  one JSON-RPC batch array.
+#
+#  SUBSCRIPTIONS: subscribe() registers a callback for a
+#  *.subscribe method; the server's pushes for it arrive on
+#  the same socket and the reader thread hands them to the
+#  callback. A reconnect re-subscribes everything in one
+#  batch and calls every callback with the fresh result —
+#  whatever changed while the socket was down counts as a
+#  change.
+#
+#  Framing is a persistent line buffer (_LineBuffer): large
+#  recv chunks go into one bytearray, lines are cut out
+#  incrementally and whatever follows the last newline waits
+#  for the next chunk — a several-hundred-KB listunspent
+#  costs linear work, and bytes of the next reply are never
+#  lost.
+#
+#  ONE SSL OBJECT, ONE OPERATION AT A TIME: OpenSSL does not
+#  allow a read and a write on the same connection at once,
+#  so every recv and sendall runs under the connection's io
+#  lock. The reader thread waits for the socket to turn
+#  readable WITHOUT the lock (select) and then only takes
+#  what is already there (a non-blocking recv) — a writer
+#  never waits behind an idle read.
+#
 #  Built to stay ALIVE: one instance per network lives for
-#  the whole process. The internal lock serializes the strict
-#  request/response protocol across threads, and any
-#  transport failure (dropped socket, timeout, desynced
-#  framing) rebuilds the connection and retries the request
+#  the whole process. A transport failure (dropped socket,
+#  desynced framing) fails every call in flight on that
+#  socket; each caller rebuilds the connection and retries
 #  ONCE — safe even for a broadcast, because re-sending the
-#  same raw transaction is idempotent (same txid).
+#  same raw transaction is idempotent (same txid). A call
+#  that merely TIMES OUT fails alone: its id is forgotten (a
+#  late reply is dropped) and the socket stays up for
+#  everyone else.
 #
 #  Used by:
-#    - utxo_faucet.py — one long-lived instance per network,
-#      created and connected at startup (UTXOFaucet.__init__
-#      + _warm_up_networks)
+#    - electrum_pool.py — one long-lived instance per
+#      configured endpoint of every network
 ############################################################
 
 
 import ssl
 import time
 import json
+import select
 import socket
+import logging
+import itertools
 import threading
 
 
@@ -36,10 +72,199 @@ import threading
 ELECTRUM_CLIENT_NAME = 'knf-faucet'
 ELECTRUM_PROTOCOL_VERSION = '1.4'
 
-# Socket timeout — a hung server fails the request instead of
-# wedging a Flask worker (and this client's lock).
+# How long a caller waits for its reply — a hung server fails
+# the request instead of wedging a Flask worker. Also the socket
+# timeout for connecting and sending.
 ELECTRUM_TIMEOUT_S = 15
 
+# Bytes asked for per recv() call in the reader thread. A big
+# listunspent reply arrives in a few large reads instead of
+# hundreds of 1 KiB ones.
+ELECTRUM_RECV_BYTES = 64 * 1024
+
+# The longest line the reader buffers before declaring the
+# stream desynced — far above any real reply (a 10k-UTXO
+# listunspent is about 1.3 MB)
+ELECTRUM_MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+
+
+
+
+
+
+############################################################
+# _LineBuffer
+############################################################
+#
+# Newline framing over a byte stream. feed() appends a chunk
+# and returns every line it completed; the bytes after the
+# last newline stay buffered for the next chunk. Only the
+# new bytes are searched for a newline, and the consumed
+# prefix is dropped once per feed, so a reply split into
+# many chunks costs linear time, not quadratic.
+#
+# Used by:
+#   - ElectrumClient._read_loop (below) — one per connection
+#   - tools/bench_electrum_framing.py
+############################################################
+
+class _LineBuffer:
+
+    def __init__(self, max_line=ELECTRUM_MAX_LINE_BYTES):
+        self.max_line = max_line
+        self._buffer = bytearray()
+        self._scanned = 0
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+
+        lines = []
+        start = 0
+        while True:
+            end = buffer.find(b'\n', max(start, self._scanned))
+            if end < 0:
+                break
+            lines.append(bytes(buffer[start:end]))
+            start = end + 1
+
+        if start:
+            del buffer[:start]
+        self._scanned = len(buffer)
+
+        if len(buffer) > self.max_line:
+            raise ValueError(f"Electrum line exceeds {self.max_line} bytes")
+        return lines
+
+
+
+
+
+
+
+
+############################################################
+# _Call
+############################################################
+#
+# One request in flight: the reader thread resolves it with
+# the reply (or the connection fails it), the caller waits on
+# `done`.
+#
+# Used by:
+#   - _Connection / ElectrumClient (below)
+############################################################
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+    def resolve(self, response):
+        self.response = response
+        self.done.set()
+
+    def fail(self, error):
+        self.error = error
+        self.done.set()
+
+
+
+
+
+
+
+
+############################################################
+# _Connection
+############################################################
+#
+# One open socket and the calls in flight on it, by request
+# id. send() and recv() are the only socket I/O, both under
+# `io` — the SSL object never reads and writes at once.
+# forget() drops calls that timed out. close() is final and
+# idempotent: it records why, fails every call still waiting
+# and shuts the socket down (which also wakes the reader
+# thread out of its select). A closed connection refuses new
+# calls; the client opens a fresh one.
+#
+# Used by:
+#   - ElectrumClient (below) — its current connection
+############################################################
+
+class _Connection:
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.calls = {}
+        self.error = None
+        self.lock = threading.Lock()
+        self.io = threading.Lock()
+
+    def send(self, data):
+        with self.io:
+            self.sock.settimeout(ELECTRUM_TIMEOUT_S)
+            self.sock.sendall(data)
+
+    def recv(self, size):
+        # None when nothing arrived within ELECTRUM_TIMEOUT_S (or
+        # only a TLS record that carried no data); b'' is EOF.
+        # Bytes OpenSSL already decrypted (pending) never show up
+        # in select, so they are read without waiting.
+        if not self.sock.pending():
+            readable, _, _ = select.select([self.sock], [], [], ELECTRUM_TIMEOUT_S)
+            if not readable:
+                return None
+        with self.io:
+            self.sock.settimeout(0.0)
+            try:
+                return self.sock.recv(size)
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                return None
+
+    def register(self, request_id):
+        call = _Call()
+        with self.lock:
+            if self.error is not None:
+                raise ConnectionError(f"Electrum connection closed: {self.error}")
+            self.calls[request_id] = call
+        return call
+
+    def resolve(self, response):
+        with self.lock:
+            call = self.calls.pop(response.get('id'), None)
+        if call is not None:
+            call.resolve(response)
+
+    def forget(self, calls):
+        with self.lock:
+            for request_id, call in list(self.calls.items()):
+                if call in calls:
+                    del self.calls[request_id]
+
+    def close(self, error):
+        with self.lock:
+            if self.error is not None:
+                return
+            self.error = error
+            calls, self.calls = self.calls, {}
+
+        for call in calls.values():
+            call.fail(error)
+
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
 
 
 
@@ -52,11 +277,12 @@ ELECTRUM_TIMEOUT_S = 15
 ############################################################
 #
 # The client itself; see the file header for the full story.
-# Public surface: request(), get_balance(), list_unspent() —
-# everything else is connection plumbing.
+# Public surface: request(), batch(), subscribe(),
+# subscribed(), get_balance(), list_unspent() — everything
+# else is connection plumbing.
 #
 # Used by:
-#   - utxo_faucet.py — UTXOFaucet keeps one per network
+#   - electrum_pool.py — ElectrumPool keeps one per endpoint
 ############################################################
 
 class ElectrumClient:
@@ -72,14 +298,15 @@ class ElectrumClient:
     #
     # endpoint is the config's 'host:port' string; a bare host
     # defaults to 50002, the conventional Electrum SSL port.
-    # label only feeds the debug timing line.
+    # label names the reader thread and feeds the debug timing
+    # line. retry=False drops the one same-server retry — for
+    # a pool that fails over to another server instead.
     #
     # Used by:
-    #   - utxo_faucet.py — UTXOFaucet.__init__, one per
-    #     configured network
+    #   - electrum_pool.py — ElectrumPool, one per endpoint
     ############################################################
 
-    def __init__(self, endpoint: str, debug: bool = False, label: str = ''):
+    def __init__(self, endpoint: str, debug: bool = False, label: str = '', retry: bool = True):
         if ':' in endpoint:
             self.host, port_str = endpoint.split(':', 1)
             self.port = int(port_str)
@@ -89,10 +316,22 @@ class ElectrumClient:
 
         self.debug = debug
         self.label = label
-        self.ssock = None
-
-        # The Electrum protocol is strict request/response over one
-        # socket — concurrent threads must take turns.
+        self.retry = retry
+        self._conn = None
+
+        # Request ids are unique for the client's lifetime, so a
+        # late reply from a dead connection can never be mistaken
+        # for a new call's
+        self._ids = itertools.count(1)
+
+        # (method, params tuple) -> callback for every subscribe()d
+        # stream; replayed on each new connection
+        self._subscriptions = {}
+
+        # Serializes (re)connecting and sending — a request's id
+        # order is its order on the wire. It is NOT held while
+        # waiting for a reply — except during the handshake,
+        # which must be answered before anything else goes out.
         self.lock = threading.Lock()
 
 
@@ -100,6 +339,26 @@ class ElectrumClient:
 
 
 
+    ############################################################
+    # ssock
+    ############################################################
+    #
+    # The live socket, or None while disconnected.
+    #
+    # Used by:
+    #   - tests/test_electrum_client.py
+    ############################################################
+
+    @property
+    def ssock(self):
+        conn = self._conn
+        return conn.sock if conn is not None and conn.error is None else None
+
+
+
+
+
+
     ############################################################
     # connect
     ############################################################
@@ -111,13 +370,35 @@ class ElectrumClient:
     # anyway.
     #
     # Used by:
-    #   - utxo_faucet.py — UTXOFaucet._warm_up_networks
+    #   - electrum_pool.py — ElectrumPool.connect
     ############################################################
 
     def connect(self):
         with self.lock:
-            if not self.ssock:
-                self._connect()
+            self._live_connection()
+
+
+
+
+
+
+    ############################################################
+    # _live_connection
+    ############################################################
+    #
+    # The current connection, opening a fresh one when there
+    # is none or the last one was closed; the caller holds
+    # self.lock.
+    #
+    # Used by:
+    #   - connect (above) / _exchange (below)
+    ############################################################
+
+    def _live_connection(self):
+        if self._conn is None or self._conn.error is not None:
+            self._conn = None
+            self._conn = self._connect()
+        return self._conn
 
 
 
@@ -128,15 +409,17 @@ class ElectrumClient:
     # _connect
     ############################################################
     #
-    # Opens the SSL connection; the caller holds self.lock.
-    # The server.version handshake goes out immediately —
+    # Opens the SSL connection and starts its reader thread;
+    # the caller holds self.lock. The server.version handshake
+    # goes out immediately and is waited for under the lock —
     # recent ElectrumX versions close the session
     # ("server.version must be first msg") if any other
-    # request arrives before it. The socket timeout keeps a
-    # hung server from wedging a Flask worker forever.
+    # request arrives before it. Then every registered
+    # subscription is re-established (one batch), and its
+    # callback gets the current value.
     #
     # Used by:
-    #   - request (below) — on first use and after a teardown
+    #   - _live_connection (above)
     ############################################################
 
     def _connect(self):
@@ -145,16 +428,39 @@ class ElectrumClient:
 
         sock = socket.create_connection((self.host, self.port), timeout=ELECTRUM_TIMEOUT_S)
 
-        # Tiny request/response messages — Nagle's algorithm would
+        # Small request/response messages — Nagle's algorithm would
         # only sit on them waiting for more data that never comes
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         context = ssl.create_default_context()
         context.check_hostname = False
         context.verify_mode = ssl.CERT_NONE
-        self.ssock = context.wrap_socket(sock, server_hostname=self.host)
+        conn = _Connection(context.wrap_socket(sock, server_hostname=self.host))
+
+        threading.Thread(
+            target=self._read_loop,
+            args=(conn,),
+            name=f'electrum-{self.label or self.host}',
+            daemon=True,
+        ).start()
 
-        self._roundtrip("server.version", [ELECTRUM_CLIENT_NAME, ELECTRUM_PROTOCOL_VERSION])
+        subscriptions = list(self._subscriptions.items())
+        try:
+            calls = self._send(conn, [("server.version", [ELECTRUM_CLIENT_NAME, ELECTRUM_PROTOCOL_VERSION])])
+            self._result(self._collect(calls)[0])
+
+            values = []
+            if subscriptions:
+                calls = self._send(conn, [(method, list(params)) for (method, params), _ in subscriptions], as_batch=True)
+                values = [self._result(response) for response in self._collect(calls)]
+        except Exception as e:
+            conn.close(e)
+            raise
+
+        for (_, callback), value in zip(subscriptions, values):
+            self._run_callback(callback, value)
+
+        return conn
 
 
 
@@ -162,24 +468,76 @@ class ElectrumClient:
 
 
     ############################################################
-    # _teardown
+    # _read_loop
     ############################################################
     #
-    # Drops the socket without ceremony; the caller holds
-    # self.lock. Errors while closing an already-broken socket
-    # mean nothing — ignored.
+    # The connection's reader thread: reads the stream
+    # (_Connection.recv), cuts it into lines (_LineBuffer) and
+    # hands each reply to the call waiting for its id. Nothing
+    # to read only means the connection is idle. EOF, a socket
+    # error or a line that is not JSON closes the connection
+    # (failing every call in flight), and the thread ends with
+    # it.
     #
     # Used by:
-    #   - request (below) — before a reconnect attempt
+    #   - _connect (above) — one thread per connection
     ############################################################
 
-    def _teardown(self):
-        if self.ssock:
+    def _read_loop(self, conn):
+        lines = _LineBuffer()
+        while True:
             try:
-                self.ssock.close()
-            except OSError:
-                pass
-            self.ssock = None
+                chunk = conn.recv(ELECTRUM_RECV_BYTES)
+            except (OSError, ValueError) as e:
+                conn.close(e)
+                return
+
+            if chunk is None:
+                if conn.error is not None:
+                    return
+                continue
+
+            if not chunk:
+                conn.close(ConnectionError("Connection closed by server"))
+                return
+
+            try:
+                for line in lines.feed(chunk):
+                    self._dispatch(conn, line)
+            except ValueError as e:
+                conn.close(e)
+                return
+
+
+
+
+
+
+    ############################################################
+    # _dispatch
+    ############################################################
+    #
+    # One line off the wire: a reply object, the array
+    # answering a batch, or a subscription push (a method and
+    # no id). Every reply is matched by id; one that nobody
+    # waits for (the call already timed out) is dropped.
+    #
+    # Used by:
+    #   - _read_loop (above)
+    ############################################################
+
+    def _dispatch(self, conn, line):
+        if not line.strip():
+            return
+
+        message = json.loads(line.decode('utf-8'))
+        for response in (message if isinstance(message, list) else [message]):
+            if not isinstance(response, dict):
+                continue
+            if response.get('id') is None and 'method' in response:
+                self._notify(response['method'], response.get('params') or [])
+            else:
+                conn.resolve(response)
 
 
 
@@ -187,49 +545,131 @@ class ElectrumClient:
 
 
     ############################################################
-    # _roundtrip
+    # _notify
     ############################################################
     #
-    # One JSON-RPC round-trip over the open socket; the caller
-    # holds self.lock. Newline-delimited protocol: send one
-    # line, read until the first '\n' comes back. Electrum-side
-    # errors raise RuntimeError — those mean the server
-    # ANSWERED, so request() never retries them. The timing
-    # print only fires with APP_DEBUG on.
+    # A push: the server sends the subscription's params with
+    # the new value appended (scripthash -> [scripthash,
+    # status], headers -> [header]), so it belongs to the
+    # subscription whose params it starts with, and the value
+    # is the last param. A push nobody subscribed to is
+    # dropped.
+    #
+    # Used by:
+    #   - _dispatch (above)
+    ############################################################
+
+    def _notify(self, method, params):
+        for (sub_method, sub_params), callback in list(self._subscriptions.items()):
+            if sub_method == method and tuple(params[:len(sub_params)]) == sub_params and params:
+                self._run_callback(callback, params[-1])
+
+
+
+
+
+
+    ############################################################
+    # _run_callback
+    ############################################################
+    #
+    # Runs a subscription callback on the reader thread (or
+    # the reconnecting caller). A failing callback is logged
+    # and never takes the connection down with it.
+    #
+    # Used by:
+    #   - _connect / _notify (above)
+    ############################################################
+
+    def _run_callback(self, callback, value):
+        try:
+            callback(value)
+        except Exception:
+            logging.exception(f"[UTXO] {self.label} Electrum subscription callback failed")
+
+
+
+
+
+
+    ############################################################
+    # _send
+    ############################################################
+    #
+    # Registers one call per (method, params) and writes them
+    # as one line — a single request object, or with
+    # as_batch=True a JSON-RPC batch array; the caller holds
+    # self.lock.
     #
     # Used by:
     #   - _connect (above) — the handshake
-    #   - request (below)
+    #   - _exchange (below)
     ############################################################
 
-    def _roundtrip(self, method: str, params: list):
-        request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": method,
-            "params": params
-        }
+    def _send(self, conn, requests, as_batch=False):
+        payload, calls = [], []
+        for method, params in requests:
+            request_id = next(self._ids)
+            calls.append(conn.register(request_id))
+            payload.append({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": method,
+                "params": params
+            })
+
+        message = payload if as_batch else payload[0]
+        conn.send((json.dumps(message) + "\n").encode("utf-8"))
+        return calls
+
+
+
+
+
+
+    ############################################################
+    # _collect
+    ############################################################
+    #
+    # Waits for every call's reply, ELECTRUM_TIMEOUT_S in total.
+    # A call failed by its connection raises ConnectionError;
+    # no reply in time raises TimeoutError — both OSErrors, so
+    # request() retries them (a timeout on the same socket).
+    #
+    # Used by:
+    #   - _connect (above) / _exchange (below)
+    ############################################################
+
+    def _collect(self, calls):
+        deadline = time.monotonic() + ELECTRUM_TIMEOUT_S
+        responses = []
+        for call in calls:
+            if not call.done.wait(max(0.0, deadline - time.monotonic())):
+                raise TimeoutError("Electrum request timed out")
+            if call.error is not None:
+                raise ConnectionError(f"Electrum connection lost: {call.error}")
+            responses.append(call.response)
+        return responses
 
-        start_time = time.time()
 
-        self.ssock.sendall((json.dumps(request) + "\n").encode("utf-8"))
 
-        response_data = b""
-        while True:
-            chunk = self.ssock.recv(1024)
-            if not chunk:
-                raise ConnectionError("Connection closed by server")
-            response_data += chunk
-            if b'\n' in response_data:
-                response_line = response_data.split(b'\n', 1)[0]
-                break
 
-        elapsed_time = time.time() - start_time
-        if self.debug:
-            print(f"[DEBUG] Electrum request '{method}' took {elapsed_time:.3f}s (network: {self.label})")
 
-        response = json.loads(response_line.decode('utf-8'))
 
+    ############################################################
+    # _result
+    ############################################################
+    #
+    # One reply's result. Electrum-side errors raise
+    # RuntimeError — those mean the server ANSWERED, so
+    # request() never retries them; a reply with neither
+    # result nor error means the framing desynced.
+    #
+    # Used by:
+    #   - _connect (above) / _exchange (below)
+    ############################################################
+
+    def _result(self, response):
         if "error" in response and response["error"]:
             raise RuntimeError(f"Electrum error: {response['error']}")
 
@@ -243,37 +683,176 @@ class ElectrumClient:
 
 
 
+    ############################################################
+    # _exchange
+    ############################################################
+    #
+    # One attempt: send under the lock, wait for the replies
+    # without it. A reply timeout fails only this attempt —
+    # its calls are forgotten, the connection and everything
+    # else in flight on it carry on. Any other transport failure
+    # closes the connection (every other call in flight on it
+    # fails too and retries on the next one) before it
+    # propagates. The timing print only fires with APP_DEBUG
+    # on.
+    #
+    # Used by:
+    #   - request / batch (below)
+    ############################################################
+
+    def _exchange(self, requests, as_batch):
+        start_time = time.time()
+        conn, calls = None, []
+
+        try:
+            with self.lock:
+                conn = self._live_connection()
+                calls = self._send(conn, requests, as_batch)
+            results = [self._result(response) for response in self._collect(calls)]
+        except RuntimeError:
+            raise
+        except (OSError, ValueError) as e:
+            # calls is only set once the send went through — a
+            # sendall that timed out half-way has desynced the stream
+            if calls and isinstance(e, TimeoutError):
+                conn.forget(calls)
+            elif conn is not None:
+                conn.close(e)
+            raise
+
+        elapsed_time = time.time() - start_time
+        if self.debug:
+            methods = ', '.join(method for method, _ in requests)
+            kind = 'batch' if as_batch else 'request'
+            print(f"[DEBUG] Electrum {kind} '{methods}' took {elapsed_time:.3f}s (network: {self.label})")
+
+        return results
+
+
+
+
+
+
     ############################################################
     # request
     ############################################################
     #
-    # The public entry: connect on first use, then one locked
-    # round-trip. Any transport failure (dropped socket, TLS
-    # hiccup, timeout, garbled framing — OSError/ValueError)
-    # tears the connection down and retries ONCE on a fresh
-    # socket, which keeps the long-lived connection self-
+    # The public entry: one call, connecting on first use. Any
+    # transport failure (dropped socket, TLS hiccup, timeout,
+    # garbled framing — OSError/ValueError) retries ONCE on a
+    # fresh socket, which keeps the long-lived connection self-
     # healing across Electrum restarts and idle disconnects.
     # RuntimeError passes straight through: the server
     # answered, reconnecting would not change the answer.
+    # With retry=False the first failure raises.
     #
     # Used by:
     #   - get_balance / list_unspent (below)
-    #   - utxo_faucet.py — _create_and_broadcast_transaction's
-    #     broadcast (retry-safe: same raw tx = same txid)
+    #   - electrum_pool.py — ElectrumPool.request / check
+    #     (a broadcast is retry-safe: same raw tx = same txid)
     ############################################################
 
     def request(self, method: str, params: list):
+        return self._with_retry([(method, params)], as_batch=False)[0]
+
+
+
+
+
+
+    ############################################################
+    # batch
+    ############################################################
+    #
+    # Several calls in ONE JSON-RPC batch array — one write,
+    # one round trip. Takes (method, params) pairs and returns
+    # their results in the same order (the server may answer
+    # the array in any order; ids sort it out). Same retry
+    # rule as request(); any item's Electrum error raises.
+    #
+    # Used by:
+    #   - fee_estimates (below)
+    #   - electrum_pool.py — ElectrumPool.batch
+    #   - tests/test_electrum_client.py
+    ############################################################
+
+    def batch(self, requests: list) -> list:
+        requests = list(requests)
+        if not requests:
+            return []
+        return self._with_retry(requests, as_batch=True)
+
+    def _with_retry(self, requests, as_batch):
+        try:
+            return self._exchange(requests, as_batch)
+        except RuntimeError:
+            raise
+        except (OSError, ValueError):
+            if not self.retry:
+                raise
+            return self._exchange(requests, as_batch)
+
+
+
+
+
+
+    ############################################################
+    # subscribe
+    ############################################################
+    #
+    # Subscribes to a *.subscribe method and returns its
+    # current value; from then on callback(value) runs for
+    # every push, and with the fresh value after every
+    # reconnect. The callback runs on the reader thread: it
+    # must be quick and must NEVER call this client (the
+    # reply it would wait for is read by that same thread).
+    # A server that refuses the subscription (RuntimeError)
+    # leaves nothing registered; a transport failure leaves it
+    # registered, so the next connection establishes it.
+    #
+    # Used by:
+    #   - electrum_pool.py — ElectrumPool.subscribe / check
+    ############################################################
+
+    def subscribe(self, method: str, params: list, callback):
+        key = (method, tuple(params))
+
+        # Connect BEFORE registering — a fresh connection replays
+        # every registered subscription, and this one is sent below
         with self.lock:
             try:
-                if not self.ssock:
-                    self._connect()
-                return self._roundtrip(method, params)
-            except RuntimeError:
-                raise
+                self._live_connection()
             except (OSError, ValueError):
-                self._teardown()
-                self._connect()
-                return self._roundtrip(method, params)
+                pass    # request() reconnects or raises
+            self._subscriptions[key] = callback
+
+        try:
+            return self.request(method, params)
+        except RuntimeError:
+            with self.lock:
+                self._subscriptions.pop(key, None)
+            raise
+
+
+
+
+
+
+    ############################################################
+    # subscribed
+    ############################################################
+    #
+    # Are pushes for this subscription arriving right now —
+    # registered AND the connection up? While False, whatever
+    # the subscriber cached may have changed unseen.
+    #
+    # Used by:
+    #   - electrum_pool.py — ElectrumPool.subscribed
+    ############################################################
+
+    def subscribed(self, method: str, params: list) -> bool:
+        return self.ssock is not None and (method, tuple(params)) in self._subscriptions
 
 
 
@@ -288,7 +867,7 @@ class ElectrumClient:
     # in satoshis), split into confirmed / unconfirmed / total.
     #
     # Used by:
-    #   - utxo_faucet.py — UTXOFaucet._faucet_balance
+    #   - electrum_pool.py — ElectrumPool.get_balance
     ############################################################
 
     def get_balance(self, scripthash: str) -> dict:
@@ -312,8 +891,7 @@ class ElectrumClient:
     ############################################################
     #
     # Used by:
-    #   - utxo_faucet.py —
-    #     UTXOFaucet._create_and_broadcast_transaction
+    #   - electrum_pool.py — ElectrumPool.list_unspent
     ############################################################
 
     def list_unspent(self, scripthash: str) -> list:
@@ -322,3 +900,23 @@ class ElectrumClient:
 
 
 
+
+
+    ############################################################
+    # fee_estimates
+    ############################################################
+    #
+    # (estimatefee for target_blocks, relayfee) in whole coins
+    # per kilobyte, in one batch round trip. The estimate is -1
+    # when the server's daemon has none.
+    #
+    # Used by:
+    #   - electrum_pool.py — ElectrumPool.fee_estimates
+    ############################################################
+
+    def fee_estimates(self, target_blocks: int) -> tuple:
+        estimate, relay = self.batch([
+            ("blockchain.estimatefee", [target_blocks]),
+            ("blockchain.relayfee", []),
+        ])
+        return estimate, relay
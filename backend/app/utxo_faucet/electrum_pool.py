@@ -0,0 +1,461 @@
+############################################################
+#  [*] Electrum pool — several endpoints per network, scored
+#      and failed over
+#
+#  One ElectrumX box per network was a single point of
+#  failure: slow or down, and every KNF/BTC/LTC request
+#  burned ELECTRUM_TIMEOUT_S on it. A network may now list
+#  fallback endpoints next to its electrum_server, and the
+#  pool keeps one long-lived ElectrumClient per endpoint.
+#
+#  Every endpoint is health-checked with server.ping every
+#  ELECTRUM_PING_SECONDS by the process's keep-alive
+#  scheduler (app/keepalive.py), which also keeps the idle
+#  sockets open and reconnects a dropped one. The ping's
+#  round trip feeds a rolling latency (an EWMA, weight
+#  LATENCY_WEIGHT), and every ping and every request feed a
+#  rolling error rate over the last ERROR_WINDOW outcomes.
+#
+#  Requests go to the best endpoint: one whose last outcome
+#  was a success before one whose last outcome failed, then
+#  the lowest latency, inflated by the error rate. An
+#  endpoint never measured yet ranks by config order, so the
+#  configured electrum_server stays first at boot. A
+#  transport failure (OSError / ValueError) fails over to the
+#  next endpoint within the SAME request — safe even for a
+#  broadcast, re-sending a raw transaction is idempotent. An
+#  Electrum-side error (RuntimeError) passes straight
+#  through: the server answered.
+#
+#  Subscriptions are registered with the pool: established
+#  on the best endpoint straight away, and on every other
+#  endpoint by its health check after its next successful
+#  ping — so after a failover the pushes are already
+#  arriving from the new endpoint.
+#
+#  A network with a single endpoint keeps the bare client's
+#  same-server retry — there is nowhere to fail over to.
+#
+#  Used by:
+#    - utxo_faucet.py — one long-lived pool per network,
+#      UTXOFaucet._electrum_clients, plus the
+#      /api/utxo/electrum debug payload
+#    - tests/test_electrum_pool.py
+############################################################
+
+
+import time
+import logging
+import threading
+from collections import deque
+
+from .electrum_client import ElectrumClient
+from ..keepalive import keepalive_scheduler
+
+
+# How often each endpoint is pinged
+ELECTRUM_PING_SECONDS = 30
+
+# Weight of the newest ping in the rolling latency
+LATENCY_WEIGHT = 0.3
+
+# How many recent outcomes (pings and requests) the error
+# rate is taken over
+ERROR_WINDOW = 20
+
+# How much a 100 % error rate inflates an endpoint's latency
+# score (x(1 + ERROR_PENALTY))
+ERROR_PENALTY = 4
+
+
+
+
+
+
+
+
+############################################################
+# _Endpoint
+############################################################
+#
+# One endpoint: its client, its rolling stats and the pool
+# subscriptions established on it. record() takes one
+# outcome (and, for pings, the round trip in seconds).
+#
+# Used by:
+#   - ElectrumPool (below)
+############################################################
+
+class _Endpoint:
+
+    def __init__(self, index, endpoint, client):
+        self.index = index
+        self.endpoint = endpoint
+        self.client = client
+        self.latency = None
+        self.outcomes = deque(maxlen=ERROR_WINDOW)
+        self.last_error = None
+        self.subscribed = set()
+        self.lock = threading.Lock()
+
+    def record(self, ok, latency=None, error=None):
+        with self.lock:
+            self.outcomes.append(ok)
+            if not ok:
+                self.last_error = str(error)
+            if latency is not None:
+                self.latency = latency if self.latency is None else (
+                    LATENCY_WEIGHT * latency + (1 - LATENCY_WEIGHT) * self.latency)
+
+    @property
+    def healthy(self):
+        return not self.outcomes or self.outcomes[-1]
+
+    @property
+    def error_rate(self):
+        outcomes = list(self.outcomes)
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+    def score(self):
+        # Sorts ascending: healthy first, then measured by
+        # inflated latency, unmeasured by config order
+        if self.latency is None:
+            return (not self.healthy, 1, self.index)
+        return (not self.healthy, 0, self.latency * (1 + ERROR_PENALTY * self.error_rate))
+
+
+
+
+
+
+
+
+############################################################
+# ElectrumPool
+############################################################
+#
+# Same public surface as ElectrumClient — connect(),
+# request(), batch(), subscribe(), subscribed(),
+# get_balance(), list_unspent(), fee_estimates() — so the
+# faucet never knows how many servers stand behind a
+# network. endpoints is the network's 'host:port' list,
+# preferred first.
+#
+# Used by:
+#   - utxo_faucet.py — UTXOFaucet keeps one per network
+############################################################
+
+class ElectrumPool:
+
+    def __init__(self, endpoints, debug: bool = False, label: str = ''):
+        endpoints = list(endpoints) or ['']
+        self.label = label
+        self._endpoints = [
+            _Endpoint(index, endpoint, ElectrumClient(
+                endpoint, debug=debug, label=label if index == 0 else f'{label}-{index}',
+                retry=len(endpoints) == 1))
+            for index, endpoint in enumerate(endpoints)
+        ]
+
+        # (method, params tuple) -> callback for every subscribe()d
+        # stream; each health check replays them on its endpoint
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+
+
+
+
+
+    ############################################################
+    # endpoints
+    ############################################################
+    #
+    # The configured 'host:port' strings, preferred first.
+    #
+    # Used by:
+    #   - UTXOFaucet._warm_up_networks — the failure log line
+    ############################################################
+
+    @property
+    def endpoints(self):
+        return [endpoint.endpoint for endpoint in self._endpoints]
+
+
+
+
+
+
+    ############################################################
+    # _ranked
+    ############################################################
+    #
+    # The endpoints best first — see the file header.
+    #
+    # Used by:
+    #   - _call / snapshot (below)
+    ############################################################
+
+    def _ranked(self):
+        return sorted(self._endpoints, key=_Endpoint.score)
+
+
+
+
+
+
+    ############################################################
+    # _call
+    ############################################################
+    #
+    # Runs call(endpoint) on the best endpoint, failing over to
+    # the next on a transport failure until one answers; the
+    # last failure raises when none does. Every outcome goes
+    # into the endpoint's stats.
+    #
+    # Used by:
+    #   - every public call (below)
+    ############################################################
+
+    def _call(self, call):
+        error = None
+        for endpoint in self._ranked():
+            try:
+                result = call(endpoint)
+            except RuntimeError:
+                endpoint.record(True)
+                raise
+            except (OSError, ValueError) as e:
+                endpoint.record(False, error=e)
+                if len(self._endpoints) > 1:
+                    logging.warning(f"[UTXO] {self.label} Electrum {endpoint.endpoint} failed, "
+                                    f"failing over: {e}")
+                error = e
+                continue
+
+            endpoint.record(True)
+            return result
+        raise error
+
+
+
+
+
+
+    ############################################################
+    # connect
+    ############################################################
+    #
+    # Connects the best endpoint that answers — the startup
+    # warmup's early failure. The others connect on their
+    # first health check.
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._warm_up_networks
+    ############################################################
+
+    def connect(self):
+        self._call(lambda endpoint: endpoint.client.connect())
+
+
+
+
+
+
+    ############################################################
+    # request / batch
+    ############################################################
+    #
+    # ElectrumClient's request() and batch(), failed over.
+    #
+    # Used by:
+    #   - utxo_faucet.py — the broadcasts
+    ############################################################
+
+    def request(self, method: str, params: list):
+        return self._call(lambda endpoint: endpoint.client.request(method, params))
+
+    def batch(self, requests: list) -> list:
+        requests = list(requests)
+        return self._call(lambda endpoint: endpoint.client.batch(requests))
+
+
+
+
+
+
+    ############################################################
+    # subscribe
+    ############################################################
+    #
+    # Registers the subscription with the pool and
+    # establishes it on the best endpoint that answers,
+    # returning its current value. The other endpoints pick
+    # it up on their next successful ping. Same callback
+    # rules as ElectrumClient.subscribe — it runs on a reader
+    # thread and must never call Electrum.
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._subscribe
+    ############################################################
+
+    def subscribe(self, method: str, params: list, callback):
+        key = (method, tuple(params))
+        with self._lock:
+            self._subscriptions[key] = callback
+
+        def establish(endpoint):
+            value = endpoint.client.subscribe(method, params, callback)
+            endpoint.subscribed.add(key)
+            return value
+
+        try:
+            return self._call(establish)
+        except RuntimeError:
+            with self._lock:
+                self._subscriptions.pop(key, None)
+            raise
+
+
+
+
+
+
+    ############################################################
+    # subscribed
+    ############################################################
+    #
+    # Are pushes for this subscription arriving from any
+    # endpoint right now?
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._balance_trusted and the
+    #     UTXO set's pushed()
+    ############################################################
+
+    def subscribed(self, method: str, params: list) -> bool:
+        return any(endpoint.client.subscribed(method, params) for endpoint in self._endpoints)
+
+
+
+
+
+
+    ############################################################
+    # get_balance / list_unspent / fee_estimates
+    ############################################################
+    #
+    # ElectrumClient's queries, failed over — see
+    # electrum_client.py.
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._fetch_balance /
+    #     _utxo_set_for
+    #   - fee_oracle.py — FeeOracle.refresh
+    ############################################################
+
+    def get_balance(self, scripthash: str) -> dict:
+        return self._call(lambda endpoint: endpoint.client.get_balance(scripthash))
+
+    def list_unspent(self, scripthash: str) -> list:
+        return self._call(lambda endpoint: endpoint.client.list_unspent(scripthash))
+
+    def fee_estimates(self, target_blocks: int) -> tuple:
+        return self._call(lambda endpoint: endpoint.client.fee_estimates(target_blocks))
+
+
+
+
+
+
+    ############################################################
+    # check
+    ############################################################
+    #
+    # One health check of one endpoint: a server.ping, timed
+    # into the rolling latency, then every pool subscription
+    # the endpoint lacks is established on it. A failed ping
+    # is recorded and raised — the scheduler retries soon,
+    # which reconnects the endpoint.
+    #
+    # Used by:
+    #   - start (below) — the endpoint's keep-alive job
+    #   - tests/test_electrum_pool.py
+    ############################################################
+
+    def check(self, endpoint):
+        start = time.monotonic()
+        try:
+            endpoint.client.request("server.ping", [])
+        except Exception as e:
+            endpoint.record(False, error=e)
+            raise
+        endpoint.record(True, latency=time.monotonic() - start)
+
+        with self._lock:
+            missing = [(key, callback) for key, callback in self._subscriptions.items()
+                       if key not in endpoint.subscribed]
+        for (method, params), callback in missing:
+            try:
+                endpoint.client.subscribe(method, list(params), callback)
+                endpoint.subscribed.add((method, params))
+            except Exception as e:
+                logging.warning(f"[UTXO] {self.label} Electrum {endpoint.endpoint} refused {method}: {e}")
+
+
+
+
+
+
+    ############################################################
+    # start
+    ############################################################
+    #
+    # Registers every endpoint's check with the keep-alive
+    # scheduler — a hung server never delays the others'
+    # checks, and a single endpoint is kept warm too.
+    #
+    # Used by:
+    #   - UTXOFaucet._warm_up_networks — after the warmup
+    ############################################################
+
+    def start(self):
+        for endpoint in self._endpoints:
+            keepalive_scheduler.register(
+                f'utxo/{self.label}/{endpoint.endpoint}',
+                lambda endpoint=endpoint: self.check(endpoint),
+                ELECTRUM_PING_SECONDS,
+            )
+
+
+
+
+
+
+    ############################################################
+    # snapshot
+    ############################################################
+    #
+    # Per endpoint, best first: its rolling latency (ms, None
+    # before the first ping), error rate and sample count,
+    # whether its last outcome was a success, whether its
+    # socket is up, and the last error seen — the debug
+    # payload.
+    #
+    # Used by:
+    #   - UTXOFaucet.get_electrum
+    ############################################################
+
+    def snapshot(self):
+        return [
+            {
+                "endpoint": endpoint.endpoint,
+                "latency_ms": round(endpoint.latency * 1000, 1) if endpoint.latency is not None else None,
+                "error_rate": round(endpoint.error_rate, 3),
+                "samples": len(endpoint.outcomes),
+                "healthy": endpoint.healthy,
+                "connected": endpoint.client.ssock is not None,
+                "last_error": endpoint.last_error,
+            }
+            for endpoint in self._ranked()
+        ]
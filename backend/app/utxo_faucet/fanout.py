@@ -0,0 +1,217 @@
+############################################################
+#  [*] Fan-out pool — pre-split coins for parallel payouts
+#
+#  Every UTXO payout spends from the same few coins and pays
+#  its change back, so a network's payouts run one at a time
+#  behind the payout lock: at most one transaction per
+#  Electrum round trip, whatever the batch window collects.
+#
+#  A network with fanout_pool_size in its config pre-splits
+#  the faucet balance instead: that many POOL COINS, each
+#  worth exactly one chunk plus the fee of spending it alone
+#  (the dialect's 1-in/1-out size estimate at the fee
+#  oracle's rate). A payout then claims one pool coin —
+#  reserved in the UTXO set, so no other payout can take it
+#  — and pays it out in a 1-in/1-out transaction: no change,
+#  nothing shared, no lock. FANOUT_WORKERS payouts sign and
+#  broadcast side by side (the Electrum client pipelines
+#  their requests).
+#
+#  The pool is topped up in the background: one thread per
+#  fan-out network, woken after every pool payout and every
+#  FANOUT_REFILL_SECONDS, splits a fresh batch of pool coins
+#  off the rest of the balance once fewer than
+#  FANOUT_REFILL_BELOW of the target are left. The split is
+#  an ordinary batch payout to the faucet's own address.
+#
+#  A coin counts as a pool coin by its OUTPOINT, recorded
+#  from the split's outputs when it is broadcast — never by
+#  its value, so a student's refund that happens to be worth
+#  one pool coin is just an ordinary coin (the record is per
+#  process — see UTXOFaucet._pool_coins). Pool coins are
+#  kept out of every other spend (batches, splits,
+#  consolidation). A payout only claims one priced at least
+#  at the current rate — when the pool is empty, or fees
+#  rose past it, the claim falls back to the ordinary
+#  batched path.
+#
+#  A payout only claims a CONFIRMED pool coin. A split's
+#  outputs spent in parallel straight from the mempool would
+#  chain every payout onto the one unconfirmed split, and
+#  Bitcoin Core refuses the 25th descendant
+#  ("too-long-mempool-chain"); refills spending the previous
+#  split's change would chain on top. Until the split
+#  confirms, claims take the batched path. The pool size is
+#  capped below that limit too (config_schema.py).
+#
+#  Electrum-free on purpose (UTXOs are listunspent-shaped
+#  dicts, the dialect only lends its size constants), so
+#  tests drive the helpers with plain lists.
+#
+#  Used by:
+#    - utxo_faucet.py — UTXOFaucet.fanout_refiller,
+#      UTXOFaucet._send_from_pool, UTXOFaucet._refill_pool
+#    - tests/test_fanout.py
+############################################################
+
+
+import logging
+import threading
+
+from .coin_selection import estimate_fee
+
+
+# Payouts one fan-out network signs and broadcasts at once
+FANOUT_WORKERS = 4
+
+# How often each fan-out network's refiller checks its pool
+# when no payout wakes it
+FANOUT_REFILL_SECONDS = 60
+
+# The share of the pool target below which a refill splits
+# new pool coins (back up to the full target)
+FANOUT_REFILL_BELOW = 0.5
+
+
+
+
+
+
+
+
+############################################################
+# pool_value
+############################################################
+#
+# What one pool coin is worth at fee_rate: the chunk plus
+# the size-estimate fee of spending it alone to one
+# recipient — generous enough for any recipient script the
+# dialect accepts.
+#
+# Used by:
+#   - utxo_faucet.py — UTXOFaucet._send_from_pool,
+#     UTXOFaucet._refill_pool
+############################################################
+
+def pool_value(dialect, chunk_sat: int, fee_rate: int) -> int:
+    return chunk_sat + estimate_fee(dialect, fee_rate, 1, 1)
+
+
+
+
+
+
+
+
+############################################################
+# FanoutRefiller
+############################################################
+#
+# The pool scheduler: refill(network) tops one network's
+# pool up (and decides whether that is due), returning a
+# report dict — pool coins before, added, transaction_id —
+# or None when the pool was full enough.
+#
+# Used by:
+#   - utxo_faucet.py — one instance, UTXOFaucet.fanout_refiller
+############################################################
+
+class FanoutRefiller:
+
+    def __init__(self, refill, networks):
+        self.refill = refill
+        self.networks = list(networks)
+        self._wakeups = {network: threading.Event() for network in self.networks}
+        self._failing = set()
+        self._threads = []
+
+
+
+
+
+
+    ############################################################
+    # start / wake
+    ############################################################
+    #
+    # start() runs one daemon refiller per network (once);
+    # wake() asks a network's refiller to check now — a pool
+    # payout calls it, so it only sets an event.
+    #
+    # Used by:
+    #   - UTXOFaucet._warm_up_networks (start),
+    #     UTXOFaucet._send_from_pool (wake)
+    ############################################################
+
+    def start(self):
+        if self._threads:
+            return
+
+        for network in self.networks:
+            thread = threading.Thread(target=self._run, args=(network,), name=f'utxo-fanout-{network}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def wake(self, network):
+        wakeup = self._wakeups.get(network)
+        if wakeup is not None:
+            wakeup.set()
+
+
+
+
+
+
+    ############################################################
+    # run_once
+    ############################################################
+    #
+    # One check on one network: the refill's report (printed
+    # when it split new pool coins), or None.
+    #
+    # Used by:
+    #   - _run (below)
+    #   - UTXOFaucet._warm_up_networks — fills the pool at boot
+    ############################################################
+
+    def run_once(self, network):
+        report = self.refill(network)
+        if report:
+            print(f"[UTXO] {network} fan-out pool {report['before']} → {report['before'] + report['added']} "
+                  f"coins: {report['transaction_id']}")
+        return report
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # The refiller loop: on a wake, or every
+    # FANOUT_REFILL_SECONDS. A failing refill (an empty
+    # wallet, a dead server) is logged once when it starts
+    # failing and once when it recovers.
+    #
+    # Used by:
+    #   - start (above) — one thread per network
+    ############################################################
+
+    def _run(self, network):
+        wakeup = self._wakeups[network]
+        while True:
+            wakeup.wait(FANOUT_REFILL_SECONDS)
+            wakeup.clear()
+            try:
+                self.run_once(network)
+            except Exception as e:
+                if network not in self._failing:
+                    self._failing.add(network)
+                    logging.warning(f"[UTXO] {network} fan-out pool refill failing: {e}")
+                continue
+
+            if network in self._failing:
+                self._failing.discard(network)
+                logging.warning(f"[UTXO] {network} fan-out pool refill recovered")
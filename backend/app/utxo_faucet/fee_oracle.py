@@ -0,0 +1,293 @@
+############################################################
+#  [*] Fee oracle — cached UTXO fee rates, refreshed in the
+#      background
+#
+#  Payouts used to pay the coin registry's static FEE_RATE
+#  (10 sat/vB on Bitcoin): far too much when the testnet
+#  mempool is empty, too little to ever confirm when it is
+#  busy. The oracle asks the network's Electrum server
+#  instead — blockchain.estimatefee for FEE_TARGET_BLOCKS and
+#  blockchain.relayfee, in one batch round trip — and keeps
+#  the resulting sat/vB rate per network. One daemon thread
+#  per network refreshes it every FEE_REFRESH_SECONDS; the
+#  payouts read the cache.
+#
+#  The registry stays in charge of the bounds:
+#
+#    MIN_FEE_RATE / MAX_FEE_RATE — the estimate is clamped
+#        into them (an idle testnet estimates ~1 sat/vB, a
+#        flooded one anything)
+#    FEE_RATE — what is paid when the server has no estimate
+#        (ElectrumX answers -1: regtest, a fresh node)
+#    relayfee — the server's own minimum wins over the
+#        ceiling: a transaction below it never leaves the node
+#
+#  The cache is bounded by FEE_MAX_AGE_SECONDS: when the
+#  refresher has fallen behind, a payout fetches the rate
+#  itself. A failed fetch never fails the payout — the fee
+#  rate is not worth a refused claim while the pool may
+#  still reach the network. It pays the last cached rate,
+#  however stale, or the registry's FEE_RATE (clamped into
+#  the bounds) when nothing was ever cached, and logs a
+#  warning either way.
+#
+#  Electrum answers in whole coins per kilobyte; every coin
+#  in the registry has 8 decimals, so coins/kB x 10^5 is
+#  sat/vB (rounded up).
+#
+#  Used by:
+#    - utxo_faucet.py — UTXOFaucet (payout fee rate, warmup,
+#      the /api/utxo/fee-oracle debug payload)
+#    - tests/test_fee_oracle.py
+############################################################
+
+
+import math
+import time
+import logging
+import threading
+from decimal import Decimal
+
+
+# How often the background threads refresh each network — the
+# estimate moves with blocks, not seconds
+FEE_REFRESH_SECONDS = 60
+
+# Cached rates older than this are never paid with — the payout
+# fetches its own
+FEE_MAX_AGE_SECONDS = 300
+
+# Confirmation target handed to blockchain.estimatefee
+FEE_TARGET_BLOCKS = 2
+
+# Satoshis per vbyte in one coin per kilobyte
+SAT_VB_PER_COIN_KB = Decimal(100_000)
+
+
+
+
+
+
+
+
+############################################################
+# FeeOracle
+############################################################
+#
+# clients is UTXOFaucet's network -> ElectrumClient map;
+# bounds maps a network to its registry params (fee_rate,
+# min_fee_rate, max_fee_rate — coins/coin_params()).
+#
+# Used by:
+#   - utxo_faucet.py — one instance, UTXOFaucet.fee_oracle
+############################################################
+
+class FeeOracle:
+
+
+
+
+
+
+    ############################################################
+    # __init__
+    ############################################################
+    #
+    # The cache: network -> (time.monotonic() of the fetch,
+    # entry dict). Replaced whole on every refresh, so readers
+    # need no lock.
+    #
+    # Used by:
+    #   - UTXOFaucet.__init__
+    ############################################################
+
+    def __init__(self, clients, bounds):
+        self.clients = clients
+        self.bounds = bounds
+        self._cache = {}
+        self._failing = set()
+        self._threads = []
+
+
+
+
+
+
+    ############################################################
+    # rate
+    ############################################################
+    #
+    # The sat/vB rate a payout pays — from the cache while it
+    # is younger than FEE_MAX_AGE_SECONDS, otherwise fetched
+    # (and cached) right here. When that fetch fails: the
+    # stale cached rate (settled against the bounds when it
+    # was fetched), else the registry's FEE_RATE clamped into
+    # them. A fallback is never cached — the next payout tries
+    # the server again.
+    #
+    # Used by:
+    #   - UTXOFaucet._create_and_broadcast_batch
+    ############################################################
+
+    def rate(self, network):
+        cached = self._cache.get(network)
+        if cached and time.monotonic() - cached[0] <= FEE_MAX_AGE_SECONDS:
+            return cached[1]['rate']
+
+        try:
+            return self.refresh(network)['rate']
+        except Exception as e:
+            if cached:
+                rate, source = cached[1]['rate'], 'the stale cached rate'
+            else:
+                bounds = self.bounds[network]
+                rate = min(max(bounds['fee_rate'], bounds['min_fee_rate']), bounds['max_fee_rate'])
+                source = 'the registry FEE_RATE'
+            logging.warning(f"[UTXO] {network} fee rate fetch failed, paying {source} of {rate} sat/vB: {e}")
+            return rate
+
+
+
+
+
+
+    ############################################################
+    # refresh
+    ############################################################
+    #
+    # Fetch one network's estimate and relay fee, settle the
+    # rate against the registry bounds, cache the entry.
+    #
+    # Used by:
+    #   - rate (above) — when the cache is stale
+    #   - _run (below) — the background refresh
+    #   - UTXOFaucet._warm_up_networks — primes the cache
+    ############################################################
+
+    def refresh(self, network):
+        bounds = self.bounds[network]
+        estimate, relay = self.clients[network].fee_estimates(FEE_TARGET_BLOCKS)
+
+        estimated = _sat_per_vbyte(estimate) if estimate and estimate > 0 else None
+        relay_rate = _sat_per_vbyte(relay) if relay and relay > 0 else 0
+
+        rate = estimated if estimated is not None else bounds['fee_rate']
+        rate = min(max(rate, bounds['min_fee_rate']), bounds['max_fee_rate'])
+        entry = {'rate': max(rate, relay_rate), 'estimate': estimated, 'relay': relay_rate}
+
+        self._cache[network] = (time.monotonic(), entry)
+        return entry
+
+
+
+
+
+
+    ############################################################
+    # start
+    ############################################################
+    #
+    # Starts one daemon refresher per network (once) — one
+    # slow server never delays the other chains' refreshes.
+    #
+    # Used by:
+    #   - UTXOFaucet._warm_up_networks — after the warmup
+    ############################################################
+
+    def start(self):
+        if self._threads:
+            return
+
+        for network in self.clients:
+            thread = threading.Thread(target=self._run, args=(network,), name=f'utxo-fee-{network}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # The refresher loop. A failing server is logged once when
+    # it starts failing and once when it recovers, not every
+    # FEE_REFRESH_SECONDS.
+    #
+    # Used by:
+    #   - start (above) — one thread per network
+    ############################################################
+
+    def _run(self, network):
+        while True:
+            time.sleep(FEE_REFRESH_SECONDS)
+            try:
+                self.refresh(network)
+            except Exception as e:
+                if network not in self._failing:
+                    self._failing.add(network)
+                    logging.warning(f"[UTXO] {network} fee rate refresh failing: {e}")
+                continue
+
+            if network in self._failing:
+                self._failing.discard(network)
+                logging.warning(f"[UTXO] {network} fee rate refresh recovered")
+
+
+
+
+
+
+    ############################################################
+    # snapshot
+    ############################################################
+    #
+    # Every network's cached rate, the estimate and relay fee
+    # it came from (sat/vB), the registry bounds, and the
+    # entry's age in seconds (None before the first fetch),
+    # plus whether it is past FEE_MAX_AGE_SECONDS — the debug
+    # payload.
+    #
+    # Used by:
+    #   - UTXOFaucet.get_fee_oracle
+    ############################################################
+
+    def snapshot(self):
+        now = time.monotonic()
+        networks = {}
+        for network in self.clients:
+            cached = self._cache.get(network)
+            bounds = self.bounds[network]
+            age = round(now - cached[0], 1) if cached else None
+            networks[network] = {
+                **(dict(cached[1]) if cached else {'rate': None, 'estimate': None, 'relay': None}),
+                'bounds': [bounds['min_fee_rate'], bounds['max_fee_rate']],
+                'fallback': bounds['fee_rate'],
+                'age_seconds': age,
+                'stale': age is None or age > FEE_MAX_AGE_SECONDS,
+            }
+        return networks
+
+
+
+
+
+
+
+
+############################################################
+# _sat_per_vbyte
+############################################################
+#
+# Coins per kilobyte (a JSON float) -> whole sat/vB, rounded
+# up. Through Decimal(str()) so 0.00001 is exactly 1, not
+# 1.0000000000000002 rounded up to 2.
+#
+# Used by:
+#   - FeeOracle.refresh (above)
+############################################################
+
+def _sat_per_vbyte(coins_per_kb) -> int:
+    return math.ceil(Decimal(str(coins_per_kb)) * SAT_VB_PER_COIN_KB)
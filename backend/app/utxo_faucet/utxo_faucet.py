@@ -6,7 +6,9 @@
 #  mainnet flavours. It talks directly to an Electrum server
 #  (ElectrumX) over SSL JSON-RPC — no local wallet files, no
 #  bitcoind RPC. The protocol work lives in electrum_client.py
-#  (ElectrumClient); this file holds the faucet logic.
+#  (ElectrumClient) and electrum_pool.py (ElectrumPool, one
+#  or more servers per network); this file holds the faucet
+#  logic.
 #
 #  How a payout works, end to end:
 #
@@ -20,12 +22,20 @@
 #       and every precise constant behind it — comes from the
 #       in-code coin registry (coins/), keyed by the config's
 #       coin + network flavour, resolved once at startup.
-#    2. UTXOs and balances are fetched from the Electrum
-#       server for that address' scripthash.
-#    3. A transaction is built with embit and signed by the
-#       dialect (BIP-143 witnesses vs legacy scriptSig).
+#    2. Balances are fetched from the Electrum server for
+#       that address' scripthash; the spendable UTXOs are
+#       kept in memory per network (utxo_set.py), loaded from
+#       and reconciled against the same server.
+#    3. Its inputs are picked from that set by coin selection
+#       (coin_selection.py: a changeless match when there is
+#       one, capped input counts), then the transaction is
+#       built with embit and signed by the dialect (BIP-143
+#       witnesses vs legacy scriptSig). The fee rate is the
+#       network's live Electrum estimate (fee_oracle.py),
+#       clamped by the coin registry, and the fee is charged
+#       on the signed transaction's exact vsize.
 #       ONE builder for every chain, KNF included — every
-#       format difference lives behind the dialect's five
+#       format difference lives behind the dialect's six
 #       methods, and embit takes network params as plain data
 #       instead of validating against a chain registry (the
 #       reason the previous engines needed a hand-rolled KNF
@@ -36,10 +46,18 @@
 #  Built for classroom load: every request still gets its own
 #  NetworkContext, but the heavy pieces behind it are shared
 #  and guarded — ONE long-lived, self-reconnecting
-#  ElectrumClient per network, a short-TTL cache for the
-#  polled faucet balance, and a per-network payout lock so two
-#  simultaneous claims can't select (and try to double-spend)
-#  the same UTXOs.
+#  ElectrumPool per network, a push-invalidated cache for
+#  the polled faucet balance (Electrum subscriptions), and a
+#  per-network payout lock so two simultaneous claims can't
+#  select (and try to double-spend) the same UTXOs. Claims
+#  arriving together are BATCHED: the network's payout worker
+#  collects them for a short window and pays them all with
+#  one transaction — many outputs, one change output, inputs
+#  reserved from the in-memory UTXO set, one broadcast round
+#  trip. All those change outputs (and the top-ups) are swept
+#  back together by a background consolidation job
+#  (consolidation.py) while the network is idle and fees are
+#  cheap.
 #
 #  Everything is prepared EAGERLY at startup — clients built,
 #  connections opened, balances pre-fetched — so a dead
@@ -55,6 +73,7 @@
 
 import os
 import time
+import contextlib
 import hashlib
 import logging
 import threading
@@ -63,15 +82,28 @@ from embit import ec as embit_ec
 from embit.transaction import Transaction, TransactionInput, TransactionOutput
 
 from .coins import coin_params
+from .coin_selection import CoinSelector, estimate_fee
+from .consolidation import (
+    Consolidator, sweep_inputs, split_outputs,
+    CONSOLIDATE_THRESHOLD_UTXOS, CONSOLIDATE_FEE_FACTOR, CONSOLIDATE_IDLE_SECONDS, CONSOLIDATE_INTO_OUTPUTS,
+)
 from .dialects import dialect_for
-from .electrum_client import ElectrumClient
-from ..cooldown import CooldownTable
+from .electrum_pool import ElectrumPool
+from .fanout import FanoutRefiller, pool_value, FANOUT_REFILL_BELOW, FANOUT_WORKERS
+from .fee_oracle import FeeOracle
+from .utxo_set import UtxoSet, outpoint
+from .. import shared_state
+from ..cooldown import cooldown_table
+from ..shared_state import SendLocks
+from ..payout_queue.payout_queue import PayoutQueue
 from ..icons import icon_url
 
 
-# How long a polled faucet balance is served from cache. The page
-# polls every few seconds per open browser tab; payouts drop the
-# cached entry, so a claim shows up immediately regardless.
+# How long a polled faucet balance is served from cache while the
+# network's Electrum subscription is DOWN. The page polls every few
+# seconds per open browser tab; payouts drop the cached entry, so a
+# claim shows up immediately regardless. While the subscription is
+# up, the entry lives until a push says the address changed.
 BALANCE_CACHE_TTL = 10
 
 # Seconds one address must wait between payouts on one network
@@ -82,6 +114,11 @@ COOLDOWN_SECONDS = 60
 # falls back to the lowest picker id instead.
 DEFAULT_NETWORK = 'btc4'
 
+# How long a network's payout worker keeps collecting claims
+# after the first one before it builds the batch transaction —
+# per network via the config's optional batch_window_ms
+BATCH_WINDOW_MS = 300
+
 
 
 
@@ -113,7 +150,7 @@ def _electrum_scripthash(script) -> str:
 #
 # Everything a single faucet request needs to know about the
 # network it operates on: the faucet identity plus pointers to
-# the network's SHARED pieces (the long-lived ElectrumClient).
+# the network's SHARED pieces (the long-lived ElectrumPool).
 # A fresh instance is still built per request — it's cheap,
 # and no request ever mutates another's view; everything
 # shared underneath carries its own lock.
@@ -147,9 +184,9 @@ class NetworkContext:
         self.script_pubkey = None   # the faucet's own script on this network (from the dialect)
         self.address = None         # faucet address on this network (bech32 or base58)
         self.scripthash = None      # Electrum scripthash of that script
-        self.electrum = None        # the network's SHARED ElectrumClient — never closed here
+        self.electrum = None        # the network's SHARED ElectrumPool — never closed here
         self.chunk_size_btc = None  # payout size for this network, in coins
-        self.fee_rate = None        # sat/vB — per-network config override or the global default
+        self.fee_rate = None        # sat/vB — the coin registry's; a payout replaces it with the fee oracle's
         self.dust_limit = None      # sats below which change is left to the miners
 
 
@@ -168,20 +205,31 @@ class NetworkContext:
 #
 #   setup       — __init__, _warm_up_networks
 #   keys        — _convert_ethereum_key_to_bitcoin,
-#                 _faucet_scripthash_for
+#                 _faucet_scripthash_for, _utxo_set_for
 #   resolution  — _setup_wallet_for_network
+#   cache       — _subscribe, _on_push, _invalidate,
+#                 _balance_trusted, _fetch_balance
 #   queries     — _faucet_balance
 #   building    — _estimate_fee,
-#                 _create_and_broadcast_transaction
+#                 _create_and_broadcast_transaction,
+#                 _create_and_broadcast_batch,
+#                 _signed_transaction
+#   payouts     — _send_batch
+#   fan-out     — _chunk_sat, _outside_pool, _send_from_pool,
+#                 _refill_pool
+#   upkeep      — _consolidate
 #   validation  — _validate_address
 #   public API  — get_networks, get_faucet_balance,
 #                 request_crypto
+#   debug       — get_fee_oracle, get_consolidation,
+#                 get_electrum
 #
-# All Electrum protocol work lives in electrum_client.py:
-# one long-lived, self-reconnecting ElectrumClient per
-# network, shared by every request. Payouts are serialized
-# per network and the polled faucet balance is cached for a
-# few seconds.
+# All Electrum protocol work lives in electrum_client.py
+# and electrum_pool.py: one long-lived, self-reconnecting
+# ElectrumPool per network, shared by every request.
+# Payouts are batched and serialized per network and the
+# polled faucet balance is cached until an Electrum push
+# says it changed.
 #
 # Used by:
 #   - utxo_routes.py — one shared instance for all handlers
@@ -200,7 +248,7 @@ class UTXOFaucet:
     #
     # EVERYTHING is prepared here, at startup: configuration,
     # the cooldown table, the faucet identity, and one
-    # ElectrumClient per configured network — then
+    # ElectrumPool per configured network — then
     # _warm_up_networks opens every connection and pre-fetches
     # every balance, so misconfiguration is visible in the
     # console immediately, not on the first student's claim.
@@ -224,8 +272,8 @@ class UTXOFaucet:
         # Per-(network, address) cooldown between payouts (matches
         # the EVM faucet's keying) — the slot is claimed atomically
         # before the payout work and released on failure (see
-        # app/cooldown.py for the in-memory trade-offs).
-        self.cooldowns = CooldownTable(COOLDOWN_SECONDS)
+        # app/cooldown.py for the backends and their trade-offs).
+        self.cooldowns = cooldown_table(COOLDOWN_SECONDS, 'utxo')
 
         # The faucet identity is the same KEY on every chain; how it
         # becomes a script and an address is each network's dialect's
@@ -257,29 +305,104 @@ class UTXOFaucet:
 
         # network_key -> the lock serializing that chain's payouts:
         # two concurrent claims would otherwise select the same UTXOs
-        # and race to double-spend them (the same discipline as
-        # EVMFaucet.send_lock, but per chain — different chains never
-        # contend).
-        self._send_locks = {}
+        # and race to double-spend them (per chain — different chains
+        # never contend; cross-process when SHARED_STATE_DIR is set).
+        self._send_locks = SendLocks('utxo')
+
+        # network_key -> the queue + worker thread that runs its
+        # payouts — see app/payout_queue/. The worker hands every
+        # claim that arrives within the network's batch window to
+        # _send_batch at once.
+        self._batch_windows = {
+            network_key: config.get('faucet', {}).get('batch_window_ms', BATCH_WINDOW_MS) / 1000
+            for network_key, config in self.network_configs.items()
+        }
+        self.payouts = PayoutQueue('utxo', batch_handler=self._send_batch, batch_windows=self._batch_windows)
 
         # network_key -> (unix time, balance dict) for the polled
         # faucet balance — see _faucet_balance. Pre-filled by the
-        # warmup below.
+        # warmup below. Every invalidation (a push, a payout) bumps
+        # the network's version, so a fetch that was in flight at
+        # the time never stores its stale answer; the lock makes
+        # the check-and-store and the bump-and-drop atomic.
         self._balance_cache = {}
-
-        # network_key -> its long-lived ElectrumClient. Built for
-        # EVERY configured network right here — nothing is lazy —
-        # then connected and warmed by _warm_up_networks, so a dead
-        # endpoint fails the console at startup instead of failing
-        # the first student.
+        self._cache_versions = {}
+        self._cache_lock = threading.Lock()
+
+        # network_key -> its long-lived ElectrumPool: the config's
+        # electrum_server plus its optional electrum_fallbacks, one
+        # client each, health-checked and failed over (see
+        # electrum_pool.py). Built for EVERY configured network
+        # right here — nothing is lazy — then connected and warmed
+        # by _warm_up_networks, so a dead endpoint fails the console
+        # at startup instead of failing the first student.
         self._electrum_clients = {}
         for network_key, config in self.network_configs.items():
-            self._electrum_clients[network_key] = ElectrumClient(
-                config.get('faucet', {}).get('electrum_server', ''),
+            faucet_config = config.get('faucet', {})
+            self._electrum_clients[network_key] = ElectrumPool(
+                [faucet_config.get('electrum_server', '')] + list(faucet_config.get('electrum_fallbacks') or []),
                 debug=self.app_debug,
                 label=network_key,
             )
 
+        # The payouts' fee rate per network: Electrum's estimate,
+        # cached and refreshed in the background, clamped by the coin
+        # registry's bounds (see fee_oracle.py)
+        self.fee_oracle = FeeOracle(self._electrum_clients, self._coin_params)
+
+        # network_key -> its in-memory UTXO set (utxo_set.py): payouts
+        # reserve their inputs from it instead of asking listunspent,
+        # and it reconciles with Electrum in the background. Networks
+        # without a faucet key never load theirs.
+        self._utxo_sets = {
+            network_key: self._utxo_set_for(network_key)
+            for network_key in self.network_configs
+        }
+
+        # network_key -> (UTXO threshold, max sat/vB) of its
+        # consolidation job (see consolidation.py) — the config's
+        # optional consolidate_above_utxos / consolidate_max_fee_rate,
+        # else the defaults. A threshold of 0 leaves the network out.
+        # _last_payouts holds each network's last payout time
+        # (time.monotonic()): sweeps wait for an idle network.
+        self._consolidation = {}
+        for network_key, config in self.network_configs.items():
+            faucet_config = config.get('faucet', {})
+            threshold = faucet_config.get('consolidate_above_utxos')
+            max_fee_rate = faucet_config.get('consolidate_max_fee_rate')
+            self._consolidation[network_key] = (
+                CONSOLIDATE_THRESHOLD_UTXOS if threshold is None else threshold,
+                max_fee_rate or self._coin_params[network_key]['min_fee_rate'] * CONSOLIDATE_FEE_FACTOR,
+            )
+        self._last_payouts = {}
+        self.consolidator = Consolidator(
+            self._consolidate,
+            [network_key for network_key, (threshold, _) in self._consolidation.items() if threshold],
+        )
+
+        # network_key -> its fan-out pool target (see fanout.py) —
+        # the config's optional fanout_pool_size; 0 (the default)
+        # keeps the network on batched payouts only. Fan-out
+        # networks' claims run on their own queue, FANOUT_WORKERS
+        # side by side, and a background refiller keeps the pool
+        # topped up.
+        self._fanout_sizes = {
+            network_key: config.get('faucet', {}).get('fanout_pool_size') or 0
+            for network_key, config in self.network_configs.items()
+        }
+        # network_key -> the outpoints of its pool coins, recorded
+        # from each split's outputs as it is broadcast — a coin is
+        # a pool coin because this process split it, never because
+        # of its value. Per process: a pool coin this process does
+        # not know (split by another worker, or before a restart)
+        # is an ordinary coin to it.
+        self._pool_coins = {network_key: set() for network_key in self._fanout_sizes}
+        self.fanout_payouts = PayoutQueue('utxo-fanout', workers=FANOUT_WORKERS)
+        self.fanout_refiller = FanoutRefiller(
+            self._refill_pool,
+            [network_key for network_key, size in self._fanout_sizes.items() if size],
+        )
+
         self._warm_up_networks()
 
 
@@ -293,11 +416,20 @@ class UTXOFaucet:
     #
     # The startup warmup, one thread per network so the
     # slowest server bounds the wall time: open every Electrum
-    # connection and fetch the faucet balance (which also
-    # primes the balance cache — the first page load answers
-    # instantly). Success and failure both go to the console.
-    # A failed network deliberately does NOT raise: the rest
-    # of the backend (EVM faucets included) keeps serving, and
+    # connection, prime the fee oracle (its refreshers and the
+    # consolidation job start once every network is through),
+    # subscribe to the faucet address and the chain tip, and
+    # fetch the faucet balance (which also primes the balance
+    # cache — the first page load answers instantly), then
+    # load the UTXO set and start its background reconciler.
+    # Subscribing comes FIRST, so no change can slip in
+    # between the fetch and the first push. A server that
+    # refuses the subscriptions only costs the cache its
+    # longevity — the balance falls back to TTL polling. Once
+    # every network is through, the pools' health checks start
+    # too. Success and failure both go to the console. A
+    # failed network deliberately does NOT raise: the rest of
+    # the backend (EVM faucets included) keeps serving, and
     # the failed client reconnects by itself on first use.
     #
     # Used by:
@@ -310,15 +442,36 @@ class UTXOFaucet:
             try:
                 client.connect()
 
+                try:
+                    self.fee_oracle.refresh(network_key)
+                except Exception as e:
+                    logging.warning(f"[UTXO] {network_key} no fee estimate yet, payouts will fetch one: {e}")
+
                 scripthash = self._faucet_scripthash_for(network_key)
                 if scripthash:
-                    balance = client.get_balance(scripthash)
-                    self._balance_cache[network_key] = (int(time.time()), balance)
+                    try:
+                        self._subscribe(network_key, client, scripthash)
+                    except Exception as e:
+                        logging.warning(f"[UTXO] {network_key} Electrum subscriptions unavailable, "
+                                        f"polling the balance every {BALANCE_CACHE_TTL}s instead: {e}")
+
+                    balance = self._fetch_balance(network_key, client, scripthash)
+
+                    utxo_set = self._utxo_sets[network_key]
+                    utxo_set.refresh()
+                    utxo_set.start()
+
+                    if self._fanout_sizes[network_key]:
+                        try:
+                            self.fanout_refiller.run_once(network_key)
+                        except Exception as e:
+                            logging.warning(f"[UTXO] {network_key} fan-out pool not filled, "
+                                            f"payouts are batched until it is: {e}")
                     print(f"[UTXO] {network_key} ready — faucet balance {balance['confirmed']} confirmed")
                 else:
                     print(f"[UTXO] {network_key} connected — but NO FAUCET KEY is configured, payouts will fail")
             except Exception:
-                logging.exception(f"[UTXO] {network_key} FAILED to warm up (endpoint: {client.host}:{client.port})")
+                logging.exception(f"[UTXO] {network_key} FAILED to warm up (endpoints: {', '.join(client.endpoints)})")
 
         threads = [
             threading.Thread(target=warm, args=(key, client), name=f'utxo-warmup-{key}')
@@ -329,6 +482,12 @@ class UTXOFaucet:
         for thread in threads:
             thread.join()
 
+        self.fee_oracle.start()
+        self.consolidator.start()
+        self.fanout_refiller.start()
+        for client in self._electrum_clients.values():
+            client.start()
+
 
 
 
@@ -372,6 +531,7 @@ class UTXOFaucet:
     #
     # Used by:
     #   - _warm_up_networks (above)
+    #   - _utxo_set_for (below)
     ############################################################
 
     def _faucet_scripthash_for(self, network_key: str):
@@ -386,6 +546,38 @@ class UTXOFaucet:
 
 
 
+    ############################################################
+    # _utxo_set_for
+    ############################################################
+    #
+    # The network's UtxoSet, wired to its Electrum client:
+    # fetch is the faucet's listunspent, pushed is the
+    # scripthash subscription being live. Both look the
+    # client up when called, not when built.
+    #
+    # Used by:
+    #   - __init__ (above)
+    ############################################################
+
+    def _utxo_set_for(self, network_key: str) -> UtxoSet:
+        client = self._electrum_clients[network_key]
+        scripthash = self._faucet_scripthash_for(network_key)
+
+        def fetch():
+            if not scripthash:
+                raise ValueError('Faucet private key not configured')
+            return client.list_unspent(scripthash)
+
+        def pushed():
+            return bool(scripthash) and client.subscribed("blockchain.scripthash.subscribe", [scripthash])
+
+        return UtxoSet(fetch, pushed, label=network_key)
+
+
+
+
+
+
     ############################################################
     # _setup_wallet_for_network
     ############################################################
@@ -393,11 +585,11 @@ class UTXOFaucet:
     # Builds the per-request NetworkContext: resolves the
     # network and points the context at the SHARED pieces —
     # the pre-derived faucet identity and the network's
-    # long-lived ElectrumClient (created on first use; it
+    # long-lived ElectrumPool (created at startup; it
     # connects itself lazily inside request()).
     #
     # Used by:
-    #   - get_faucet_balance / request_crypto (below)
+    #   - get_faucet_balance / request_crypto / _send_batch (below)
     ############################################################
 
     def _setup_wallet_for_network(self, network_key: str) -> NetworkContext:
@@ -451,30 +643,150 @@ class UTXOFaucet:
 
 
 
+    ############################################################
+    # _subscribe
+    ############################################################
+    #
+    # Subscribes the network's client to the faucet's
+    # scripthash (its status changes with every transaction
+    # touching the address, mempool or confirmed) and to the
+    # chain tip (a new block is when unconfirmed coins become
+    # spendable). Either push invalidates the cached balance
+    # and wakes the UTXO set's reconciler — the callbacks run
+    # on the client's reader thread and must not call
+    # Electrum themselves.
+    #
+    # Used by:
+    #   - _warm_up_networks (above)
+    ############################################################
+
+    def _subscribe(self, network_key: str, client: ElectrumPool, scripthash: str):
+        client.subscribe("blockchain.scripthash.subscribe", [scripthash],
+                         lambda status: self._on_push(network_key))
+        client.subscribe("blockchain.headers.subscribe", [],
+                         lambda header: self._on_push(network_key))
+
+
+
+
+
+
+    ############################################################
+    # _on_push
+    ############################################################
+    #
+    # Something changed on the network: drop the cached
+    # balance and wake the UTXO set's reconciler. Runs on the
+    # Electrum reader thread — both are instant.
+    #
+    # Used by:
+    #   - _subscribe (above) — every push
+    ############################################################
+
+    def _on_push(self, network_key: str):
+        self._invalidate(network_key)
+        self._utxo_sets[network_key].wake()
+
+
+
+
+
+
+    ############################################################
+    # _invalidate
+    ############################################################
+    #
+    # Drops the network's cached balance and bumps its
+    # version, so a fetch already in flight can't store its
+    # now-stale answer.
+    #
+    # Used by:
+    #   - _on_push (above)
+    #   - _send_batch (below) — after a payout
+    ############################################################
+
+    def _invalidate(self, network_key: str):
+        with self._cache_lock:
+            self._cache_versions[network_key] = self._cache_versions.get(network_key, 0) + 1
+            self._balance_cache.pop(network_key, None)
+
+
+
+
+
+
+    ############################################################
+    # _balance_trusted
+    ############################################################
+    #
+    # May a cached balance fetched at fetched_at be served?
+    # Always while the network's scripthash subscription is
+    # live — a change would have been pushed and dropped the
+    # entry — otherwise for BALANCE_CACHE_TTL seconds.
+    #
+    # Used by:
+    #   - _faucet_balance (below)
+    ############################################################
+
+    def _balance_trusted(self, ctx: NetworkContext, fetched_at: int) -> bool:
+        if ctx.electrum.subscribed("blockchain.scripthash.subscribe", [ctx.scripthash]):
+            return True
+        return int(time.time()) - fetched_at < BALANCE_CACHE_TTL
+
+
+
+
+
+
+    ############################################################
+    # _fetch_balance
+    ############################################################
+    #
+    # One get_balance round trip, stored in the cache unless
+    # the network was invalidated while it was in flight.
+    #
+    # Used by:
+    #   - _warm_up_networks (above)
+    #   - _faucet_balance (below)
+    ############################################################
+
+    def _fetch_balance(self, network_key: str, client: ElectrumPool, scripthash: str) -> dict:
+        version = self._cache_versions.get(network_key, 0)
+        balance_info = client.get_balance(scripthash)
+
+        with self._cache_lock:
+            if self._cache_versions.get(network_key, 0) == version:
+                self._balance_cache[network_key] = (int(time.time()), balance_info)
+        return balance_info
+
+
+
+
+
+
     ############################################################
     # _faucet_balance
     ############################################################
     #
-    # The faucet's balance on one chain, cached for
-    # BALANCE_CACHE_TTL seconds — the frontend polls it every
+    # The faucet's balance on one chain, from the cache while
+    # _balance_trusted says so — the frontend polls it every
     # few seconds per open browser tab, and a classroom of
     # open tabs would otherwise turn every poll into an
-    # Electrum round trip. request_crypto drops the entry
-    # after a payout, so the next poll shows the new number
-    # immediately.
+    # Electrum round trip. With the subscription up an idle
+    # network costs no polls at all. _send_batch drops the
+    # entry after a payout, so the next poll shows the new
+    # number immediately.
     #
     # Used by:
-    #   - get_faucet_balance / request_crypto (below)
+    #   - get_faucet_balance / _send_batch (below)
     ############################################################
 
     def _faucet_balance(self, ctx: NetworkContext) -> dict:
         cached = self._balance_cache.get(ctx.network_key)
-        if cached and int(time.time()) - cached[0] < BALANCE_CACHE_TTL:
+        if cached and self._balance_trusted(ctx, cached[0]):
             return cached[1]
 
-        balance_info = ctx.electrum.get_balance(ctx.scripthash)
-        self._balance_cache[ctx.network_key] = (int(time.time()), balance_info)
-        return balance_info
+        return self._fetch_balance(ctx.network_key, ctx.electrum, ctx.scripthash)
 
 
 
@@ -485,20 +797,17 @@ class UTXOFaucet:
     # _estimate_fee
     ############################################################
     #
-    # Conservative size estimate times the network's sat/vB
-    # rate. The per-input/per-output sizes are the dialect's
-    # constants (SegWit ~91/31 vbytes, legacy ~148/34 bytes);
-    # the rate comes from the context — legacy chains like
-    # Dogecoin need ~100x Bitcoin's rate to clear their relay
-    # minimums.
+    # coin_selection.estimate_fee at the network's sat/vB rate,
+    # with the dialect's per-input/per-output sizes. The rate
+    # comes from the context — legacy chains like Dogecoin need
+    # ~100x Bitcoin's rate to clear their relay minimums.
     #
     # Used by:
-    #   - _create_and_broadcast_transaction (below)
+    #   - tests/test_utxo_engine.py
     ############################################################
 
     def _estimate_fee(self, ctx: NetworkContext, num_inputs: int, num_outputs: int) -> int:
-        estimated_size = (num_inputs * ctx.dialect.INPUT_SIZE) + (num_outputs * ctx.dialect.OUTPUT_SIZE) + 10
-        return estimated_size * ctx.fee_rate
+        return estimate_fee(ctx.dialect, ctx.fee_rate, num_inputs, num_outputs)
 
 
 
@@ -509,61 +818,166 @@ class UTXOFaucet:
     # _create_and_broadcast_transaction
     ############################################################
     #
-    # Builds, signs and broadcasts a payout with embit: ONE
-    # code path for every chain. Every format difference — how
-    # a recipient address becomes a scriptPubKey, which sighash
+    # A single payout — the one-recipient batch, byte for byte
+    # what the faucet built before batching existed.
+    #
+    # Used by:
+    #   - tests/test_utxo_engine.py
+    ############################################################
+
+    def _create_and_broadcast_transaction(self, ctx: NetworkContext, to_address: str, amount_sat: int) -> str:
+        return self._create_and_broadcast_batch(ctx, [(to_address, amount_sat)])
+
+
+
+
+
+
+    ############################################################
+    # _create_and_broadcast_batch
+    ############################################################
+    #
+    # Builds, signs and broadcasts ONE transaction paying every
+    # (to_address, amount_sat) in payouts, with embit: ONE code
+    # path for every chain. Every format difference — how a
+    # recipient address becomes a scriptPubKey, which sighash
     # and unlocking format sign the inputs, the transaction
     # version — is the dialect's answer, not a branch here.
-    # Signatures use deterministic RFC-6979 nonces.
+    # Signatures use deterministic RFC-6979 nonces. Outputs are
+    # the recipients in order, then the change. Inputs come
+    # from, and the spend goes back to, the network's UTXO set.
+    # pool_split marks a fan-out refill: its recipient outputs
+    # become the network's pool coins.
     #
     # Used by:
-    #   - request_crypto (below)
+    #   - _send_batch (below)
+    #   - _create_and_broadcast_transaction (above)
+    #   - _refill_pool (below) — with pool_split
     ############################################################
 
-    def _create_and_broadcast_transaction(self, ctx: NetworkContext, to_address: str, amount_sat: int) -> str:
-        # STEP 1: what can we spend?
-        # ==========================
-        utxos = ctx.electrum.list_unspent(ctx.scripthash)
-        if not utxos:
-            raise ValueError("No UTXOs available")
-
-
-        # STEP 2: greedy coin selection — the target includes the fee
-        # for the inputs selected so far, so the change can never go
-        # negative.
-        # ===========================================================
-        selected_utxos = []
-        total_input = 0
-        for utxo in utxos:
-            selected_utxos.append(utxo)
-            total_input += utxo['value']
-            if total_input >= amount_sat + self._estimate_fee(ctx, len(selected_utxos), 2):
-                break
-
-        fee = self._estimate_fee(ctx, len(selected_utxos), 2)
-        if total_input < amount_sat + fee:
-            raise ValueError("Insufficient funds")
-
-        change = total_input - amount_sat - fee
-
-
-        # STEP 3: outputs. The dialect decodes the recipient (full
-        # checksum check) into this chain's scriptPubKey flavour and
-        # raises ValueError on anything that isn't valid here.
-        # ===========================================================
-        to_script = ctx.dialect.recipient_script(to_address)
-
-        outputs = [TransactionOutput(amount_sat, to_script)]
-        if change > ctx.dust_limit:
+    def _create_and_broadcast_batch(self, ctx: NetworkContext, payouts: list, pool_split: bool = False) -> str:
+        # STEP 1: what can we spend? The network's in-memory UTXO
+        # set — no round trip, unless it is stale (never loaded, or
+        # the last payout failed) or several worker processes pay
+        # from this wallet (another worker's spends are only known
+        # to Electrum): then it reloads first.
+        # ==========================================================
+        utxo_set = self._utxo_sets[ctx.network_key]
+        reloaded = utxo_set.stale or bool(shared_state.SHARED_STATE_DIR)
+        if reloaded:
+            utxo_set.refresh()
+
+
+        # STEP 2: coin selection (coin_selection.py) at the fee
+        # oracle's current rate — a changeless match if branch and
+        # bound finds one, else the fallbacks, never more than the
+        # input cap, never a fan-out pool coin (those pay single
+        # claims, see fanout.py). The chosen inputs are RESERVED
+        # in the set as they are chosen; a shortfall reloads the
+        # set once (a top-up the background reconcile has not
+        # picked up yet) before giving up.
+        # ==========================================================
+        ctx.fee_rate = self.fee_oracle.rate(ctx.network_key)
+        total_amount = sum(amount_sat for _, amount_sat in payouts)
+        selector = CoinSelector(ctx.dialect, ctx.fee_rate, ctx.dust_limit)
+
+        def choose(utxos):
+            return selector.select(self._outside_pool(ctx, utxos), total_amount, len(payouts))
+
+        try:
+            selected_utxos = utxo_set.reserve(choose)
+        except ValueError:
+            if reloaded:
+                raise
+            utxo_set.refresh()
+            selected_utxos = utxo_set.reserve(choose)
+
+        try:
+            _, change = selector.settle(selected_utxos, total_amount, len(payouts))
+
+
+            # STEP 3: recipients. The dialect decodes each one (full
+            # checksum check) into this chain's scriptPubKey flavour and
+            # raises ValueError on anything that isn't valid here.
+            # ===========================================================
+            recipients = [
+                TransactionOutput(amount_sat, ctx.dialect.recipient_script(to_address))
+                for to_address, amount_sat in payouts
+            ]
+
+
+            # STEP 4: build and sign at the selection's size estimate.
+            # =========================================================
+            tx = self._signed_transaction(ctx, selected_utxos, recipients, change)
+
+
+            # STEP 5: the exact fee. With a change output, the fee is
+            # re-priced on the signed transaction's vsize (the dialect's
+            # count) and the transaction re-signed with the difference
+            # back in the change — the estimate's per-input allowance is
+            # generous. A changeless transaction stays as it is: the
+            # estimate plus the excess already cover its exact size.
+            # ===========================================================
+            if change:
+                total_input = sum(utxo['value'] for utxo in selected_utxos)
+                change = total_input - total_amount - ctx.dialect.signed_vsize(tx) * ctx.fee_rate
+                if change <= ctx.dust_limit:
+                    change = 0
+                tx = self._signed_transaction(ctx, selected_utxos, recipients, change)
+
+
+            # STEP 6: broadcast over the same Electrum connection.
+            # ====================================================
+            tx_id = ctx.electrum.request("blockchain.transaction.broadcast", [tx.serialize().hex()])
+        except Exception:
+            utxo_set.release(selected_utxos)
+            raise
+
+
+        # STEP 7: the set learns the spend at once — the inputs
+        # leave it, every output back to the faucet (the change,
+        # always last, and a fan-out split's pool coins) joins it
+        # under the txid computed here, so the very next payout can
+        # spend it. A split's payout outputs — every output before
+        # the change — are recorded as pool coins first.
+        # =========================================================
+        txid = tx.txid().hex()
+        if pool_split:
+            self._pool_coins[ctx.network_key].update((txid, vout) for vout in range(len(payouts)))
+        own_outputs = [
+            (vout, output.value) for vout, output in enumerate(tx.vout)
+            if output.script_pubkey == ctx.script_pubkey
+        ]
+        utxo_set.spend(selected_utxos, txid, own_outputs)
+        return tx_id
+
+
+
+
+
+
+    ############################################################
+    # _signed_transaction
+    ############################################################
+    #
+    # The transaction spending selected_utxos to the recipient
+    # outputs, plus a change output back to the faucet when
+    # change is non-zero, signed. Electrum reports tx_hash in
+    # display order — the wire format wants it reversed. The
+    # dialect owns the transaction version and signs each
+    # input in place (BIP-143 witness or legacy scriptSig).
+    #
+    # Used by:
+    #   - _create_and_broadcast_batch (above) — once at the
+    #     estimate, once more at the exact fee
+    ############################################################
+
+    def _signed_transaction(self, ctx: NetworkContext, selected_utxos: list, recipients: list, change: int):
+        outputs = list(recipients)
+        if change:
             outputs.append(TransactionOutput(change, ctx.script_pubkey))
         # sub-dust change is simply left to the miners as extra fee
 
-
-        # STEP 4: build and sign. Electrum reports tx_hash in display
-        # order — the wire format wants it reversed. The dialect owns
-        # the transaction version and signs each input in place
-        # (BIP-143 witness or legacy scriptSig).
-        # ===========================================================
         tx = Transaction(
             version=ctx.dialect.TX_VERSION,
             vin=[TransactionInput(bytes.fromhex(u['tx_hash'])[::-1], u['tx_pos']) for u in selected_utxos],
@@ -573,11 +987,352 @@ class UTXOFaucet:
 
         for i, utxo in enumerate(selected_utxos):
             ctx.dialect.sign_input(tx, i, ctx.key, ctx.script_pubkey, utxo['value'])
+        return tx
+
 
 
-        # STEP 5: broadcast over the same Electrum connection.
-        # ====================================================
-        return ctx.electrum.request("blockchain.transaction.broadcast", [tx.serialize().hex()])
+
+
+
+    ############################################################
+    # _send_batch
+    ############################################################
+    #
+    # The payout worker's batch handler: pays every claim the
+    # batch window collected with one transaction and answers
+    # each with its own (payload, http_status) — all successes
+    # share the txid. A claim is dropped from the batch (its
+    # cooldown slot released) when its address does not decode
+    # or the confirmed balance cannot cover it too; a failed
+    # build or broadcast fails, and releases, every claim in it.
+    #
+    # Used by:
+    #   - PayoutQueue — as the UTXO queue's batch_handler
+    #   - _send_from_pool (below) — a claim the pool can't pay
+    ############################################################
+
+    def _send_batch(self, network_key: str, claims: list) -> list:
+        results = [None] * len(claims)
+        self._last_payouts[network_key] = time.monotonic()
+
+        def fail(index, result):
+            self.cooldowns.release(claims[index]['cooldown_key'])
+            results[index] = result
+
+        try:
+            ctx = self._setup_wallet_for_network(network_key)
+
+
+            # STEP 1: does the faucet have the coins? Only confirmed
+            # balance counts — unconfirmed change can't be re-spent on
+            # every chain config. The cached balance is fine here: the
+            # UTXO selection inside the payout checks for real. Claims
+            # are covered in arrival order; the ones the balance can't
+            # cover any more answer 503.
+            # ========================================================
+            balance_info = self._faucet_balance(ctx)
+            available = balance_info["confirmed"]  # only spend confirmed coins
+
+            batch = []
+            for index, claim in enumerate(claims):
+                try:
+                    ctx.dialect.recipient_script(claim['to_address'])
+                except Exception as e:
+                    fail(index, ({"error": "Nepavyko išsiųsti kriptovaliutą", "details": str(e)}, 500))
+                    continue
+
+                if available < ctx.chunk_size_btc:
+                    fail(index, ({"error": "Čiaupas nebeturi kriptovaliutos. Praneškite dėstytojui."}, 503))
+                    continue
+
+                available -= ctx.chunk_size_btc
+                batch.append(index)
+
+            if not batch:
+                return results
+
+
+            # STEP 2: build, sign and broadcast ONE transaction for the
+            # whole batch — serialized per network, or a concurrent
+            # payout from another worker process would select the same
+            # UTXOs and race to double-spend them. On success the
+            # cached balance is dropped so the page shows the payout
+            # on its next poll.
+            # ========================================================
+            amount_sat = int(float(ctx.chunk_size_btc) * 1e8)
+            with self._send_locks.for_network(network_key):
+                tx_id = self._create_and_broadcast_batch(
+                    ctx, [(claims[index]['to_address'], amount_sat) for index in batch])
+        except Exception as e:
+            for index, result in enumerate(results):
+                if result is None:
+                    fail(index, ({"error": "Nepavyko išsiųsti kriptovaliutą", "details": str(e)}, 500))
+            return results
+
+        self._invalidate(network_key)
+
+        for index in batch:
+            results[index] = ({
+                "message": "Cryptocurrency sent successfully",
+                "transaction_id": tx_id,
+                "amount": float(ctx.chunk_size_btc),
+                "from_address": ctx.address,
+                "network": ctx.network_key,
+                "batch_size": len(batch),
+            }, 200)
+
+        return results
+
+
+
+
+
+
+    ############################################################
+    # _chunk_sat / _outside_pool
+    ############################################################
+    #
+    # _chunk_sat is a network's chunk in satoshis.
+    # _outside_pool drops the pool coins (by outpoint) from a
+    # list of UTXOs, so batches, splits and sweeps never spend
+    # them; on other networks it returns the list as it is.
+    #
+    # Used by:
+    #   - _create_and_broadcast_batch / _consolidate (above) —
+    #     in their choose()
+    #   - _send_from_pool / _refill_pool (below)
+    ############################################################
+
+    def _chunk_sat(self, ctx: NetworkContext) -> int:
+        return int(float(ctx.chunk_size_btc) * 1e8)
+
+    def _outside_pool(self, ctx: NetworkContext, utxos: list) -> list:
+        pool = self._pool_coins.get(ctx.network_key)
+        if not pool:
+            return utxos
+        return [utxo for utxo in utxos if outpoint(utxo) not in pool]
+
+
+
+
+
+
+    ############################################################
+    # _send_from_pool
+    ############################################################
+    #
+    # A fan-out network's claim (the job its pool workers
+    # run): claims the smallest confirmed pool coin worth at
+    # least the chunk plus its fee at the fee oracle's current
+    # rate and pays it out in a 1-in/1-out transaction — the
+    # chunk to the recipient, the rest is fee. No payout lock:
+    # the UTXO set's reservation alone keeps two workers off
+    # the same coin. With several worker processes
+    # (SHARED_STATE_DIR) the reservation is per process, so
+    # the claim takes the lock and a fresh set after all. A
+    # claim the pool cannot pay (empty, still unconfirmed, or
+    # fees rose past its coins) takes the batched path
+    # instead. Answers like one claim of _send_batch.
+    #
+    # Used by:
+    #   - request_crypto (below) — through self.fanout_payouts
+    ############################################################
+
+    def _send_from_pool(self, network_key: str, claim: dict) -> tuple:
+        self._last_payouts[network_key] = time.monotonic()
+        self.fanout_refiller.wake(network_key)
+
+        try:
+            ctx = self._setup_wallet_for_network(network_key)
+            chunk_sat = self._chunk_sat(ctx)
+            recipient = TransactionOutput(chunk_sat, ctx.dialect.recipient_script(claim['to_address']))
+
+            ctx.fee_rate = self.fee_oracle.rate(network_key)
+            lowest = pool_value(ctx.dialect, chunk_sat, ctx.fee_rate)
+            pool = self._pool_coins[network_key]
+
+            def choose(utxos):
+                coins = [
+                    utxo for utxo in utxos
+                    if outpoint(utxo) in pool and utxo['value'] >= lowest and utxo.get('height', 0) > 0
+                ]
+                return [min(coins, key=lambda utxo: utxo['value'])] if coins else []
+
+            shared = bool(shared_state.SHARED_STATE_DIR)
+            utxo_set = self._utxo_sets[network_key]
+            with self._send_locks.for_network(network_key) if shared else contextlib.nullcontext():
+                if utxo_set.stale or shared:
+                    utxo_set.refresh()
+                selected_utxos = utxo_set.reserve(choose)
+                if selected_utxos:
+                    try:
+                        tx = self._signed_transaction(ctx, selected_utxos, [recipient], 0)
+                        tx_id = ctx.electrum.request("blockchain.transaction.broadcast", [tx.serialize().hex()])
+                    except Exception:
+                        utxo_set.release(selected_utxos)
+                        raise
+                    utxo_set.spend(selected_utxos, tx.txid().hex())
+                    pool.discard(outpoint(selected_utxos[0]))
+        except Exception as e:
+            self.cooldowns.release(claim['cooldown_key'])
+            return {"error": "Nepavyko išsiųsti kriptovaliutą", "details": str(e)}, 500
+
+        if not selected_utxos:
+            return self._send_batch(network_key, [claim])[0]
+
+        self._invalidate(network_key)
+        return {
+            "message": "Cryptocurrency sent successfully",
+            "transaction_id": tx_id,
+            "amount": float(ctx.chunk_size_btc),
+            "from_address": ctx.address,
+            "network": ctx.network_key,
+            "batch_size": 1,
+        }, 200
+
+
+
+
+
+
+    ############################################################
+    # _refill_pool
+    ############################################################
+    #
+    # Tops a fan-out network's pool back up to its target once
+    # fewer than FANOUT_REFILL_BELOW of it are left: one batch
+    # payout to the faucet's own address, an output per missing
+    # pool coin, priced at the current rate — its outputs join
+    # the UTXO set, and their outpoints the pool, right away.
+    # Pool coins that left the set some other way are
+    # forgotten first. Returns the report (pool coins before,
+    # added, transaction_id) or None.
+    #
+    # Used by:
+    #   - FanoutRefiller — as its refill(), from the network's
+    #     refiller thread and the warmup
+    ############################################################
+
+    def _refill_pool(self, network_key: str):
+        size = self._fanout_sizes[network_key]
+        ctx = self._setup_wallet_for_network(network_key)
+        lowest = pool_value(ctx.dialect, self._chunk_sat(ctx), self.fee_oracle.rate(network_key))
+
+        utxo_set = self._utxo_sets[network_key]
+        pool = self._pool_coins[network_key]
+        with self._send_locks.for_network(network_key):
+            if utxo_set.stale or shared_state.SHARED_STATE_DIR:
+                utxo_set.refresh()
+            pool.intersection_update([point for point in list(pool) if point in utxo_set])
+            before = sum(1 for utxo in utxo_set.available() if outpoint(utxo) in pool and utxo['value'] >= lowest)
+            if before >= size * FANOUT_REFILL_BELOW:
+                return None
+
+            tx_id = self._create_and_broadcast_batch(ctx, [(ctx.address, lowest)] * (size - before), pool_split=True)
+
+        self._invalidate(network_key)
+        return {"before": before, "added": size - before, "transaction_id": tx_id}
+
+
+
+
+
+
+    ############################################################
+    # _consolidate
+    ############################################################
+    #
+    # One consolidation check on one network (consolidation.py
+    # has the rules): None when the network is busy, fees are
+    # not cheap, or the wallet is not fragmented; otherwise it
+    # sweeps the smallest coins into a few outputs back to the
+    # faucet and returns the report — UTXO counts before and
+    # after, inputs, outputs, fee, transaction_id. The sweep
+    # holds the payout lock and goes through the UTXO set
+    # exactly like a payout: reserve, spend, or release on
+    # failure.
+    #
+    # Used by:
+    #   - Consolidator — as its sweep(), from the network's
+    #     consolidation thread
+    ############################################################
+
+    def _consolidate(self, network_key: str):
+        threshold, max_fee_rate = self._consolidation[network_key]
+        if time.monotonic() - self._last_payouts.get(network_key, float('-inf')) < CONSOLIDATE_IDLE_SECONDS:
+            return None
+
+        ctx = self._setup_wallet_for_network(network_key)
+        ctx.fee_rate = self.fee_oracle.rate(network_key)
+        if ctx.fee_rate > max_fee_rate:
+            return None
+
+        utxo_set = self._utxo_sets[network_key]
+        with self._send_locks.for_network(network_key):
+
+
+            # STEP 1: is the wallet fragmented? Counted on a fresh
+            # set when it is stale or another worker process may
+            # have swept it already.
+            # ====================================================
+            if utxo_set.stale or shared_state.SHARED_STATE_DIR:
+                utxo_set.refresh()
+            before = len(utxo_set)
+            if before <= threshold:
+                return None
+
+
+            # STEP 2: reserve the smallest usable coins and split
+            # their total, less the estimated fee, into the outputs.
+            # ======================================================
+            selected_utxos = utxo_set.reserve(
+                lambda utxos: sweep_inputs(self._outside_pool(ctx, utxos), ctx.dialect, ctx.fee_rate))
+            if not selected_utxos:
+                return None
+
+            try:
+                total_input = sum(utxo['value'] for utxo in selected_utxos)
+                fee = estimate_fee(ctx.dialect, ctx.fee_rate, len(selected_utxos), CONSOLIDATE_INTO_OUTPUTS)
+                values = split_outputs(total_input - fee, CONSOLIDATE_INTO_OUTPUTS, ctx.dust_limit)
+                if not values:
+                    raise ValueError("Consolidation would leave only dust")
+
+
+                # STEP 3: build and sign, then re-price on the signed
+                # vsize and re-sign — the payout's exact fee (see
+                # _create_and_broadcast_batch).
+                # =====================================================
+                def signed(values):
+                    outputs = [TransactionOutput(value, ctx.script_pubkey) for value in values]
+                    return self._signed_transaction(ctx, selected_utxos, outputs, 0)
+
+                tx = signed(values)
+                fee = ctx.dialect.signed_vsize(tx) * ctx.fee_rate
+                values = split_outputs(total_input - fee, len(values), ctx.dust_limit)
+                if not values:
+                    raise ValueError("Consolidation would leave only dust")
+                tx = signed(values)
+
+
+                # STEP 4: broadcast.
+                # ==================
+                tx_id = ctx.electrum.request("blockchain.transaction.broadcast", [tx.serialize().hex()])
+            except Exception:
+                utxo_set.release(selected_utxos)
+                raise
+
+            utxo_set.spend(selected_utxos, tx.txid().hex(), list(enumerate(values)))
+
+        self._invalidate(network_key)
+        return {
+            "before": before,
+            "after": len(utxo_set),
+            "inputs": len(selected_utxos),
+            "outputs": len(values),
+            "fee": total_input - sum(values),
+            "fee_rate": ctx.fee_rate,
+            "transaction_id": tx_id,
+        }
 
 
 
@@ -690,16 +1445,18 @@ class UTXOFaucet:
     ############################################################
     #
     # The actual payout: validate the address, enforce the
-    # cooldown, check the faucet balance and broadcast one
-    # chunk to the student. Returns (payload, http_status);
-    # user-facing errors in Lithuanian, with the raw exception
-    # in 'details' for debugging.
+    # cooldown, then queue the claim — the network's payout
+    # worker batches it with its neighbours and broadcasts one
+    # chunk to every student in one transaction. Returns
+    # (payload, http_status); user-facing errors in Lithuanian,
+    # with the raw exception in 'details' for debugging.
+    # wait=False answers 202 with its ticket instead.
     #
     # Used by:
     #   - utxo_routes.py — GET /api/utxo/<network>/request-btc
     ############################################################
 
-    def request_crypto(self, network_key: str, to_address: str) -> tuple:
+    def request_crypto(self, network_key: str, to_address: str, wait: bool = True) -> tuple:
         try:
             ctx = self._setup_wallet_for_network(network_key)
 
@@ -736,53 +1493,93 @@ class UTXOFaucet:
                 return {
                     "error": f"Kriptovaliuta jums jau išsiųsta. Daugiau galėsite pasiimti už {remaining} sek."
                 }, 429
+        except Exception as e:
+            return {"error": "Nepavyko išsiųsti kriptovaliutą", "details": str(e)}, 500
 
+        # From here on the work runs on the network's payout worker
+        # (app/payout_queue/): the claim joins the network's next
+        # batch, and _send_batch checks the balance and broadcasts
+        # — or, on a fan-out network, one of its pool workers pays
+        # it from a pool coin (_send_from_pool). With wait (the
+        # method's default; the route passes it only for ?wait=1)
+        # the HTTP thread waits for its own answer; without — the
+        # route's default — it answers 202 with the ticket
+        # straight away.
+        claim = {'to_address': to_address, 'cooldown_key': cooldown_key}
+        if self._fanout_sizes.get(network_key):
+            return self.fanout_payouts.submit(network_key, lambda: self._send_from_pool(network_key, claim), wait=wait)
+        return self.payouts.submit(network_key, claim, wait=wait)
 
-            # STEP 3: does the faucet have the coins? Only confirmed
-            # balance counts — unconfirmed change can't be re-spent on
-            # every chain config. The cached balance is fine here: the
-            # UTXO selection inside the payout checks for real. From
-            # here on every failure — balance shortage, Electrum
-            # trouble, a failed broadcast — releases the cooldown
-            # slot claimed in STEP 2 before the error propagates.
-            # ========================================================
-            try:
-                balance_info = self._faucet_balance(ctx)
-                current_balance = balance_info["confirmed"]  # only spend confirmed coins
-                if current_balance < ctx.chunk_size_btc:
-                    self.cooldowns.release(cooldown_key)
-                    return {"error": "Čiaupas nebeturi kriptovaliutos. Praneškite dėstytojui."}, 503
-
-
-                # STEP 4: build, sign and broadcast — serialized per
-                # network, or two simultaneous claims would select the
-                # same UTXOs and race to double-spend them. On success
-                # the cached balance is dropped so the page shows the
-                # payout on its next poll.
-                # ======================================================
-                amount_sat = int(float(ctx.chunk_size_btc) * 1e8)
-                with self._send_locks.setdefault(network_key, threading.Lock()):
-                    tx_id = self._create_and_broadcast_transaction(ctx, to_address, amount_sat)
-            except Exception:
-                self.cooldowns.release(cooldown_key)
-                raise
 
-            self._balance_cache.pop(network_key, None)
 
-            return {
-                "message": "Cryptocurrency sent successfully",
-                "transaction_id": tx_id,
-                "amount": float(ctx.chunk_size_btc),
-                "from_address": ctx.address,
-                "network": ctx.network_key
-            }, 200
 
-        except Exception as e:
-            return {"error": "Nepavyko išsiųsti kriptovaliutą", "details": str(e)}, 500
+
+
+    ############################################################
+    # get_fee_oracle
+    ############################################################
+    #
+    # The fee oracle's cache for every network: the sat/vB
+    # rate, the estimate and relay fee behind it, the registry
+    # bounds, its age and whether it is past the staleness
+    # bound — what an operator checks when payouts overpay or
+    # linger in the mempool.
+    #
+    # Used by:
+    #   - utxo_routes.py — GET /api/utxo/fee-oracle
+    ############################################################
+
+    def get_fee_oracle(self):
+        return {"networks": self.fee_oracle.snapshot()}, 200
 
 
 
 
 
 
+    ############################################################
+    # get_consolidation
+    ############################################################
+    #
+    # Every network's consolidation job: its threshold and fee
+    # ceiling, the UTXO count right now, and the last sweep's
+    # report (None before the first) — where an operator sees
+    # the before/after counts.
+    #
+    # Used by:
+    #   - utxo_routes.py — GET /api/utxo/consolidation
+    ############################################################
+
+    def get_consolidation(self):
+        networks = {}
+        for network_key, (threshold, max_fee_rate) in self._consolidation.items():
+            networks[network_key] = {
+                "threshold": threshold,
+                "max_fee_rate": max_fee_rate,
+                "utxos": len(self._utxo_sets[network_key]),
+                "last": self.consolidator.reports.get(network_key),
+            }
+        return {"networks": networks}, 200
+
+
+
+
+
+
+
+    ############################################################
+    # get_electrum
+    ############################################################
+    #
+    # Every network's Electrum endpoints, best first, with
+    # their rolling latency, error rate and connection state —
+    # where an operator sees which server is serving and why.
+    #
+    # Used by:
+    #   - utxo_routes.py — GET /api/utxo/electrum
+    ############################################################
 
+    def get_electrum(self):
+        return {"networks": {
+            network_key: client.snapshot() for network_key, client in self._electrum_clients.items()
+        }}, 200
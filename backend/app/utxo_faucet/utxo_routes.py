@@ -7,6 +7,13 @@
 #    GET /api/utxo/networks                  — available networks
 #    GET /api/utxo/<network>/faucet-balance  — faucet address + balance
 #    GET /api/utxo/<network>/request-btc     — send one chunk to ?address=
+#                                              (?wait=1 → 200, not 202 + ticket)
+#    GET /api/utxo/fee-oracle                — cached fee rates + their age
+#                                              (debug)
+#    GET /api/utxo/consolidation             — wallet sweeps: thresholds,
+#                                              UTXO counts, last report (debug)
+#    GET /api/utxo/electrum                  — Electrum endpoints: latency,
+#                                              error rate, health (debug)
 #
 #  A deliberately thin layer: every handler just forwards to
 #  the shared UTXOFaucet instance, which already returns
@@ -107,5 +114,85 @@ def faucet_balance(network):
 @bp_utxo_faucet.route('/api/utxo/<network>/request-btc', methods=['GET'])
 def request_btc(network):
     to_address = request.args.get('address')
-    data, status = utxo_faucet.request_crypto(network, to_address)
+    data, status = utxo_faucet.request_crypto(network, to_address, wait=request.args.get('wait') == '1')
+    return jsonify(data), status
+
+
+
+
+
+
+
+
+############################################################
+# get_fee_oracle
+############################################################
+#
+# GET /api/utxo/fee-oracle
+#
+# Debug view of the fee oracle: per network, the cached
+# sat/vB rate payouts use, the estimate and relay fee it
+# came from, the registry bounds, its age in seconds and
+# whether it is past the staleness bound.
+#
+# Used by:
+#   - the operator, by hand — no page calls it
+############################################################
+
+@bp_utxo_faucet.route('/api/utxo/fee-oracle', methods=['GET'])
+def get_fee_oracle():
+    data, status = utxo_faucet.get_fee_oracle()
+    return jsonify(data), status
+
+
+
+
+
+
+
+
+
+############################################################
+# get_consolidation
+############################################################
+#
+# GET /api/utxo/consolidation
+#
+# Debug view of the consolidation job: per network, the
+# UTXO threshold and fee ceiling, the current UTXO count and
+# the last sweep's report with its before/after counts.
+#
+# Used by:
+#   - the operator, by hand — no page calls it
+############################################################
+
+@bp_utxo_faucet.route('/api/utxo/consolidation', methods=['GET'])
+def get_consolidation():
+    data, status = utxo_faucet.get_consolidation()
+    return jsonify(data), status
+
+
+
+
+
+
+
+
+############################################################
+# get_electrum
+############################################################
+#
+# GET /api/utxo/electrum
+#
+# Debug view of the Electrum pools: per network, every
+# configured endpoint best first, with its rolling ping
+# latency, error rate, health and last error.
+#
+# Used by:
+#   - the operator, by hand — no page calls it
+############################################################
+
+@bp_utxo_faucet.route('/api/utxo/electrum', methods=['GET'])
+def get_electrum():
+    data, status = utxo_faucet.get_electrum()
     return jsonify(data), status
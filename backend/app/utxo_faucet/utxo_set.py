@@ -0,0 +1,369 @@
+############################################################
+#  [*] UTXO set — the faucet's spendable outputs, in memory
+#
+#  A payout used to start with a listunspent round trip, take
+#  inputs in list order and broadcast — and the next payout
+#  asked Electrum again, which may not have seen the previous
+#  spend yet (same inputs picked twice) or its change (no
+#  funds while the change is pending).
+#
+#  Now each network keeps its own set of outpoints:
+#
+#    reserve   — a payout picks its inputs from memory and
+#                they are RESERVED the same moment, under the
+#                set's lock: no other payout can pick them
+#    spend     — after the broadcast the inputs leave the set
+#                and the transaction's change output joins it
+#                right away, so the next payout can chain on
+#    release   — a failed build or broadcast hands the inputs
+#                back and marks the set stale: what happened
+#                on the wire is unknown, so the next payout
+#                reloads from Electrum first
+#    reconcile — Electrum's listunspent replaces the view in
+#                the background (on every push the faucet's
+#                subscriptions deliver, or every
+#                UTXO_RECONCILE_SECONDS when there are none)
+#
+#  Electrum lags behind our own broadcasts, so for
+#  UTXO_PENDING_GRACE_SECONDS a reconcile keeps our spends
+#  spent and our change present even where listunspent still
+#  says otherwise. Past that, Electrum wins: a transaction it
+#  never saw was dropped, its inputs are spendable again.
+#
+#  Electrum-free on purpose (fetch is any callable returning
+#  a listunspent-shaped list), so the tests drive it with
+#  plain lists.
+#
+#  Used by:
+#    - utxo_faucet.py — one per network, UTXOFaucet._utxo_sets
+#    - tests/test_utxo_set.py
+############################################################
+
+
+import time
+import logging
+import threading
+
+
+# How often the background thread reconciles with Electrum when
+# no subscription push arrives to ask for it
+UTXO_RECONCILE_SECONDS = 60
+
+# How long our own spends and change outputs override what
+# listunspent says — Electrum picks a broadcast up within
+# seconds; one it has not seen after this was dropped
+UTXO_PENDING_GRACE_SECONDS = 120
+
+
+
+
+
+
+
+
+############################################################
+# outpoint
+############################################################
+#
+# The key of one UTXO: (tx_hash in Electrum's display order,
+# output index).
+#
+# Used by:
+#   - UtxoSet (below)
+############################################################
+
+def outpoint(utxo):
+    return (utxo['tx_hash'], utxo['tx_pos'])
+
+
+
+
+
+
+
+
+############################################################
+# UtxoSet
+############################################################
+#
+# fetch() returns the address' listunspent; pushed() says
+# whether subscription pushes are arriving (the periodic
+# reconcile is skipped while they are). label only names the
+# thread and the log lines.
+#
+# Used by:
+#   - utxo_faucet.py — UTXOFaucet.__init__, one per network
+############################################################
+
+class UtxoSet:
+
+
+
+
+
+
+    ############################################################
+    # __init__
+    ############################################################
+    #
+    # The coins keep listunspent's order (confirmed first, as
+    # ElectrumX lists them) with our own change appended —
+    # dicts preserve insertion order. _spent and _created map
+    # an outpoint to the time.monotonic() of our broadcast.
+    #
+    # Used by:
+    #   - UTXOFaucet.__init__
+    ############################################################
+
+    def __init__(self, fetch, pushed=None, label=''):
+        self.fetch = fetch
+        self.pushed = pushed or (lambda: False)
+        self.label = label
+
+        self._lock = threading.Lock()
+        self._coins = {}
+        self._reserved = set()
+        self._spent = {}
+        self._created = {}
+        self.stale = True
+
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._failing = False
+
+
+
+
+
+
+    ############################################################
+    # refresh / reconcile
+    ############################################################
+    #
+    # refresh() fetches listunspent (outside the lock — a
+    # payout keeps selecting meanwhile) and reconciles it in.
+    # A listing taken before one of our broadcasts is fine:
+    # the grace rules keep that broadcast's effects.
+    #
+    # Used by:
+    #   - utxo_faucet.py — the payout path (stale set or a
+    #     shortfall), the warmup
+    #   - _run (below)
+    ############################################################
+
+    def refresh(self):
+        self.reconcile(self.fetch())
+
+    def reconcile(self, utxos):
+        now = time.monotonic()
+        listed = {outpoint(utxo): dict(utxo) for utxo in utxos}
+
+        with self._lock:
+            self._spent = {
+                point: at for point, at in self._spent.items()
+                if point in listed and now - at < UTXO_PENDING_GRACE_SECONDS
+            }
+            self._created = {
+                point: at for point, at in self._created.items()
+                if point not in listed and now - at < UTXO_PENDING_GRACE_SECONDS and point in self._coins
+            }
+
+            coins = {point: utxo for point, utxo in listed.items() if point not in self._spent}
+            for point in self._created:
+                coins[point] = self._coins[point]
+
+            self._coins = coins
+            self.stale = False
+
+
+
+
+
+
+    ############################################################
+    # reserve
+    ############################################################
+    #
+    # choose(available) gets every unreserved coin, in order,
+    # and returns the ones to spend (or raises — then nothing
+    # is reserved). The returned coins are reserved before
+    # the lock is let go.
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._create_and_broadcast_batch
+    ############################################################
+
+    def reserve(self, choose):
+        with self._lock:
+            available = [utxo for point, utxo in self._coins.items() if point not in self._reserved]
+            selected = choose(available)
+            self._reserved.update(outpoint(utxo) for utxo in selected)
+            return selected
+
+
+
+
+
+
+    ############################################################
+    # available
+    ############################################################
+    #
+    # A snapshot of the unreserved coins, in order — for
+    # counting, not for spending (reserve() is what hands
+    # coins out).
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._refill_pool
+    ############################################################
+
+    def available(self):
+        with self._lock:
+            return [utxo for point, utxo in self._coins.items() if point not in self._reserved]
+
+
+
+
+
+
+    ############################################################
+    # spend
+    ############################################################
+    #
+    # A broadcast went through: its inputs leave the set and
+    # its outputs back to us (the change) join it,
+    # unconfirmed. change is a list of (vout, value).
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._create_and_broadcast_batch
+    ############################################################
+
+    def spend(self, selected, txid, change=()):
+        now = time.monotonic()
+        with self._lock:
+            for utxo in selected:
+                point = outpoint(utxo)
+                self._reserved.discard(point)
+                self._coins.pop(point, None)
+                self._spent[point] = now
+
+            for vout, value in change:
+                point = (txid, vout)
+                self._coins[point] = {'tx_hash': txid, 'tx_pos': vout, 'value': value, 'height': 0}
+                self._created[point] = now
+
+
+
+
+
+
+    ############################################################
+    # release
+    ############################################################
+    #
+    # A payout failed before or during its broadcast: the
+    # inputs are free again, and the set is stale — the node
+    # may or may not have taken the transaction.
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._create_and_broadcast_batch
+    ############################################################
+
+    def release(self, selected):
+        with self._lock:
+            for utxo in selected:
+                self._reserved.discard(outpoint(utxo))
+            self.stale = True
+
+
+
+
+
+
+    ############################################################
+    # __len__ / __contains__
+    ############################################################
+    #
+    # How many coins the set holds, and whether it holds one
+    # outpoint — reserved ones included.
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._consolidate (the
+    #     threshold and its before/after counts),
+    #     UTXOFaucet.get_consolidation (__len__),
+    #     UTXOFaucet._refill_pool (__contains__)
+    ############################################################
+
+    def __len__(self):
+        with self._lock:
+            return len(self._coins)
+
+    def __contains__(self, point):
+        with self._lock:
+            return point in self._coins
+
+
+
+
+
+
+    ############################################################
+    # start / wake
+    ############################################################
+    #
+    # start() runs the background reconciler (once); wake()
+    # asks it to reconcile now — the faucet's subscription
+    # callbacks call it, from the Electrum reader thread, so
+    # it only sets an event.
+    #
+    # Used by:
+    #   - utxo_faucet.py — UTXOFaucet._warm_up_networks (start),
+    #     UTXOFaucet._on_push (wake)
+    ############################################################
+
+    def start(self):
+        if self._thread:
+            return
+
+        self._thread = threading.Thread(target=self._run, name=f'utxo-set-{self.label}', daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+
+
+
+
+
+    ############################################################
+    # _run
+    ############################################################
+    #
+    # The reconciler loop: on a wake, or every
+    # UTXO_RECONCILE_SECONDS unless pushes are arriving. A
+    # failing Electrum is logged once when it starts failing
+    # and once when it recovers.
+    #
+    # Used by:
+    #   - start (above)
+    ############################################################
+
+    def _run(self):
+        while True:
+            woken = self._wakeup.wait(UTXO_RECONCILE_SECONDS)
+            self._wakeup.clear()
+            if not woken and self.pushed():
+                continue
+
+            try:
+                self.refresh()
+            except Exception as e:
+                if not self._failing:
+                    self._failing = True
+                    logging.warning(f"[UTXO] {self.label} UTXO set reconcile failing: {e}")
+                continue
+
+            if self._failing:
+                self._failing = False
+                logging.warning(f"[UTXO] {self.label} UTXO set reconcile recovered")
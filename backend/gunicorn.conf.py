@@ -0,0 +1,117 @@
+############################################################
+#  [*] Gunicorn configuration — the production server
+#
+#  Serves wsgi:app with the threaded worker: a payout spends
+#  most of its time waiting on an RPC, so threads — not
+#  processes — are what give real concurrency here. Every
+#  knob is an environment variable, so the compose file tunes
+#  it without an image rebuild:
+#
+#    GUNICORN_WORKERS           — processes (default 1). More
+#                                 than one REQUIRES
+#                                 SHARED_STATE_DIR, or every
+#                                 worker hands out its own
+#                                 cooldowns and send locks
+#                                 (see app/shared_state.py)
+#    GUNICORN_THREADS           — request threads per worker
+#                                 (default 16)
+#    GUNICORN_KEEPALIVE         — seconds an idle keep-alive
+#                                 connection from the Caddy
+#                                 endpoint stays open (default 5)
+#    GUNICORN_GRACEFUL_TIMEOUT  — seconds in-flight requests
+#                                 get to finish after SIGTERM
+#                                 (default 60)
+#
+#  On SIGTERM (docker stop) each worker stops accepting and
+#  drains: every request still open completes and answers,
+#  then the payout queues pay out the jobs already accepted
+#  (app/payout_queue/ — a 202 is a promise). Both share ONE
+#  budget counted from the SIGTERM: the queue drain ends
+#  DRAIN_MARGIN_SECONDS before GUNICORN_GRACEFUL_TIMEOUT, so
+#  the master never SIGKILLs a worker mid-broadcast. Keep
+#  docker's stop timeout ABOVE GUNICORN_GRACEFUL_TIMEOUT
+#  (stop_grace_period in compose), or docker's SIGKILL cuts
+#  the drain short instead.
+#
+#  Used by:
+#    - Dockerfile — CMD gunicorn -c gunicorn.conf.py wsgi:app
+############################################################
+
+
+import os
+import time
+import signal
+
+
+bind = '0.0.0.0:8000'
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '60'))
+
+# A single request may legitimately wait on a slow RPC and a
+# busy send lock — well past gunicorn's 30 s default
+timeout = 120
+
+# Each worker builds its own faucets AFTER the fork — the
+# warmup threads and open Electrum sockets must not be
+# shared across processes
+preload_app = False
+
+# The dev container mounts the source — reload on edits there
+reload = os.getenv('APP_DEBUG', 'false').lower() == 'true'
+
+accesslog = '-'
+errorlog = '-'
+
+_started = time.monotonic()
+
+
+
+
+
+
+
+
+############################################################
+# Server hooks — the startup and shutdown report
+############################################################
+#
+# when_ready fires once the master is listening: the time
+# since the config was loaded plus the effective tuning.
+# post_worker_init wraps the worker's own SIGTERM handler to
+# stamp when the drain began — for the payout queue's exit
+# drain, which counts its budget from it, and for
+# worker_exit, which reports how long the drain took.
+############################################################
+
+def when_ready(server):
+    shared = os.getenv('SHARED_STATE_DIR') or 'off'
+    print(
+        f"[BOOT] gunicorn ready on {bind} in {time.monotonic() - _started:.2f}s — "
+        f"{workers} worker(s) x {threads} threads, keepalive {keepalive}s, "
+        f"drain {graceful_timeout}s, shared state {shared}"
+    )
+    if workers > 1 and shared == 'off':
+        print("[BOOT] WARNING — several workers WITHOUT SHARED_STATE_DIR: cooldowns and send locks are per worker")
+
+
+def post_worker_init(worker):
+    from app.payout_queue import payout_queue
+
+    handle_exit = worker.handle_exit
+
+    def stamped_handle_exit(sig, frame):
+        worker._drain_started = time.monotonic()
+        payout_queue.shutdown_started()
+        print(f"[BOOT] worker {worker.pid} draining in-flight requests (up to {graceful_timeout}s)")
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, stamped_handle_exit)
+
+
+def worker_exit(server, worker):
+    drain_started = getattr(worker, '_drain_started', None)
+    if drain_started is not None:
+        print(f"[BOOT] worker {worker.pid} drained in {time.monotonic() - drain_started:.2f}s")
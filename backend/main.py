@@ -3,7 +3,8 @@
 #
 #  The Flask app plus the LOADER for the five config maps
 #  that drive every faucet (EVM networks, ERC-20 tokens,
-#  UTXO networks, SVM networks, MOVE networks). The maps
+#  UTXO networks, SVM networks, MOVE networks) and the
+#  optional per-route rate limits. The maps
 #  themselves live
 #  OUTSIDE the image, in the mounted config directory
 #  (_CONFIG/coins.py on the host → /config/coins.py in the
@@ -15,12 +16,13 @@
 #  precise error instead of becoming a silent runtime
 #  fallback.
 #
-#  Run directly (python main.py) this file wires the
-#  database, the seven blueprints and the dev server. The
-#  route modules import THIS module back for their config
-#  maps — that is why the blueprint imports sit inside
-#  __main__: by the time they run, main is fully defined and
-#  the circular import resolves cleanly.
+#  create_app() wires the database, the eight blueprints and
+#  the rate limiter onto the app — wsgi.py calls it for
+#  gunicorn in production, `python main.py` for the dev
+#  server. The route modules import THIS module back for
+#  their config maps — that is why the blueprint imports sit
+#  inside create_app(): by the time they run, main is fully
+#  defined and the circular import resolves cleanly.
 #
 #  Used by:
 #    - app/evm_faucet/evm_routes.py — EVM_NETWORK_CONFIGS
@@ -30,23 +32,25 @@
 #    - app/move_faucet/move_routes.py — MOVE_NETWORK_CONFIGS
 #    - app/icons.py — CONFIG_DIR (the icons live beside coins.py)
 #    - tests/ — config invariants + schema tests import main
-#    - Dockerfile — CMD ["python3", "-u", "main.py"]
+#    - wsgi.py — create_app() for gunicorn
+#    - Dockerfile — gunicorn -c gunicorn.conf.py wsgi:app
 ############################################################
 
 
 import os
 import sys
+import time
 import importlib.util
 
 from flask import Flask, Response
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from app.database.db import get_db_connection
-from app.config_models import validate_configs
+from app.config_models import validate_configs, validate_rate_limits
 
 
 # The Flask app — the blueprint modules register their routes
-# onto it in the __main__ block below.
+# onto it in create_app() below.
 app = Flask(__name__)
 
 
@@ -113,6 +117,10 @@ EVM_NETWORK_CONFIGS, ERC20_TOKEN_CONFIGS, UTXO_NETWORK_CONFIGS, SVM_NETWORK_CONF
     getattr(_coins, 'MOVE_NETWORK_CONFIGS', {}),
 )
 
+# Optional per-route, per-client-IP request budgets — absent
+# means nothing is rate limited (see app/rate_limit/)
+RATE_LIMIT_CONFIGS = validate_rate_limits(getattr(_coins, 'RATE_LIMIT_CONFIGS', {}))
+
 
 
 
@@ -162,19 +170,35 @@ def get_example_blockchain():
 
 
 ############################################################
-# Entrypoint
+# create_app
 ############################################################
 #
-# Wires the whole backend when run directly: the database
-# schema, the seven feature blueprints, then the dev server.
-# The blueprint imports are deliberately DEFERRED to down
-# here — the route modules import main back for their config
-# maps, and at this point main is fully defined, so the
-# circular import resolves cleanly.
+# The application factory: wires the whole backend onto the
+# module's app — the database schema, ProxyFix, the eight
+# feature blueprints and the rate limiter — and returns it.
+# The blueprint imports are deliberately DEFERRED to in here
+# — the route modules import main back for their config
+# maps, and by the time this runs main is fully defined, so
+# the circular import resolves cleanly.
+#
+# The blueprints build the faucet singletons at import time,
+# so there is exactly ONE app per process: a second call
+# returns it as is. Prints the build time — the warmup
+# threads keep reporting per network after it.
+#
+# Used by:
+#   - wsgi.py — what gunicorn serves in production
+#   - the __main__ block (below) — the dev server
 ############################################################
 
-if __name__ == '__main__':
-    APP_DEBUG = os.getenv('APP_DEBUG', 'false').lower() == 'true'
+_app_built = False
+
+def create_app():
+    global _app_built
+    if _app_built:
+        return app
+
+    started = time.monotonic()
 
 
 
@@ -218,12 +242,46 @@ if __name__ == '__main__':
     from app.icons import bp_icons
     app.register_blueprint(bp_icons, url_prefix='')
 
+    # The ticket status route of the faucets' payout queues
+    from app.payout_queue.payout_routes import bp_payout_queue
+    app.register_blueprint(bp_payout_queue, url_prefix='')
+
+
+
+    # STEP 4: the per-client-IP rate limiter — after the
+    # blueprints, because it checks RATE_LIMIT_CONFIGS against
+    # the registered routes. It sees real client IPs thanks to
+    # the ProxyFix from STEP 2.
+    # ========================================================
+    from app.rate_limit.rate_limit_hook import install_rate_limiter
+    install_rate_limiter(app, RATE_LIMIT_CONFIGS)
 
-    # STEP 4: the dev server. Debug mode means hot reload AND
-    # the Werkzeug debugger — never expose it publicly.
-    # =======================================================
-    app.run(host='0.0.0.0', port=8000, debug=APP_DEBUG)
+    _app_built = True
+    print(
+        f"[BOOT] backend built in {time.monotonic() - started:.2f}s (pid {os.getpid()}) — "
+        f"{len(app.blueprints)} blueprints, {len(list(app.url_map.iter_rules()))} routes, "
+        f"{len(RATE_LIMIT_CONFIGS)} rate-limited"
+    )
+    return app
 
 
 
 
+
+
+
+
+############################################################
+# Entrypoint — the dev server
+############################################################
+#
+# `python main.py` builds the app and runs Werkzeug's dev
+# server — local development only. Production runs gunicorn
+# on wsgi.py (see gunicorn.conf.py and the Dockerfile).
+# Debug mode means hot reload AND the Werkzeug debugger —
+# never expose it publicly.
+############################################################
+
+if __name__ == '__main__':
+    APP_DEBUG = os.getenv('APP_DEBUG', 'false').lower() == 'true'
+    create_app().run(host='0.0.0.0', port=8000, debug=APP_DEBUG)
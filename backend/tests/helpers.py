@@ -21,6 +21,11 @@
 import os
 from unittest import mock
 
+from web3 import Web3
+from eth_account import Account
+from eth_account._utils.legacy_transactions import Transaction as LegacyTransaction
+from eth_account._utils.typed_transactions import TypedTransaction
+
 from app.utxo_faucet.utxo_faucet import UTXOFaucet
 from app.evm_faucet.evm_faucet import EVMFaucet
 from app.erc_faucet.erc20_faucet import ERC20Faucet
@@ -44,7 +49,9 @@ ANCHOR_KNF_ADDRESS = 'knf1qyvsy6ypssxmqmdzthzua3qwupkey90p3lcuzy4'
 # 250000 sat to the RECIPIENT key's knf address (fee rate 10,
 # 2 inputs, payout + change outputs). The txid covers version,
 # inputs, outputs and locktime — any byte drift changes it.
-ANCHOR_TXID_PREFIX = '5cad5657115dafb6'
+# Re-recorded when the fee moved to the signed vsize (the
+# change output grew by the estimate's slack).
+ANCHOR_TXID_PREFIX = '5002d1c72f10449e'
 
 ANCHOR_UTXOS = [
     {'tx_hash': '11' * 32, 'tx_pos': 0, 'value': 200000},
@@ -75,10 +82,12 @@ UTXO_TEST_CONFIGS = {
         'faucet': {'coin': 'knfcoin', 'network': 'mainnet', 'chunk_size': 1000,
                    'electrum_server': '127.0.0.1:9999'},
     },
+    # The request-flow network: no batch window, so a lone test
+    # payout goes out at once instead of waiting for company
     'btc4': {
         'id': 4, 'short_name': 'tBTC4', 'full_name': 'Bitcoin Testnet4',
         'faucet': {'coin': 'bitcoin', 'network': 'testnet', 'chunk_size': 0.01,
-                   'electrum_server': '127.0.0.1:9999'},
+                   'electrum_server': '127.0.0.1:9999', 'batch_window_ms': 0},
     },
     # Legacy (pre-SegWit) dialect — the coin registry supplies the
     # base58 version bytes and doge-scale fee/dust
@@ -188,7 +197,8 @@ def make_utxo_faucet(configs=None):
 # captured['raw'] holds the raw tx hex after a payout.
 #
 # Used by:
-#   - test_utxo_engine.py
+#   - test_utxo_engine.py / test_consolidation.py /
+#     test_fanout.py
 ############################################################
 
 def fake_electrum(faucet, network, utxos):
@@ -196,6 +206,8 @@ def fake_electrum(faucet, network, utxos):
     client = faucet._electrum_clients[network]
     client.list_unspent = lambda scripthash: [dict(u) for u in utxos]
     client.get_balance = lambda scripthash: {'confirmed': 1.0, 'unconfirmed': 0.0, 'total': 1.0}
+    # no estimate (regtest's -1): payouts pay the registry's FEE_RATE
+    client.fee_estimates = lambda target_blocks: (-1, 0.00001)
     client.request = lambda method, params: captured.__setitem__('raw', params[0]) or 'txid-ok'
     return captured
 
@@ -272,7 +284,11 @@ def make_svm_faucet(configs=None, private_key=TEST_PRIVATE_KEY):
 #
 # Points one network's RPC client at canned data: balances
 # keyed by base58 address (absent reads as 0), a fixed
-# blockhash, and send_transaction recording the broadcast
+# blockhash (served to the faucet's blockhash cache through
+# batch(), with client.blockhash_reads counting the
+# fetches), signature statuses from client.statuses at
+# client.block_height, and send_transaction recording the
+# broadcast
 # instead of sending it. broadcast_error / balance_error
 # drive the failure paths. Returns the client, so a test can
 # assert on client.sent afterwards.
@@ -286,6 +302,9 @@ def fake_solana_rpc(faucet, network, balances=None, broadcast_error=None, balanc
     blockhash = '11111111111111111111111111111111'
     client = faucet._clients[network]
     client.sent = []
+    client.blockhash_reads = 0
+    client.block_height = 1000
+    client.statuses = {}
 
     def get_balance(address):
         if balance_error:
@@ -298,8 +317,24 @@ def fake_solana_rpc(faucet, network, balances=None, broadcast_error=None, balanc
         client.sent.append(signed_base64)
         return 'sig' + '1' * 85
 
+    def batch(requests):
+        # The blockhash cache's refresh (a whole validity window
+        # left) and the signature tracker's polls
+        results = []
+        for method, params in requests:
+            if method == 'getLatestBlockhash':
+                client.blockhash_reads += 1
+                results.append({'value': {'blockhash': blockhash, 'lastValidBlockHeight': 1150}})
+            elif method == 'getBlockHeight':
+                results.append(client.block_height)
+            else:
+                assert method == 'getSignatureStatuses', method
+                results.append({'value': [client.statuses.get(signature) for signature in params[0]]})
+        return results
+
     client.get_balance = get_balance
-    client.get_latest_blockhash = lambda: blockhash
+    client.get_balances = lambda addresses: [get_balance(a) for a in addresses]
+    client.batch = batch
     client.send_transaction = send_transaction
     client.get_version = lambda: '4.2.0'
     return client
@@ -366,11 +401,12 @@ def make_move_faucet(configs=None, private_key=TEST_PRIVATE_KEY):
 #
 # Points one network's GraphQL client at canned data: MIST
 # balances keyed by address (absent reads as 0), a fixed
-# node-built transaction, and execute() recording the
-# broadcast instead of sending it. build_error /
-# execute_error / balance_error drive the failure paths.
-# Returns the client, so a test can assert on client.executed
-# afterwards.
+# node-built transaction (client.builds counts the builds),
+# a reference gas price of 1000, and execute() recording the
+# broadcast instead of sending it — its effects move the gas
+# coin to the next version. build_error / execute_error /
+# balance_error drive the failure paths. Returns the client,
+# so a test can assert on client.executed afterwards.
 #
 # Used by:
 #   - test_move_faucet.py
@@ -382,6 +418,7 @@ def fake_sui_graphql(faucet, network, balances=None, build_error=None, execute_e
     built_tx = 'dGVzdC10cmFuc2FjdGlvbi1iY3M='
     client = faucet._clients[network]
     client.executed = []
+    client.builds = 0
 
     def get_balance(address, coin_type):
         if balance_error:
@@ -392,15 +429,20 @@ def fake_sui_graphql(faucet, network, balances=None, build_error=None, execute_e
         if build_error:
             raise RuntimeError(build_error)
         client.built = {'sender': sender, 'recipient': recipient_b64, 'amount': amount_b64}
+        client.builds += 1
         return built_tx
 
     def execute(tx_bcs, signature):
         if execute_error:
             raise RuntimeError(execute_error)
         client.executed.append({'tx_bcs': tx_bcs, 'signature': signature})
-        return 'digest' + '1' * 38
+        # A valid base58 32-byte digest — the next payout's BCS
+        # must be able to encode it
+        gas_ref = ('0x' + '22' * 32, 100 + len(client.executed), '11111111111111111111111111111111')
+        return 'digest' + '1' * 38, gas_ref
 
     client.get_balance = get_balance
+    client.get_reference_gas_price = lambda: 1000
     client.build_transfer = build_transfer
     client.execute = execute
     client.get_chain_identifier = lambda: 'testchain-id'
@@ -488,8 +530,15 @@ def sign_claim(nonce='1785666345742', address_key=RECIPIENT_PRIVATE_KEY, signer_
 # are canned, EVERYTHING else (notably .account, which does
 # the real signature recovery) delegates to the genuine
 # module — so tests exercise real crypto and only the network
-# is faked. broadcast_error makes the send raise, which is
-# how the release-the-cooldown paths are tested.
+# is faked. The raw broadcast is decoded back into the
+# transaction's fields (its sender recovered from the real
+# signature) and recorded in `sent`. broadcast_error makes
+# the send raise, which is how the release-the-cooldown
+# paths are tested; nonce_conflicts makes that many sends
+# fail the way a node refuses a used nonce, already_known
+# that many the way it refuses a transaction it holds
+# already (recording it — it did go out). pending_nonce is
+# what get_transaction_count answers.
 #
 # Used by:
 #   - fake_web3 (below)
@@ -497,14 +546,23 @@ def sign_claim(nonce='1785666345742', address_key=RECIPIENT_PRIVATE_KEY, signer_
 
 class FakeEth:
 
-    def __init__(self, real_eth, balances, gas_price=1, broadcast_error=None, balance_error=None):
+    def __init__(self, real_eth, balances, gas_price=1, broadcast_error=None, balance_error=None,
+                 pending_nonce=0, nonce_conflicts=0, already_known=0):
         self._real = real_eth
         self._balances = balances
         self.gas_price = gas_price
         self.broadcast_error = broadcast_error
         self.balance_error = balance_error
+        self.pending_nonce = pending_nonce
+        self.nonce_conflicts = nonce_conflicts
+        self.already_known = already_known
+        self.nonce_reads = 0
         self.sent = []
 
+    @property
+    def chain_id(self):
+        return EVM_TEST_CONFIGS['testchain']['chain_id']
+
     def __getattr__(self, name):
         return getattr(self._real, name)
 
@@ -513,11 +571,49 @@ class FakeEth:
             raise RuntimeError(self.balance_error)
         return self._balances.get(address.lower(), 0)
 
-    def send_transaction(self, tx):
+    def get_transaction_count(self, address, block_identifier=None):
+        self.nonce_reads += 1
+        return self.pending_nonce
+
+    def send_raw_transaction(self, raw):
         if self.broadcast_error:
             raise RuntimeError(self.broadcast_error)
-        self.sent.append(tx)
-        return bytes.fromhex('ab' * 32)
+        if self.nonce_conflicts:
+            self.nonce_conflicts -= 1
+            raise ValueError({'code': -32000, 'message': 'nonce too low'})
+        self.sent.append(decode_raw_transaction(raw))
+        if self.already_known:
+            self.already_known -= 1
+            raise ValueError({'code': -32000, 'message': 'already known'})
+        return Web3.keccak(raw)
+
+
+
+
+############################################################
+# decode_raw_transaction
+############################################################
+#
+# A signed raw transaction back as the dict a payout built:
+# to (checksummed), value, nonce, gas, the fee fields,
+# chainId, data, from — recovered from the signature — and
+# the transaction hash.
+#
+# Used by:
+#   - FakeEth.send_raw_transaction (above)
+############################################################
+
+def decode_raw_transaction(raw):
+    if raw[0] < 0x80:
+        tx = dict(TypedTransaction.from_bytes(raw).as_dict())
+    else:
+        tx = LegacyTransaction.from_bytes(raw).as_dict()
+        tx['chainId'] = (tx['v'] - 35) // 2
+
+    tx['to'] = Web3.to_checksum_address(tx['to'])
+    tx['from'] = Account.recover_transaction(raw)
+    tx['hash'] = Web3.keccak(raw)
+    return tx
 
 
 
@@ -550,7 +646,8 @@ def fake_web3(faucet, network, balances=None, **kwargs):
 ############################################################
 #
 # Stands in for the token contract: balanceOf reads a canned
-# map, transfer records the call and returns a tx hash.
+# map, transfer records the call and builds the transaction
+# to the token's testchain deployment.
 # transfer_error / estimate_error drive the failure paths
 # (the engine falls back to a fixed gas limit when the
 # estimate raises).
@@ -589,11 +686,11 @@ class FakeErc20Contract:
                     raise RuntimeError(contract.estimate_error)
                 return 60000
 
-            def transact(self, tx):
+            def build_transaction(self, tx):
                 if contract.transfer_error:
                     raise RuntimeError(contract.transfer_error)
                 contract.transfers.append((to_address, amount, tx))
-                return bytes.fromhex('cd' * 32)
+                return {**tx, 'to': ERC20_TEST_CONFIGS['TST']['deployments']['testchain'], 'value': 0, 'data': '0xa9059cbb'}
 
         return Transfer()
 
@@ -0,0 +1,117 @@
+############################################################
+#  [*] Coin selection tests
+#
+#  Offline checks of the UTXO faucet's input selection:
+#  branch and bound finds changeless matches (and only
+#  within its tolerance), the fallbacks take the fewest
+#  inputs — or, on a fragmented wallet, the smallest coins —
+#  coins worth less than their own input fee are never
+#  spent, the input cap holds, and settle() drops dust
+#  change into the fee. Sizes are SegWit's (91/31) at 10
+#  sat/vB; UTXOs are plain dicts.
+############################################################
+
+
+import random
+import unittest
+from types import SimpleNamespace
+
+from app.utxo_faucet.coin_selection import CoinSelector, SMALLEST_FIRST_ABOVE_UTXOS, estimate_fee
+
+
+SEGWIT = SimpleNamespace(INPUT_SIZE=91, OUTPUT_SIZE=31)
+RATE = 10
+DUST = 546
+INPUT_FEE = 91 * RATE
+
+
+def coin(value, tag=None):
+    tag = tag if tag is not None else value
+    return {'tx_hash': f'{tag:064x}', 'tx_pos': 0, 'value': value, 'height': 100}
+
+
+def selector(**kwargs):
+    return CoinSelector(SEGWIT, RATE, DUST, **kwargs)
+
+
+def values(selected):
+    return sorted(utxo['value'] for utxo in selected)
+
+
+def changeless(amount, *effective):
+    # Coin values with the given effective values, plus the one
+    # coin that tops them up to exactly the no-change target of
+    # paying amount to one recipient
+    target = amount + estimate_fee(SEGWIT, RATE, 0, 1)
+    return [value + INPUT_FEE for value in effective] + [target - sum(effective) + INPUT_FEE]
+
+
+
+
+############################################################
+# CoinSelectionTests
+############################################################
+
+class CoinSelectionTests(unittest.TestCase):
+
+    def test_branch_and_bound_finds_the_exact_match(self):
+        exact = changeless(100_000, 60_000)
+        utxos = [coin(500_000), coin(exact[0]), coin(exact[1]), coin(7_000)]
+
+        selected = selector().select(utxos, 100_000, 1)
+        self.assertEqual(values(selected), sorted(exact))
+        self.assertEqual(selector().settle(selected, 100_000, 1),
+                         (estimate_fee(SEGWIT, RATE, 2, 1), 0))
+
+    def test_match_within_tolerance_has_no_change_output(self):
+        # 400 sat over the target is less than a change output plus dust
+        utxos = [coin(value + 400) for value in changeless(100_000)] + [coin(900_000)]
+        fee, change = selector().settle(selector().select(utxos, 100_000, 1), 100_000, 1)
+
+        self.assertEqual(change, 0)
+        self.assertEqual(fee, estimate_fee(SEGWIT, RATE, 1, 1) + 400)
+
+    def test_no_match_falls_back_to_largest_first(self):
+        utxos = [coin(30_000), coin(900_000), coin(80_000), coin(50_000)]
+        self.assertIsNone(selector().branch_and_bound(utxos, 100_000, 1))
+
+        selected = selector().select(utxos, 100_000, 1)
+        fee, change = selector().settle(selected, 100_000, 1)
+        self.assertEqual(values(selected), [900_000])
+        self.assertEqual(change, 900_000 - 100_000 - estimate_fee(SEGWIT, RATE, 1, 2))
+
+    def test_fragmented_wallet_spends_the_smallest_coins(self):
+        utxos = [coin(20_000 + i, tag=i) for i in range(SMALLEST_FIRST_ABOVE_UTXOS + 1)] + [coin(5_000_000)]
+        selected = selector().select(utxos, 100_000, 1)
+
+        self.assertNotIn(5_000_000, values(selected))
+        self.assertEqual(values(selected), values(utxos[:len(selected)]))
+
+    def test_coins_below_their_input_fee_are_never_spent(self):
+        utxos = [coin(INPUT_FEE), coin(300), coin(200_000)]
+        self.assertEqual(values(selector().select(utxos, 100_000, 1)), [200_000])
+        with self.assertRaises(ValueError):
+            selector().select([coin(INPUT_FEE)] * 3, 100, 1)
+
+    def test_input_cap_holds(self):
+        utxos = [coin(10_000, tag=i) for i in range(10)]
+        with self.assertRaises(ValueError):
+            selector(max_inputs=5).select(utxos, 60_000, 1)
+        self.assertLessEqual(len(selector(max_inputs=8).select(utxos, 60_000, 1)), 8)
+
+    def test_empty_and_short_wallets_raise(self):
+        with self.assertRaisesRegex(ValueError, 'No UTXOs'):
+            selector().select([], 1_000, 1)
+        with self.assertRaisesRegex(ValueError, 'Insufficient'):
+            selector().select([coin(50_000)], 100_000, 1)
+
+    def test_every_payout_is_covered_on_a_large_random_wallet(self):
+        rng = random.Random(7)
+        utxos = [coin(rng.randint(1_000, 2_000_000), tag=i) for i in range(10_000)]
+
+        for amount, payouts in ((150_000, 1), (2_500_000, 3), (40_000_000, 8)):
+            selected = selector().select(utxos, amount, payouts)
+            fee, change = selector().settle(selected, amount, payouts)
+            self.assertLessEqual(len(selected), 100)
+            self.assertEqual(sum(u['value'] for u in selected), amount + fee + change)
+            self.assertGreaterEqual(fee, estimate_fee(SEGWIT, RATE, len(selected), payouts + (1 if change else 0)))
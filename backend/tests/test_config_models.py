@@ -13,7 +13,7 @@
 import copy
 import unittest
 
-from app.config_models import validate_configs
+from app.config_models import validate_configs, validate_rate_limits
 from tests import helpers
 
 
@@ -140,6 +140,16 @@ class ConfigModelTests(unittest.TestCase):
         with self.assertRaises(ValueError):
             validate_configs({}, {}, utxo, {}, {})
 
+    def test_fanout_pool_stays_below_the_mempool_chain_limit(self):
+        # 25 unconfirmed descendants is Bitcoin Core's default limit
+        utxo = copy.deepcopy(helpers.UTXO_TEST_CONFIGS)
+        utxo['knf']['faucet']['fanout_pool_size'] = 24
+        validate_configs({}, {}, utxo, {}, {})
+
+        utxo['knf']['faucet']['fanout_pool_size'] = 25
+        with self.assertRaises(ValueError):
+            validate_configs({}, {}, utxo, {}, {})
+
     def test_error_names_the_broken_entry(self):
         def mutate(c):
             del c['testchain']['faucet']['rpc_url']
@@ -156,5 +166,19 @@ class ConfigModelTests(unittest.TestCase):
         self.assertNotIn('explorer', evm['testchain'])
 
 
+    def test_rate_limit_budget_validates(self):
+        rules = validate_rate_limits({'/api/evm/<network>/request': {'burst': 5, 'per_minute': 10}})
+        self.assertEqual(rules['/api/evm/<network>/request'], {'burst': 5, 'per_minute': 10.0})
+
+    def test_rate_limit_zero_burst_is_rejected(self):
+        with self.assertRaises(ValueError) as caught:
+            validate_rate_limits({'/api/evm/<network>/request': {'burst': 0, 'per_minute': 10}})
+        self.assertIn('/api/evm/<network>/request', str(caught.exception))
+
+    def test_rate_limit_key_must_be_a_route_rule(self):
+        with self.assertRaises(ValueError):
+            validate_rate_limits({'sepolia': {'burst': 5, 'per_minute': 10}})
+
+
 if __name__ == '__main__':
     unittest.main()
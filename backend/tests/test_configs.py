@@ -104,6 +104,7 @@ class UtxoConfigTests(unittest.TestCase):
                 params = coin_params(faucet['coin'], faucet['network'])
                 self.assertTrue('hrp' in params or 'p2pkh_prefix' in params)
                 self.assertGreater(params['fee_rate'], 0)
+                self.assertTrue(0 < params['min_fee_rate'] <= params['fee_rate'] <= params['max_fee_rate'])
                 self.assertGreater(params['dust_limit'], 0)
 
     def test_ids_unique(self):
@@ -0,0 +1,132 @@
+############################################################
+#  [*] Consolidation tests
+#
+#  Offline checks of the UTXO wallet sweep: the planner
+#  takes the smallest coins worth spending and splits them
+#  into a few equal outputs (never dust); the faucet sweeps
+#  only a fragmented wallet, at a cheap fee rate, on an idle
+#  network — and then pays the exact fee, keeps the UTXO set
+#  in step and reports the before/after counts. Electrum is
+#  faked; the sweep is built and signed for real.
+############################################################
+
+
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from embit.transaction import Transaction
+
+from app.utxo_faucet.consolidation import sweep_inputs, split_outputs, CONSOLIDATE_INTO_OUTPUTS
+from tests import helpers
+
+
+SEGWIT = SimpleNamespace(INPUT_SIZE=91, OUTPUT_SIZE=31)
+
+
+def coin(value, tag):
+    return {'tx_hash': f'{tag:064x}', 'tx_pos': 0, 'value': value, 'height': 100}
+
+
+
+
+############################################################
+# SweepPlanTests
+############################################################
+
+class SweepPlanTests(unittest.TestCase):
+
+    def test_sweep_takes_the_smallest_coins_worth_spending(self):
+        # 910 sat is exactly its own input fee at 10 sat/vB: never spent
+        utxos = [coin(910, 0), coin(5_000_000, 1)] + [coin(2_000 + i, 2 + i) for i in range(6)]
+        selected = sweep_inputs(utxos, SEGWIT, 10, max_inputs=5)
+        self.assertEqual([u['value'] for u in selected], [2_000, 2_001, 2_002, 2_003, 2_004])
+
+    def test_too_few_coins_are_not_swept(self):
+        utxos = [coin(50_000, i) for i in range(CONSOLIDATE_INTO_OUTPUTS)]
+        self.assertEqual(sweep_inputs(utxos, SEGWIT, 10), [])
+
+    def test_split_is_equal_with_the_remainder_last(self):
+        self.assertEqual(split_outputs(10_001, 3, 546), [3_333, 3_333, 3_335])
+
+    def test_split_never_makes_dust(self):
+        self.assertEqual(split_outputs(1_500, 3, 546), [750, 750])
+        self.assertEqual(split_outputs(1_000, 3, 546), [1_000])
+        self.assertEqual(split_outputs(546, 3, 546), [])
+
+
+
+
+############################################################
+# ConsolidationTests
+############################################################
+#
+# knf with 120 coins of 20k sat; the tests lower the
+# threshold and raise the fee ceiling where a sweep must run
+# (the fake Electrum has no estimate, so the rate is the
+# registry's 10 sat/vB — above the default ceiling).
+############################################################
+
+class ConsolidationTests(unittest.TestCase):
+
+    UTXOS = [coin(20_000, i) for i in range(120)]
+
+    def setUp(self):
+        self.faucet = helpers.make_utxo_faucet()
+        self.captured = helpers.fake_electrum(self.faucet, 'knf', self.UTXOS)
+        self.faucet._consolidation['knf'] = (100, 10)
+
+    def test_fragmented_wallet_is_swept_into_a_few_outputs(self):
+        report = self.faucet.consolidator.run_once('knf')
+        tx = Transaction.from_string(self.captured['raw'])
+        ctx = self.faucet._setup_wallet_for_network('knf')
+
+        self.assertEqual((report['before'], report['after']), (120, 120 - 100 + CONSOLIDATE_INTO_OUTPUTS))
+        self.assertEqual((len(tx.vin), len(tx.vout)), (100, CONSOLIDATE_INTO_OUTPUTS))
+        self.assertTrue(all(out.script_pubkey == ctx.script_pubkey for out in tx.vout))
+        self.assertEqual(report['fee'], ctx.dialect.signed_vsize(tx) * 10)
+        self.assertEqual(sum(out.value for out in tx.vout) + report['fee'], 100 * 20_000)
+        self.assertEqual(self.faucet.get_consolidation()[0]['networks']['knf']['last'], report)
+
+    def test_the_sweep_outputs_join_the_utxo_set(self):
+        self.faucet._consolidate('knf')
+        txid = Transaction.from_string(self.captured['raw']).txid().hex()
+        utxo_set = self.faucet._utxo_sets['knf']
+        swept = utxo_set.reserve(lambda utxos: [u for u in utxos if u['tx_hash'] == txid])
+        self.assertEqual(len(swept), CONSOLIDATE_INTO_OUTPUTS)
+
+    def test_wallet_under_the_threshold_is_left_alone(self):
+        self.faucet._consolidation['knf'] = (120, 10)
+        self.assertIsNone(self.faucet._consolidate('knf'))
+        self.assertNotIn('raw', self.captured)
+
+    def test_expensive_fees_skip_the_sweep(self):
+        self.faucet._consolidation['knf'] = (100, 9)
+        self.assertIsNone(self.faucet._consolidate('knf'))
+        self.assertNotIn('raw', self.captured)
+
+    def test_a_recent_payout_skips_the_sweep(self):
+        self.faucet._last_payouts['knf'] = time.monotonic()
+        self.assertIsNone(self.faucet._consolidate('knf'))
+        self.assertNotIn('raw', self.captured)
+
+    def test_dust_after_the_re_price_is_never_broadcast(self):
+        # The signed vsize can price the sweep past its inputs too
+        first = split_outputs(1_000_000, CONSOLIDATE_INTO_OUTPUTS, 546)
+        with patch('app.utxo_faucet.utxo_faucet.split_outputs', side_effect=[first, []]):
+            with self.assertRaises(ValueError):
+                self.faucet._consolidate('knf')
+
+        self.assertNotIn('raw', self.captured)
+        self.assertEqual(len(self.faucet._utxo_sets['knf'].reserve(lambda utxos: utxos)), 120)
+
+    def test_failed_broadcast_frees_the_coins(self):
+        client = self.faucet._electrum_clients['knf']
+        client.request = lambda method, params: 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            self.faucet._consolidate('knf')
+
+        utxo_set = self.faucet._utxo_sets['knf']
+        self.assertTrue(utxo_set.stale)
+        self.assertEqual(len(utxo_set.reserve(lambda utxos: utxos)), 120)
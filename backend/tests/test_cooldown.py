@@ -1,19 +1,29 @@
 ############################################################
 #  [*] Cooldown table regression tests
 #
-#  Offline checks of the shared claim/release semantics all
-#  three faucets rely on: the first claim wins, a second one
+#  Offline checks of the shared claim/release semantics every
+#  faucet relies on: the first claim wins, a second one
 #  inside the window is refused with the remaining seconds, a
 #  release (the failure path) reopens the slot immediately,
 #  expiry reopens it by itself, and keys don't interfere.
-#  Time is mocked — no sleeping in tests.
+#  Expired slots are swept, released ones unfiled, and the
+#  hard cap evicts oldest first, so memory stays flat.
+#  The SQLite backend runs the same checks against a
+#  throwaway file, plus the multi-worker send locks. Time is
+#  mocked — no sleeping in tests.
 ############################################################
 
 
+import os
+import fcntl
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch
 
-from app.cooldown import CooldownTable
+from app import shared_state
+from app.cooldown import CooldownTable, SqliteCooldownTable, cooldown_table
+from app.shared_state import SendLocks, ProcessLock
 
 
 
@@ -64,6 +74,213 @@ class CooldownTableTests(unittest.TestCase):
         table = CooldownTable(seconds=60)
         table.release(('net', 'never-claimed'))
 
+    def test_expired_slots_are_swept_from_memory(self):
+        table = CooldownTable(seconds=60)
+        with patch('app.cooldown.time.time', return_value=1000):
+            for i in range(50):
+                table.claim(('net', f'addr-{i}'))
+        with patch('app.cooldown.time.time', return_value=1060):
+            table.claim(('net', 'late'))
+            self.assertEqual(table.stats()['live'], 1)
+            self.assertEqual(table.stats()['expired'], 50)
+
+    def test_cap_evicts_the_oldest_slots_first(self):
+        table = CooldownTable(seconds=60, max_entries=3, stripes=1)
+        for second, addr in enumerate(['a', 'b', 'c', 'd']):
+            with patch('app.cooldown.time.time', return_value=1000 + second):
+                self.assertEqual(table.claim(('net', addr)), 0)
+        with patch('app.cooldown.time.time', return_value=1004):
+            self.assertEqual(table.stats()['evicted'], 1)
+            self.assertEqual(table.claim(('net', 'a')), 0)   # evicted — reopened early
+            self.assertEqual(table.claim(('net', 'd')), 59)  # newest still cooling down
+
+    def test_peek_reports_without_claiming(self):
+        table = CooldownTable(seconds=60)
+        with patch('app.cooldown.time.time', return_value=1000):
+            self.assertEqual(table.peek(('net', 'addr')), 0)
+            self.assertEqual(table.claim(('net', 'addr')), 0)   # the peek took nothing
+        with patch('app.cooldown.time.time', return_value=1040):
+            self.assertEqual(table.peek(('net', 'addr')), 20)
+
+    def test_membership_tracks_live_claims(self):
+        table = CooldownTable(seconds=60)
+        with patch('app.cooldown.time.time', return_value=1000):
+            table.claim(('net', 'addr'))
+            self.assertIn(('net', 'addr'), table)
+            self.assertNotIn(('net', 'other'), table)
+        with patch('app.cooldown.time.time', return_value=1060):
+            self.assertNotIn(('net', 'addr'), table)
+
+    def test_parallel_claims_have_exactly_one_winner_per_key(self):
+        # Striping must keep check-and-claim atomic per key
+        table = CooldownTable(seconds=60, stripes=4)
+        keys = [('net', f'addr-{i}') for i in range(10)]
+        results = []
+        threads = [threading.Thread(target=lambda k=k: results.append((k, table.claim(k))))
+                   for k in keys for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        winners = [key for key, remaining in results if remaining == 0]
+        self.assertEqual(sorted(winners), sorted(keys))
+
+    def test_reclaimed_slot_survives_its_old_bucket(self):
+        # Released and claimed again later: the stale first filing must not
+        # sweep the fresh claim
+        table = CooldownTable(seconds=60)
+        with patch('app.cooldown.time.time', return_value=1000):
+            table.claim(('net', 'addr'))
+            table.release(('net', 'addr'))
+        with patch('app.cooldown.time.time', return_value=1030):
+            table.claim(('net', 'addr'))
+        with patch('app.cooldown.time.time', return_value=1065):
+            self.assertEqual(table.claim(('net', 'addr')), 25)
+            self.assertEqual(table.stats()['expired'], 0)
+
+    def test_claim_release_churn_keeps_the_buckets_flat(self):
+        # Every payout failing: a claim and a release per request,
+        # within one window — nothing may stay filed
+        table = CooldownTable(seconds=60, stripes=4)
+        with patch('app.cooldown.time.time', return_value=1000):
+            for i in range(1000):
+                table.claim(('net', f'addr-{i}'))
+                table.release(('net', f'addr-{i}'))
+            table.claim(('net', 'kept'))
+            self.assertEqual(table.stats()['live'], 1)
+
+        filed = sum(len(keys) for stripe in table._stripes for keys in stripe._buckets.values())
+        self.assertEqual(filed, 1)
+
+
+
+
+
+############################################################
+# SqliteCooldownTableTests
+############################################################
+#
+# The multi-worker backend must honour the exact same
+# contract — two table objects on one file stand in for two
+# gunicorn workers.
+############################################################
+
+class SqliteCooldownTableTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cooldowns.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def table(self, namespace='evm'):
+        return SqliteCooldownTable(60, namespace, self.path)
+
+    def test_claim_is_shared_between_workers(self):
+        worker_a, worker_b = self.table(), self.table()
+        with patch('app.cooldown.time.time', return_value=1000):
+            self.assertEqual(worker_a.claim(('net', 'addr')), 0)
+            self.assertEqual(worker_b.claim(('net', 'addr')), 60)
+
+    def test_refusal_reports_remaining_seconds(self):
+        table = self.table()
+        with patch('app.cooldown.time.time', return_value=1000):
+            table.claim(('net', 'addr'))
+        with patch('app.cooldown.time.time', return_value=1040):
+            self.assertEqual(table.claim(('net', 'addr')), 20)
+
+    def test_release_in_one_worker_reopens_for_all(self):
+        worker_a, worker_b = self.table(), self.table()
+        with patch('app.cooldown.time.time', return_value=1000):
+            worker_a.claim(('net', 'addr'))
+            worker_a.release(('net', 'addr'))
+            self.assertEqual(worker_b.claim(('net', 'addr')), 0)
+
+    def test_expiry_reopens_the_slot(self):
+        table = self.table()
+        with patch('app.cooldown.time.time', return_value=1000):
+            table.claim(('net', 'addr'))
+        with patch('app.cooldown.time.time', return_value=1060):
+            self.assertEqual(table.claim(('net', 'addr')), 0)
+
+    def test_namespaces_do_not_interfere(self):
+        # The EVM and ERC-20 faucets share the file, not the slots
+        with patch('app.cooldown.time.time', return_value=1000):
+            self.assertEqual(self.table('evm').claim(('net', 'addr')), 0)
+            self.assertEqual(self.table('erc20').claim(('net', 'addr')), 0)
+
+    def test_peek_sees_other_workers_claims(self):
+        worker_a, worker_b = self.table(), self.table()
+        with patch('app.cooldown.time.time', return_value=1000):
+            self.assertEqual(worker_b.peek(('net', 'addr')), 0)
+            worker_a.claim(('net', 'addr'))
+            self.assertEqual(worker_b.peek(('net', 'addr')), 60)
+
+    def test_expired_rows_are_pruned(self):
+        table = self.table()
+        with patch('app.cooldown.time.time', return_value=1000):
+            for i in range(20):
+                table.claim(('net', f'addr-{i}'))
+        with patch('app.cooldown.time.time', return_value=1060):
+            table.claim(('net', 'late'))
+            self.assertEqual(table.stats()['live'], 1)
+            self.assertEqual(table.stats()['expired'], 20)
+
+    def test_parallel_claims_have_exactly_one_winner(self):
+        results = []
+        tables = [self.table() for _ in range(8)]
+        threads = [threading.Thread(target=lambda t=t: results.append(t.claim(('net', 'addr')))) for t in tables]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(0), 1)
+
+    def test_factory_picks_the_backend_from_the_switch(self):
+        self.assertIsInstance(cooldown_table(60, 'evm'), CooldownTable)
+        with patch.object(shared_state, 'SHARED_STATE_DIR', self.tmp.name):
+            self.assertIsInstance(cooldown_table(60, 'evm'), SqliteCooldownTable)
+
+
+
+
+############################################################
+# SendLocksTests
+############################################################
+#
+# One lock object per network, and in multi-worker mode a
+# lock that a second open of the same file cannot take.
+############################################################
+
+class SendLocksTests(unittest.TestCase):
+
+    def test_same_network_same_lock(self):
+        locks = SendLocks('evm')
+        self.assertIs(locks.for_network('sepolia'), locks.for_network('sepolia'))
+        self.assertIsNot(locks.for_network('sepolia'), locks.for_network('hoodi'))
+
+    def test_single_process_mode_uses_plain_locks(self):
+        self.assertNotIsInstance(SendLocks('evm').for_network('sepolia'), ProcessLock)
+
+    def test_process_lock_excludes_another_worker(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.object(shared_state, 'SHARED_STATE_DIR', tmp):
+                lock = SendLocks('utxo').for_network('btc4')
+                self.assertIsInstance(lock, ProcessLock)
+
+                # A separate open of the same file = another worker
+                other = os.open(os.path.join(tmp, 'locks', 'utxo-btc4.lock'), os.O_RDWR)
+                try:
+                    with lock:
+                        with self.assertRaises(BlockingIOError):
+                            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(other, fcntl.LOCK_UN)
+                finally:
+                    os.close(other)
+
 
 if __name__ == '__main__':
     unittest.main()
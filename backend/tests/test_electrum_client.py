@@ -7,11 +7,16 @@
 #
 #    framing  — the handshake goes first, requests are
 #               newline-delimited JSON, a reply split across
-#               TCP chunks is reassembled, trailing bytes are
-#               ignored
+#               TCP chunks is reassembled, bytes after a
+#               newline are kept for the next reply
 #    healing  — a dropped socket reconnects and retries ONCE;
 #               a server-side error does NOT retry (the server
 #               answered, asking again changes nothing)
+#    pipeline — concurrent calls share the socket, replies are
+#               matched by id, batch arrays, a read never
+#               overlaps a write, a timeout fails one call only
+#    pushes   — subscription notifications reach their
+#               callback, and survive a reconnect
 #    queries  — the satoshi→coin conversion behind every
 #               balance the pages show
 #
@@ -22,13 +27,20 @@
 
 
 import io
+import ssl
 import json
+import socket
+import time
+import itertools
+import threading
 import contextlib
+import weakref
 import unittest
 from unittest.mock import patch
 
 from app.utxo_faucet.electrum_client import (
     ElectrumClient,
+    _LineBuffer,
     ELECTRUM_CLIENT_NAME,
     ELECTRUM_PROTOCOL_VERSION,
 )
@@ -43,6 +55,43 @@ def rpc_error(message):
     return (json.dumps({'jsonrpc': '2.0', 'id': 1, 'error': {'message': message}}) + '\n').encode()
 
 
+def rpc_batch(*results):
+    # One batch reply: an array of results, ids in request order
+    return (json.dumps([{'jsonrpc': '2.0', 'id': 1, 'result': r} for r in results]) + '\n').encode()
+
+
+def reply_to(request, result):
+    return (json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': result}) + '\n').encode()
+
+
+def wait_for_sent(sock, count):
+    # Until the client has written `count` lines to the fake
+    deadline = time.monotonic() + 5
+    while len(sock.sent) < count:
+        if time.monotonic() > deadline:
+            raise AssertionError(f'only {len(sock.sent)} of {count} requests were sent')
+        time.sleep(0.005)
+
+
+def in_thread(results, key, call, *args):
+    thread = threading.Thread(target=lambda: results.__setitem__(key, call(*args)))
+    thread.start()
+    return thread
+
+
+def push(method, params):
+    # A server-initiated notification: a method, no id
+    return (json.dumps({'jsonrpc': '2.0', 'method': method, 'params': params}) + '\n').encode()
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition never became true')
+        time.sleep(0.005)
+
+
 HANDSHAKE = rpc_ok(['ElectrumX 2.0.0', '1.4'])
 
 
@@ -54,8 +103,19 @@ HANDSHAKE = rpc_ok(['ElectrumX 2.0.0', '1.4'])
 #
 # Stands in for the SSL socket. Each script entry is the
 # reply to the NEXT sendall — bytes, a list of byte chunks
-# (to split one reply across recv calls), or an Exception to
-# raise instead. Everything sent is recorded.
+# (to split one reply across recv calls), an Exception to
+# raise instead, or None for no reply yet (a test push()es
+# it later). A reply's id is rewritten to the id actually
+# sent (in order, for a batch array), so scripts need not
+# know the client's numbering. Like the client's
+# non-blocking SSL socket, recv raises SSLWantReadError while
+# nothing has arrived and returns b'' once shut down (b'' in
+# a script is EOF too); fileno() is one end of a socketpair
+# that is readable exactly while recv has something to
+# return, so the reader's select works on the fake.
+# Everything sent is recorded, and a recv during a sendall —
+# two operations on one SSL object at once — is flagged in
+# `overlapped`.
 #
 # Used by:
 #   - fake_transport (below)
@@ -67,28 +127,73 @@ class FakeElectrumSocket:
         self.script = list(script)
         self.sent = []
         self.closed = False
+        self.overlapped = False
+        self._sending = False
         self._chunks = []
+        self._ready = threading.Lock()
+        self._readable, self._signal = socket.socketpair()
+        self._signalled = False
+        weakref.finalize(self, self._readable.close)
+        weakref.finalize(self, self._signal.close)
 
     def setsockopt(self, *args):
         pass
 
+    def settimeout(self, timeout):
+        pass
+
+    def pending(self):
+        return 0
+
+    def fileno(self):
+        return self._readable.fileno()
+
     def sendall(self, data):
+        self._sending = True
+        time.sleep(0.001)   # a window for a concurrent recv to hit
+        self._sending = False
+
         self.sent.append(data)
         reply = self.script.pop(0) if self.script else b''
         if isinstance(reply, Exception):
             raise reply
-        self._chunks = list(reply) if isinstance(reply, list) else [reply]
+        if reply is not None:
+            self.push(*with_request_ids(reply, json.loads(data.decode())))
+
+    def push(self, *chunks):
+        with self._ready:
+            self._chunks.extend(chunks)
+            self._signal_readable()
 
     def recv(self, size):
-        if not self._chunks:
-            return b''
-        chunk = self._chunks.pop(0)
+        if self._sending:
+            self.overlapped = True
+        with self._ready:
+            if not self._chunks:
+                if self.closed:
+                    return b''
+                raise ssl.SSLWantReadError('no data yet')
+            chunk = self._chunks.pop(0)
+            if not self._chunks and not self.closed and self._signalled:
+                self._readable.recv(1)
+                self._signalled = False
         if isinstance(chunk, Exception):
             raise chunk
         return chunk
 
+    def _signal_readable(self):
+        if not self._signalled:
+            self._signal.send(b'.')
+            self._signalled = True
+
+    def shutdown(self, how):
+        self.close()
+
     def close(self):
-        self.closed = True
+        with self._ready:
+            if not self.closed:
+                self.closed = True
+                self._signal.close()    # the reader's select sees EOF
 
     def requests(self):
         # The decoded JSON of everything this socket was asked to send
@@ -97,6 +202,30 @@ class FakeElectrumSocket:
 
 
 
+def with_request_ids(reply, request):
+    # The scripted reply's chunks, its first line re-addressed to
+    # the request's id(s) — chunk boundaries are kept, the last
+    # chunk absorbs the length change
+    chunks = reply if isinstance(reply, list) else [reply]
+    data = b''.join(chunks)
+    if not data:
+        return chunks
+
+    head, newline, rest = data.partition(b'\n')
+    message = json.loads(head.decode())
+    if isinstance(message, list):
+        for response, sent in zip(message, request):
+            response['id'] = sent['id']
+    elif isinstance(message, dict) and 'id' in message:
+        message['id'] = request['id']
+    data = json.dumps(message).encode() + newline + rest
+
+    cuts = list(itertools.accumulate(len(chunk) for chunk in chunks[:-1]))
+    return [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+
+
+
+
 ############################################################
 # fake_transport
 ############################################################
@@ -196,8 +325,9 @@ class ElectrumFramingTests(unittest.TestCase):
 
         self.assertEqual(result[0]['value'], 12345)
 
-    def test_bytes_after_the_newline_are_ignored(self):
-        # Only the first line belongs to this request
+    def test_unmatched_messages_are_ignored(self):
+        # A line that answers no call in flight is dropped; the
+        # waiting call still gets its own reply
         noisy = rpc_ok({'confirmed': 7}) + b'{"garbage": true}\n'
 
         client = ElectrumClient('host:1')
@@ -206,6 +336,23 @@ class ElectrumFramingTests(unittest.TestCase):
 
         self.assertEqual(result['confirmed'], 7)
 
+    def test_two_replies_in_one_chunk_are_both_delivered(self):
+        # The second reply rides in the same recv as the first —
+        # its bytes must wait in the buffer, not be thrown away
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE, None, None]) as sockets:
+            client.connect()
+            results = {}
+            threads = [in_thread(results, param, client.request, 'm', [param]) for param in ('a', 'b')]
+            wait_for_sent(sockets[0], 3)
+
+            first, second = sockets[0].requests()[1:]
+            sockets[0].push(reply_to(first, 1) + reply_to(second, 2))
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(results, {first['params'][0]: 1, second['params'][0]: 2})
+
     def test_debug_mode_prints_timings_without_changing_the_result(self):
         # APP_DEBUG makes the client print() a timing line per call —
         # captured here so a passing run stays quiet
@@ -222,6 +369,38 @@ class ElectrumFramingTests(unittest.TestCase):
 
 
 
+############################################################
+# LineBufferTests
+############################################################
+#
+# The reader's framing layer on its own: lines out of an
+# arbitrary chunking of the stream, leftovers kept.
+############################################################
+
+class LineBufferTests(unittest.TestCase):
+
+    def test_lines_are_cut_across_chunks(self):
+        lines = _LineBuffer()
+        self.assertEqual(lines.feed(b'{"a"'), [])
+        self.assertEqual(lines.feed(b': 1}\n{"b": 2}\n{"c'), [b'{"a": 1}', b'{"b": 2}'])
+        self.assertEqual(lines.feed(b'": 3}\n'), [b'{"c": 3}'])
+
+    def test_byte_by_byte_feed_yields_the_same_lines(self):
+        stream = b'one\ntwo\n\nthree\n'
+        lines = _LineBuffer()
+        out = [line for byte in range(len(stream)) for line in lines.feed(stream[byte:byte + 1])]
+        self.assertEqual(out, [b'one', b'two', b'', b'three'])
+
+    def test_overlong_line_raises(self):
+        # A stream with no newline in sight has desynced
+        lines = _LineBuffer(max_line=8)
+        lines.feed(b'12345678')
+        with self.assertRaises(ValueError):
+            lines.feed(b'9')
+
+
+
+
 ############################################################
 # ElectrumHealingTests
 ############################################################
@@ -301,6 +480,37 @@ class ElectrumHealingTests(unittest.TestCase):
         self.assertEqual(result['confirmed'], 2)
         self.assertEqual(len(sockets), 2)
 
+    def test_silent_server_times_out_and_retries_on_the_same_socket(self):
+        # A timeout is the call's failure, not the connection's
+        client = ElectrumClient('host:1')
+        with patch('app.utxo_faucet.electrum_client.ELECTRUM_TIMEOUT_S', 0.05):
+            with fake_transport([HANDSHAKE, None, rpc_ok({'confirmed': 3})]) as sockets:
+                result = client.request('m', [])
+
+        self.assertEqual(result['confirmed'], 3)
+        self.assertEqual(len(sockets), 1)
+        self.assertFalse(sockets[0].closed)
+
+    def test_a_timed_out_call_fails_alone(self):
+        # The slow call gives up; the call beside it still gets its
+        # reply on the same socket, and the late reply is dropped
+        client = ElectrumClient('host:1', retry=False)
+        with fake_transport([HANDSHAKE, None, None]) as sockets:
+            client.connect()
+            with patch('app.utxo_faucet.electrum_client.ELECTRUM_TIMEOUT_S', 0.05):
+                with self.assertRaises(TimeoutError):
+                    client.request('slow', [])
+
+            results = {}
+            thread = in_thread(results, 'fast', client.request, 'fast', [])
+            wait_for_sent(sockets[0], 3)
+            slow, fast = sockets[0].requests()[1:]
+            sockets[0].push(reply_to(slow, 'late') + reply_to(fast, 'fast'))
+            thread.join(5)
+
+        self.assertEqual(results, {'fast': 'fast'})
+        self.assertIsNotNone(client.ssock)
+
     def test_server_side_error_is_not_retried(self):
         # The server ANSWERED (bad scripthash, unknown method) —
         # reconnecting would only ask the same question again
@@ -337,6 +547,199 @@ class ElectrumHealingTests(unittest.TestCase):
 
 
 
+############################################################
+# ElectrumPipelineTests
+############################################################
+#
+# Many calls in flight on one socket: unique ids, replies
+# matched by id whatever order they arrive in, batch arrays,
+# and a dropped socket failing (and healing) every waiting
+# call at once.
+############################################################
+
+class ElectrumPipelineTests(unittest.TestCase):
+
+    def test_every_request_gets_its_own_id(self):
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE, rpc_ok(1), rpc_ok(2)]) as sockets:
+            client.request('m', [])
+            client.request('m', [])
+
+        ids = [request['id'] for request in sockets[0].requests()]
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_concurrent_requests_share_the_socket_and_match_by_id(self):
+        # Both requests are on the wire before either is answered,
+        # and the answers arrive in reverse order
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE, None, None]) as sockets:
+            client.connect()
+            results = {}
+            threads = [in_thread(results, param, client.request, 'm', [param]) for param in ('a', 'b')]
+            wait_for_sent(sockets[0], 3)
+
+            for request in reversed(sockets[0].requests()[1:]):
+                sockets[0].push(reply_to(request, request['params'][0].upper()))
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(results, {'a': 'A', 'b': 'B'})
+        self.assertEqual(len(sockets), 1)
+
+    def test_reads_never_overlap_a_write(self):
+        # Replies stream in while other calls are still sending;
+        # the SSL object must never see a recv inside a sendall
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE] + [rpc_ok(n) for n in range(20)]) as sockets:
+            client.connect()
+            results = {}
+            threads = [in_thread(results, n, client.request, 'm', []) for n in range(20)]
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(len(results), 20)
+        self.assertFalse(sockets[0].overlapped)
+
+    def test_batch_is_one_array_with_results_in_request_order(self):
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE, None]) as sockets:
+            client.connect()
+            results = {}
+            thread = in_thread(results, 'batch', client.batch, [('m1', ['x']), ('m2', ['y'])])
+            wait_for_sent(sockets[0], 2)
+
+            sent = sockets[0].requests()[1]
+            self.assertIsInstance(sent, list)
+            self.assertEqual([request['method'] for request in sent], ['m1', 'm2'])
+
+            # The server may answer the array in any order
+            answers = [{'jsonrpc': '2.0', 'id': request['id'], 'result': request['method']} for request in sent]
+            sockets[0].push((json.dumps(answers[::-1]) + '\n').encode())
+            thread.join(5)
+
+        self.assertEqual(results['batch'], ['m1', 'm2'])
+
+    def test_batch_item_error_raises_without_retry(self):
+        error_item = {'jsonrpc': '2.0', 'id': 1, 'error': {'message': 'bad scripthash'}}
+        reply = (json.dumps([{'jsonrpc': '2.0', 'id': 1, 'result': 1}, error_item]) + '\n').encode()
+
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE, reply], [HANDSHAKE, rpc_batch(1, 2)]) as sockets:
+            with self.assertRaises(RuntimeError):
+                client.batch([('m', []), ('m', [])])
+
+        self.assertEqual(len(sockets), 1)
+
+    def test_empty_batch_sends_nothing(self):
+        client = ElectrumClient('host:1')
+        with fake_transport() as sockets:
+            self.assertEqual(client.batch([]), [])
+        self.assertEqual(sockets, [])
+
+    def test_dropped_socket_fails_and_heals_every_call_in_flight(self):
+        # Both waiting calls retry; the second finds the first's
+        # fresh connection instead of opening a third
+        client = ElectrumClient('host:1')
+        with fake_transport(
+            [HANDSHAKE, None, None],
+            [HANDSHAKE, rpc_ok('again'), rpc_ok('again')],
+        ) as sockets:
+            client.connect()
+            results = {}
+            threads = [in_thread(results, key, client.request, 'm', []) for key in ('a', 'b')]
+            wait_for_sent(sockets[0], 3)
+
+            sockets[0].push(b'')
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(results, {'a': 'again', 'b': 'again'})
+        self.assertEqual(len(sockets), 2)
+        self.assertTrue(sockets[0].closed)
+
+
+
+
+############################################################
+# ElectrumSubscriptionTests
+############################################################
+#
+# Server pushes: routed to the subscription they belong to,
+# re-established (and reported) after a reconnect.
+############################################################
+
+class ElectrumSubscriptionTests(unittest.TestCase):
+
+    SCRIPTHASH_SUB = 'blockchain.scripthash.subscribe'
+
+    def test_subscribe_returns_the_current_value(self):
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE, rpc_ok('status-1')]) as sockets:
+            value = client.subscribe(self.SCRIPTHASH_SUB, ['ff'], lambda status: None)
+
+            self.assertEqual(value, 'status-1')
+            self.assertTrue(client.subscribed(self.SCRIPTHASH_SUB, ['ff']))
+        self.assertEqual(sockets[0].requests()[1]['method'], self.SCRIPTHASH_SUB)
+
+    def test_pushes_reach_their_own_subscription_only(self):
+        seen = []
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE, rpc_ok('s0'), rpc_ok({'height': 1})]) as sockets:
+            client.subscribe(self.SCRIPTHASH_SUB, ['ff'], lambda status: seen.append(('ff', status)))
+            client.subscribe('blockchain.headers.subscribe', [], lambda header: seen.append(('tip', header['height'])))
+
+            sockets[0].push(push(self.SCRIPTHASH_SUB, ['ee', 'other-address']))
+            sockets[0].push(push(self.SCRIPTHASH_SUB, ['ff', 's1']))
+            sockets[0].push(push('blockchain.headers.subscribe', [{'height': 2}]))
+            wait_until(lambda: len(seen) == 2)
+
+        self.assertEqual(seen, [('ff', 's1'), ('tip', 2)])
+
+    def test_reconnect_resubscribes_in_one_batch_and_reports(self):
+        seen = []
+        client = ElectrumClient('host:1')
+        with fake_transport(
+            [HANDSHAKE, rpc_ok('s0')],
+            [HANDSHAKE, rpc_batch('s-after'), rpc_ok(1)],
+        ) as sockets:
+            client.subscribe(self.SCRIPTHASH_SUB, ['ff'], seen.append)
+
+            sockets[0].push(b'')
+            wait_until(lambda: client.ssock is None)
+            self.assertFalse(client.subscribed(self.SCRIPTHASH_SUB, ['ff']))
+
+            client.request('m', [])
+
+        resubscribe = sockets[1].requests()[1]
+        self.assertEqual([request['method'] for request in resubscribe], [self.SCRIPTHASH_SUB])
+        self.assertEqual(seen, ['s-after'])
+        self.assertTrue(client.subscribed(self.SCRIPTHASH_SUB, ['ff']))
+
+    def test_refused_subscription_is_not_kept(self):
+        client = ElectrumClient('host:1')
+        with fake_transport([HANDSHAKE, rpc_error('unknown method')]):
+            with self.assertRaises(RuntimeError):
+                client.subscribe(self.SCRIPTHASH_SUB, ['ff'], lambda status: None)
+
+            self.assertFalse(client.subscribed(self.SCRIPTHASH_SUB, ['ff']))
+
+    def test_failing_callback_keeps_the_connection(self):
+        def broken(status):
+            raise KeyError(status)
+
+        client = ElectrumClient('host:1')
+        with patch('app.utxo_faucet.electrum_client.logging.exception') as logged:
+            with fake_transport([HANDSHAKE, rpc_ok('s0'), rpc_ok(7)]) as sockets:
+                client.subscribe(self.SCRIPTHASH_SUB, ['ff'], broken)
+                sockets[0].push(push(self.SCRIPTHASH_SUB, ['ff', 's1']))
+                wait_until(lambda: logged.called)
+
+                self.assertEqual(client.request('m', []), 7)
+        self.assertEqual(len(sockets), 1)
+
+
+
+
 ############################################################
 # ElectrumQueryTests
 ############################################################
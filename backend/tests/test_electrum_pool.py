@@ -0,0 +1,170 @@
+############################################################
+#  [*] Electrum pool tests
+#
+#  Offline checks of the multi-endpoint Electrum pool: the
+#  configured endpoint is preferred until pings say
+#  otherwise, the fastest healthy endpoint wins, a transport
+#  failure fails over within the same request while an
+#  Electrum-side error does not, subscriptions reach the
+#  other endpoints on their next ping, a single-endpoint
+#  pool keeps the client's own retry, every endpoint is
+#  handed to the keep-alive scheduler, and the debug
+#  snapshot reports the stats. The per-endpoint clients are
+#  fakes; ping latency is mocked through time.
+############################################################
+
+
+import unittest
+from unittest.mock import patch
+
+from app.utxo_faucet.electrum_pool import ElectrumPool
+
+
+class FakeClient:
+    # request() answers its own name unless `down` or
+    # `refuse`, counted; subscribe() registers like the real
+    # client
+    def __init__(self, name):
+        self.name = name
+        self.down = False
+        self.refuse = False
+        self.calls = []
+        self.subscriptions = {}
+        self.label = name
+
+    @property
+    def ssock(self):
+        return None if self.down else object()
+
+    def request(self, method, params):
+        self.calls.append(method)
+        if self.down:
+            raise ConnectionError(f'{self.name} down')
+        if self.refuse:
+            raise RuntimeError(f'{self.name} refused')
+        return self.name
+
+    def subscribe(self, method, params, callback):
+        self.subscriptions[(method, tuple(params))] = callback
+        return self.request(method, params)
+
+    def subscribed(self, method, params):
+        return not self.down and (method, tuple(params)) in self.subscriptions
+
+
+def pool(*names):
+    electrum = ElectrumPool([f'{name}:50002' for name in names], label='net')
+    clients = []
+    for endpoint, name in zip(electrum._endpoints, names):
+        endpoint.client = FakeClient(name)
+        clients.append(endpoint.client)
+    return electrum, clients
+
+
+def ping(electrum, index, seconds):
+    # One health check whose server.ping takes `seconds`; a
+    # failed one raises for the scheduler, swallowed here
+    with patch('app.utxo_faucet.electrum_pool.time.monotonic', side_effect=[0.0, seconds]):
+        try:
+            electrum.check(electrum._endpoints[index])
+        except ConnectionError:
+            pass
+
+
+
+
+############################################################
+# ElectrumPoolTests
+############################################################
+
+class ElectrumPoolTests(unittest.TestCase):
+
+    def test_configured_endpoint_is_preferred_before_any_ping(self):
+        electrum, (a, b) = pool('a', 'b')
+        self.assertEqual(electrum.request('server.features', []), 'a')
+        self.assertEqual(b.calls, [])
+
+    def test_fastest_healthy_endpoint_wins(self):
+        electrum, _ = pool('a', 'b')
+        ping(electrum, 0, 0.400)
+        ping(electrum, 1, 0.050)
+        self.assertEqual(electrum.request('server.features', []), 'b')
+
+    def test_transport_failure_fails_over_in_the_same_request(self):
+        electrum, (a, b) = pool('a', 'b')
+        a.down = True
+
+        self.assertEqual(electrum.request('blockchain.transaction.broadcast', ['00']), 'b')
+        # a's failure is remembered: the next request skips it
+        self.assertEqual(electrum.request('server.features', []), 'b')
+        self.assertEqual(len(a.calls), 1)
+
+    def test_every_endpoint_down_raises_the_last_failure(self):
+        electrum, (a, b) = pool('a', 'b')
+        a.down = b.down = True
+        with self.assertRaisesRegex(ConnectionError, 'b down'):
+            electrum.request('server.features', [])
+
+    def test_server_side_error_does_not_fail_over(self):
+        electrum, (a, b) = pool('a', 'b')
+        a.refuse = True
+        with self.assertRaises(RuntimeError):
+            electrum.request('blockchain.transaction.broadcast', ['00'])
+        self.assertEqual(b.calls, [])
+
+    def test_errors_inflate_the_latency_score(self):
+        electrum, (a, b) = pool('a', 'b')
+        ping(electrum, 0, 0.050)
+        ping(electrum, 1, 0.100)
+        a.down = True
+        ping(electrum, 0, 0.050)
+        a.down = False
+        ping(electrum, 0, 0.050)    # healthy again, but 1 in 3 failed
+
+        self.assertEqual(electrum.request('server.features', []), 'b')
+
+    def test_subscriptions_reach_the_other_endpoints_on_their_ping(self):
+        electrum, (a, b) = pool('a', 'b')
+        electrum.subscribe('blockchain.headers.subscribe', [], lambda header: None)
+        self.assertEqual(list(b.subscriptions), [])
+
+        ping(electrum, 1, 0.050)
+        self.assertIn(('blockchain.headers.subscribe', ()), b.subscriptions)
+
+        a.down = True
+        self.assertTrue(electrum.subscribed('blockchain.headers.subscribe', []))
+
+    def test_refused_subscription_is_not_kept(self):
+        electrum, (a, b) = pool('a', 'b')
+        a.refuse = True
+        with self.assertRaises(RuntimeError):
+            electrum.subscribe('blockchain.headers.subscribe', [], lambda header: None)
+
+        ping(electrum, 1, 0.050)
+        self.assertEqual(b.subscriptions, {})
+
+    def test_single_endpoint_keeps_the_client_retry(self):
+        self.assertTrue(ElectrumPool(['a:50002'])._endpoints[0].client.retry)
+        self.assertFalse(ElectrumPool(['a:50002', 'b:50002'])._endpoints[0].client.retry)
+
+    def test_every_endpoint_is_kept_alive(self):
+        electrum, (a, b) = pool('a', 'b')
+        with patch('app.utxo_faucet.electrum_pool.keepalive_scheduler') as scheduler:
+            electrum.start()
+
+        names = [call.args[0] for call in scheduler.register.call_args_list]
+        self.assertEqual(names, ['utxo/net/a:50002', 'utxo/net/b:50002'])
+        scheduler.register.call_args_list[1].args[1]()
+        self.assertEqual(b.calls, ['server.ping'])
+
+    def test_snapshot_reports_stats_best_first(self):
+        electrum, (a, b) = pool('a', 'b')
+        ping(electrum, 0, 0.200)
+        b.down = True
+        ping(electrum, 1, 0.010)
+
+        first, second = electrum.snapshot()
+        self.assertEqual((first['endpoint'], first['latency_ms'], first['healthy']), ('a:50002', 200.0, True))
+        self.assertEqual((second['endpoint'], second['error_rate'], second['healthy']), ('b:50002', 1.0, False))
+        self.assertEqual(second['last_error'], 'b down')
+        self.assertFalse(second['connected'])
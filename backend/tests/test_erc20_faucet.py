@@ -54,11 +54,13 @@ class Erc20FaucetTests(unittest.TestCase):
         self.assertEqual(status, 400)
         self.assertIn('error', data)
 
-    def test_shares_the_evm_send_locks(self):
-        # Same wallet, same chain -> the SAME lock object as the native faucet
+    def test_shares_the_evm_nonces_and_queue(self):
+        # Same wallet, same chain -> the SAME nonce counter and payout
+        # queue as the native faucet
         evm = helpers.make_evm_faucet()
         erc20 = helpers.make_erc20_faucet(evm_faucet=evm)
-        self.assertIs(erc20.evm_faucet.send_lock_for('testchain'), evm.send_lock_for('testchain'))
+        self.assertIs(erc20.evm_faucet.nonces, evm.nonces)
+        self.assertIs(erc20.evm_faucet.payouts, evm.payouts)
 
 
 if __name__ == '__main__':
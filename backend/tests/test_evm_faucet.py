@@ -4,12 +4,14 @@
 #  Offline checks of everything EVMFaucet decides without an
 #  RPC: key normalization, the <NAME> template substitution
 #  in rpc_url, the composed public payload (which must never
-#  leak backend-only config), and the per-network send locks.
+#  leak backend-only config), the local nonce counter and the
+#  gas oracle's debug payload.
 ############################################################
 
 
 import json
 import unittest
+import threading
 
 from eth_account import Account
 
@@ -70,11 +72,73 @@ class EvmFaucetTests(unittest.TestCase):
         self.assertIsInstance(entry['block_explorer_urls'], list)
         self.assertEqual(entry['native_currency']['decimals'], 18)
 
-    def test_send_lock_is_per_network(self):
-        # Same network -> same lock object; different -> different
+    def test_gas_oracle_payload_covers_every_network(self):
+        # Before any fetch: listed, legacy by default, stale
         faucet = helpers.make_evm_faucet()
-        self.assertIs(faucet.send_lock_for('testchain'), faucet.send_lock_for('testchain'))
-        self.assertIsNot(faucet.send_lock_for('testchain'), faucet.send_lock_for('other'))
+        data, status = faucet.get_gas_oracle()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['networks']['testchain']['mode'], 'legacy')
+        self.assertTrue(data['networks']['testchain']['stale'])
+
+    @staticmethod
+    def transfer(nonce):
+        return {'to': '0x' + '22' * 20, 'value': 1, 'gas': 21000, 'gasPrice': 1, 'nonce': nonce, 'chainId': 12345}
+
+    def test_send_with_nonce_gives_up_after_one_retry(self):
+        # A conflict that survives the resync is a real failure
+        faucet = helpers.make_evm_faucet()
+        eth = helpers.fake_web3(faucet, 'testchain', pending_nonce=2, nonce_conflicts=2)
+
+        with self.assertRaises(ValueError):
+            faucet.send_with_nonce('testchain', self.transfer)
+        self.assertEqual(eth.nonce_reads, 2)
+
+    def test_other_failures_are_not_retried(self):
+        faucet = helpers.make_evm_faucet()
+        eth = helpers.fake_web3(faucet, 'testchain', broadcast_error='insufficient funds')
+
+        with self.assertRaises(RuntimeError):
+            faucet.send_with_nonce('testchain', self.transfer)
+        self.assertEqual(eth.nonce_reads, 1)
+
+    def test_failed_send_never_reissues_a_nonce_in_flight(self):
+        # A's send fails while B holds the next nonce, not yet
+        # broadcast: the payouts after A reuse A's number and then
+        # skip B's — never a resync back onto it
+        faucet = helpers.make_evm_faucet()
+        eth = helpers.fake_web3(faucet, 'testchain', pending_nonce=2)
+        b_allocated, a_failed = threading.Event(), threading.Event()
+
+        def build_a(nonce):
+            b_allocated.wait(5)
+            raise TimeoutError('rpc timed out')
+
+        def build_b(nonce):
+            b_allocated.set()
+            a_failed.wait(5)
+            return self.transfer(nonce)
+
+        payout_b = threading.Thread(target=faucet.send_with_nonce, args=('testchain', build_b))
+        payout_b.start()
+        with self.assertRaises(TimeoutError):
+            faucet.send_with_nonce('testchain', build_a)
+        faucet.send_with_nonce('testchain', self.transfer)
+        faucet.send_with_nonce('testchain', self.transfer)
+        a_failed.set()
+        payout_b.join(5)
+
+        nonces = [tx['nonce'] for tx in eth.sent]
+        self.assertEqual(sorted(nonces), [2, 3, 4])
+        self.assertEqual(eth.nonce_reads, 1)
+
+    def test_already_known_answers_the_signed_hash(self):
+        faucet = helpers.make_evm_faucet()
+        eth = helpers.fake_web3(faucet, 'testchain', already_known=1)
+
+        tx_hash = faucet.send_with_nonce('testchain', self.transfer)
+        self.assertEqual(tx_hash, eth.sent[0]['hash'])
+        self.assertEqual(eth.sent[0]['from'], faucet.FAUCET_ADDRESS)
 
 
 
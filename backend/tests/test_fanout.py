@@ -0,0 +1,164 @@
+############################################################
+#  [*] Fan-out pool tests
+#
+#  Offline checks of the UTXO fan-out mode on btc4: a refill
+#  splits pool coins of one chunk plus its 1-in/1-out fee off
+#  the rest of the balance and records their outpoints, a
+#  claim spends exactly one pool coin with no change, two
+#  claims never share one, an unconfirmed one is not
+#  claimed, batched payouts leave the pool alone, a coin
+#  merely worth a pool coin is not one, and a claim the pool
+#  cannot pay (empty, or priced below the current rate)
+#  takes the batched path. Electrum is faked;
+#  transactions are built and signed for real.
+############################################################
+
+
+import copy
+import unittest
+from unittest.mock import patch
+
+from embit import ec as embit_ec
+from embit import script as embit_script
+from embit.transaction import Transaction
+
+from app.utxo_faucet.coin_selection import estimate_fee
+from tests import helpers
+
+
+CHUNK_SAT = 1_000_000  # btc4's 0.01 BTC
+BIG_COIN = {'tx_hash': 'aa' * 32, 'tx_pos': 0, 'value': 50_000_000}
+
+
+def pool_coins(count, rate=10):
+    # What a refill at `rate` sat/vB leaves behind, confirmed
+    value = CHUNK_SAT + estimate_fee(helpers.make_utxo_faucet()._dialects['btc4'], rate, 1, 1)
+    return [{'tx_hash': f'{i + 1:064x}', 'tx_pos': 0, 'value': value, 'height': 100} for i in range(count)]
+
+
+
+
+############################################################
+# FanoutTests
+############################################################
+#
+# btc4 with a pool target of 4. The fake Electrum has no
+# estimate, so the rate is the registry's 10 sat/vB.
+############################################################
+
+class FanoutTests(unittest.TestCase):
+
+    def make(self, utxos, pool=()):
+        # pool: the coins this faucet split itself
+        configs = copy.deepcopy(helpers.UTXO_TEST_CONFIGS)
+        configs['btc4']['faucet']['fanout_pool_size'] = 4
+        self.faucet = helpers.make_utxo_faucet(configs)
+        self.faucet._pool_coins['btc4'].update((coin['tx_hash'], coin['tx_pos']) for coin in pool)
+        self.captured = helpers.fake_electrum(self.faucet, 'btc4', list(pool) + utxos)
+        self.ctx = self.faucet._setup_wallet_for_network('btc4')
+
+        prv = embit_ec.PrivateKey(bytes.fromhex(helpers.RECIPIENT_PRIVATE_KEY))
+        self.recipient = embit_script.p2wpkh(prv.get_public_key()).address({'bech32': 'tb'})
+
+    def claim(self):
+        data, status = self.faucet._send_from_pool(
+            'btc4', {'to_address': self.recipient, 'cooldown_key': ('btc4', self.recipient)})
+        return Transaction.from_string(self.captured['raw']), status
+
+    def test_refill_splits_the_pool_off_the_balance(self):
+        self.make([BIG_COIN])
+        report = self.faucet._refill_pool('btc4')
+        tx = Transaction.from_string(self.captured['raw'])
+
+        self.assertEqual((report['before'], report['added']), (0, 4))
+        self.assertEqual([out.value for out in tx.vout[:4]], [pool_coins(1)[0]['value']] * 4)
+        self.assertTrue(all(out.script_pubkey == self.ctx.script_pubkey for out in tx.vout))
+        self.assertEqual(len(self.faucet._utxo_sets['btc4'].available()), 5)
+
+        # The split's outputs, not its change, are the pool now
+        txid = tx.txid().hex()
+        self.assertEqual(self.faucet._pool_coins['btc4'], {(txid, vout) for vout in range(4)})
+
+    def test_split_outputs_are_claimed_once_confirmed(self):
+        # Straight from the mempool every claim would chain onto the
+        # one unconfirmed split — those claims take the batched path
+        self.make([BIG_COIN])
+        self.faucet._refill_pool('btc4')
+        split = Transaction.from_string(self.captured['raw'])
+        with patch.object(self.faucet, '_send_batch', wraps=self.faucet._send_batch) as batched:
+            _, status = self.claim()
+        self.assertEqual(status, 200)
+        batched.assert_called_once()
+
+        coins = self.faucet._utxo_sets['btc4']._coins
+        for point in self.faucet._pool_coins['btc4']:
+            coins[point]['height'] = 101
+        tx, status = self.claim()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(tx.vin[0].txid[::-1], split.txid())
+        self.assertLess(tx.vin[0].vout, 4)
+        self.assertEqual(len(self.faucet._pool_coins['btc4']), 3)
+
+    def test_full_pool_is_not_refilled(self):
+        self.make([BIG_COIN], pool=pool_coins(2))
+        self.assertIsNone(self.faucet._refill_pool('btc4'))
+        self.assertNotIn('raw', self.captured)
+
+    def test_claim_spends_one_pool_coin_without_change(self):
+        self.make([BIG_COIN], pool=pool_coins(2))
+        tx, status = self.claim()
+
+        self.assertEqual(status, 200)
+        self.assertEqual((len(tx.vin), len(tx.vout)), (1, 1))
+        self.assertEqual(tx.vout[0].value, CHUNK_SAT)
+        self.assertEqual(tx.vout[0].script_pubkey, self.ctx.dialect.recipient_script(self.recipient))
+
+    def test_two_claims_never_share_a_pool_coin(self):
+        self.make([BIG_COIN], pool=pool_coins(2))
+        first, _ = self.claim()
+        second, _ = self.claim()
+        self.assertNotEqual(first.vin[0].txid, second.vin[0].txid)
+
+    def test_empty_pool_falls_back_to_the_batched_path(self):
+        self.make([BIG_COIN])
+        tx, status = self.claim()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(tx.vout), 2)  # payout + change
+
+    def test_pool_priced_below_the_current_rate_is_not_claimed(self):
+        self.make([BIG_COIN], pool=pool_coins(2))
+        self.faucet.fee_oracle.rate = lambda network: 20
+        tx, status = self.claim()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(tx.vin[0].txid, bytes.fromhex(BIG_COIN['tx_hash']))
+
+    def test_batched_payouts_leave_the_pool_alone(self):
+        # A pool coin would be the better fit — it is not offered
+        self.make([BIG_COIN], pool=pool_coins(3))
+        self.faucet._create_and_broadcast_batch(self.ctx, [(self.recipient, 900_000)])
+        tx = Transaction.from_string(self.captured['raw'])
+        self.assertEqual([vin.txid for vin in tx.vin], [bytes.fromhex(BIG_COIN['tx_hash'])])
+
+    def test_coin_worth_a_pool_coin_is_not_one(self):
+        # A refund of exactly a pool coin's value: an ordinary coin,
+        # spent by batches and never claimed as a pool coin
+        refund = pool_coins(1)[0]
+        self.make([refund, BIG_COIN])
+        with patch.object(self.faucet, '_send_batch', wraps=self.faucet._send_batch) as batched:
+            _, status = self.claim()
+        self.assertEqual(status, 200)
+        batched.assert_called_once()
+
+        self.make([refund, BIG_COIN], pool=pool_coins(2)[1:])
+        self.assertEqual(self.faucet._outside_pool(self.ctx, [refund, BIG_COIN]), [refund, BIG_COIN])
+
+    def test_requests_on_a_fanout_network_are_paid_from_the_pool(self):
+        self.make([BIG_COIN], pool=pool_coins(2))
+        data, status = self.faucet.request_crypto('btc4', self.recipient)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['batch_size'], 1)
+        self.assertEqual(len(Transaction.from_string(self.captured['raw']).vin), 1)
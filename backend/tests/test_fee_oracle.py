@@ -0,0 +1,129 @@
+############################################################
+#  [*] Fee oracle tests
+#
+#  Offline checks of the UTXO fee-rate cache: Electrum's
+#  coins/kB estimate becomes whole sat/vB, clamped into the
+#  registry's MIN/MAX_FEE_RATE; no estimate (-1) falls back
+#  to the registry's FEE_RATE; the relay fee beats the
+#  ceiling; payouts read the cache while it is fresh and
+#  fetch their own past the staleness bound, falling back to
+#  the stale rate or the registry's when that fetch fails;
+#  the debug snapshot reports bounds and age. The Electrum
+#  client is a fake; time is mocked.
+############################################################
+
+
+import unittest
+from unittest.mock import patch
+
+from app.utxo_faucet.fee_oracle import FeeOracle, FEE_MAX_AGE_SECONDS, FEE_TARGET_BLOCKS
+
+
+BOUNDS = {'fee_rate': 10, 'min_fee_rate': 1, 'max_fee_rate': 200}
+
+
+class FakeElectrum:
+    # fee_estimates() answers, counted (coins per kB, like Electrum)
+    def __init__(self, estimate=0.00005, relay=0.00001):
+        self.estimate = estimate
+        self.relay = relay
+        self.calls = []
+
+    def fee_estimates(self, target_blocks):
+        self.calls.append(target_blocks)
+        return self.estimate, self.relay
+
+
+def oracle(**kwargs):
+    client = FakeElectrum(**kwargs)
+    return FeeOracle({'net': client}, {'net': BOUNDS}), client
+
+
+
+
+############################################################
+# FeeOracleTests
+############################################################
+
+class FeeOracleTests(unittest.TestCase):
+
+    def test_estimate_is_converted_to_sat_per_vbyte(self):
+        # 0.00005 coin/kB is 5 sat/vB; 0.000012 rounds up to 2
+        fees, client = oracle()
+        self.assertEqual(fees.rate('net'), 5)
+        self.assertEqual(client.calls, [FEE_TARGET_BLOCKS])
+
+        fees, _ = oracle(estimate=0.000012)
+        self.assertEqual(fees.rate('net'), 2)
+
+    def test_estimate_is_clamped_into_the_registry_bounds(self):
+        self.assertEqual(oracle(estimate=0.00000001, relay=0)[0].rate('net'), 1)
+        self.assertEqual(oracle(estimate=0.01)[0].rate('net'), 200)
+
+    def test_no_estimate_falls_back_to_the_registry_rate(self):
+        # ElectrumX answers -1 when the node cannot estimate (regtest)
+        fees, _ = oracle(estimate=-1)
+        self.assertEqual(fees.refresh('net'), {'rate': 10, 'estimate': None, 'relay': 1})
+
+    def test_relay_fee_beats_the_ceiling(self):
+        # Below relayfee the transaction would never leave the node
+        self.assertEqual(oracle(estimate=0.01, relay=0.003)[0].rate('net'), 300)
+
+    def test_fresh_cache_is_served_without_electrum(self):
+        fees, client = oracle()
+        with patch('app.utxo_faucet.fee_oracle.time.monotonic', return_value=100.0):
+            fees.refresh('net')
+        with patch('app.utxo_faucet.fee_oracle.time.monotonic', return_value=100.0 + FEE_MAX_AGE_SECONDS):
+            fees.rate('net')
+
+        self.assertEqual(len(client.calls), 1)
+
+    def test_stale_cache_is_refetched_by_the_payout(self):
+        fees, client = oracle()
+        with patch('app.utxo_faucet.fee_oracle.time.monotonic', return_value=100.0):
+            fees.refresh('net')
+        client.estimate = 0.00008
+        with patch('app.utxo_faucet.fee_oracle.time.monotonic', return_value=101.0 + FEE_MAX_AGE_SECONDS):
+            self.assertEqual(fees.rate('net'), 8)
+
+        self.assertEqual(len(client.calls), 2)
+
+    def test_failed_fetch_pays_the_stale_cached_rate(self):
+        fees, client = oracle()
+        with patch('app.utxo_faucet.fee_oracle.time.monotonic', return_value=100.0):
+            fees.refresh('net')
+        client.fee_estimates = lambda target_blocks: 1 / 0
+        with patch('app.utxo_faucet.fee_oracle.time.monotonic', return_value=101.0 + FEE_MAX_AGE_SECONDS):
+            with self.assertLogs(level='WARNING'):
+                self.assertEqual(fees.rate('net'), 5)
+
+    def test_failed_fetch_without_a_cache_pays_the_clamped_registry_rate(self):
+        client = FakeElectrum()
+        client.fee_estimates = lambda target_blocks: 1 / 0
+        fees = FeeOracle({'net': client}, {'net': {**BOUNDS, 'fee_rate': 500}})
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(fees.rate('net'), 200)
+
+        # The fallback is not cached — the next payout asks again
+        self.assertIsNone(fees.snapshot()['net']['rate'])
+
+    def test_failed_background_refresh_still_raises(self):
+        fees, client = oracle()
+        client.fee_estimates = lambda target_blocks: 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            fees.refresh('net')
+
+    def test_snapshot_reports_bounds_and_age(self):
+        fees, _ = oracle()
+        self.assertEqual(fees.snapshot()['net'], {
+            'rate': None, 'estimate': None, 'relay': None,
+            'bounds': [1, 200], 'fallback': 10, 'age_seconds': None, 'stale': True,
+        })
+
+        with patch('app.utxo_faucet.fee_oracle.time.monotonic', return_value=100.0):
+            fees.refresh('net')
+        with patch('app.utxo_faucet.fee_oracle.time.monotonic', return_value=104.0):
+            entry = fees.snapshot()['net']
+
+        self.assertEqual((entry['rate'], entry['estimate'], entry['relay']), (5, 5, 1))
+        self.assertEqual((entry['age_seconds'], entry['stale']), (4.0, False))
@@ -0,0 +1,103 @@
+############################################################
+#  [*] Gas oracle tests
+#
+#  Offline checks of the EVM fee cache: payouts read the
+#  cache while it is fresh and fetch their own past the
+#  staleness bound, legacy mode prices with eth_gasPrice,
+#  EIP-1559 mode derives its fields from eth_feeHistory
+#  (median tip, floored; twice the next base fee), and the
+#  debug snapshot reports the age. The RPC is a fake w3 — no
+#  Web3 involved; time is mocked.
+############################################################
+
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.evm_faucet.gas_oracle import GasOracle, GAS_MAX_AGE_SECONDS, GAS_MIN_PRIORITY_WEI
+
+
+GWEI = 10 ** 9
+
+
+class FakeEth:
+    # The two fee calls the oracle makes, counted
+    def __init__(self, gas_price=3 * GWEI, base_fees=(10 * GWEI, 12 * GWEI), tips=(2 * GWEI, 1 * GWEI, 5 * GWEI)):
+        self._gas_price = gas_price
+        self.history = {'baseFeePerGas': list(base_fees), 'reward': [[tip] for tip in tips]}
+        self.calls = 0
+
+    @property
+    def gas_price(self):
+        self.calls += 1
+        return self._gas_price
+
+    def fee_history(self, blocks, newest, percentiles):
+        self.calls += 1
+        return self.history
+
+
+def oracle(mode='legacy', **kwargs):
+    eth = FakeEth(**kwargs)
+    return GasOracle({'net': SimpleNamespace(eth=eth)}, {'net': mode}), eth
+
+
+
+
+############################################################
+# GasOracleTests
+############################################################
+
+class GasOracleTests(unittest.TestCase):
+
+    def test_legacy_mode_prices_with_gas_price(self):
+        gas, eth = oracle()
+        self.assertEqual(gas.fees('net'), {'gasPrice': 3 * GWEI})
+
+    def test_fresh_cache_is_served_without_rpc(self):
+        gas, eth = oracle()
+        with patch('app.evm_faucet.gas_oracle.time.monotonic', return_value=100.0):
+            gas.refresh('net')
+        with patch('app.evm_faucet.gas_oracle.time.monotonic', return_value=100.0 + GAS_MAX_AGE_SECONDS):
+            gas.fees('net')
+
+        self.assertEqual(eth.calls, 1)
+
+    def test_stale_cache_is_refetched_by_the_payout(self):
+        gas, eth = oracle()
+        with patch('app.evm_faucet.gas_oracle.time.monotonic', return_value=100.0):
+            gas.refresh('net')
+        eth._gas_price = 4 * GWEI
+        with patch('app.evm_faucet.gas_oracle.time.monotonic', return_value=101.0 + GAS_MAX_AGE_SECONDS):
+            self.assertEqual(gas.fees('net'), {'gasPrice': 4 * GWEI})
+
+        self.assertEqual(eth.calls, 2)
+
+    def test_eip1559_mode_uses_fee_history(self):
+        # Median tip of (1, 2, 5) gwei on top of twice the NEXT base fee
+        gas, eth = oracle('eip1559')
+        self.assertEqual(gas.fees('net'), {'maxFeePerGas': 26 * GWEI, 'maxPriorityFeePerGas': 2 * GWEI})
+
+    def test_eip1559_zero_tips_are_floored(self):
+        gas, eth = oracle('eip1559', tips=(0, 0))
+        self.assertEqual(gas.fees('net')['maxPriorityFeePerGas'], GAS_MIN_PRIORITY_WEI)
+
+    def test_failed_fetch_raises_and_caches_nothing(self):
+        gas, eth = oracle('eip1559')
+        eth.history = {}
+        with self.assertRaises(KeyError):
+            gas.fees('net')
+        self.assertIsNone(gas.snapshot()['net']['fees'])
+
+    def test_snapshot_reports_age_and_staleness(self):
+        gas, eth = oracle()
+        self.assertEqual(gas.snapshot()['net'], {'mode': 'legacy', 'fees': None, 'age_seconds': None, 'stale': True})
+
+        with patch('app.evm_faucet.gas_oracle.time.monotonic', return_value=100.0):
+            gas.refresh('net')
+        with patch('app.evm_faucet.gas_oracle.time.monotonic', return_value=104.0):
+            entry = gas.snapshot()['net']
+
+        self.assertEqual((entry['age_seconds'], entry['stale']), (4.0, False))
+        self.assertEqual(entry['fees'], {'gasPrice': 3 * GWEI})
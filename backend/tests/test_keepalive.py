@@ -0,0 +1,97 @@
+############################################################
+#  [*] Keep-alive scheduler tests
+#
+#  Offline checks of the process-wide keep-alive scheduler:
+#  a registered ping runs every interval, a failed one is
+#  retried after the short reconnect delay instead, a name
+#  registers once, and a failing job is logged when it
+#  starts failing and when it recovers — not on every ping.
+#  The pings are plain callables; intervals are shrunk to
+#  milliseconds.
+############################################################
+
+
+import time
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.keepalive import KeepAliveScheduler, _Job
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition never became true')
+        time.sleep(0.005)
+
+
+class Pings:
+    # A ping callable that counts its runs and fails while
+    # `down`
+    def __init__(self, down=False):
+        self.down = down
+        self.runs = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.runs += 1
+        if self.down:
+            raise ConnectionError('node down')
+
+
+
+
+############################################################
+# KeepAliveTests
+############################################################
+
+class KeepAliveTests(unittest.TestCase):
+
+    def test_registered_ping_runs_every_interval(self):
+        pings = Pings()
+        KeepAliveScheduler().register('net', pings, interval=0.01)
+        wait_until(lambda: pings.runs >= 3)
+
+    def test_first_ping_waits_one_interval(self):
+        pings = Pings()
+        KeepAliveScheduler().register('net', pings, interval=60)
+        time.sleep(0.05)
+        self.assertEqual(pings.runs, 0)
+
+    def test_failed_ping_is_retried_soon(self):
+        pings = Pings(down=True)
+        scheduler = KeepAliveScheduler()
+        with patch('app.keepalive.KEEPALIVE_RETRY_SECONDS', 0.01):
+            scheduler.register('net', pings, interval=0.01)
+            wait_until(lambda: pings.runs >= 1)
+            # the retry comes in milliseconds, not a full interval
+            scheduler._jobs['net'].interval = 60
+            wait_until(lambda: pings.runs >= 3)
+
+    def test_a_name_registers_once(self):
+        first, second = Pings(), Pings()
+        scheduler = KeepAliveScheduler()
+        scheduler.register('net', first, interval=0.01)
+        scheduler.register('net', second, interval=0.01)
+
+        wait_until(lambda: first.runs >= 2)
+        self.assertEqual(second.runs, 0)
+
+    def test_failures_are_logged_on_change_only(self):
+        pings = Pings(down=True)
+        job = _Job('net', pings, 60)
+        scheduler = KeepAliveScheduler()
+
+        with self.assertLogs(level='WARNING') as logs:
+            self.assertFalse(scheduler._ping(job))
+            self.assertFalse(scheduler._ping(job))
+            pings.down = False
+            self.assertTrue(scheduler._ping(job))
+            self.assertTrue(scheduler._ping(job))
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('failing, reconnecting: node down', logs.output[0])
+        self.assertIn('recovered', logs.output[1])
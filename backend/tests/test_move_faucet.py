@@ -5,8 +5,9 @@
 #  blake2b-derived identity (the shared secret as an Ed25519
 #  seed, hashed into a DIFFERENT address than any other
 #  family), real personal-message signature verification, the
-#  composed public payload, and the full claim flow with the
-#  GraphQL client faked.
+#  composed public payload, the locally serialized payout
+#  transaction, and the full claim flow with the GraphQL
+#  client faked.
 #
 #  Everything here is offline — no Sui node is contacted —
 #  but the cryptography is REAL: claims carry genuine Ed25519
@@ -25,6 +26,7 @@ from solders.pubkey import Pubkey
 from solders.signature import Signature
 
 from app.move_faucet.chains import chain_params
+from app.move_faucet.transaction_bcs import transfer_transaction, uleb128
 from tests import helpers
 
 
@@ -213,7 +215,7 @@ class MoveRequestFlowTests(unittest.TestCase):
         return self.faucet.request_move('testmove', self.address, self.signature, self.nonce)
 
     def claimed(self):
-        return ('testmove', self.address) in self.faucet.cooldowns._last_claim
+        return ('testmove', self.address) in self.faucet.cooldowns
 
     def test_happy_path_executes_and_keeps_the_cooldown(self):
         client = self.fake()
@@ -257,7 +259,7 @@ class MoveRequestFlowTests(unittest.TestCase):
         data, status = self.faucet.request_move('testmove', address, signature, nonce)
 
         self.assertEqual(status, 403)
-        self.assertFalse(('testmove', address) in self.faucet.cooldowns._last_claim)
+        self.assertFalse(('testmove', address) in self.faucet.cooldowns)
 
     def test_wallet_already_funded_is_400_without_claiming(self):
         self.fake(user_mist=self.CHUNK_MIST)
@@ -274,6 +276,15 @@ class MoveRequestFlowTests(unittest.TestCase):
 
         self.assertEqual(status, 429)
 
+    def test_cooling_down_wallet_is_429_before_the_signature_check(self):
+        # The peek fast path refuses before any verification — a
+        # garbage signature gets the 429, not the 403
+        self.fake()
+        self.claim()
+        data, status = self.faucet.request_move('testmove', self.address, 'garbage', self.nonce)
+
+        self.assertEqual(status, 429)
+
     def test_empty_faucet_is_503_and_releases_the_cooldown(self):
         self.fake(faucet_mist=1000)
         data, status = self.claim()
@@ -307,12 +318,102 @@ class MoveRequestFlowTests(unittest.TestCase):
         self.assertEqual(status, 500)
         self.assertFalse(self.claimed())
 
+    def second_claim(self):
+        address, signature, nonce = helpers.sign_move_claim(address_seed=bytes(range(1, 33)))
+        return address, self.faucet.request_move('testmove', address, signature, nonce)
+
+    def test_first_payout_is_node_built_and_caches_the_gas_coin(self):
+        client = self.fake()
+        self.assertEqual(self.claim()[1], 200)
+
+        self.assertEqual(client.builds, 1)
+        self.assertEqual(self.faucet._gas_coins['testmove'][1], 101)
+
+    def test_next_payout_is_built_locally_in_one_round_trip(self):
+        client = self.fake()
+        self.claim()
+        gas_ref = self.faucet._gas_coins['testmove']
+        client.build_transfer = lambda *args: self.fail('a simulateTransaction round trip')
+
+        address, (data, status) = self.second_claim()
+        self.assertEqual(status, 200)
+
+        expected = transfer_transaction(
+            self.faucet.FAUCET_ADDRESS, address, self.CHUNK_MIST, gas_ref, 1000, 10_000_000)
+        self.assertEqual(base64.b64decode(client.executed[1]['tx_bcs']), expected)
+        self.assertEqual(self.faucet._gas_coins['testmove'][1], 102)     # the effects' new version
+
+    def test_refused_local_payout_falls_back_to_the_node(self):
+        client = self.fake()
+        self.claim()
+        executed = client.execute
+        refusals = []
+
+        def execute(tx_bcs, signature):
+            if not refusals:
+                refusals.append(tx_bcs)
+                raise RuntimeError('Object is not available for consumption, current version: 0x99')
+            return executed(tx_bcs, signature)
+        client.execute = execute
+
+        self.assertEqual(self.second_claim()[1][1], 200)
+        self.assertEqual(client.builds, 2)
+        self.assertNotIn('testmove', self.faucet._gas_prices)         # read afresh next time
+        self.assertIn('testmove', self.faucet._gas_coins)
+
+    def test_payout_short_of_gas_falls_back_to_the_node(self):
+        # Landed and charged gas, but its transfer was rolled back
+        client = self.fake()
+        self.claim()
+        executed = client.execute
+        failures = []
+
+        def execute(tx_bcs, signature):
+            if not failures:
+                failures.append(tx_bcs)
+                raise RuntimeError('Sui transaction failed: InsufficientGas')
+            return executed(tx_bcs, signature)
+        client.execute = execute
+
+        self.assertEqual(self.second_claim()[1][1], 200)
+        self.assertEqual(client.builds, 2)
+        self.assertNotIn('testmove', self.faucet._gas_prices)
+
+    def test_transport_failure_never_builds_a_second_payout(self):
+        import requests
+
+        client = self.fake()
+        self.claim()
+
+        def execute(tx_bcs, signature):
+            raise requests.ConnectionError('reset by peer')
+        client.execute = execute
+
+        address, (data, status) = self.second_claim()
+        self.assertEqual(status, 500)
+        self.assertEqual(client.builds, 1)
+        self.assertNotIn('testmove', self.faucet._gas_coins)          # the next one is node-built
+
+    def test_unrefused_execute_error_never_builds_a_second_payout(self):
+        # A timeout is no refusal: the first transaction may land
+        client = self.fake()
+        self.claim()
+
+        def execute(tx_bcs, signature):
+            raise RuntimeError("Sui GraphQL error: [{'message': 'Transaction timed out before reaching finality'}]")
+        client.execute = execute
+
+        address, (data, status) = self.second_claim()
+        self.assertEqual(status, 500)
+        self.assertEqual(client.builds, 1)
+        self.assertIn('testmove', self.faucet._gas_prices)
+
     def test_invalid_address_never_claims_a_slot(self):
         self.fake()
         for bad in ('0x' + 'ab' * 20, 'not-an-address', self.address[:-2], self.address + 'ff'):
             data, status = self.faucet.request_move('testmove', bad, self.signature, self.nonce)
             self.assertEqual(status, 400)
-            self.assertFalse((('testmove', bad) in self.faucet.cooldowns._last_claim))
+            self.assertFalse((('testmove', bad) in self.faucet.cooldowns))
 
     def test_paying_the_faucet_itself_is_refused(self):
         self.fake()
@@ -334,5 +435,54 @@ class MoveRequestFlowTests(unittest.TestCase):
             self.assertEqual(self.faucet.request_move('testmove', *args)[1], 400)
 
 
+############################################################
+# MoveTransactionBcsTests
+############################################################
+#
+# The locally serialized payout, byte for byte: the
+# TransactionData::V1 layout of a SplitCoins +
+# TransferObjects transfer.
+############################################################
+
+class MoveTransactionBcsTests(unittest.TestCase):
+
+    SENDER = '0x' + '11' * 32
+    RECIPIENT = '0x' + 'aa' * 32
+    GAS_REF = ('0x' + '22' * 32, 7, '11111111111111111111111111111111')
+
+    def test_uleb128(self):
+        self.assertEqual(uleb128(0), b'\x00')
+        self.assertEqual(uleb128(127), b'\x7f')
+        self.assertEqual(uleb128(128), b'\x80\x01')
+        self.assertEqual(uleb128(300), b'\xac\x02')
+
+    def test_transfer_layout(self):
+        tx = transfer_transaction(self.SENDER, self.RECIPIENT, 500, self.GAS_REF, 1000, 10_000_000)
+
+        expected = (
+            b'\x00'                                             # TransactionData::V1
+            + b'\x00'                                           # ProgrammableTransaction
+            + b'\x02'                                           # 2 inputs
+            + b'\x00\x08' + (500).to_bytes(8, 'little')          # Pure(u64 amount)
+            + b'\x00\x20' + b'\xaa' * 32                          # Pure(address)
+            + b'\x02'                                           # 2 commands
+            + b'\x02' + b'\x00' + b'\x01' + b'\x01\x00\x00'          # SplitCoins(GasCoin, [Input(0)])
+            + b'\x01' + b'\x01' + b'\x03\x00\x00\x00\x00'           # TransferObjects([NestedResult(0, 0)],
+            + b'\x01\x01\x00'                                   #                 Input(1))
+            + b'\x11' * 32                                      # sender
+            + b'\x01' + b'\x22' * 32 + (7).to_bytes(8, 'little')  # gas payment: 1 object ref
+            + b'\x20' + b'\x00' * 32                              #   its digest, length-prefixed
+            + b'\x11' * 32                                      # gas owner
+            + (1000).to_bytes(8, 'little')                     # gas price
+            + (10_000_000).to_bytes(8, 'little')               # gas budget
+            + b'\x00'                                           # TransactionExpiration::None
+        )
+        self.assertEqual(tx, expected)
+
+    def test_malformed_address_raises(self):
+        with self.assertRaises(ValueError):
+            transfer_transaction(self.SENDER, '0x1234', 500, self.GAS_REF, 1000, 10_000_000)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,133 @@
+############################################################
+#  [*] Nonce manager tests
+#
+#  Offline checks of the EVM faucet's local nonce counter:
+#  seeded once from the pending count, then one increment per
+#  payout, per network; resync re-reads the chain; a
+#  released number is handed out again before the counter
+#  moves on; parallel allocations never share a number; the
+#  SQLite backend shares one sequence between workers. The pending-count RPC
+#  is a plain callable — no Web3 involved.
+############################################################
+
+
+import os
+import tempfile
+import threading
+import unittest
+
+from app.evm_faucet.nonce_manager import NonceManager, SqliteNonceManager, is_nonce_conflict, is_already_known
+
+
+class Pending:
+    # A fake eth_getTransactionCount(..., 'pending'): answers
+    # `value` and counts the reads
+    def __init__(self, value):
+        self.value = value
+        self.reads = 0
+
+    def __call__(self):
+        self.reads += 1
+        return self.value
+
+
+
+
+############################################################
+# NonceManagerTests
+############################################################
+
+class NonceManagerTests(unittest.TestCase):
+
+    def test_seeds_once_then_counts_up(self):
+        nonces, pending = NonceManager(), Pending(7)
+        allocated = [nonces.allocate('net', pending) for _ in range(3)]
+
+        self.assertEqual(allocated, [7, 8, 9])
+        self.assertEqual(pending.reads, 1)
+
+    def test_resync_rereads_the_pending_count(self):
+        nonces, pending = NonceManager(), Pending(7)
+        nonces.allocate('net', pending)
+        nonces.resync('net')
+
+        self.assertEqual(nonces.allocate('net', pending), 7)
+        self.assertEqual(pending.reads, 2)
+
+    def test_released_nonce_is_reused_first(self):
+        nonces, pending = NonceManager(), Pending(7)
+        first, second = nonces.allocate('net', pending), nonces.allocate('net', pending)
+        nonces.release('net', first)
+
+        self.assertEqual([nonces.allocate('net', pending) for _ in range(2)], [first, second + 1])
+        self.assertEqual(pending.reads, 1)
+
+    def test_resync_drops_released_nonces(self):
+        nonces, pending = NonceManager(), Pending(7)
+        nonces.release('net', nonces.allocate('net', pending))
+        nonces.resync('net')
+        pending.value = 9
+
+        self.assertEqual(nonces.allocate('net', pending), 9)
+
+    def test_networks_count_separately(self):
+        nonces = NonceManager()
+        nonces.allocate('a', Pending(1))
+
+        self.assertEqual(nonces.allocate('b', Pending(40)), 40)
+        self.assertEqual(nonces.allocate('a', Pending(1)), 2)
+
+    def test_failed_seed_leaves_no_counter(self):
+        # An RPC error while seeding must not pin a bogus number
+        nonces = NonceManager()
+
+        def down():
+            raise RuntimeError('rpc down')
+        with self.assertRaises(RuntimeError):
+            nonces.allocate('net', down)
+        self.assertEqual(nonces.allocate('net', Pending(3)), 3)
+
+    def test_parallel_allocations_are_unique(self):
+        nonces, pending = NonceManager(), Pending(0)
+        allocated = []
+        start = threading.Barrier(8)
+
+        def worker():
+            start.wait()
+            for _ in range(100):
+                allocated.append(nonces.allocate('net', pending))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(allocated), list(range(800)))
+
+    def test_sqlite_backend_shares_one_sequence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'nonces.db')
+            worker_a, worker_b, pending = SqliteNonceManager(path), SqliteNonceManager(path), Pending(10)
+
+            self.assertEqual(worker_a.allocate('net', pending), 10)
+            self.assertEqual(worker_b.allocate('net', pending), 11)
+            worker_b.resync('net')
+            self.assertEqual(worker_a.allocate('net', pending), 10)
+            self.assertEqual(pending.reads, 2)
+
+            worker_a.release('net', 10)
+            self.assertEqual(worker_b.allocate('net', pending), 10)
+            self.assertEqual(worker_b.allocate('net', pending), 11)
+
+    def test_nonce_conflicts_are_recognised(self):
+        self.assertTrue(is_nonce_conflict(ValueError({'code': -32000, 'message': 'nonce too low'})))
+        self.assertTrue(is_nonce_conflict(ValueError('Replacement transaction underpriced')))
+        self.assertFalse(is_nonce_conflict(ValueError('insufficient funds for gas * price + value')))
+
+    def test_already_known_is_not_a_conflict(self):
+        # The node holds this very transaction — it went out
+        error = ValueError({'code': -32000, 'message': 'already known'})
+        self.assertFalse(is_nonce_conflict(error))
+        self.assertTrue(is_already_known(error))
+        self.assertFalse(is_already_known(ValueError('nonce too low')))
@@ -0,0 +1,236 @@
+############################################################
+#  [*] Payout queue tests
+#
+#  Offline checks of the per-network payout workers and
+#  their tickets: a waiting submit gets the job's own answer,
+#  an async one gets 202 and a ticket that walks to sent or
+#  failed, a crashing job becomes a generic 500, one network's
+#  jobs run in order on one thread (side by side on a pool),
+#  a batch handler pays a window's jobs in one call, the exit
+#  drain ends a budget past the shutdown stamp, and both
+#  ticket stores keep the same contract. Jobs are plain
+#  callables (or plain data for a batch handler) — no faucet
+#  involved.
+############################################################
+
+
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.payout_queue import payout_queue
+from app.payout_queue.payout_queue import PayoutQueue, TicketStore, SqliteTicketStore
+
+
+def job(result=({}, 200), gate=None, log=None):
+    # A fake payout: optionally blocks on `gate`, records the
+    # worker thread's name and its payload in `log`, then
+    # answers `result`
+    def run():
+        if gate is not None:
+            gate.wait(5)
+        if log is not None:
+            log.append((threading.current_thread().name, result[0]))
+        return result
+    return run
+
+
+
+
+############################################################
+# PayoutQueueTests
+############################################################
+
+class PayoutQueueTests(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TicketStore()
+        patcher = patch.object(payout_queue, 'tickets', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = PayoutQueue('test')
+
+    def test_waiting_submit_returns_the_jobs_answer(self):
+        data, status = self.queue.submit('net', job(({'tx': 'abc'}, 200)))
+
+        self.assertEqual((data, status), ({'tx': 'abc'}, 200))
+
+    def test_async_submit_returns_a_ticket_that_finishes(self):
+        release = threading.Event()
+        data, status = self.queue.submit('net', job(({'tx': 'abc'}, 200), gate=release), wait=False)
+
+        self.assertEqual(status, 202)
+        self.assertIn(self.store.get(data['ticket'])['status'], ('queued', 'sending'))
+
+        release.set()
+        self.queue.submit('net', job())   # behind it on the same worker
+        record = self.store.get(data['ticket'])
+        self.assertEqual(record['status'], 'sent')
+        self.assertEqual(record['result'], {'tx': 'abc'})
+        self.assertEqual(record['http_status'], 200)
+
+    def test_failed_job_marks_the_ticket_failed(self):
+        data, status = self.queue.submit('net', job(({'error': 'x'}, 503)), wait=False)
+        self.queue.submit('net', job())
+
+        self.assertEqual(self.store.get(data['ticket'])['status'], 'failed')
+        self.assertEqual(self.store.get(data['ticket'])['http_status'], 503)
+
+    def test_crashing_job_is_a_generic_500(self):
+        def crash():
+            raise RuntimeError('boom')
+        with self.assertLogs(level='ERROR'):
+            data, status = self.queue.submit('net', crash)
+
+        self.assertEqual(status, 500)
+        self.assertIn('error', data)
+
+    def test_one_networks_jobs_run_in_order_on_one_thread(self):
+        log = []
+        for i in range(5):
+            self.queue.submit('net', job(({'n': i}, 200), log=log), wait=False)
+        self.queue.submit('net', job())
+
+        self.assertEqual([payload['n'] for _, payload in log], [0, 1, 2, 3, 4])
+        self.assertEqual({name for name, _ in log}, {'payout-test-net'})
+
+    def test_a_worker_pool_runs_jobs_side_by_side(self):
+        # Two gated jobs on a two-worker network are both in flight
+        queue = PayoutQueue('pool', workers=2)
+        release = threading.Event()
+        first = queue.submit('net', job(gate=release), wait=False)[0]['ticket']
+        second = queue.submit('net', job(gate=release), wait=False)[0]['ticket']
+
+        for _ in range(100):
+            if {self.store.get(t)['status'] for t in (first, second)} == {'sending'}:
+                break
+            time.sleep(0.01)
+        self.assertEqual({self.store.get(t)['status'] for t in (first, second)}, {'sending'})
+        release.set()
+        queue._drain()
+
+    def test_drain_budget_counts_from_the_shutdown_stamp(self):
+        # A SIGTERM stamped a whole budget ago leaves nothing to wait
+        # for: a stuck job cannot hold the exit past graceful_timeout
+        queue = PayoutQueue('drain')
+        release = threading.Event()
+        queue.submit('net', job(gate=release), wait=False)
+
+        stamped = time.monotonic() - payout_queue.DRAIN_TIMEOUT_SECONDS
+        with patch.object(payout_queue, '_shutdown_started', stamped):
+            started = time.monotonic()
+            queue._drain()
+        release.set()
+
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_networks_get_separate_workers(self):
+        log = []
+        for network in ('a', 'b'):
+            self.queue.submit(network, job(log=log))
+
+        self.assertEqual([name for name, _ in log], ['payout-test-a', 'payout-test-b'])
+
+    def test_wait_timeout_falls_back_to_the_ticket(self):
+        release = threading.Event()
+        with patch.object(payout_queue, 'WAIT_TIMEOUT_SECONDS', 0.05):
+            data, status = self.queue.submit('net', job(gate=release))
+        release.set()
+
+        self.assertEqual(status, 202)
+        self.assertIn('ticket', data)
+
+
+
+
+############################################################
+# BatchingPayoutQueueTests
+############################################################
+
+class BatchingPayoutQueueTests(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TicketStore()
+        patcher = patch.object(payout_queue, 'tickets', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.batches = []
+
+    def handler(self, network, jobs):
+        # A fake batch payout: one answer per job, echoing it
+        self.batches.append(list(jobs))
+        return [({'job': job, 'tx': 'shared'}, 200) for job in jobs]
+
+    def test_jobs_inside_the_window_share_one_call(self):
+        queue = PayoutQueue('test', batch_handler=self.handler, batch_windows={'net': 0.3})
+        queued = [queue.submit('net', n, wait=False)[0]['ticket'] for n in range(3)]
+        data, status = queue.submit('net', 3)
+
+        self.assertEqual(self.batches, [[0, 1, 2, 3]])
+        self.assertEqual((data, status), ({'job': 3, 'tx': 'shared'}, 200))
+        self.assertEqual([self.store.get(t)['result']['job'] for t in queued], [0, 1, 2])
+
+    def test_batch_size_is_capped(self):
+        queue = PayoutQueue('test', batch_handler=self.handler, batch_windows={'net': 0.3})
+        with patch.object(payout_queue, 'BATCH_MAX_JOBS', 2):
+            for n in range(2):
+                queue.submit('net', n, wait=False)
+            queue.submit('net', 2)
+
+        self.assertEqual(self.batches, [[0, 1], [2]])
+
+    def test_crashing_handler_fails_every_ticket(self):
+        def crash(network, jobs):
+            raise RuntimeError('boom')
+        queue = PayoutQueue('test', batch_handler=crash, batch_windows={'net': 0.3})
+
+        with self.assertLogs(level='ERROR'):
+            first = queue.submit('net', 0, wait=False)[0]['ticket']
+            data, status = queue.submit('net', 1)
+
+        self.assertEqual(status, 500)
+        self.assertEqual(self.store.get(first)['status'], 'failed')
+
+
+
+
+############################################################
+# TicketStoreTests
+############################################################
+
+class TicketStoreTests(unittest.TestCase):
+
+    def test_unknown_ticket_is_none(self):
+        self.assertIsNone(TicketStore().get('nope'))
+
+    def test_store_is_capped_oldest_first(self):
+        store = TicketStore(max_entries=2)
+        first = store.create('net')
+        store.create('net')
+        store.create('net')
+
+        self.assertIsNone(store.get(first))
+
+    def test_expired_tickets_are_swept(self):
+        store = TicketStore(ttl=60)
+        with patch('app.payout_queue.payout_queue.time.time', return_value=1000):
+            old = store.create('net')
+        with patch('app.payout_queue.payout_queue.time.time', return_value=1060):
+            store.create('net')
+
+        self.assertIsNone(store.get(old))
+
+    def test_sqlite_store_is_shared_between_workers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'payouts.db')
+            worker_a, worker_b = SqliteTicketStore(path), SqliteTicketStore(path)
+            ticket = worker_a.create('net')
+            worker_a.update(ticket, 'sent', {'tx': 'abc'}, 200)
+
+            record = worker_b.get(ticket)
+            self.assertEqual(record['status'], 'sent')
+            self.assertEqual(record['result'], {'tx': 'abc'})
+            self.assertEqual(record['http_status'], 200)
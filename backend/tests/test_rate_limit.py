@@ -0,0 +1,78 @@
+############################################################
+#  [*] Rate limiter tests
+#
+#  Offline checks of the token buckets behind the
+#  before_request hook: a client gets its burst, is then
+#  refused with a Retry-After, refills with time, never
+#  drains another client's or another route's bucket, and
+#  the bucket table stays under its cap. Time is mocked — no
+#  sleeping in tests.
+############################################################
+
+
+import unittest
+from unittest.mock import patch
+
+from app.rate_limit.limiter import TokenBucketLimiter
+
+
+RULE = '/api/evm/<network>/request'
+
+
+
+
+############################################################
+# TokenBucketLimiterTests
+############################################################
+
+class TokenBucketLimiterTests(unittest.TestCase):
+
+    def limiter(self, burst=3, per_minute=60, **kwargs):
+        return TokenBucketLimiter({RULE: {'burst': burst, 'per_minute': per_minute}}, **kwargs)
+
+    def test_burst_passes_then_the_client_is_shed(self):
+        limiter = self.limiter()
+        with patch('app.rate_limit.limiter.time.monotonic', return_value=100.0):
+            self.assertEqual([limiter.allow(RULE, '1.1.1.1') for _ in range(3)], [0, 0, 0])
+            self.assertEqual(limiter.allow(RULE, '1.1.1.1'), 1)   # one token a second
+        self.assertEqual(limiter.stats()['rejected'], 1)
+
+    def test_bucket_refills_with_time(self):
+        limiter = self.limiter(burst=1, per_minute=6)   # a token every 10 s
+        with patch('app.rate_limit.limiter.time.monotonic', return_value=100.0):
+            limiter.allow(RULE, '1.1.1.1')
+        with patch('app.rate_limit.limiter.time.monotonic', return_value=104.0):
+            self.assertEqual(limiter.allow(RULE, '1.1.1.1'), 6)
+        with patch('app.rate_limit.limiter.time.monotonic', return_value=110.0):
+            self.assertEqual(limiter.allow(RULE, '1.1.1.1'), 0)
+
+    def test_clients_do_not_share_buckets(self):
+        limiter = self.limiter(burst=1)
+        with patch('app.rate_limit.limiter.time.monotonic', return_value=100.0):
+            self.assertEqual(limiter.allow(RULE, '1.1.1.1'), 0)
+            self.assertEqual(limiter.allow(RULE, '2.2.2.2'), 0)
+
+    def test_routes_do_not_share_buckets(self):
+        other = '/api/svm/<network>/request'
+        limiter = TokenBucketLimiter({RULE: {'burst': 1, 'per_minute': 1}, other: {'burst': 1, 'per_minute': 1}})
+        with patch('app.rate_limit.limiter.time.monotonic', return_value=100.0):
+            self.assertEqual(limiter.allow(RULE, '1.1.1.1'), 0)
+            self.assertEqual(limiter.allow(other, '1.1.1.1'), 0)
+
+    def test_unlisted_routes_are_never_limited(self):
+        limiter = self.limiter(burst=1)
+        for _ in range(10):
+            self.assertEqual(limiter.allow('/api/evm/networks', '1.1.1.1'), 0)
+        self.assertEqual(limiter.stats()['clients'], 0)
+
+    def test_table_is_capped_least_recently_used_first(self):
+        limiter = self.limiter(burst=1, max_clients=2)
+        with patch('app.rate_limit.limiter.time.monotonic', return_value=100.0):
+            limiter.allow(RULE, 'a')
+            limiter.allow(RULE, 'b')
+            limiter.allow(RULE, 'a')        # refused, but touches 'a'
+            limiter.allow(RULE, 'c')        # evicts 'b', the idle one
+            self.assertEqual(limiter.stats()['clients'], 2)
+            self.assertEqual(limiter.stats()['evicted'], 1)
+            self.assertEqual(limiter.allow(RULE, 'b'), 0)   # back with a full bucket
+            self.assertNotEqual(limiter.allow(RULE, 'c'), 0)
@@ -11,6 +11,8 @@
 #    - the cooldown is KEPT on success and RELEASED on every
 #      failure after the claim
 #    - the balance cache is dropped after a payout
+#    - claims batched into one UTXO transaction each get
+#      their own answer
 #    - every refusal maps to the right HTTP status
 #      (400 / 403 / 429 / 500 / 503)
 #
@@ -23,10 +25,13 @@
 
 import logging
 import unittest
+from types import SimpleNamespace
 
 from embit import ec as embit_ec
 from embit import script as embit_script
+from embit.transaction import Transaction
 
+from app.payout_queue import payout_queue
 from tests import helpers
 
 
@@ -67,7 +72,7 @@ class UtxoRequestFlowTests(unittest.TestCase):
 
     def claimed(self, address=None):
         # Is the cooldown slot for this address taken?
-        return ('btc4', (address or self.recipient).lower()) in self.faucet.cooldowns._last_claim
+        return ('btc4', (address or self.recipient).lower()) in self.faucet.cooldowns
 
     def test_happy_path_pays_and_keeps_the_cooldown(self):
         data, status = self.faucet.request_crypto('btc4', self.recipient)
@@ -85,6 +90,42 @@ class UtxoRequestFlowTests(unittest.TestCase):
         self.faucet.request_crypto('btc4', self.recipient)
         self.assertNotIn('btc4', self.faucet._balance_cache)
 
+    def test_subscribed_network_trusts_the_cache_past_the_ttl(self):
+        # While pushes arrive, an old entry is still the truth
+        self.client.subscribed = lambda method, params: True
+        self.client.get_balance = lambda scripthash: self.fail('polled a subscribed network')
+        self.faucet._balance_cache['btc4'] = (0, {'confirmed': 5.0, 'unconfirmed': 0.0, 'total': 5.0})
+
+        data, status = self.faucet.get_faucet_balance('btc4')
+        self.assertEqual(data['balance_confirmed'], 5.0)
+
+    def test_unsubscribed_network_polls_after_the_ttl(self):
+        self.faucet._balance_cache['btc4'] = (0, {'confirmed': 5.0, 'unconfirmed': 0.0, 'total': 5.0})
+
+        data, status = self.faucet.get_faucet_balance('btc4')
+        self.assertEqual(data['balance_confirmed'], 1.0)
+
+    def test_pushes_invalidate_the_cached_balance(self):
+        callbacks = []
+        fake = SimpleNamespace(subscribe=lambda method, params, callback: callbacks.append(callback))
+        self.faucet._subscribe('btc4', fake, 'ff' * 32)
+        self.assertEqual(len(callbacks), 2)     # the address and the chain tip
+
+        for callback in callbacks:
+            self.faucet._balance_cache['btc4'] = (9999999999, {'confirmed': 1.0})
+            callback('pushed')
+            self.assertNotIn('btc4', self.faucet._balance_cache)
+
+    def test_fetch_overtaken_by_a_push_is_not_cached(self):
+        # The answer was computed before the change the push reports
+        def overtaken(scripthash):
+            self.faucet._invalidate('btc4')
+            return {'confirmed': 1.0, 'unconfirmed': 0.0, 'total': 1.0}
+        self.client.get_balance = overtaken
+
+        self.faucet.get_faucet_balance('btc4')
+        self.assertNotIn('btc4', self.faucet._balance_cache)
+
     def test_second_claim_inside_the_window_is_429(self):
         self.faucet.request_crypto('btc4', self.recipient)
         data, status = self.faucet.request_crypto('btc4', self.recipient)
@@ -149,6 +190,56 @@ class UtxoRequestFlowTests(unittest.TestCase):
         self.faucet.request_crypto('btc4', self.recipient)
         self.assertEqual(self.faucet.cooldowns.claim(('knf', self.recipient.lower())), 0)
 
+    def second_recipient(self):
+        prv = embit_ec.PrivateKey(bytes.fromhex('dd' * 32))
+        return embit_script.p2wpkh(prv.get_public_key()).address({'bech32': 'tb'})
+
+    def test_consecutive_payouts_chain_on_the_local_change(self):
+        # The second payout spends the first one's change straight
+        # from the in-memory UTXO set — listunspent is asked once
+        listings, broadcasts = [], []
+        self.client.list_unspent = lambda scripthash: listings.append(scripthash) or [
+            {'tx_hash': 'aa' * 32, 'tx_pos': 0, 'value': 5_000_000}]
+        self.client.request = lambda method, params: broadcasts.append(params[0]) or 'txid-ok'
+
+        self.faucet.request_crypto('btc4', self.recipient)
+        data, status = self.faucet.request_crypto('btc4', self.second_recipient())
+
+        first, second = (Transaction.from_string(raw) for raw in broadcasts)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(listings), 1)
+        self.assertEqual((second.vin[0].txid, second.vin[0].vout), (first.txid()[::-1], 1))
+
+    def test_claims_in_one_window_share_one_transaction(self):
+        # Two students inside the batch window: one broadcast, two
+        # outputs plus change, the same txid for both
+        self.client.list_unspent = lambda scripthash: [{'tx_hash': 'aa' * 32, 'tx_pos': 0, 'value': 5_000_000}]
+        broadcasts = []
+        self.client.request = lambda method, params: broadcasts.append(params[0]) or 'txid-batch'
+        self.faucet._batch_windows['btc4'] = 0.3
+
+        ticket = self.faucet.request_crypto('btc4', self.recipient, wait=False)[0]['ticket']
+        data, status = self.faucet.request_crypto('btc4', self.second_recipient())
+
+        self.assertEqual(status, 200)
+        self.assertEqual((data['transaction_id'], data['batch_size']), ('txid-batch', 2))
+        self.assertEqual(payout_queue.tickets.get(ticket)['result']['transaction_id'], 'txid-batch')
+        self.assertEqual(len(broadcasts), 1)
+        self.assertEqual(len(Transaction.from_string(broadcasts[0]).vout), 3)
+
+    def test_batch_beyond_the_balance_is_503_for_the_rest(self):
+        # The balance covers one chunk: the first claim is paid, the
+        # second answers 503 and gets its slot back
+        self.client.get_balance = lambda scripthash: {'confirmed': 0.015, 'unconfirmed': 0.0, 'total': 0.015}
+        self.faucet._batch_windows['btc4'] = 0.3
+
+        ticket = self.faucet.request_crypto('btc4', self.recipient, wait=False)[0]['ticket']
+        data, status = self.faucet.request_crypto('btc4', self.second_recipient())
+
+        self.assertEqual(payout_queue.tickets.get(ticket)['http_status'], 200)
+        self.assertEqual(status, 503)
+        self.assertFalse(self.claimed(self.second_recipient()))
+
 
 
 
@@ -180,7 +271,7 @@ class EvmRequestFlowTests(unittest.TestCase):
         return self.faucet.request_eth('testchain', self.address, self.signature, self.nonce)
 
     def claimed(self):
-        return ('testchain', self.address.lower()) in self.faucet.cooldowns._last_claim
+        return ('testchain', self.address.lower()) in self.faucet.cooldowns
 
     def test_happy_path_broadcasts_the_chunk(self):
         eth = self.fake()
@@ -192,7 +283,64 @@ class EvmRequestFlowTests(unittest.TestCase):
         self.assertEqual(eth.sent[0]['to'], self.address)
         self.assertEqual(eth.sent[0]['value'], self.CHUNK_WEI)
         self.assertEqual(eth.sent[0]['from'], self.faucet.FAUCET_ADDRESS)
+        self.assertEqual((eth.sent[0]['nonce'], eth.sent[0]['chainId']), (0, 12345))
+        self.assertEqual(eth.sent[0]['gasPrice'], 1)   # the gas oracle's legacy fee
+        self.assertTrue(self.claimed())
+
+    def test_payouts_take_consecutive_local_nonces(self):
+        # The pending nonce is read once; every later payout just
+        # takes the next number
+        eth = self.fake(pending_nonce=7)
+        self.claim()
+        address, signature, nonce = helpers.sign_claim(address_key='dd' * 32)
+        self.faucet.request_eth('testchain', address, signature, nonce)
+
+        self.assertEqual([tx['nonce'] for tx in eth.sent], [7, 8])
+        self.assertEqual(eth.nonce_reads, 1)
+
+    def test_nonce_conflict_resyncs_and_retries_once(self):
+        # The node says the local counter is stale: re-read, resend
+        eth = self.fake(pending_nonce=3, nonce_conflicts=1)
+        data, status = self.claim()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(eth.nonce_reads, 2)
+        self.assertEqual(len(eth.sent), 1)
+
+    def test_already_known_broadcast_is_the_payout_going_out(self):
+        # A duplicated broadcast the node already holds: the payout
+        # went out — its hash is the answer, the nonce stays spent
+        eth = self.fake(pending_nonce=3, already_known=1)
+        data, status = self.claim()
+
+        self.assertEqual(status, 200)
         self.assertTrue(self.claimed())
+        self.assertEqual(data['transaction_hash'], eth.sent[0]['hash'].hex())
+
+        address, signature, nonce = helpers.sign_claim(address_key='dd' * 32)
+        self.faucet.request_eth('testchain', address, signature, nonce)
+        self.assertEqual([tx['nonce'] for tx in eth.sent], [3, 4])
+        self.assertEqual(eth.nonce_reads, 1)
+
+    def test_failed_broadcast_hands_its_nonce_out_again(self):
+        # A nonce that never reached the chain must not leave a gap
+        eth = self.fake(pending_nonce=5, broadcast_error='rpc down')
+        self.claim()
+        eth.broadcast_error = None
+        address, signature, nonce = helpers.sign_claim(address_key='dd' * 32)
+        self.faucet.request_eth('testchain', address, signature, nonce)
+
+        self.assertEqual([tx['nonce'] for tx in eth.sent], [5])
+
+    def test_async_claim_answers_202_and_pays_on_the_queue(self):
+        eth = self.fake()
+        data, status = self.faucet.request_eth('testchain', self.address, self.signature, self.nonce, wait=False)
+        self.assertEqual(status, 202)
+        self.assertTrue(self.claimed())
+
+        self.faucet.payouts._drain()   # the workers finish the queued payout, then stop
+        self.assertEqual(payout_queue.tickets.get(data['ticket'])['status'], 'sent')
+        self.assertEqual(len(eth.sent), 1)
 
     def test_payout_drops_the_cached_balance(self):
         self.fake()
@@ -207,7 +355,7 @@ class EvmRequestFlowTests(unittest.TestCase):
         data, status = self.faucet.request_eth('testchain', address, signature, nonce)
 
         self.assertEqual(status, 403)
-        self.assertFalse(('testchain', address.lower()) in self.faucet.cooldowns._last_claim)
+        self.assertFalse(('testchain', address.lower()) in self.faucet.cooldowns)
 
     def test_tampered_nonce_is_403(self):
         # The signature covers the nonce — replaying it under another
@@ -237,6 +385,15 @@ class EvmRequestFlowTests(unittest.TestCase):
         self.assertEqual(status, 429)
         self.assertIn('sek', data['error'])
 
+    def test_cooling_down_wallet_is_429_before_the_signature_check(self):
+        # The peek fast path refuses before any recovery — a garbage
+        # signature gets the 429, not the 403
+        self.fake()
+        self.claim()
+        data, status = self.faucet.request_eth('testchain', self.address, '0xdead', self.nonce)
+
+        self.assertEqual(status, 429)
+
     def test_empty_faucet_is_503_and_releases_the_cooldown(self):
         self.fake(faucet_balance=1)
         data, status = self.claim()
@@ -304,7 +461,7 @@ class Erc20RequestFlowTests(unittest.TestCase):
         return self.faucet.request_tokens('testchain', 'TST', self.address, self.signature, self.nonce)
 
     def claimed(self):
-        return ('testchain', 'TST', self.address.lower()) in self.faucet.cooldowns._last_claim
+        return ('testchain', 'TST', self.address.lower()) in self.faucet.cooldowns
 
     def test_happy_path_transfers_the_chunk(self):
         self.fake()
@@ -321,6 +478,18 @@ class Erc20RequestFlowTests(unittest.TestCase):
         self.assertEqual(tx['gas'], 90000)  # the 60000 estimate * 1.5
         self.assertTrue(self.claimed())
 
+    def test_token_and_native_payouts_share_one_nonce_sequence(self):
+        # Same wallet, same chain: the native payout after a token
+        # payout takes the NEXT nonce, not the pending count again
+        eth = helpers.fake_web3(self.evm, 'testchain', pending_nonce=4, balances={
+            self.address: self.ENOUGH_GAS, self.evm.FAUCET_ADDRESS: 10 ** 18})
+        with helpers.fake_token_contract({self.evm.FAUCET_ADDRESS: 100 * 10 ** 18}) as contract:
+            self.claim()
+        self.evm.request_eth('testchain', self.address, self.signature, self.nonce)
+
+        self.assertEqual(contract.transfers[0][2]['nonce'], 4)
+        self.assertEqual([tx['nonce'] for tx in eth.sent], [4, 5])
+
     def test_payout_drops_the_cached_balance(self):
         self.fake()
         self.faucet._balance_cache[('TST', 'testchain')] = (9999999999, 1.0)
@@ -365,6 +534,14 @@ class Erc20RequestFlowTests(unittest.TestCase):
 
         self.assertEqual(status, 429)
 
+    def test_cooling_down_wallet_is_429_before_the_signature_check(self):
+        self.fake()
+        with helpers.fake_token_contract({self.evm.FAUCET_ADDRESS: 100 * 10 ** 18}):
+            self.claim()
+            data, status = self.faucet.request_tokens('testchain', 'TST', self.address, '0xdead', self.nonce)
+
+        self.assertEqual(status, 429)
+
     def test_empty_faucet_is_503_and_releases_the_cooldown(self):
         self.fake()
         with helpers.fake_token_contract({self.evm.FAUCET_ADDRESS: 0}):
@@ -5,7 +5,9 @@
 #  Ed25519 identity (derived from the shared secp256k1 secret
 #  as a SEED, so it is deterministic but a DIFFERENT address),
 #  real signature verification, the composed public payload,
-#  and the full claim flow with the RPC faked.
+#  the RPC client's batch arrays, the blockhash cache, the
+#  payout signature tracker, and the full claim flow with
+#  the RPC faked.
 #
 #  Everything here is offline — no Solana node is contacted —
 #  but the cryptography is REAL: claims carry genuine Ed25519
@@ -14,10 +16,17 @@
 
 
 import json
+import time
 import logging
 import unittest
+import threading
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
 
+from app.svm_faucet.blockhash_cache import BLOCKHASH_SAFETY_BLOCKS, BlockhashCache, is_blockhash_not_found
 from app.svm_faucet.chains import chain_params
+from app.svm_faucet.signature_tracker import SignatureTracker
+from app.svm_faucet.rpc_client import SolanaRpcClient
 from tests import helpers
 
 
@@ -210,7 +219,7 @@ class SvmRequestFlowTests(unittest.TestCase):
         return self.faucet.request_sol('testsvm', self.address, self.signature, self.nonce)
 
     def claimed(self):
-        return ('testsvm', self.address) in self.faucet.cooldowns._last_claim
+        return ('testsvm', self.address) in self.faucet.cooldowns
 
     def test_happy_path_broadcasts_and_keeps_the_cooldown(self):
         client = self.fake()
@@ -223,6 +232,24 @@ class SvmRequestFlowTests(unittest.TestCase):
         self.assertEqual(len(client.sent), 1)
         self.assertTrue(self.claimed())
 
+    def test_async_claim_answers_202_and_pays_on_the_queue(self):
+        from app.payout_queue import payout_queue
+
+        client = self.fake()
+        data, status = self.faucet.request_sol('testsvm', self.address, self.signature, self.nonce, wait=False)
+        self.assertEqual(status, 202)
+        self.assertTrue(self.claimed())
+
+        # The payout workers run side by side, so there is no
+        # "behind it" job to wait on — poll the ticket instead
+        deadline = time.monotonic() + 5
+        while payout_queue.tickets.get(data['ticket'])['status'] != 'sent' and time.monotonic() < deadline:
+            time.sleep(0.005)
+        record = payout_queue.tickets.get(data['ticket'])
+        self.assertEqual(record['status'], 'sent')
+        self.assertTrue(record['result']['transaction_id'])
+        self.assertEqual(len(client.sent), 1)
+
     def test_broadcast_is_a_real_signed_transaction(self):
         # The payout is genuinely built and signed — only the
         # transport is faked
@@ -236,12 +263,36 @@ class SvmRequestFlowTests(unittest.TestCase):
         self.assertEqual(str(tx.message.account_keys[0]), self.faucet.FAUCET_ADDRESS)
         self.assertIn(self.address, [str(k) for k in tx.message.account_keys])
 
-    def test_payout_drops_the_cached_balance(self):
-        self.fake()
+    def test_confirmed_payout_drops_the_cached_balance(self):
+        client = self.fake()
         self.faucet._balance_cache['testsvm'] = (9999999999, 42.0)
-        self.claim()
+        data, _ = self.claim()
+
+        # Accepted is not landed — the balance stays cached...
+        self.faucet.signatures.poll()
+        self.assertIn('testsvm', self.faucet._balance_cache)
 
+        # ...until the tracker sees it confirmed
+        client.statuses[data['transaction_id']] = {'confirmationStatus': 'confirmed', 'err': None}
+        self.faucet.signatures.poll()
         self.assertNotIn('testsvm', self.faucet._balance_cache)
+        self.assertTrue(self.claimed())
+        self.assertEqual(self.faucet.get_payout_status('testsvm', data['transaction_id'])[0]['status'], 'confirmed')
+
+    def test_expired_payout_releases_the_cooldown(self):
+        client = self.fake()
+        data, _ = self.claim()
+        self.assertEqual(data['status'], 'pending')
+
+        client.block_height = 1151          # past the hash's lastValidBlockHeight, never seen
+        self.faucet.signatures.poll()
+
+        self.assertFalse(self.claimed())
+        self.assertEqual(self.faucet.get_payout_status('testsvm', data['transaction_id'])[0]['status'], 'expired')
+
+    def test_unknown_payout_is_404(self):
+        self.assertEqual(self.faucet.get_payout_status('testsvm', 'nosuchsig')[1], 404)
+        self.assertEqual(self.faucet.get_payout_status('nosuchnet', 'nosuchsig')[1], 400)
 
     def test_wrong_signer_is_403(self):
         self.fake()
@@ -249,7 +300,7 @@ class SvmRequestFlowTests(unittest.TestCase):
         data, status = self.faucet.request_sol('testsvm', address, signature, nonce)
 
         self.assertEqual(status, 403)
-        self.assertFalse(('testsvm', address) in self.faucet.cooldowns._last_claim)
+        self.assertFalse(('testsvm', address) in self.faucet.cooldowns)
 
     def test_wallet_already_funded_is_400_without_claiming(self):
         self.fake(user_lamports=self.CHUNK_LAMPORTS)
@@ -266,6 +317,15 @@ class SvmRequestFlowTests(unittest.TestCase):
 
         self.assertEqual(status, 429)
 
+    def test_cooling_down_wallet_is_429_before_the_signature_check(self):
+        # The peek fast path refuses before any verification — a
+        # garbage signature gets the 429, not the 403
+        self.fake()
+        self.claim()
+        data, status = self.faucet.request_sol('testsvm', self.address, 'garbage', self.nonce)
+
+        self.assertEqual(status, 429)
+
     def test_empty_faucet_is_503_and_releases_the_cooldown(self):
         self.fake(faucet_lamports=1000)
         data, status = self.claim()
@@ -281,12 +341,94 @@ class SvmRequestFlowTests(unittest.TestCase):
         self.fake(faucet_lamports=self.CHUNK_LAMPORTS + 5000)
         self.assertEqual(self.claim()[1], 200)
 
+    def test_claim_reads_both_balances_at_once(self):
+        client = self.fake()
+        reads = []
+        fetched = client.get_balances
+        client.get_balances = lambda addresses: reads.append(addresses) or fetched(addresses)
+        client.get_balance = lambda address: self.fail('a separate getBalance round trip')
+
+        self.assertEqual(self.claim()[1], 200)
+        self.assertEqual(reads, [[self.address, self.faucet.FAUCET_ADDRESS]])
+
+    def test_payouts_sign_with_the_cached_blockhash(self):
+        client = self.fake()
+        self.faucet.blockhashes.refresh('testsvm')
+
+        self.assertEqual(self.claim()[1], 200)
+        self.assertEqual(client.blockhash_reads, 1)     # the priming refresh only
+
+    def test_blockhash_not_found_refreshes_and_retries_once(self):
+        client = self.fake()
+        self.faucet.blockhashes.refresh('testsvm')
+        sent = client.send_transaction
+        attempts = []
+
+        def send_transaction(signed_base64):
+            attempts.append(signed_base64)
+            if len(attempts) == 1:
+                raise RuntimeError('Transaction simulation failed: Blockhash not found')
+            return sent(signed_base64)
+        client.send_transaction = send_transaction
+
+        data, status = self.claim()
+        self.assertEqual(status, 200)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(client.blockhash_reads, 2)     # the cache was dropped and refetched
+        self.assertTrue(self.claimed())
+
+    def test_in_flight_payouts_are_reserved_from_the_balance(self):
+        # Two chunks plus fees fit; the third claim reads the same
+        # stale balance, but the first two are still in flight
+        cost = self.CHUNK_LAMPORTS + 5000
+        client = self.fake(faucet_lamports=2 * cost)
+        self.assertEqual(self.claim()[1], 200)
+        self.assertEqual(self.faucet._reserved['testsvm'], cost)
+
+        for seed in (b'\x01' * 32, b'\x02' * 32):
+            address, signature, nonce = helpers.sign_svm_claim(address_seed=seed)
+            status = self.faucet.request_sol('testsvm', address, signature, nonce)[1]
+        self.assertEqual(status, 503)
+        self.assertEqual(len(client.sent), 2)
+
+    def test_settled_payout_gives_its_reservation_back(self):
+        client = self.fake()
+        data, _ = self.claim()
+
+        client.statuses[data['transaction_id']] = {'confirmationStatus': 'confirmed', 'err': None}
+        self.faucet.signatures.poll()
+        self.assertEqual(self.faucet._reserved['testsvm'], 0)
+
+    def test_parallel_payouts_broadcast_side_by_side(self):
+        client = self.fake()
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+        sent = client.send_transaction
+
+        def send_transaction(signed_base64):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return sent(signed_base64)
+        client.send_transaction = send_transaction
+
+        claims = [helpers.sign_svm_claim(address_seed=bytes([i + 1]) * 32) for i in range(8)]
+        with ThreadPoolExecutor(len(claims)) as pool:
+            statuses = list(pool.map(lambda claim: self.faucet.request_sol('testsvm', *claim)[1], claims))
+
+        self.assertEqual(statuses, [200] * 8)
+        self.assertGreater(peak[0], 1)
+
     def test_broadcast_failure_releases_the_cooldown(self):
         self.fake(broadcast_error='blockhash not found')
         data, status = self.claim()
 
         self.assertEqual(status, 500)
         self.assertFalse(self.claimed())
+        self.assertEqual(self.faucet._reserved['testsvm'], 0)
         self.assertNotIn('blockhash', str(data))       # no raw RPC text to students
 
         self.fake()
@@ -297,7 +439,7 @@ class SvmRequestFlowTests(unittest.TestCase):
         for bad in ('0x' + 'ab' * 20, 'not-an-address', 'tb1qw508d6qejxtdg4y5r3zarvary0c5xw7kxpjzsx'):
             data, status = self.faucet.request_sol('testsvm', bad, self.signature, self.nonce)
             self.assertEqual(status, 400)
-            self.assertFalse((('testsvm', bad) in self.faucet.cooldowns._last_claim))
+            self.assertFalse((('testsvm', bad) in self.faucet.cooldowns))
 
     def test_paying_the_faucet_itself_is_refused(self):
         self.fake()
@@ -319,5 +461,287 @@ class SvmRequestFlowTests(unittest.TestCase):
             self.assertEqual(self.faucet.request_sol('testsvm', *args)[1], 400)
 
 
+
+
+
+############################################################
+# SolanaRpcBatchTests
+############################################################
+#
+# The client's JSON-RPC batch arrays against a fake HTTP
+# session: one POST, results back in request order whatever
+# order the node answers in, any item's error raised.
+############################################################
+
+class FakeSession:
+    # post() records the payload and answers with `reply(payload)`
+    def __init__(self, reply):
+        self.reply = reply
+        self.posts = []
+
+    def post(self, endpoint, json=None, timeout=None):
+        self.posts.append(json)
+        answer = self.reply(json)
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return answer
+        return Response()
+
+
+class SolanaRpcBatchTests(unittest.TestCase):
+
+    def client(self, reply):
+        client = SolanaRpcClient('https://rpc.invalid')
+        client.session = FakeSession(reply)
+        return client
+
+    def test_batch_is_one_post_with_results_in_request_order(self):
+        def reply(payload):
+            return [{'jsonrpc': '2.0', 'id': item['id'], 'result': item['method']} for item in reversed(payload)]
+
+        client = self.client(reply)
+        self.assertEqual(client.batch([('getHealth', None), ('getSlot', [])]), ['getHealth', 'getSlot'])
+        self.assertEqual(len(client.session.posts), 1)
+        self.assertEqual([item['id'] for item in client.session.posts[0]], [1, 2])
+
+    def test_batch_item_error_raises(self):
+        client = self.client(lambda payload: [
+            {'jsonrpc': '2.0', 'id': 1, 'result': 'ok'},
+            {'jsonrpc': '2.0', 'id': 2, 'error': {'message': 'boom'}},
+        ])
+        with self.assertRaisesRegex(RuntimeError, 'boom'):
+            client.batch([('getHealth', None), ('getSlot', [])])
+
+    def test_node_refusing_batches_raises(self):
+        client = self.client(lambda payload: {'jsonrpc': '2.0', 'id': None, 'error': {'message': 'no batches'}})
+        with self.assertRaisesRegex(RuntimeError, 'no batches'):
+            client.batch([('getHealth', None)])
+
+    def test_balances_come_from_one_call_without_account_data(self):
+        def reply(payload):
+            self.assertEqual(payload['method'], 'getMultipleAccounts')
+            self.assertEqual(payload['params'][1]['dataSlice'], {'offset': 0, 'length': 0})
+            return {'jsonrpc': '2.0', 'id': 1, 'result': {'value': [None, {'lamports': 42}]}}
+
+        client = self.client(reply)
+        # An account the chain has never seen reads as 0
+        self.assertEqual(client.get_balances(['new', 'old']), [0, 42])
+        self.assertEqual(len(client.session.posts), 1)
+
+
+
+
+############################################################
+# BlockhashCacheTests
+############################################################
+#
+# The per-network blockhash cache against a fake client:
+# served while the hash has blocks to spare, refetched near
+# its last valid height or once invalidated, and refreshed
+# in one batch round trip.
+############################################################
+
+class FakeBlockhashClient:
+    # batch() answers getLatestBlockhash + getBlockHeight with
+    # hash-<n>, `left` blocks short of its last valid height
+    def __init__(self, left=150):
+        self.left = left
+        self.reads = 0
+
+    def batch(self, requests):
+        self.reads += 1
+        return [{'value': {'blockhash': f'hash-{self.reads}', 'lastValidBlockHeight': 1000 + self.left}}, 1000]
+
+
+class BlockhashCacheTests(unittest.TestCase):
+
+    def cache(self, left=150):
+        client = FakeBlockhashClient(left)
+        return BlockhashCache({'net': client}), client
+
+    def test_cached_hash_is_served_while_blocks_are_left(self):
+        cache, client = self.cache()
+        self.assertEqual(cache.blockhash('net'), 'hash-1')
+        self.assertEqual(cache.blockhash('net'), 'hash-1')
+        self.assertEqual(client.reads, 1)
+
+    def test_hash_near_its_last_valid_height_is_refetched(self):
+        cache, client = self.cache(left=BLOCKHASH_SAFETY_BLOCKS)
+        self.assertEqual(cache.blockhash('net'), 'hash-1')
+        self.assertEqual(cache.blockhash('net'), 'hash-2')
+
+    def test_cached_hash_ages_with_the_clock(self):
+        cache, client = self.cache()
+        cache.refresh('net')
+        # 150 blocks left at the fetch, 110 blocks (44 s) later
+        # only 40 remain — under the safety margin
+        with patch('app.svm_faucet.blockhash_cache.time.monotonic', return_value=time.monotonic() + 44):
+            self.assertEqual(cache.blockhash('net'), 'hash-2')
+
+    def test_invalidate_drops_the_hash(self):
+        cache, client = self.cache()
+        cache.blockhash('net')
+        cache.invalidate('net')
+        self.assertEqual(cache.blockhash('net'), 'hash-2')
+
+    def test_refresh_is_one_batch(self):
+        cache, client = self.cache()
+        self.assertEqual(cache.refresh('net'), {
+            'blockhash': 'hash-1', 'last_valid_block_height': 1150, 'block_height': 1000})
+        self.assertEqual(client.reads, 1)
+
+    def test_blockhash_not_found_is_recognized(self):
+        self.assertTrue(is_blockhash_not_found(RuntimeError('Transaction simulation failed: Blockhash not found')))
+        self.assertFalse(is_blockhash_not_found(RuntimeError('insufficient funds for rent')))
+
+
+
+
+############################################################
+# SignatureTrackerTests
+############################################################
+#
+# The payout tracker against a fake client: statuses polled
+# in batches of at most 256, a payout settled only once it
+# landed or its blockhash expired, and each outcome handed
+# to the faucet exactly once.
+############################################################
+
+class FakeStatusClient:
+    # batch() answers getSignatureStatuses from `statuses` (the
+    # recent cache) — plus `history` when asked to search it —
+    # and getBlockHeight with `block_height`, recording each
+    # batch
+    def __init__(self):
+        self.statuses = {}
+        self.history = {}
+        self.block_height = 1000
+        self.batches = []
+        self.down = False
+
+    def batch(self, requests):
+        if self.down:
+            raise ConnectionError('node down')
+        self.batches.append(requests)
+        return [self._statuses(*params) if method == 'getSignatureStatuses' else self.block_height
+                for method, params in requests]
+
+    def _statuses(self, signatures, options):
+        known = dict(self.history, **self.statuses) if options.get('searchTransactionHistory') else self.statuses
+        return {'value': [known.get(signature) for signature in signatures]}
+
+
+class SignatureTrackerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeStatusClient()
+        self.settled = []
+        self.tracker = SignatureTracker(
+            {'net': self.client}, lambda record: self.settled.append((record['context'], record['status'])))
+
+    def track(self, signature, last_valid=1150):
+        # Tracked directly — the poller thread is never started
+        with patch('app.svm_faucet.signature_tracker.threading.Thread'):
+            self.tracker.track('net', signature, last_valid, context=('net', signature))
+
+    def status(self, signature):
+        return self.tracker.status('net', signature)['status']
+
+    def test_confirmed_payout_has_landed(self):
+        self.track('a')
+        self.client.statuses['a'] = {'confirmationStatus': 'confirmed', 'err': None}
+        self.tracker.poll()
+
+        self.assertEqual(self.status('a'), 'confirmed')
+        self.assertEqual(self.settled, [(('net', 'a'), 'confirmed')])
+
+    def test_processed_payout_stays_pending(self):
+        self.track('a')
+        self.client.statuses['a'] = {'confirmationStatus': 'processed', 'err': None}
+        self.tracker.poll()
+
+        self.assertEqual(self.status('a'), 'pending')
+        self.assertEqual(self.settled, [])
+
+    def test_unseen_payout_expires_past_its_last_valid_height(self):
+        self.track('a', last_valid=1000)
+        self.tracker.poll()
+        self.assertEqual(self.status('a'), 'pending')      # height 1000 is still valid
+
+        self.client.block_height = 1001
+        self.tracker.poll()
+        self.assertEqual(self.status('a'), 'expired')
+        self.assertEqual(self.settled, [(('net', 'a'), 'expired')])
+
+    def test_failed_payout_is_settled_with_its_error(self):
+        self.track('a')
+        self.client.statuses['a'] = {'confirmationStatus': 'finalized', 'err': {'InstructionError': [0, 'Custom']}}
+        self.tracker.poll()
+
+        self.assertEqual(self.status('a'), 'failed')
+        self.assertEqual(self.settled, [(('net', 'a'), 'failed')])
+
+    def test_statuses_are_polled_in_chunks_of_256_in_one_batch(self):
+        for i in range(300):
+            self.track(f'sig{i}')
+        self.tracker.poll()
+
+        (requests,) = self.client.batches
+        self.assertEqual([method for method, _ in requests],
+                         ['getSignatureStatuses', 'getSignatureStatuses', 'getBlockHeight'])
+        self.assertEqual([len(params[0]) for _, params in requests[:2]], [256, 44])
+
+    def test_settled_payouts_are_not_polled_again(self):
+        self.track('a')
+        self.client.statuses['a'] = {'confirmationStatus': 'confirmed', 'err': None}
+        self.tracker.poll()
+        self.tracker.poll()
+
+        self.assertEqual(len(self.client.batches), 1)
+        self.assertEqual(self.settled, [(('net', 'a'), 'confirmed')])
+
+    def test_payout_missing_from_the_recent_cache_is_found_in_history(self):
+        # The RPC was down past the status cache window: the
+        # payout landed, but only the history still knows it
+        self.track('a', last_valid=1000)
+        self.client.block_height = 1200
+        self.client.history['a'] = {'confirmationStatus': 'finalized', 'err': None}
+        self.tracker.poll()
+
+        self.assertEqual(self.status('a'), 'confirmed')
+        self.assertEqual(self.settled, [(('net', 'a'), 'confirmed')])
+        history = self.client.batches[-1]
+        self.assertEqual(history, [('getSignatureStatuses', [['a'], {'searchTransactionHistory': True}])])
+
+    def test_failed_history_lookup_keeps_the_payout_pending(self):
+        self.track('a', last_valid=1000)
+        self.client.block_height = 1200
+        batch = self.client.batch
+
+        def recent_only(requests):
+            if requests[0][1][1].get('searchTransactionHistory'):
+                raise ConnectionError('history unavailable')
+            return batch(requests)
+        self.client.batch = recent_only
+
+        self.tracker.poll()
+        self.assertEqual(self.status('a'), 'pending')
+        self.assertEqual(self.settled, [])
+
+    def test_failing_rpc_keeps_payouts_pending(self):
+        self.track('a', last_valid=0)
+        self.client.down = True
+        self.tracker.poll()
+        self.assertEqual(self.status('a'), 'pending')
+
+        self.client.down = False
+        self.tracker.poll()
+        self.assertEqual(self.status('a'), 'expired')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -21,6 +21,7 @@ from embit import ec
 from embit import script as embit_script
 from embit.transaction import Transaction
 
+from app.utxo_faucet.coin_selection import estimate_fee
 from tests import helpers
 
 
@@ -50,6 +51,38 @@ class UtxoEngineTests(unittest.TestCase):
         faucet._create_and_broadcast_transaction(ctx, to_address, amount)
         return Transaction.from_string(captured['raw']), ctx
 
+    def test_batch_pays_every_recipient_then_change(self):
+        # One transaction, the recipients in order, change last
+        faucet = helpers.make_utxo_faucet()
+        captured = helpers.fake_electrum(faucet, 'knf', helpers.ANCHOR_UTXOS)
+        ctx = faucet._setup_wallet_for_network('knf')
+        recipients = [
+            embit_script.p2wpkh(ec.PrivateKey(bytes.fromhex(key * 32)).get_public_key()).address({'bech32': ctx.dialect.hrp})
+            for key in ('bb', 'dd')
+        ]
+
+        faucet._create_and_broadcast_batch(ctx, [(recipients[0], 100000), (recipients[1], 50000)])
+        tx = Transaction.from_string(captured['raw'])
+
+        self.assertEqual([out.value for out in tx.vout[:2]], [100000, 50000])
+        self.assertEqual([out.script_pubkey for out in tx.vout[:2]],
+                         [ctx.dialect.recipient_script(address) for address in recipients])
+        self.assertEqual(tx.vout[2].script_pubkey, ctx.script_pubkey)
+        self.assertEqual(sum(out.value for out in tx.vout) + ctx.dialect.signed_vsize(tx) * ctx.fee_rate,
+                         sum(u['value'] for u in helpers.ANCHOR_UTXOS[:len(tx.vin)]))
+
+    def test_fee_is_priced_on_the_signed_size(self):
+        # The paid fee is the signed vsize at the rate — never under
+        # the real vsize, never the looser per-input estimate
+        tx, ctx = self.build_payout()
+        fee = sum(u['value'] for u in helpers.ANCHOR_UTXOS) - sum(out.value for out in tx.vout)
+        witness = sum(len(inp.witness.serialize()) for inp in tx.vin) + 2
+        vsize = -(-((len(tx.serialize()) - witness) * 4 + witness) // 4)
+
+        self.assertEqual(fee, ctx.dialect.signed_vsize(tx) * ctx.fee_rate)
+        self.assertGreaterEqual(ctx.dialect.signed_vsize(tx), vsize)
+        self.assertLess(fee, estimate_fee(ctx.dialect, ctx.fee_rate, len(tx.vin), 2))
+
     def test_faucet_address_anchor(self):
         # Same key must always derive the same knf address
         faucet = helpers.make_utxo_faucet()
@@ -88,6 +121,15 @@ class UtxoEngineTests(unittest.TestCase):
         self.assertEqual(len(tx.vout), 2)
         self.assertEqual(tx.vout[1].script_pubkey.data, ctx.script_pubkey.data)
 
+    def test_fee_oracle_payload_covers_every_network(self):
+        # Before any fetch: listed with the registry bounds, stale
+        faucet = helpers.make_utxo_faucet()
+        data, status = faucet.get_fee_oracle()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(set(data['networks']), set(faucet._electrum_clients))
+        self.assertTrue(data['networks']['knf']['stale'])
+
     def test_sub_dust_change_is_dropped(self):
         # total = amount + fee + sub-dust remainder -> single output
         fee = (2 * 91 + 2 * 31 + 10) * 10  # matches _estimate_fee at rate 10
@@ -209,6 +251,14 @@ class UtxoLegacyDialectTests(unittest.TestCase):
         self.assertEqual(tx.vout[0].script_pubkey.data[:3], b'\x76\xa9\x14')
         self.assertEqual(tx.vout[0].script_pubkey.data[-2:], b'\x88\xac')
 
+    def test_legacy_fee_is_priced_on_the_signed_size(self):
+        # Every signature counted at its 73-byte maximum: the paid fee
+        # covers the real size, whatever the DER encoding came out as
+        tx, ctx = self.build_payout()
+        fee = sum(u['value'] for u in helpers.ANCHOR_DOGE_UTXOS[:len(tx.vin)]) - sum(out.value for out in tx.vout)
+        self.assertEqual(fee, ctx.dialect.signed_vsize(tx) * ctx.fee_rate)
+        self.assertGreaterEqual(ctx.dialect.signed_vsize(tx), len(tx.serialize()))
+
     def test_legacy_signatures_verify(self):
         # Every scriptSig is <DER sig + SIGHASH_ALL> <pubkey> and the
         # signature verifies against the legacy sighash
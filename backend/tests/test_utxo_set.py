@@ -0,0 +1,162 @@
+############################################################
+#  [*] UTXO set tests
+#
+#  Offline checks of the UTXO faucet's in-memory coin set:
+#  reserved inputs are never handed out twice, a spend swaps
+#  its inputs for its change at once, a failure frees the
+#  inputs and marks the set stale, and a reconcile trusts our
+#  own recent broadcasts over a lagging Electrum — until the
+#  grace period says Electrum is right. fetch is a plain list;
+#  time is mocked.
+############################################################
+
+
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.utxo_faucet.utxo_set import UtxoSet, UTXO_PENDING_GRACE_SECONDS
+
+
+def coin(tag, value=1000, pos=0):
+    return {'tx_hash': tag * 32, 'tx_pos': pos, 'value': value, 'height': 100}
+
+
+def take(count):
+    # A choose() that takes the first `count` coins offered
+    def choose(utxos):
+        if len(utxos) < count:
+            raise ValueError('Insufficient funds')
+        return utxos[:count]
+    return choose
+
+
+def loaded(*coins):
+    utxo_set = UtxoSet(lambda: [dict(c) for c in coins], label='net')
+    utxo_set.refresh()
+    return utxo_set
+
+
+
+
+############################################################
+# UtxoSetTests
+############################################################
+
+class UtxoSetTests(unittest.TestCase):
+
+    def test_starts_stale_and_loads_in_listing_order(self):
+        utxo_set = UtxoSet(lambda: [coin('bb'), coin('aa')])
+        self.assertTrue(utxo_set.stale)
+
+        utxo_set.refresh()
+        self.assertFalse(utxo_set.stale)
+        self.assertEqual([u['tx_hash'][:2] for u in utxo_set.reserve(take(2))], ['bb', 'aa'])
+
+    def test_reserved_inputs_are_not_offered_again(self):
+        utxo_set = loaded(coin('aa'), coin('bb'))
+        first = utxo_set.reserve(take(1))
+        second = utxo_set.reserve(take(1))
+
+        self.assertNotEqual(first[0]['tx_hash'], second[0]['tx_hash'])
+        with self.assertRaises(ValueError):
+            utxo_set.reserve(take(1))
+
+    def test_failed_choice_reserves_nothing(self):
+        utxo_set = loaded(coin('aa'))
+        with self.assertRaises(ValueError):
+            utxo_set.reserve(take(2))
+        self.assertEqual(len(utxo_set.reserve(take(1))), 1)
+
+    def test_parallel_reservations_never_overlap(self):
+        utxo_set = loaded(*[coin(f'{i:02x}') for i in range(64)])
+        taken = []
+        start = threading.Barrier(8)
+
+        def payout():
+            start.wait()
+            for _ in range(8):
+                taken.extend(u['tx_hash'] for u in utxo_set.reserve(take(1)))
+
+        threads = [threading.Thread(target=payout) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(taken), 64)
+        self.assertEqual(len(set(taken)), 64)
+
+    def test_spend_swaps_the_inputs_for_the_change(self):
+        utxo_set = loaded(coin('aa', 5000), coin('bb', 7000))
+        spent = utxo_set.reserve(take(1))
+        utxo_set.spend(spent, 'cc' * 32, [(1, 3500)])
+
+        remaining = utxo_set.reserve(take(2))
+        self.assertEqual([(u['tx_hash'][:2], u['tx_pos'], u['value']) for u in remaining],
+                         [('bb', 0, 7000), ('cc', 1, 3500)])
+        self.assertEqual(remaining[1]['height'], 0)
+
+    def test_release_frees_the_inputs_and_marks_stale(self):
+        utxo_set = loaded(coin('aa'))
+        utxo_set.release(utxo_set.reserve(take(1)))
+
+        self.assertTrue(utxo_set.stale)
+        self.assertEqual(len(utxo_set.reserve(take(1))), 1)
+
+    def test_lagging_electrum_cannot_undo_our_broadcast(self):
+        # Electrum still lists the spent input and not yet the change
+        listing = [coin('aa'), coin('bb')]
+        utxo_set = UtxoSet(lambda: [dict(c) for c in listing])
+        utxo_set.refresh()
+        utxo_set.spend(utxo_set.reserve(take(1)), 'cc' * 32, [(1, 500)])
+
+        utxo_set.refresh()
+        self.assertEqual([u['tx_hash'][:2] for u in utxo_set.reserve(take(2))], ['bb', 'cc'])
+
+    def test_electrum_catching_up_replaces_the_local_entries(self):
+        listing = [coin('aa'), coin('bb')]
+        utxo_set = UtxoSet(lambda: [dict(c) for c in listing])
+        utxo_set.refresh()
+        utxo_set.spend(utxo_set.reserve(take(1)), 'cc' * 32, [(1, 500)])
+
+        listing[:] = [coin('bb'), dict(coin('cc', 500, pos=1), height=0)]
+        utxo_set.refresh()
+        self.assertEqual(len(utxo_set.reserve(take(2))), 2)
+        self.assertEqual((utxo_set._spent, utxo_set._created), ({}, {}))
+
+    def test_after_the_grace_period_electrum_wins(self):
+        # Our transaction never showed up: it was dropped, so its
+        # input is spendable again and its change never existed
+        listing = [coin('aa')]
+        utxo_set = UtxoSet(lambda: [dict(c) for c in listing])
+        with patch('app.utxo_faucet.utxo_set.time.monotonic', return_value=100.0):
+            utxo_set.refresh()
+            utxo_set.spend(utxo_set.reserve(take(1)), 'cc' * 32, [(1, 500)])
+
+        with patch('app.utxo_faucet.utxo_set.time.monotonic', return_value=100.0 + UTXO_PENDING_GRACE_SECONDS):
+            utxo_set.refresh()
+
+        self.assertEqual([u['tx_hash'][:2] for u in utxo_set.reserve(take(1))], ['aa'])
+        with self.assertRaises(ValueError):
+            utxo_set.reserve(take(1))
+
+    def test_reconcile_keeps_reservations_in_flight(self):
+        utxo_set = loaded(coin('aa'), coin('bb'))
+        utxo_set.reserve(take(1))
+        utxo_set.refresh()
+
+        self.assertEqual([u['tx_hash'][:2] for u in utxo_set.reserve(take(1))], ['bb'])
+
+    def test_wake_reconciles_in_the_background(self):
+        fetched = threading.Event()
+
+        def fetch():
+            fetched.set()
+            return [coin('aa')]
+
+        utxo_set = UtxoSet(fetch, label='net')
+        utxo_set.start()
+        utxo_set.wake()
+
+        self.assertTrue(fetched.wait(5))
@@ -0,0 +1,155 @@
+############################################################
+#  [*] Coin selection benchmark
+#
+#  Pays the same random payouts out of synthetic UTXO sets
+#  (100 to 10k coins by default, values spread log-uniformly
+#  from dust-ish to whole coins) with every strategy, and
+#  reports per strategy: the mean selection time, mean input
+#  count, mean fee, mean waste, and how many payouts needed a
+#  change output. Waste is Bitcoin Core's measure at a fixed
+#  fee rate: the excess a changeless payout leaves to the
+#  miners, or — with change — the cost of creating and later
+#  spending the change output. Every input is paid for
+#  eventually, whenever it is spent; the fee column is this
+#  payout's share only:
+#
+#    listing order    — the previous loop: coins in Electrum's
+#                       order until amount + fee is covered
+#    branch and bound — changeless matches only (the rest
+#                       count as misses)
+#    largest first    — fewest inputs
+#    smallest first   — sweeps small coins (misses at the cap)
+#    select           — what payouts run: BnB, then the
+#                       fallbacks
+#
+#  SegWit sizes at 10 sat/vB, dust 546, the default input
+#  cap. The coin set is not spent down between payouts, so
+#  every strategy sees the same wallet.
+#
+#  On 3.11 (a slow container): at 10k UTXOs select takes
+#  ~18 ms per payout, ~6 of them the one sort, the rest the
+#  bounded search; at 50k ~120 ms. It finds a changeless
+#  match for every payout (waste 0) on ~2.7 inputs, where
+#  listing order and largest first add a change output to
+#  every payout (waste 1220 sat each). At 100 UTXOs the match
+#  costs ~7 inputs — more fee now, none later. Smallest first
+#  alone at the full cap sweeps 100 inputs; select bounds
+#  that to SWEEP_MAX_INPUTS.
+#
+#  Run from backend/:
+#    python tools/bench_coin_selection.py
+#    python tools/bench_coin_selection.py 50000    # largest set
+#
+#  Used by:
+#    - the developer, manually — not imported by the app
+############################################################
+
+
+import os
+import sys
+import time
+import random
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utxo_faucet.coin_selection import CoinSelector, estimate_fee
+
+
+SEGWIT = SimpleNamespace(INPUT_SIZE=91, OUTPUT_SIZE=31)
+FEE_RATE = 10
+DUST_LIMIT = 546
+PAYOUTS = 50
+
+
+
+
+def synthetic_utxos(count, rng):
+    return [
+        {'tx_hash': f'{i:064x}', 'tx_pos': 0, 'value': int(10 ** rng.uniform(3, 8)), 'height': 100}
+        for i in range(count)
+    ]
+
+
+def synthetic_payouts(rng):
+    # 1-5 recipients of 0.0005-0.01 coin each, like a class's claims
+    return [
+        [rng.randint(50_000, 1_000_000) for _ in range(rng.randint(1, 5))]
+        for _ in range(PAYOUTS)
+    ]
+
+
+
+
+def listing_order(selector, utxos, amount, num_payouts):
+    selected, total = [], 0
+    for utxo in utxos:
+        selected.append(utxo)
+        total += utxo['value']
+        if total >= amount + estimate_fee(SEGWIT, FEE_RATE, len(selected), num_payouts + 1):
+            return selected
+    return None
+
+
+def select(selector, utxos, amount, num_payouts):
+    try:
+        return selector.select(utxos, amount, num_payouts)
+    except ValueError:
+        return None
+
+
+STRATEGIES = (
+    ('listing order', listing_order),
+    ('branch and bound', lambda s, *args: s.branch_and_bound(*args)),
+    ('largest first', lambda s, *args: s.largest_first(*args)),
+    ('smallest first', lambda s, *args: s.smallest_first(*args)),
+    ('select', select),
+)
+
+
+
+
+def run(strategy, utxos, payouts):
+    selector = CoinSelector(SEGWIT, FEE_RATE, DUST_LIMIT)
+    change_cost = (SEGWIT.OUTPUT_SIZE + SEGWIT.INPUT_SIZE) * FEE_RATE
+    elapsed, inputs, fees, waste, changes, misses = 0.0, 0, 0, 0, 0, 0
+    for amounts in payouts:
+        amount = sum(amounts)
+        began = time.perf_counter()
+        selected = strategy(selector, utxos, amount, len(amounts))
+        elapsed += time.perf_counter() - began
+        if selected is None:
+            misses += 1
+            continue
+
+        fee, change = selector.settle(selected, amount, len(amounts))
+        inputs += len(selected)
+        fees += fee
+        waste += change_cost if change else fee - estimate_fee(SEGWIT, FEE_RATE, len(selected), len(amounts))
+        changes += bool(change)
+
+    paid = max(len(payouts) - misses, 1)
+    return elapsed / len(payouts), inputs / paid, fees / paid, waste / paid, changes, misses
+
+
+
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = random.Random(1)
+    payouts = synthetic_payouts(rng)
+
+    for count in sorted({100, 1_000, largest}):
+        utxos = synthetic_utxos(count, rng)
+        print(f"{count} UTXOs, {PAYOUTS} payouts")
+        print(f"  {'strategy':<17} {'ms/payout':>9} {'inputs':>7} {'fee sat':>8} {'waste':>6} {'change':>6} {'misses':>6}")
+        for name, strategy in STRATEGIES:
+            elapsed, inputs, fee, waste, changes, misses = run(strategy, utxos, payouts)
+            print(f"  {name:<17} {elapsed * 1000:9.2f} {inputs:7.1f} {fee:8.0f} {waste:6.0f} {changes:6} {misses:6}")
+        print()
+
+
+
+
+if __name__ == '__main__':
+    main()
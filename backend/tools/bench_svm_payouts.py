@@ -0,0 +1,88 @@
+############################################################
+#  [*] SVM payout throughput benchmark
+#
+#  Measures how many Solana payouts per second one network
+#  pays when a whole class claims at once, with the payout
+#  queue running one worker (the old serialized path) and
+#  PAYOUT_WORKERS of them. The RPC is the tests' in-process
+#  fake (tests/helpers.py — fake_solana_rpc) with a fixed
+#  latency per sendTransaction, so the number is what the
+#  queue and the faucet's own work allow, not the network.
+#  Every claim is a fresh wallet with a real Ed25519
+#  signature.
+#
+#  With 64 claims and 50 ms per send, one worker pays about
+#  20 payouts/s (1 / latency) and eight about 155 — close to
+#  the eightfold the worker count promises.
+#
+#  Run from backend/:
+#    python tools/bench_svm_payouts.py
+#    python tools/bench_svm_payouts.py 128 0.02   # claims, send latency (s)
+#
+#  Used by:
+#    - the developer, manually — not imported by the app
+############################################################
+
+
+import os
+import sys
+import time
+import logging
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.payout_queue.payout_queue import PayoutQueue
+from app.svm_faucet.svm_faucet import PAYOUT_WORKERS
+from tests import helpers
+
+
+NETWORK = 'testsvm'
+
+
+
+
+def run(workers, claims, latency):
+    faucet = helpers.make_svm_faucet()
+    faucet.payouts = PayoutQueue('svm-bench', workers=workers)
+    client = helpers.fake_solana_rpc(faucet, NETWORK, balances={faucet.FAUCET_ADDRESS: 10 ** 15})
+
+    # A distinct signature per send, so the tracker follows each
+    # payout on its own
+    signatures = itertools.count()
+
+    def send_transaction(signed_base64):
+        time.sleep(latency)
+        client.sent.append(signed_base64)
+        return f'sig{next(signatures):085d}'
+    client.send_transaction = send_transaction
+
+    wallets = [helpers.sign_svm_claim(address_seed=(i + 1).to_bytes(32, 'big')) for i in range(claims)]
+    began = time.perf_counter()
+    with ThreadPoolExecutor(claims) as pool:
+        statuses = list(pool.map(lambda wallet: faucet.request_sol(NETWORK, *wallet)[1], wallets))
+    elapsed = time.perf_counter() - began
+
+    if statuses != [200] * claims:
+        raise SystemExit(f"not every claim was paid: {sorted(set(statuses))}")
+    return claims / elapsed
+
+
+
+
+def main():
+    claims = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    logging.disable(logging.CRITICAL)
+
+    print(f"{claims} concurrent claims, {latency * 1000:.0f} ms per sendTransaction")
+    print("workers   payouts/s")
+    for workers in sorted({1, PAYOUT_WORKERS}):
+        print(f"{workers:>7} {run(workers, claims, latency):>11.1f}")
+
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+############################################################
+#  [*] WSGI entrypoint — what gunicorn serves
+#
+#  Builds the backend once per worker through main's
+#  application factory. Tuning (workers, threads, keep-alive,
+#  the graceful drain) lives in gunicorn.conf.py.
+#
+#  Used by:
+#    - Dockerfile — gunicorn -c gunicorn.conf.py wsgi:app
+############################################################
+
+
+from main import create_app
+
+
+app = create_app()
@@ -52,6 +52,7 @@ import LocalGasStationIcon from '@mui/icons-material/LocalGasStation';
 import useMetamaskWallet, { getMetamaskProvider } from '@/hooks/useMetamaskWallet';
 import { WalletStepper, WalletGateButton, FadingAlert, useAlerts } from '@/components/WalletFlow';
 import AssetIcon from '@/components/AssetIcon';
+import requestPayout from '@/requestPayout';
 
 
 // How often the token payload (with the faucet's per-chain
@@ -614,8 +615,8 @@ function useTokenActions(symbol, wallet, data, addAlert, reload) {
     try {
       const { nonce, signature } = await wallet.signMessage();
 
-      await axios.get(`/api/erc20/${deployment.network}/${symbol}/request`, {
-        params: { address: wallet.account, signature, nonce },
+      await requestPayout(`/api/erc20/${deployment.network}/${symbol}/request`, {
+        address: wallet.account, signature, nonce,
       });
 
       addAlert(
@@ -39,6 +39,7 @@ import HubIcon from '@mui/icons-material/Hub';
 import useMetamaskWallet from '@/hooks/useMetamaskWallet';
 import { WalletStepper, WalletGateButton, FadingAlert, useAlerts } from '@/components/WalletFlow';
 import AssetIcon from '@/components/AssetIcon';
+import requestPayout from '@/requestPayout';
 
 
 // How often the faucet balance repolls
@@ -180,9 +181,7 @@ export default function FaucetEVM() {
     try {
       const { nonce, signature } = await wallet.signMessage();
 
-      await axios.get(`/api/evm/${network}/request`, {
-        params: { address: wallet.account, signature, nonce },
-      });
+      await requestPayout(`/api/evm/${network}/request`, { address: wallet.account, signature, nonce });
 
       addAlert('success', `${networkInfo.full_name} išsiųstas į jūsų piniginę.`);
       queryClient.invalidateQueries({ queryKey: ['evm-faucet-balance', network] });
@@ -41,6 +41,7 @@ import PaidIcon from '@mui/icons-material/Paid';
 
 import AssetIcon from '@/components/AssetIcon';
 import { WalletStepper, WalletGateButton, FadingAlert, useAlerts } from '@/components/WalletFlow';
+import requestPayout from '@/requestPayout';
 
 import useSuiWallet from './useSuiWallet';
 
@@ -287,9 +288,7 @@ export default function FaucetMOVE() {
     try {
       const { nonce, signature } = await wallet.signMessage();
 
-      await axios.get(`/api/move/${network}/request`, {
-        params: { address: wallet.address, signature, nonce },
-      });
+      await requestPayout(`/api/move/${network}/request`, { address: wallet.address, signature, nonce });
 
       addAlert('success', `${networkInfo.full_name} išsiųstas į jūsų piniginę.`);
       queryClient.invalidateQueries({ queryKey: ['move-faucet-balance', network] });
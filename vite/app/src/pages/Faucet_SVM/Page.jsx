@@ -46,6 +46,7 @@ import PaidIcon from '@mui/icons-material/Paid';
 
 import AssetIcon from '@/components/AssetIcon';
 import { WalletStepper, WalletGateButton, FadingAlert, useAlerts } from '@/components/WalletFlow';
+import requestPayout from '@/requestPayout';
 
 import usePhantomWallet from './usePhantomWallet';
 
@@ -339,9 +340,7 @@ export default function FaucetSVM() {
     try {
       const { nonce, signature } = await wallet.signMessage();
 
-      await axios.get(`/api/svm/${network}/request`, {
-        params: { address: wallet.address, signature, nonce },
-      });
+      await requestPayout(`/api/svm/${network}/request`, { address: wallet.address, signature, nonce });
 
       addAlert('success', `${networkInfo.full_name} išsiųstas į jūsų piniginę.`);
       queryClient.invalidateQueries({ queryKey: ['svm-faucet-balance', network] });
@@ -32,6 +32,7 @@ import QRCode from 'react-qr-code';
 import { Box, Paper, TextField, Button, Alert, Stack, Typography, Divider, Skeleton } from '@mui/material';
 
 import AssetIcon from '@/components/AssetIcon';
+import requestPayout from '@/requestPayout';
 
 
 // How often the faucet balance repolls in the background
@@ -240,7 +241,7 @@ export default function FaucetUTXO() {
 
     try {
       setSubmitting(true);
-      const { data } = await axios.get(`/api/utxo/${network}/request-btc`, { params: { address: recipient.trim() } });
+      const data = await requestPayout(`/api/utxo/${network}/request-btc`, { address: recipient.trim() });
       if (data?.error) {
         setError(data.error);
       } else {
@@ -0,0 +1,60 @@
+// -----------------------------------------------------------
+//  [*] requestPayout — claim, then follow the payout ticket
+//
+//  Every faucet's request route answers 202 with a ticket at
+//  once: the payout itself runs on the backend's per-network
+//  payout queue, so no HTTP thread waits on a send lock or an
+//  RPC. This helper makes the claim and polls
+//  GET /api/payout/<ticket> until the ticket is sent or
+//  failed, then hands back what the old synchronous request
+//  answered — the payout's own payload on success, an
+//  axios-shaped error ({ response: { status, data } }) on
+//  failure — so the pages' success and error paths stay as
+//  they were. A refusal before the queue (400, 403, 429)
+//  still arrives as the claim's own error response.
+//
+//  Used by:
+//    - pages/Faucet_EVM/Page.jsx
+//    - pages/Faucet_ERC20/Page.jsx
+//    - pages/Faucet_UTXO/Page.jsx
+//    - pages/Faucet_SVM/Page.jsx
+//    - pages/Faucet_MOVE/Page.jsx
+// -----------------------------------------------------------
+
+import axios from 'axios';
+
+
+// How often a queued payout's ticket is polled
+const PAYOUT_POLL_MS = 1000;
+
+// How long the page follows one ticket before giving up on
+// it — the payout may still go out, the student is told so
+const PAYOUT_POLL_TIMEOUT_MS = 180000;
+
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+
+export default async function requestPayout(url, params) {
+  const claim = await axios.get(url, { params });
+  if (claim.status !== 202) {
+    return claim.data;
+  }
+
+  const deadline = Date.now() + PAYOUT_POLL_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    await sleep(PAYOUT_POLL_MS);
+
+    const { data: ticket } = await axios.get(`/api/payout/${claim.data.ticket}`);
+    if (ticket.status === 'sent') {
+      return ticket.result;
+    }
+    if (ticket.status === 'failed') {
+      const error = new Error(ticket.result?.error || 'Nepavyko išsiųsti transakcijos.');
+      error.response = { status: ticket.http_status, data: ticket.result };
+      throw error;
+    }
+  }
+
+  throw new Error('Išmoka vis dar eilėje — patikrinkite piniginę po kelių minučių.');
+}